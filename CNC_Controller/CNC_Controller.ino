@@ -9,12 +9,21 @@
 #include <MPU6050.h>
 
 // === DECLARACIÓN DE FUNCIONES ===
+void pulseX(bool cw);
+void pulseY(bool cw);
 void stepX(bool cw);
 void stepY(bool cw);
 void stepZ(bool cw);
 void moveX(long steps);
 void moveY(long steps);
 void moveZ(long steps);
+void moveXY(long stepsX, long stepsY);
+void moveXYProfiled(long stepsX, long stepsY, long entryUs, long exitUs);
+void traceXY(long stepsX, long stepsY, long entryUs, long exitUs);
+void releaseXY();
+bool processVelocity(const String& args);
+bool parseVelocity(const String& args, long values[4]);
+bool batchMove(const String& command, int start, int end, bool run);
 void penUp();
 void penDown();
 void releasePenMotor();
@@ -28,6 +37,7 @@ void calibrateXWithIMU();
 void calibrateYWithIMU();
 void testAreaCompleta();
 void processCommand(char cmd);
+void processBatch(const String& command, int colon);
 bool isAtLimit(int16_t current, int16_t previous, int threshold);
 
 // ============================================
@@ -61,6 +71,11 @@ bool isAtLimit(int16_t current, int16_t previous, int threshold);
 // ============================================
 
 #define STEP_DELAY 2000  // Aumentado para más torque
+// Movimientos con perfil (V): arrancan/frenan a STEP_DELAY y aceleran
+// hasta CRUISE_DELAY. El host planifica con los mismos valores
+// (cnc_lookahead.py): si se cambian acá, cambiarlos allá también.
+#define CRUISE_DELAY 1200       // µs por paso a velocidad crucero
+#define ACCEL_STEPS_S2 1500.0   // pasos/s² del eje mayor
 #define MAX_X_STEPS 8192  // Se ajustará automáticamente con calibración IMU
 #define MAX_Y_STEPS 8192  // Se ajustará automáticamente con calibración IMU
 #define MAX_Z_STEPS 512
@@ -101,6 +116,9 @@ int stepIndexX = 0;
 int stepIndexY = 0;
 int stepIndexZ = 0;
 bool penIsDown = false;
+bool quietMoves = false;  // dentro de un lote (M) no se imprimen los movimientos
+String commandBuffer = "";
+#define MAX_COMMAND_LENGTH 128  // un lote M cabe sin realocar el String
 
 // ============================================
 // SETUP
@@ -203,14 +221,14 @@ void setup() {
   Serial.println("💡 Escribe un comando y presiona Enter");
   Serial.println();
   Serial.flush();
+  
+  commandBuffer.reserve(MAX_COMMAND_LENGTH);
 }
 
 // ============================================
 // LOOP
 // ============================================
 
-String commandBuffer = "";
-
 void loop() {
   // Leer comandos completos desde el puerto serial
   while (Serial.available()) {
@@ -234,7 +252,8 @@ void loop() {
 // FUNCIONES MOTOR
 // ============================================
 
-void stepX(bool cw) {
+void pulseX(bool cw) {
+  // Avanzar la secuencia de X sin esperar (usado por moveXY)
   if (cw) {
     stepIndexX++;
     if (stepIndexX >= 8) stepIndexX = 0;
@@ -246,10 +265,15 @@ void stepX(bool cw) {
   digitalWrite(MOTOR_X_IN2, halfStep[stepIndexX][1]);
   digitalWrite(MOTOR_X_IN3, halfStep[stepIndexX][2]);
   digitalWrite(MOTOR_X_IN4, halfStep[stepIndexX][3]);
+}
+
+void stepX(bool cw) {
+  pulseX(cw);
   delayMicroseconds(STEP_DELAY);
 }
 
-void stepY(bool cw) {
+void pulseY(bool cw) {
+  // Avanzar la secuencia de Y sin esperar (usado por moveXY)
   if (cw) {
     stepIndexY++;
     if (stepIndexY >= 8) stepIndexY = 0;
@@ -261,6 +285,10 @@ void stepY(bool cw) {
   digitalWrite(MOTOR_Y_IN2, halfStep[stepIndexY][1]);
   digitalWrite(MOTOR_Y_IN3, halfStep[stepIndexY][2]);
   digitalWrite(MOTOR_Y_IN4, halfStep[stepIndexY][3]);
+}
+
+void stepY(bool cw) {
+  pulseY(cw);
   delayMicroseconds(STEP_DELAY);
 }
 
@@ -288,9 +316,11 @@ void moveX(long steps) {
   bool cw = (steps > 0);
   steps = abs(steps);
   
-  Serial.print("X ");
-  Serial.print(cw ? "+" : "-");
-  Serial.println(steps);
+  if (!quietMoves) {
+    Serial.print("X ");
+    Serial.print(cw ? "+" : "-");
+    Serial.println(steps);
+  }
   
   for (long i = 0; i < steps; i++) {
     stepX(cw);
@@ -308,9 +338,11 @@ void moveY(long steps) {
   bool cw = (steps > 0);
   steps = abs(steps);
   
-  Serial.print("Y ");
-  Serial.print(cw ? "+" : "-");
-  Serial.println(steps);
+  if (!quietMoves) {
+    Serial.print("Y ");
+    Serial.print(cw ? "+" : "-");
+    Serial.println(steps);
+  }
   
   for (long i = 0; i < steps; i++) {
     stepY(cw);
@@ -328,10 +360,12 @@ void moveZ(long steps) {
   bool cw = (steps > 0);
   steps = abs(steps);
   
-  Serial.print("Z ");
-  Serial.print(cw ? "⬆️" : "⬇️");
-  Serial.print(" ");
-  Serial.println(steps);
+  if (!quietMoves) {
+    Serial.print("Z ");
+    Serial.print(cw ? "⬆️" : "⬇️");
+    Serial.print(" ");
+    Serial.println(steps);
+  }
   
   for (long i = 0; i < steps; i++) {
     stepZ(cw);
@@ -350,7 +384,41 @@ void moveZ(long steps) {
 }
 
 void moveXY(long stepsX, long stepsY) {
-  // Movimiento diagonal coordinado
+  // Movimiento diagonal coordinado (línea recta tipo Bresenham)
+  // Ambos motores avanzan en el mismo ciclo con UN solo STEP_DELAY:
+  // una diagonal tarda max(|dx|,|dy|) pasos en vez de |dx|+|dy|
+  if (!quietMoves) {
+    Serial.print("Movimiento XY: (");
+    Serial.print(stepsX);
+    Serial.print(", ");
+    Serial.print(stepsY);
+    Serial.println(")");
+  }
+  
+  traceXY(stepsX, stepsY, 0, 0);
+  releaseXY();
+}
+
+void moveXYProfiled(long stepsX, long stepsY, long entryUs, long exitUs) {
+  // Igual que moveXY pero entrando y saliendo a la velocidad que planificó
+  // el host (look-ahead): los segmentos casi alineados de una curva se
+  // encadenan sin frenar. Las bobinas quedan energizadas para el siguiente.
+  if (!quietMoves) {
+    Serial.print("Movimiento XY: (");
+    Serial.print(stepsX);
+    Serial.print(", ");
+    Serial.print(stepsY);
+    Serial.println(")");
+  }
+  
+  traceXY(stepsX, stepsY,
+          constrain(entryUs, CRUISE_DELAY, STEP_DELAY),
+          constrain(exitUs, CRUISE_DELAY, STEP_DELAY));
+}
+
+void traceXY(long stepsX, long stepsY, long entryUs, long exitUs) {
+  // entryUs = 0: STEP_DELAY constante. Si no, la velocidad del paso i es
+  // min(crucero, sqrt(ve² + 2·a·i), sqrt(vs² + 2·a·(n-1-i)))
   bool cwX = (stepsX > 0);
   bool cwY = (stepsY > 0);
   
@@ -359,24 +427,46 @@ void moveXY(long stepsX, long stepsY) {
   
   long maxSteps = max(absX, absY);
   
-  Serial.print("Movimiento XY: (");
-  Serial.print(stepsX);
-  Serial.print(", ");
-  Serial.print(stepsY);
-  Serial.println(")");
+  bool ramp = (entryUs > 0);
+  float entry2 = ramp ? sq(1e6f / entryUs) : 0;
+  float exit2 = ramp ? sq(1e6f / exitUs) : 0;
+  float cruise = 1e6f / CRUISE_DELAY;
+  
+  long errX = 0;
+  long errY = 0;
   
   for (long i = 0; i < maxSteps; i++) {
-    if (i < absX && currentX >= 0 && currentX <= MAX_X_STEPS) {
-      stepX(cwX);
-      currentX += (cwX ? 1 : -1);
+    errX += absX;
+    errY += absY;
+    
+    // Solo avanzar si el paso no saca al eje del rango 0..MAX
+    if (2 * errX >= maxSteps) {
+      errX -= maxSteps;
+      if (cwX ? currentX < MAX_X_STEPS : currentX > 0) {
+        pulseX(cwX);
+        currentX += (cwX ? 1 : -1);
+      }
     }
     
-    if (i < absY && currentY >= 0 && currentY <= MAX_Y_STEPS) {
-      stepY(cwY);
-      currentY += (cwY ? 1 : -1);
+    if (2 * errY >= maxSteps) {
+      errY -= maxSteps;
+      if (cwY ? currentY < MAX_Y_STEPS : currentY > 0) {
+        pulseY(cwY);
+        currentY += (cwY ? 1 : -1);
+      }
+    }
+    
+    if (ramp) {
+      float v = min(cruise, min(sqrtf(entry2 + 2 * ACCEL_STEPS_S2 * i),
+                                sqrtf(exit2 + 2 * ACCEL_STEPS_S2 * (maxSteps - 1 - i))));
+      delayMicroseconds((unsigned long)(1e6f / v));
+    } else {
+      delayMicroseconds(STEP_DELAY);
     }
   }
-  
+}
+
+void releaseXY() {
   // Apagar motores
   digitalWrite(MOTOR_X_IN1, LOW);
   digitalWrite(MOTOR_X_IN2, LOW);
@@ -394,23 +484,23 @@ void moveXY(long stepsX, long stepsY) {
 
 void penUp() {
   if (penIsDown) {
-    Serial.println("✏️ ⬆️ LÁPIZ ARRIBA (Pen Up)");
+    if (!quietMoves) Serial.println("✏️ ⬆️ LÁPIZ ARRIBA (Pen Up)");
     moveZ(PEN_UP_STEPS);  // Subir lápiz
     penIsDown = false;
     delay(200);  // Pequeña pausa para estabilizar
   } else {
-    Serial.println("ℹ️ Lápiz ya está arriba");
+    if (!quietMoves) Serial.println("ℹ️ Lápiz ya está arriba");
   }
 }
 
 void penDown() {
   if (!penIsDown) {
-    Serial.println("✏️ ⬇️ LÁPIZ ABAJO (Pen Down)");
+    if (!quietMoves) Serial.println("✏️ ⬇️ LÁPIZ ABAJO (Pen Down)");
     moveZ(-PEN_DOWN_STEPS);  // Bajar lápiz
     penIsDown = true;
     delay(200);  // Pequeña pausa para estabilizar
   } else {
-    Serial.println("ℹ️ Lápiz ya está abajo");
+    if (!quietMoves) Serial.println("ℹ️ Lápiz ya está abajo");
   }
 }
 
@@ -515,6 +605,7 @@ void goHome() {
   if (currentX != 0) moveX(-currentX);
   if (currentY != 0) moveY(-currentY);
   if (currentZ != 0) moveZ(-currentZ);
+  penIsDown = false;  // Z en 0 = lápiz arriba (si no, el próximo B no baja)
   Serial.println("HOME OK\n");
 }
 
@@ -1044,11 +1135,20 @@ void processCommand(String command) {
   
   if (command.length() == 0) return;
   
+  char cmd = command.charAt(0);  // Primer carácter
+  
+  // Lote de movimientos (M<seq>:...*CK): eco corto, sin repetir toda la línea
+  int colon = command.indexOf(':');
+  if (cmd == 'M' && colon > 0) {
+    Serial.print("\n> ");
+    Serial.println(command.substring(0, colon));
+    processBatch(command, colon);
+    return;
+  }
+  
   Serial.print("\n> ");
   Serial.println(command);
   
-  char cmd = command.charAt(0);  // Primer carácter
-  
   // Comandos con parámetros numéricos (X100, Y-50, Z20, etc.)
   if (command.length() > 1 && (cmd == 'X' || cmd == 'Y' || cmd == 'Z')) {
     int value = command.substring(1).toInt();
@@ -1078,6 +1178,28 @@ void processCommand(String command) {
     return;
   }
   
+  // Línea XY coordinada (L100,-50): ambos ejes a la vez con moveXY
+  if (command.length() > 1 && cmd == 'L') {
+    int comma = command.indexOf(',');
+    if (comma < 0) {
+      Serial.println("⚠ Formato: L<dx>,<dy> (ej: L100,-50)");
+      return;
+    }
+    long dx = command.substring(1, comma).toInt();
+    long dy = command.substring(comma + 1).toInt();
+    moveXY(dx, dy);
+    return;
+  }
+  
+  // Línea XY con perfil de velocidad (V100,-50,2000,1200)
+  if (command.length() > 1 && cmd == 'V') {
+    if (!processVelocity(command.substring(1))) {
+      Serial.println("⚠ Formato: V<dx>,<dy>,<entrada_us>,<salida_us> (ej: V100,-50,2000,1200)");
+    }
+    if (!Serial.available()) releaseXY();  // nada más en camino: soltar bobinas
+    return;
+  }
+  
   // Comandos simples (sin parámetros)
   switch(cmd) {
     case 'X': testMotorX(); break;
@@ -1104,6 +1226,9 @@ void processCommand(String command) {
       Serial.println("  X<n> = Mover X n pasos (ej: X100, X-50)");
       Serial.println("  Y<n> = Mover Y n pasos (ej: Y200, Y-100)");
       Serial.println("  Z<n> = Mover Z n pasos (ej: Z50, Z-25)");
+      Serial.println("  L<dx>,<dy> = Línea XY coordinada (ej: L100,-50)");
+      Serial.println("  V<dx>,<dy>,<e>,<s> = Línea XY con rampa (µs/paso al entrar y salir)");
+      Serial.println("  M<n>:L10,5;B;X20;U*CK = Lote de movimientos (checksum XOR)");
       Serial.println();
       Serial.println("🎨 DIBUJO:");
       Serial.println("  S = Cuadrado");
@@ -1125,3 +1250,105 @@ void processCommand(String command) {
   }
   Serial.flush();
 }
+
+// ============================================
+// LOTES DE MOVIMIENTOS (M<seq>:<cmd>;<cmd>...*<XOR hex>)
+// ============================================
+// Varios L/V/X/Y/B/U en una sola línea: un eco, ninguna charla por
+// movimiento y una sola vuelta de loop(). El checksum es el XOR de todos
+// los bytes antes del '*'; si no coincide, o si algún sub-comando está mal
+// formado, no se mueve nada (se valida el lote entero antes de moverse).
+
+void processBatch(const String& command, int colon) {
+  String seq = command.substring(1, colon);
+  int star = command.lastIndexOf('*');
+  if (star < colon) {
+    Serial.print("⚠ M"); Serial.print(seq); Serial.println(" CHK");
+    return;
+  }
+  
+  byte sum = 0;
+  for (int i = 0; i < star; i++) {
+    sum ^= (byte)command.charAt(i);
+  }
+  long expected = strtol(command.substring(star + 1).c_str(), NULL, 16);
+  if (sum != expected) {
+    Serial.print("⚠ M"); Serial.print(seq); Serial.println(" CHK");
+    return;
+  }
+  
+  // Primera pasada: validar todo; el host no cuenta un lote con error
+  for (int start = colon + 1; start < star; ) {
+    int end = command.indexOf(';', start);
+    if (end < 0 || end > star) end = star;
+    if (!batchMove(command, start, end, false)) {
+      Serial.print("⚠ M"); Serial.print(seq); Serial.print(" ? ");
+      Serial.println(command.substring(start, end));
+      return;
+    }
+    start = end + 1;
+  }
+  
+  // Segunda pasada: ejecutar
+  quietMoves = true;
+  for (int start = colon + 1; start < star; ) {
+    int end = command.indexOf(';', start);
+    if (end < 0 || end > star) end = star;
+    batchMove(command, start, end, true);
+    start = end + 1;
+  }
+  quietMoves = false;
+  if (!Serial.available()) releaseXY();
+  
+  Serial.print("M"); Serial.print(seq); Serial.println(" OK");
+}
+
+bool batchMove(const String& command, int start, int end, bool run) {
+  // Un sub-comando del lote (entre start y end): false si está mal formado
+  char move = command.charAt(start);
+  
+  if (move == 'L') {
+    int comma = command.indexOf(',', start);
+    if (comma < 0 || comma > end) return false;
+    if (run) moveXY(command.substring(start + 1, comma).toInt(),
+                    command.substring(comma + 1, end).toInt());
+  } else if (move == 'V') {
+    long values[4];
+    if (!parseVelocity(command.substring(start + 1, end), values)) return false;
+    if (run) moveXYProfiled(values[0], values[1], values[2], values[3]);
+  } else if (move == 'X' && end > start + 1) {
+    if (run) moveX(command.substring(start + 1, end).toInt());
+  } else if (move == 'Y' && end > start + 1) {
+    if (run) moveY(command.substring(start + 1, end).toInt());
+  } else if (move == 'B' && end == start + 1) {
+    if (run) penDown();
+  } else if (move == 'U' && end == start + 1) {
+    if (run) penUp();
+  } else {
+    return false;
+  }
+  return true;
+}
+
+// ============================================
+// MOVIMIENTO CON PERFIL (V<dx>,<dy>,<entrada_us>,<salida_us>)
+// ============================================
+
+bool processVelocity(const String& args) {
+  long values[4];
+  if (!parseVelocity(args, values)) return false;
+  moveXYProfiled(values[0], values[1], values[2], values[3]);
+  return true;
+}
+
+bool parseVelocity(const String& args, long values[4]) {
+  // <dx>,<dy>,<entrada_us>,<salida_us>: exactamente cuatro valores
+  int start = 0;
+  for (int k = 0; k < 4; k++) {
+    int comma = args.indexOf(',', start);
+    if ((comma < 0) != (k == 3)) return false;
+    values[k] = args.substring(start, comma < 0 ? args.length() : comma).toInt();
+    start = comma + 1;
+  }
+  return true;
+}
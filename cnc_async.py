@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transporte asyncio - Un escritor, un lector y comandos como futuros
+
+`AsyncPlotterTransport` es el único dueño del puerto serial: una tarea
+escribe (en orden, respetando la ventana del búfer RX del ESP32) y otra lee
+y corta en líneas. Cada `send(comando)` devuelve un futuro que se resuelve
+con las líneas que imprimió el firmware para ese comando, cuando terminó:
+
+    > X120                  <- eco de X120
+    Moviendo X: 120 pasos   <- respuesta de X120
+    X +120
+    > P                     <- eco del siguiente: X120 terminó
+
+Cuando la cola se vacía y el último comando todavía no tiene "siguiente",
+el escritor manda 'P' como barrera, así un comando aislado (o una
+calibración C/D) también se resuelve al terminar, sin sleeps. La 'P'
+termina con su línea "Z: n / 512" y de paso actualiza `position`.
+
+Las lecturas y escrituras bloqueantes de pyserial corren en un executor
+propio. `AsyncJobRunner` envía un trabajo con pausa, reanudación y aborto
+cooperativos: nunca quedan más de `lookahead` comandos por delante, así
+la latencia de una pausa está acotada. `LoopThread` corre un loop en un hilo
+para usarlo desde código síncrono (motor, GUI).
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from cnc_batch import batch_echo
+from cnc_position import parse_position_report
+from cnc_sender import (BARRIER_COMMAND, DEFAULT_ACK_TIMEOUT, DEFAULT_MAX_BYTES, DEFAULT_WINDOW,
+                        parse_echo)
+from cnc_serial_reader import MAX_READ, READ_TIMEOUT, LineFramer
+
+LineListener = Callable[[str], None]
+
+
+class _Entry:
+    """Un comando en la cola o en camino"""
+
+    __slots__ = ('command', 'future', 'size', 'barrier', 'echoed', 'lines')
+
+    def __init__(self, command: str, future: asyncio.Future, barrier: bool = False):
+        self.command = command
+        self.future = future
+        self.size = len(command) + 1
+        self.barrier = barrier
+        self.echoed = False
+        self.lines: List[str] = []
+
+
+class AsyncPlotterTransport:
+    """Puerto serial estilo pyserial con una tarea escritora y una lectora"""
+
+    def __init__(self, port, window: int = DEFAULT_WINDOW, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ack_timeout: float = DEFAULT_ACK_TIMEOUT):
+        self.port = port
+        self.window = window
+        self.max_bytes = max_bytes
+        self.ack_timeout = ack_timeout
+        self.position = None          # (x, y, z) del último reporte 'P'
+        self.limits = None            # (MAX_X, MAX_Y, MAX_Z) del mismo reporte
+        self.lock = None              # asyncio.Lock para trabajos exclusivos
+        self.on_line: Optional[LineListener] = None   # cada línea recibida
+        self.on_write: Optional[LineListener] = None  # cada comando escrito
+        self.on_error: Optional[Callable[[Exception], None]] = None
+        self.error: Optional[Exception] = None
+        self._framer = LineFramer()
+        self._queue = deque()         # por escribir
+        self._in_flight = deque()     # escritos, sin terminar
+        self._in_flight_bytes = 0     # escritos y todavía sin eco (en el búfer RX)
+        self._wakeup = None
+        self._executor = None
+        self._tasks = []
+        self._closing = False
+        self._holds = 0               # productores que prometen más comandos
+
+    # ------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------
+
+    async def start(self) -> None:
+        self.lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cnc-serial')
+        if hasattr(self.port, 'timeout'):
+            self.port.timeout = READ_TIMEOUT
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._reader()), loop.create_task(self._writer())]
+
+    async def close(self) -> None:
+        self._closing = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._fail_all(ConnectionError("Transporte cerrado"))
+        self._executor.shutdown(wait=True)
+        self.port.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ------------------------------------------------------------
+    # Comandos
+    # ------------------------------------------------------------
+
+    def send(self, command: str) -> asyncio.Future:
+        """Encolar un comando; el futuro se resuelve con sus líneas de
+        respuesta cuando el firmware lo terminó. Cancelar el futuro antes
+        de que se escriba lo saca de la cola."""
+        future = asyncio.get_running_loop().create_future()
+        if self.error is not None:
+            future.set_exception(self.error)
+            return future
+        self._queue.append(_Entry(command, future))
+        self._wakeup.set()
+        return future
+
+    async def command(self, command: str) -> List[str]:
+        return await self.send(command)
+
+    async def drain(self) -> None:
+        """Esperar a que termine todo lo encolado y lo que está en camino"""
+        futures = [entry.future for entry in list(self._in_flight) + list(self._queue)]
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+
+    def cancel_queued(self, futures: Optional[Iterable[asyncio.Future]] = None) -> int:
+        """Descartar lo que todavía no se escribió (todo, o solo esos
+        futuros). Lo que está en camino termina igual: el firmware no
+        permite retirarlo."""
+        selected = None if futures is None else set(futures)
+        kept = deque()
+        count = 0
+        for entry in self._queue:
+            if selected is None or entry.future in selected:
+                if entry.future.cancel():
+                    count += 1
+            else:
+                kept.append(entry)
+        self._queue = kept
+        self._wakeup.set()
+        return count
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue) + len(self._in_flight)
+
+    # ------------------------------------------------------------
+    # Escritor
+    # ------------------------------------------------------------
+
+    def _unechoed(self):
+        return [entry for entry in self._in_flight if not entry.echoed]
+
+    def _has_room(self, entry: _Entry) -> bool:
+        unechoed = self._unechoed()
+        if not unechoed:
+            return True
+        return len(unechoed) < self.window and self._in_flight_bytes + entry.size <= self.max_bytes
+
+    def _needs_barrier(self) -> bool:
+        """El último comando escrito necesita un 'siguiente' para terminar"""
+        if self._holds or not self._in_flight:
+            return False
+        return self._in_flight[-1].command.strip().upper() != BARRIER_COMMAND
+
+    def hold_barrier(self) -> None:
+        """Un productor va a seguir encolando: no mandar 'P' si la cola se
+        vacía un momento (cada barrera es un comando más para el firmware)"""
+        self._holds += 1
+
+    def release_barrier(self) -> None:
+        self._holds -= 1
+        self._wakeup.set()
+
+    async def _writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._closing:
+            while self._queue and self._queue[0].future.cancelled():
+                self._queue.popleft()
+            if self._queue:
+                entry = self._queue[0]
+            elif self._needs_barrier():
+                entry = _Entry(BARRIER_COMMAND, loop.create_future(), barrier=True)
+                self._queue.append(entry)
+            else:
+                entry = None
+            if entry is None or not self._has_room(entry):
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self._queue.popleft()
+            self._in_flight.append(entry)
+            self._in_flight_bytes += entry.size
+            try:
+                await loop.run_in_executor(self._executor, self.port.write,
+                                           (entry.command + '\n').encode())
+            except Exception as e:
+                self._fail(e)
+                return
+            if self.on_write is not None:
+                self.on_write(entry.command)
+
+    # ------------------------------------------------------------
+    # Lector
+    # ------------------------------------------------------------
+
+    def _read_chunk(self) -> bytes:
+        # Bloquea hasta que llegue al menos un byte (o venza el timeout)
+        # y luego se lleva de una vez todo lo que haya en el buffer
+        data = self.port.read(1)
+        if data:
+            waiting = self.port.in_waiting
+            if waiting:
+                data += self.port.read(min(waiting, MAX_READ))
+        return data
+
+    async def _reader(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_progress = loop.time()
+        while not self._closing:
+            try:
+                data = await loop.run_in_executor(self._executor, self._read_chunk)
+            except Exception as e:
+                self._fail(e)
+                return
+            now = loop.time()
+            for line in self._framer.feed(data):
+                # Cualquier línea prueba que el enlace sigue vivo (una
+                # calibración imprime progreso pero tarda en dar el eco)
+                last_progress = now
+                if self.on_line is not None:
+                    self.on_line(line)
+                self._handle_line(line)
+            if not self._unechoed():
+                last_progress = now
+            elif now - last_progress > self.ack_timeout:
+                self._fail(TimeoutError(f"Sin respuesta del CNC en {self.ack_timeout:.0f} s "
+                                        f"(esperando '{self._unechoed()[0].command}')"))
+                return
+
+    def _handle_line(self, line: str) -> None:
+        """Asignar una línea al comando en curso (o marcar un eco)"""
+        echo = parse_echo(line)
+        unechoed = self._unechoed()
+        if echo is not None and unechoed and batch_echo(echo) == batch_echo(unechoed[0].command):
+            # El comando anterior terminó; este empieza
+            while self._in_flight and self._in_flight[0].echoed:
+                self._complete(self._in_flight[0])
+            entry = unechoed[0]
+            entry.echoed = True
+            self._in_flight_bytes -= entry.size
+            self._wakeup.set()
+            return
+
+        current = self._in_flight[0] if self._in_flight and self._in_flight[0].echoed else None
+        if current is None:
+            return
+        current.lines.append(line)
+        if current.command.strip().upper() == BARRIER_COMMAND and line.startswith('Z:'):
+            report = parse_position_report(current.lines)
+            if report is not None:
+                self.position, self.limits = report
+            self._complete(current)
+
+    def _complete(self, entry: _Entry) -> None:
+        self._in_flight.remove(entry)
+        if not entry.future.done():
+            entry.future.set_result(entry.lines)
+        self._wakeup.set()
+
+    def _fail_all(self, error: Exception) -> None:
+        for entry in list(self._in_flight) + list(self._queue):
+            if not entry.future.done():
+                entry.future.set_exception(error)
+                if entry.barrier:
+                    entry.future.exception()   # nadie la espera: no avisar
+        self._in_flight.clear()
+        self._queue.clear()
+        self._in_flight_bytes = 0
+
+    def _fail(self, error: Exception) -> None:
+        self.error = error
+        self._fail_all(error)
+        if self.on_error is not None:
+            self.on_error(error)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+class AsyncJobRunner:
+    """Envía una secuencia de comandos con pausa y aborto cooperativos.
+
+    Mantiene `lookahead` comandos encolados o en camino (por defecto dos
+    ventanas): la cola del transporte nunca se vacía mientras se espera al
+    más antiguo, y una pausa deja terminar a lo sumo esos comandos.
+    """
+
+    def __init__(self, transport: AsyncPlotterTransport, lookahead: Optional[int] = None):
+        self.transport = transport
+        self.lookahead = max(lookahead or 2 * transport.window, transport.window + 2)
+        self.completed = 0
+        self.aborted = False
+        self._running = asyncio.Event()
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def pause(self) -> None:
+        """No encolar más: lo ya enviado (<= lookahead comandos) termina"""
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def abort(self) -> None:
+        """Terminar el trabajo: se descarta lo que no se escribió"""
+        self.aborted = True
+        self._running.set()
+
+    async def run(self, commands: Iterable[str],
+                  on_progress: Optional[Callable[[int], None]] = None,
+                  should_continue: Callable[[], bool] = lambda: True,
+                  on_response: Optional[Callable[[List[str]], None]] = None) -> int:
+        """Enviar todo (o hasta abortar); devuelve cuántos terminaron.
+        `on_response` recibe las líneas de cada comando, en orden."""
+        pending = deque()
+        self.completed = 0
+
+        async def settle_oldest():
+            lines = await pending.popleft()
+            self.completed += 1
+            if on_response is not None:
+                on_response(lines)
+            if on_progress is not None:
+                on_progress(self.completed)
+
+        async with self.transport.lock:
+            try:
+                self.transport.hold_barrier()
+                try:
+                    for command in commands:
+                        if self.paused:
+                            # Sin productor la barrera deja terminar lo enviado
+                            self.transport.release_barrier()
+                            await self._running.wait()
+                            self.transport.hold_barrier()
+                        if self.aborted or not should_continue():
+                            break
+                        pending.append(self.transport.send(command))
+                        while len(pending) >= self.lookahead:
+                            await settle_oldest()
+                finally:
+                    self.transport.release_barrier()
+                if self.aborted or not should_continue():
+                    # Lo escrito termina igual: esperarlo para dejar la
+                    # máquina quieta y la posición conocida
+                    self.transport.cancel_queued(pending)
+                while pending:
+                    if pending[0].cancelled():
+                        pending.popleft()
+                        continue
+                    await settle_oldest()
+            except asyncio.CancelledError:
+                for future in pending:
+                    future.cancel()
+                raise
+            except Exception:
+                # El transporte falló (o on_response rechazó una respuesta):
+                # no escribir nada más; los demás futuros fallan igual
+                self.transport.cancel_queued(pending)
+                for future in pending:
+                    future.add_done_callback(_consume_exception)
+                raise
+        return self.completed
+
+
+class LoopThread:
+    """Loop de asyncio en un hilo propio, para usarlo desde código síncrono"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True,
+                                        name='cnc-asyncio')
+        self._thread.start()
+
+    def run(self, coroutine, timeout: Optional[float] = None):
+        """Ejecutar una corrutina en el loop y esperar su resultado"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def submit(self, coroutine):
+        """Ejecutar una corrutina sin esperar (devuelve un concurrent Future)"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, callback: Callable, *args) -> None:
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+            self.loop.close()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Protocolo por Lotes - Varios movimientos en una sola línea serial
+
+Cada comando suelto cuesta una línea, el eco completo, la charla de
+moveXY/penUp y una vuelta de loop() (delay(10)): en dibujos densos eso
+pesa más que el movimiento. Un lote empaqueta movimientos relativos y
+cambios de lápiz en una línea con número de secuencia y checksum:
+
+    M17:L12,-3;L9,4;U;X250;B;Y-40*5C
+
+El checksum es el XOR (2 dígitos hex, estilo NMEA) de todos los bytes
+antes del '*'. El firmware responde con un eco corto "> M17", ejecuta los
+movimientos sin imprimir nada y termina con "M17 OK". Si el checksum no
+cuadra imprime "⚠ M17 CHK", y si un comando del lote está mal formado
+"⚠ M17 ? <comando>"; en los dos casos no mueve nada (valida el lote
+entero antes de moverse), así que un lote con error no cuenta ningún
+comando.
+
+`AdaptiveBatcher` arma los lotes a partir del flujo de comandos: cada lote
+dura (en movimiento previsto) unas `RTT_MULTIPLE` veces el tiempo de ida y
+vuelta medido, así el costo fijo por línea queda en ~5% del lote sin que
+una pausa tarde mucho en hacer efecto. El RTT nunca se toma menor que
+`MIN_RTT_S` (el delay(10) de loop() del firmware).
+"""
+
+from collections import deque
+from typing import Iterable, Iterator, List, Tuple
+
+from cnc_planner import PEN_SECONDS, STEP_DELAY_S
+from cnc_position import parse_move
+
+BATCH_PREFIX = 'M'
+MAX_BATCH_BYTES = 96     # dos lotes entran en la ventana de 200 bytes (RX de 256)
+MAX_BATCH_MOVES = 32
+RTT_MULTIPLE = 20.0      # duración objetivo de un lote, en RTTs
+DEFAULT_RTT_S = 0.02
+MIN_RTT_S = 0.01         # delay(10) en loop()
+RTT_SMOOTHING = 0.3      # peso de cada medición nueva (EWMA)
+SEQUENCE_MODULO = 1000
+
+
+class BatchError(ValueError):
+    """Lote mal formado o rechazado por el firmware"""
+
+
+def checksum(text: str) -> int:
+    value = 0
+    for byte in text.encode('ascii'):
+        value ^= byte
+    return value
+
+
+def encode_batch(sequence: int, commands: Iterable[str]) -> str:
+    body = f"{BATCH_PREFIX}{sequence}:{';'.join(c.strip().upper() for c in commands)}"
+    return f"{body}*{checksum(body):02X}"
+
+
+def decode_batch(line: str) -> Tuple[int, List[str]]:
+    """Inverso de encode_batch; lanza BatchError si no cuadra"""
+    line = line.strip().upper()
+    body, star, check = line.rpartition('*')
+    head, colon, payload = body.partition(':')
+    if not (star and colon and head.startswith(BATCH_PREFIX)):
+        raise BatchError(f"Formato de lote inválido: {line!r}")
+    try:
+        sequence = int(head[1:])
+        expected = int(check, 16)
+    except ValueError:
+        raise BatchError(f"Formato de lote inválido: {line!r}") from None
+    if checksum(body) != expected:
+        raise BatchError(f"Checksum incorrecto en {head}")
+    return sequence, [command for command in payload.split(';') if command]
+
+
+def is_batch(command: str) -> bool:
+    command = command.strip().upper()
+    return command.startswith(BATCH_PREFIX) and ':' in command
+
+
+def batch_echo(command: str) -> str:
+    """Lo que el firmware repite como eco: "M17" para un lote"""
+    command = command.strip().upper()
+    if is_batch(command):
+        return command.partition(':')[0]
+    return command
+
+
+def is_batchable(command: str) -> bool:
+    """Movimientos relativos y lápiz (no 'X' solo, que es el test del motor)"""
+    command = command.strip().upper()
+    return command in ('B', 'U') or parse_move(command) is not None
+
+
+def _seconds(command: str) -> float:
+    move = parse_move(command)
+    if move is None:
+        return PEN_SECONDS
+    return max(abs(move[0]), abs(move[1])) * STEP_DELAY_S
+
+
+class AdaptiveBatcher:
+    """Agrupa un flujo de comandos en lotes según el RTT medido"""
+
+    def __init__(self, rtt_s: float = DEFAULT_RTT_S, max_bytes: int = MAX_BATCH_BYTES,
+                 max_moves: int = MAX_BATCH_MOVES):
+        self.rtt_s = max(rtt_s, MIN_RTT_S)
+        self.max_bytes = max_bytes
+        self.max_moves = max_moves
+        self.batches = 0
+        self.batched_commands = 0
+        self._sequence = 0
+        self._sizes = deque()   # por cada línea enviada: (comandos, eco esperado)
+
+    @property
+    def target_seconds(self) -> float:
+        return self.rtt_s * RTT_MULTIPLE
+
+    def observe_rtt(self, seconds: float) -> None:
+        self.rtt_s = max(self.rtt_s + RTT_SMOOTHING * (seconds - self.rtt_s), MIN_RTT_S)
+
+    def _line(self, group: List[str]) -> str:
+        if len(group) == 1:
+            self._sizes.append((1, None))
+            return group[0]
+        self._sequence = (self._sequence + 1) % SEQUENCE_MODULO
+        line = encode_batch(self._sequence, group)
+        self._sizes.append((len(group), f"{BATCH_PREFIX}{self._sequence} OK"))
+        self.batches += 1
+        self.batched_commands += len(group)
+        return line
+
+    def wrap(self, commands: Iterable[str]) -> Iterator[str]:
+        group, size, seconds = [], 0, 0.0
+        for command in commands:
+            if not is_batchable(command):
+                if group:
+                    yield self._line(group)
+                    group, size, seconds = [], 0, 0.0
+                yield self._line([command])
+                continue
+            # '*XX' + ';' + "M999:" de encabezado
+            if group and (size + len(command) + 10 > self.max_bytes
+                          or len(group) >= self.max_moves):
+                yield self._line(group)
+                group, size, seconds = [], 0, 0.0
+            group.append(command)
+            size += len(command) + 1
+            seconds += _seconds(command)
+            if seconds >= self.target_seconds:
+                yield self._line(group)
+                group, size, seconds = [], 0, 0.0
+        if group:
+            yield self._line(group)
+
+    def on_response(self, lines: List[str]) -> int:
+        """Respuesta de la siguiente línea enviada; devuelve cuántos
+        comandos originales cubría. Lanza BatchError si el firmware
+        rechazó el lote."""
+        count, ok_line = self._sizes.popleft()
+        if ok_line is not None and ok_line not in lines:
+            detail = next((line for line in lines if line.startswith('⚠')), "sin confirmación")
+            raise BatchError(f"Lote rechazado por el CNC: {detail}")
+        return count
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Trabajos - Corpus sintético y tiempos de punta a punta
+
+Cada dibujo del corpus (reproducible con una semilla) pasa por el mismo
+camino que en la GUI:
+
+    captura (px) -> transformación (mm) -> simplificación -> orden óptimo
+    -> pasos -> comandos -> StreamingSender -> firmware simulado
+
+y se reporta: tiempo real de cada etapa, tiempo mecánico modelado (reloj
+del simulador), bytes enviados, número de comandos, distancia con lápiz
+arriba, subidas de lápiz y el tiempo previsto por `MotionModel`. Los resultados se guardan
+en JSON para comparar entre commits:
+
+    python cnc_benchmark.py run -o bench_antes.json
+    python cnc_benchmark.py run -o bench_despues.json
+    python cnc_benchmark.py compare bench_antes.json bench_despues.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from cnc_drawing import Drawing
+from cnc_lookahead import LookaheadPlanner
+from cnc_motion import MotionModel
+from cnc_optimizer import optimize_order
+from cnc_planner import count_pen_lifts, plan
+from cnc_sender import StreamingSender, parse_echo
+from cnc_serial_reader import SerialReader
+from cnc_simplify import DEFAULT_TOLERANCE_MM, count_segments, simplify_strokes
+from cnc_simulator import SimulatedSerial
+from cnc_transform import CoordinateTransform
+
+RESULTS_VERSION = 1
+CANVAS_SIZE = 600
+STEPS_PER_MM = 51.2
+SCALE_FACTOR = 4.0
+REGRESSION_THRESHOLD = 0.05   # 5 % peor = regresión
+
+
+# ------------------------------------------------------------
+# Corpus sintético
+# ------------------------------------------------------------
+
+def dense_freehand(rng: np.random.Generator) -> Drawing:
+    """Pocos trazos muy largos con un punto cada 1-3 px (como el mouse)"""
+    strokes = []
+    for _ in range(8):
+        n = 3000
+        angle = np.cumsum(rng.normal(0, 0.15, n))
+        step = rng.uniform(1, 3, n)
+        start = rng.uniform(100, 500, 2)
+        points = start + np.cumsum(np.column_stack([np.cos(angle), np.sin(angle)]) * step[:, None], axis=0)
+        strokes.append(np.clip(points, 0, CANVAS_SIZE))
+    return Drawing.from_strokes(strokes)
+
+
+def many_small_strokes(rng: np.random.Generator) -> Drawing:
+    """Miles de trazos cortos dispersos (relleno, sombreado, puntos)"""
+    strokes = []
+    for center in rng.uniform(10, CANVAS_SIZE - 10, (2000, 2)):
+        k = rng.integers(2, 6)
+        strokes.append(center + np.cumsum(rng.normal(0, 2.5, (k, 2)), axis=0))
+    return Drawing.from_strokes(np.clip(s, 0, CANVAS_SIZE) for s in strokes)
+
+
+def long_diagonals(rng: np.random.Generator) -> Drawing:
+    """Diagonales de lado a lado muestreadas densamente (caso del planner)"""
+    strokes = []
+    for _ in range(60):
+        a, b = rng.uniform(0, CANVAS_SIZE, (2, 2))
+        t = np.linspace(0, 1, 200)[:, None]
+        strokes.append(a + (b - a) * t)
+    return Drawing.from_strokes(strokes)
+
+
+# Fuente de trazos mínima: cada glifo en una celda de 1x1
+_GLYPHS = {
+    'A': [[(0, 1), (0.5, 0), (1, 1)], [(0.25, 0.5), (0.75, 0.5)]],
+    'C': [[(1, 0.15), (0.6, 0), (0.2, 0.1), (0, 0.5), (0.2, 0.9), (0.6, 1), (1, 0.85)]],
+    'E': [[(1, 0), (0, 0), (0, 1), (1, 1)], [(0, 0.5), (0.7, 0.5)]],
+    'N': [[(0, 1), (0, 0), (1, 1), (1, 0)]],
+    'O': [[(0.5, 0), (0.1, 0.2), (0, 0.5), (0.1, 0.8), (0.5, 1), (0.9, 0.8), (1, 0.5),
+           (0.9, 0.2), (0.5, 0)]],
+    'S': [[(1, 0.1), (0.5, 0), (0, 0.25), (0.5, 0.5), (1, 0.75), (0.5, 1), (0, 0.9)]],
+    'T': [[(0, 0), (1, 0)], [(0.5, 0), (0.5, 1)]],
+    'X': [[(0, 0), (1, 1)], [(1, 0), (0, 1)]],
+}
+
+
+def text_glyphs(rng: np.random.Generator) -> Drawing:
+    """Renglones de texto: muchos trazos cortos ordenados como escritura"""
+    letters = list(_GLYPHS)
+    size, gap = 14.0, 5.0
+    strokes = []
+    y = 20.0
+    while y + size < CANVAS_SIZE - 10:
+        x = 15.0
+        while x + size < CANVAS_SIZE - 10:
+            glyph = _GLYPHS[letters[rng.integers(len(letters))]]
+            for path in glyph:
+                path = np.asarray(path, dtype=float)
+                # Interpolar como lo haría una captura con el mouse
+                t = np.linspace(0, len(path) - 1, 6 * len(path))
+                dense = np.column_stack([np.interp(t, np.arange(len(path)), path[:, i]) for i in range(2)])
+                strokes.append((x, y) + dense * size + rng.normal(0, 0.2, dense.shape))
+            x += size + gap
+        y += size * 1.6
+    return Drawing.from_strokes(strokes)
+
+
+CORPUS: Dict[str, Callable[[np.random.Generator], Drawing]] = {
+    'dense_freehand': dense_freehand,
+    'many_small_strokes': many_small_strokes,
+    'long_diagonals': long_diagonals,
+    'text_glyphs': text_glyphs,
+}
+
+
+# ------------------------------------------------------------
+# Ejecución
+# ------------------------------------------------------------
+
+def pen_up_distance(commands: List[str], positions: List[tuple],
+                    steps_per_mm: float = STEPS_PER_MM) -> float:
+    """mm recorridos con el lápiz arriba"""
+    total = 0.0
+    pen_down = False
+    previous = (0, 0)
+    for command, position in zip(commands, positions):
+        if command == 'B':
+            pen_down = True
+        elif command == 'U':
+            pen_down = False
+        elif not pen_down:
+            total += math.hypot(position[0] - previous[0], position[1] - previous[1])
+        previous = position
+    return total / steps_per_mm
+
+
+def send_to_simulator(commands: List[str], window: Optional[int] = None) -> Dict[str, float]:
+    """Enviar los comandos al firmware simulado (tiempo instantáneo) y
+    medir el tiempo mecánico que habría tardado la máquina"""
+    port = SimulatedSerial(time_scale=0, timeout=0.05, boot=False)
+    reader = SerialReader(port)
+    echoes = reader.subscribe(lambda line: parse_echo(line) is not None)
+    reader.start()
+    sent_bytes = [0]
+
+    def write(command):
+        data = (command + '\n').encode()
+        sent_bytes[0] += len(data)
+        return port.write(data) > 0
+
+    try:
+        kwargs = {} if window is None else {'window': window}
+        sender = StreamingSender(write, echoes.get, **kwargs)
+        start_clock = port.cnc.clock
+        completed = sender.stream(commands)
+        return {
+            'completed': completed,
+            'bytes_sent': sent_bytes[0],
+            'mechanical_s': port.cnc.clock - start_clock,
+            'dropped_bytes': port.dropped_bytes,
+        }
+    finally:
+        reader.stop()
+        port.close()
+
+
+def run_case(drawing: Drawing, simplify: bool = True, optimize: bool = True,
+             send: bool = True, window: Optional[int] = None,
+             lookahead: bool = False) -> Dict[str, float]:
+    """Pasar un dibujo por todo el pipeline y medir cada etapa"""
+    timings = {}
+    transform = CoordinateTransform("top-left", SCALE_FACTOR, STEPS_PER_MM,
+                                    CANVAS_SIZE, CANVAS_SIZE)
+
+    start = time.perf_counter()
+    lines = drawing.map_strokes(transform.px_to_mm)
+    timings['transform_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if simplify:
+        lines = simplify_strokes(lines, DEFAULT_TOLERANCE_MM, STEPS_PER_MM)
+    timings['simplify_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if optimize and lines:
+        result = optimize_order([[line[0], line[-1]] for line in lines])
+        lines = result.apply(lines)
+    timings['optimize_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    commands, positions, _ = plan(transform.mm_to_steps(line) for line in lines)
+    if lookahead:
+        commands = list(LookaheadPlanner().wrap(commands))   # 1 a 1: positions sigue valiendo
+    timings['plan_s'] = time.perf_counter() - start
+
+    result = {
+        'points': drawing.num_points,
+        'strokes': len(drawing),
+        'segments': count_segments(lines),
+        'commands': len(commands),
+        'bytes': sum(len(command) + 1 for command in commands),
+        'pen_up_mm': pen_up_distance(commands, positions),
+        'pen_lifts': count_pen_lifts(commands),
+        'estimated_s': MotionModel().total_seconds(commands),
+    }
+    if send:
+        start = time.perf_counter()
+        sent = send_to_simulator(commands, window)
+        timings['send_s'] = time.perf_counter() - start
+        result.update(sent)
+    result.update(timings)
+    result['wall_s'] = sum(timings.values())
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(cases: Optional[List[str]] = None, seed: int = 0, **options) -> dict:
+    """Correr el corpus; devuelve el documento de resultados (JSON)"""
+    results = {}
+    for name in cases or list(CORPUS):
+        drawing = CORPUS[name](np.random.default_rng(seed))
+        results[name] = run_case(drawing, **options)
+    return {
+        'version': RESULTS_VERSION,
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'seed': seed,
+        'options': {key: value for key, value in options.items()},
+        'results': results,
+    }
+
+
+# ------------------------------------------------------------
+# Reportes
+# ------------------------------------------------------------
+
+REPORT_COLUMNS = ('commands', 'bytes_sent', 'pen_up_mm', 'pen_lifts', 'estimated_s', 'mechanical_s', 'wall_s')
+
+
+def format_report(document: dict) -> str:
+    lines = [f"{'Dibujo':<20} " + " ".join(f"{column:>13}" for column in REPORT_COLUMNS)]
+    for name, result in document['results'].items():
+        cells = []
+        for column in REPORT_COLUMNS:
+            value = result.get(column)
+            cells.append(f"{value:>13.2f}" if isinstance(value, float) else f"{str(value):>13}")
+        lines.append(f"{name:<20} " + " ".join(cells))
+    return "\n".join(lines)
+
+
+def compare(old: dict, new: dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Diferencias por métrica; marca con ⚠ lo que empeoró más que `threshold`"""
+    lines = []
+    for name, result in new['results'].items():
+        before = old['results'].get(name)
+        if before is None:
+            continue
+        for column in REPORT_COLUMNS:
+            if column not in result or column not in before or not before[column]:
+                continue
+            change = (result[column] - before[column]) / before[column]
+            mark = "⚠" if change > threshold else ("✓" if change < -threshold else " ")
+            lines.append(f"{mark} {name:<20} {column:<13} {before[column]:>12.2f} → "
+                         f"{result[column]:>12.2f} ({change:+.1%})")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de trabajos del plotter")
+    commands = parser.add_subparsers(dest='action', required=True)
+
+    run = commands.add_parser('run', help="correr el corpus")
+    run.add_argument('-o', '--output', help="guardar resultados en este JSON")
+    run.add_argument('--cases', nargs='+', choices=list(CORPUS))
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--no-simplify', action='store_true')
+    run.add_argument('--no-optimize', action='store_true')
+    run.add_argument('--no-send', action='store_true', help="solo preparar, sin simulador")
+    run.add_argument('--window', type=int, help="ventana del StreamingSender")
+    run.add_argument('--lookahead', action='store_true', help="rampas V<...> entre segmentos")
+
+    diff = commands.add_parser('compare', help="comparar dos resultados")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.action == 'run':
+        document = run_benchmark(args.cases, args.seed, simplify=not args.no_simplify,
+                                 optimize=not args.no_optimize, send=not args.no_send,
+                                 window=args.window, lookahead=args.lookahead)
+        print(format_report(document))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(document, f, indent=2)
+            print(f"\n💾 Resultados guardados en {args.output}")
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    lines = compare(old, new, args.threshold)
+    print("\n".join(lines))
+    return 1 if any(line.startswith("⚠") for line in lines) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
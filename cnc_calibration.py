@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Calibración por Eventos - C, D y A esperando los mensajes del firmware
+
+Antes la auto-detección enviaba C, dormía 15 s, D, 15 s, A, 10 s: tardaba
+~50 s aunque los ejes terminaran en 5 y se rompía sin avisar si tardaban
+más. `CalibrationMonitor` lee las líneas del CNC y avanza por las etapas
+de cada fase (límite bajo, límite alto, regreso al origen) con los textos
+reales de calibrateXWithIMU/calibrateYWithIMU/testAreaCompleta; la fase
+termina cuando el firmware imprime su "COMPLETADA", no cuando se acaba
+una espera fija. Cada fase tiene su propio tiempo máximo.
+
+`run_calibration(engine)` corre la secuencia sobre un PlotterEngine
+conectado y guarda MAX_X_STEPS/MAX_Y_STEPS medidos en
+`engine.max_x_steps`/`engine.max_y_steps`. MAX suma los pasos hasta el
+primer límite, que dependen de dónde arrancó el carro; el segundo límite
+(de límite a límite) queda en `engine.span_x_steps`/`engine.span_y_steps`
+y sirve para comparar calibraciones.
+"""
+
+import re
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+from cnc_engine import EVENT_CONNECTION, EVENT_RECEIVED
+
+STATE_IDLE = 'idle'
+STATE_RUNNING = 'running'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+
+# Etapas dentro de una fase (para saber dónde se quedó si no termina)
+STAGE_START = "inicio"
+STAGE_LOW = "buscando el primer límite"
+STAGE_HIGH = "buscando el segundo límite"
+STAGE_RETURN = "regresando al origen"
+STAGE_TESTS = "probando direcciones"
+
+_LIMIT = re.compile(r'📍 Límite (\w+): (\d+) pasos')
+_MAX_STEPS = re.compile(r'#define (MAX_[XY]_STEPS) (\d+)')
+_STAGES = (
+    ("═══ FASE 1:", STAGE_LOW),
+    ("═══ FASE 2:", STAGE_HIGH),
+    ("═══ Regresando al ORIGEN", STAGE_RETURN),
+    ("═══ TEST 1/4", STAGE_TESTS),
+)
+_SPAN_RESULTS = {'C': 'SPAN_X_STEPS', 'D': 'SPAN_Y_STEPS'}   # segundo límite de C/D
+_ERROR_PREFIX = "⚠ ERROR:"
+_AREA_WARNING = "⚠️ ATENCIÓN:"
+
+
+class CalibrationError(Exception):
+    """La calibración falló o una fase no terminó a tiempo"""
+
+
+class CalibrationPhase:
+    """Un comando de calibración y cómo reconocer su final"""
+
+    def __init__(self, command: str, title: str, done_marker: str, timeout_s: float):
+        self.command = command
+        self.title = title
+        self.done_marker = done_marker
+        self.timeout_s = timeout_s
+
+
+# Peor caso de C/D: 2 x 10000 pasos buscando límites + 10000 de regreso
+# a 2 ms/paso ~ 60 s. A: 8 movimientos de 500 pasos + 8 s de pausas.
+PHASES = (
+    CalibrationPhase('C', "Calibrando eje X", "Calibración X COMPLETADA", 90.0),
+    CalibrationPhase('D', "Calibrando eje Y", "Calibración Y COMPLETADA", 90.0),
+    CalibrationPhase('A', "Ejecutando test de 4 direcciones",
+                     "Test completo de 4 direcciones COMPLETADO", 30.0),
+)
+
+
+class CalibrationMonitor:
+    """Máquina de estados alimentada con las líneas del CNC (thread-safe)"""
+
+    def __init__(self):
+        self.state = STATE_IDLE
+        self.phase = None
+        self.stage = None
+        self.limits = {}      # 'IZQUIERDO' -> pasos
+        self.results = {}     # 'MAX_X_STEPS' -> pasos
+        self.warnings = []
+        self.error = None
+        self._changed = threading.Condition()
+
+    def begin(self, phase: CalibrationPhase) -> None:
+        with self._changed:
+            self.state = STATE_RUNNING
+            self.phase = phase
+            self.stage = STAGE_START
+            self.error = None
+
+    def feed(self, line: str) -> None:
+        with self._changed:
+            if self.state != STATE_RUNNING:
+                return
+            for marker, stage in _STAGES:
+                if line.startswith(marker):
+                    self.stage = stage
+            match = _LIMIT.search(line)
+            if match:
+                self.limits[match.group(1)] = int(match.group(2))
+                span = _SPAN_RESULTS.get(self.phase.command)
+                if span is not None and self.stage == STAGE_HIGH:
+                    self.results[span] = int(match.group(2))
+            match = _MAX_STEPS.search(line)
+            if match:
+                self.results[match.group(1)] = int(match.group(2))
+            if line.startswith(_AREA_WARNING):
+                self.warnings.append(line)
+            if line.startswith(_ERROR_PREFIX):
+                self._finish(STATE_FAILED, line[len(_ERROR_PREFIX):].strip())
+            elif self.phase.done_marker in line:
+                self._finish(STATE_DONE)
+
+    def fail(self, message: str) -> None:
+        with self._changed:
+            if self.state == STATE_RUNNING:
+                self._finish(STATE_FAILED, message)
+
+    def _finish(self, state: str, error: Optional[str] = None) -> None:
+        self.state = state
+        self.error = error
+        self._changed.notify_all()
+
+    def wait(self, timeout: float) -> bool:
+        """Esperar el final de la fase; False si se agotó el tiempo"""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.state != STATE_RUNNING, timeout)
+
+
+def run_calibration(engine, phases: Sequence[CalibrationPhase] = PHASES,
+                    on_phase: Optional[Callable[[int, CalibrationPhase], None]] = None
+                    ) -> CalibrationMonitor:
+    """Correr las fases en orden sobre un PlotterEngine conectado (bloqueante).
+
+    Lanza CalibrationError si el firmware informa un error, si se pierde
+    la conexión o si una fase no termina en su tiempo máximo.
+    """
+    monitor = CalibrationMonitor()
+
+    def listener(event, data):
+        if event == EVENT_RECEIVED:
+            monitor.feed(data)
+        elif event == EVENT_CONNECTION and not data:
+            monitor.fail("se perdió la conexión")
+
+    engine.add_listener(listener)
+    try:
+        for index, phase in enumerate(phases):
+            if on_phase is not None:
+                on_phase(index, phase)
+            monitor.begin(phase)
+            started = time.monotonic()
+            if not engine.send_command(phase.command):
+                raise CalibrationError("CNC no conectado")
+            if not monitor.wait(phase.timeout_s):
+                raise CalibrationError(f"{phase.title}: no terminó en {phase.timeout_s:.0f} s "
+                                       f"(etapa: {monitor.stage})")
+            if monitor.state == STATE_FAILED:
+                raise CalibrationError(f"{phase.title}: {monitor.error}")
+            engine.log(f"✓ {phase.title} ({time.monotonic() - started:.1f} s)")
+    finally:
+        engine.remove_listener(listener)
+
+    engine.max_x_steps = monitor.results.get('MAX_X_STEPS', engine.max_x_steps)
+    engine.max_y_steps = monitor.results.get('MAX_Y_STEPS', engine.max_y_steps)
+    engine.span_x_steps = monitor.results.get('SPAN_X_STEPS', engine.span_x_steps)
+    engine.span_y_steps = monitor.results.get('SPAN_Y_STEPS', engine.span_y_steps)
+    return monitor
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CNC Plotter CLI - Dibujar archivos sin interfaz gráfica
+
+Usa el mismo `PlotterEngine` que la GUI, así un script o un servidor
+pueden enviar trabajos en lote:
+
+    python cnc_cli.py ports
+    python cnc_cli.py stats dibujo.svg
+    python cnc_cli.py plot dibujo.svg --port COM3 --origin bottom-right
+    python cnc_cli.py plot pieza.gcode --port SIMULADOR --time-scale 0
+    python cnc_cli.py resume --port COM3
+
+Formatos: .npz, .json (formato anterior), .svg y G-code (.gcode, .nc...).
+El G-code se envía mientras se lee; el resto se simplifica y se ordena
+igual que desde la GUI. Cada trabajo anota su avance en un diario: si se
+corta (Ctrl+C, USB), `resume` busca el origen y sigue desde ahí.
+"""
+
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+import serial.tools.list_ports
+
+from cnc_calibration import PHASES, run_calibration
+from cnc_engine import (BOOT_WAIT_S, EVENT_JOB_DONE, EVENT_LOG, EVENT_PROGRESS, EVENT_RECEIVED,
+                        EVENT_SENT, PlotterEngine)
+from cnc_gcode import is_gcode_file
+from cnc_journal import DEFAULT_JOURNAL_FILE, JobJournal
+from cnc_motion import format_duration
+from cnc_simplify import DEFAULT_TOLERANCE_MM
+from cnc_simulator import SIMULATOR_PORT
+from cnc_transform import ORIGIN_CORNERS
+
+PROGRESS_INTERVAL_S = 0.5   # refresco de la línea de progreso
+
+
+class ConsoleReporter:
+    """Imprime los eventos del motor en la terminal"""
+
+    def __init__(self, verbose: bool = False, stream=None):
+        self.verbose = verbose
+        self.stream = stream or sys.stderr
+        self._last_progress = 0.0
+        self._progress_shown = False
+
+    def __call__(self, event: str, data) -> None:
+        if event == EVENT_PROGRESS:
+            now = time.monotonic()
+            if now - self._last_progress >= PROGRESS_INTERVAL_S:
+                self._last_progress = now
+                self.stream.write(f"\r📊 {data.fraction * 100:5.1f}% {data}   ")
+                self.stream.flush()
+                self._progress_shown = True
+            return
+        if event == EVENT_JOB_DONE and self._progress_shown:
+            self.stream.write("\n")
+            self._progress_shown = False
+        if event == EVENT_LOG:
+            self._print(data)
+        elif self.verbose and event == EVENT_SENT:
+            self._print(f"→ Enviado: {data}")
+        elif self.verbose and event == EVENT_RECEIVED:
+            self._print(f"← {data}")
+
+    def _print(self, message: str) -> None:
+        if self._progress_shown:
+            self.stream.write("\n")
+            self._progress_shown = False
+        print(message, file=self.stream)
+
+
+def _engine(args) -> PlotterEngine:
+    return PlotterEngine(steps_per_mm=args.steps_per_mm, work_area_width=args.width,
+                         work_area_height=args.height, simplify_tolerance=args.tolerance,
+                         optimize=not args.no_optimize, simulator_time_scale=args.time_scale,
+                         journal=JobJournal(args.journal) if 'journal' in args else None)
+
+
+def cmd_ports(args) -> int:
+    for port in serial.tools.list_ports.comports():
+        print(port.device)
+    print(SIMULATOR_PORT)
+    return 0
+
+
+def cmd_stats(args) -> int:
+    engine = _engine(args)
+    engine.set_origin(args.origin)
+    drawing = engine.load_drawing(args.file)
+    stats = engine.job_stats(drawing)
+    print(f"Trazos: {len(drawing)}  Puntos: {drawing.num_points}")
+    print(f"Segmentos: {stats['segments_before']} → {stats['segments_after']}")
+    print(f"Tiempo est.: {format_duration(stats['seconds_before'])} → "
+          f"{format_duration(stats['seconds_after'])}")
+    return 0
+
+
+def _run(engine: PlotterEngine, args, job) -> int:
+    """Conectar, correr `job(engine)` y desconectar; Ctrl+C lo detiene"""
+    engine.add_listener(ConsoleReporter(args.verbose))
+    boot_wait = 0 if args.port == SIMULATOR_PORT else BOOT_WAIT_S
+    try:
+        engine.connect(args.port, boot_wait=boot_wait)
+    except Exception as e:
+        print(f"✗ No se pudo conectar: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        result = job(engine)
+    except KeyboardInterrupt:
+        engine.stop()
+        print("\n⏹️ Interrumpido", file=sys.stderr)
+        return 130
+    finally:
+        engine.disconnect()
+    return 0 if result.ok else 1
+
+
+def cmd_plot(args) -> int:
+    engine = _engine(args)
+    engine.set_origin(args.origin)
+    if is_gcode_file(args.file):
+        return _run(engine, args, lambda engine: engine.plot_gcode(args.file))
+    return _run(engine, args,
+                lambda engine: engine.plot_drawing(engine.load_drawing(args.file)))
+
+
+def cmd_resume(args) -> int:
+    engine = PlotterEngine(simulator_time_scale=args.time_scale,
+                           journal=JobJournal(args.journal))
+    checkpoint = engine.pending_job()
+    if checkpoint is None:
+        print("No hay ningún trabajo para reanudar", file=sys.stderr)
+        return 1
+    # Al conectar el ESP32 se reinicia: buscar el origen (C y D) antes de seguir
+    return _run(engine, args, lambda engine: engine.resume_job(
+        checkpoint, rehome=lambda: run_calibration(engine, PHASES[:2])))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="CNC Plotter sin interfaz gráfica")
+    commands = parser.add_subparsers(dest='action', required=True)
+
+    ports = commands.add_parser('ports', help="listar puertos disponibles")
+    ports.set_defaults(func=cmd_ports)
+
+    for name, func, help_text in (('stats', cmd_stats, "segmentos y tiempo estimado"),
+                                  ('plot', cmd_plot, "dibujar un archivo")):
+        sub = commands.add_parser(name, help=help_text)
+        sub.set_defaults(func=func)
+        sub.add_argument('file', help=".npz, .json, .svg o G-code")
+        sub.add_argument('--origin', choices=ORIGIN_CORNERS, default="top-left",
+                         help="esquina del (0,0) del CNC (default: top-left)")
+        sub.add_argument('--steps-per-mm', type=float, default=51.2)
+        sub.add_argument('--width', type=float, default=150, help="área de trabajo X (mm)")
+        sub.add_argument('--height', type=float, default=150, help="área de trabajo Y (mm)")
+        sub.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE_MM,
+                         help="tolerancia de simplificación (mm)")
+        sub.add_argument('--no-optimize', action='store_true', help="no reordenar los trazos")
+        sub.add_argument('--time-scale', type=float, default=1.0,
+                         help="velocidad del SIMULADOR (0 = instantáneo)")
+        if name == 'plot':
+            _add_job_arguments(sub)
+
+    resume = commands.add_parser('resume', help="seguir el último trabajo cortado")
+    resume.set_defaults(func=cmd_resume)
+    resume.add_argument('--time-scale', type=float, default=1.0,
+                        help="velocidad del SIMULADOR (0 = instantáneo)")
+    _add_job_arguments(resume)
+    return parser
+
+
+def _add_job_arguments(sub) -> None:
+    sub.add_argument('--port', required=True, help=f"puerto serial o {SIMULATOR_PORT}")
+    sub.add_argument('--journal', default=DEFAULT_JOURNAL_FILE,
+                     help="diario del avance, para reanudar (default: ~/.cnc_plotter_trabajo.jsonl)")
+    sub.add_argument('-v', '--verbose', action='store_true',
+                     help="mostrar comandos y respuestas")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dibujo Compacto - Trazos como buffers planos de NumPy
+
+En lugar de listas de listas de tuplas (px, py, x_mm, y_mm), un dibujo es:
+
+    points  : arreglo (N, 2) con TODOS los puntos en píxeles del canvas
+    offsets : arreglo (M+1,) donde el trazo i es points[offsets[i]:offsets[i+1]]
+
+Solo se guardan coordenadas canónicas (píxeles); mm y pasos se calculan
+cuando se necesitan, así nunca quedan desactualizados si cambia el origen
+o la escala. Se guarda en un .npz versionado y se siguen pudiendo abrir
+los .json del formato anterior.
+"""
+
+import json
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+FORMAT_VERSION = 1
+FILE_EXTENSION = '.npz'
+
+
+class Drawing:
+    """Trazos de un dibujo en buffers planos (píxeles del canvas)"""
+
+    def __init__(self, points: Optional[np.ndarray] = None,
+                 offsets: Optional[np.ndarray] = None):
+        if points is None:
+            points = np.zeros((0, 2), dtype=float)
+            offsets = np.zeros(1, dtype=np.int64)
+        self._points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        if self._offsets[0] != 0 or self._offsets[-1] != len(self._points):
+            raise ValueError("Offsets inconsistentes con el número de puntos")
+        self._active = None  # trazo en captura (lista de puntos)
+
+    # ------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------
+
+    @classmethod
+    def from_strokes(cls, strokes: Iterable) -> 'Drawing':
+        """Crear desde una secuencia de trazos (cada uno (k, 2))"""
+        arrays = [np.asarray(stroke, dtype=float).reshape(-1, 2) for stroke in strokes]
+        arrays = [a for a in arrays if len(a) > 0]
+        if not arrays:
+            return cls()
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(a) for a in arrays])
+        return cls(np.vstack(arrays), offsets)
+
+    @classmethod
+    def from_legacy(cls, lines: List[list]) -> 'Drawing':
+        """Convertir el formato anterior [[(px, py, x_mm, y_mm), ...], ...]
+
+        Los mm guardados se descartan: se recalculan con el origen actual.
+        """
+        return cls.from_strokes([[(point[0], point[1]) for point in line] for line in lines])
+
+    def begin_stroke(self, x: float, y: float) -> None:
+        """Empezar un trazo nuevo durante la captura con el mouse"""
+        self.end_stroke()
+        self._active = [(x, y)]
+
+    def add_point(self, x: float, y: float) -> None:
+        """Agregar un punto al trazo en captura"""
+        if self._active is None:
+            self._active = []
+        self._active.append((x, y))
+
+    def end_stroke(self) -> None:
+        """Pasar el trazo en captura a los buffers planos"""
+        if not self._active:
+            self._active = None
+            return
+        stroke = np.asarray(self._active, dtype=float)
+        self._active = None
+        self._points = np.vstack([self._points, stroke])
+        self._offsets = np.append(self._offsets, len(self._points))
+
+    # ------------------------------------------------------------
+    # Acceso
+    # ------------------------------------------------------------
+
+    @property
+    def points(self) -> np.ndarray:
+        self.end_stroke()
+        return self._points
+
+    @property
+    def offsets(self) -> np.ndarray:
+        self.end_stroke()
+        return self._offsets
+
+    @property
+    def last_point(self):
+        """Último punto capturado (o None)"""
+        if self._active:
+            return self._active[-1]
+        if len(self._points):
+            return tuple(self._points[-1])
+        return None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @property
+    def num_points(self) -> int:
+        return len(self.points)
+
+    def stroke(self, index: int) -> np.ndarray:
+        offsets = self.offsets
+        return self._points[offsets[index]:offsets[index + 1]]
+
+    def strokes(self) -> Iterator[np.ndarray]:
+        """Vistas (sin copiar) de cada trazo"""
+        offsets = self.offsets.tolist()
+        points = self._points
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield points[start:end]
+
+    def map_strokes(self, transform: Callable[[np.ndarray], np.ndarray]) -> List[np.ndarray]:
+        """Aplicar una conversión vectorizada (p. ej. px -> mm) a todos los
+        puntos de una vez y devolver el resultado partido por trazo"""
+        converted = transform(self.points)
+        offsets = self._offsets.tolist()
+        return [converted[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+    # ------------------------------------------------------------
+    # Archivos
+    # ------------------------------------------------------------
+
+    def save(self, filename: str) -> None:
+        """Guardar en formato binario versionado (.npz)"""
+        with open(filename, 'wb') as f:
+            np.savez_compressed(f, version=np.int32(FORMAT_VERSION),
+                                points=self.points.astype(np.float32),
+                                offsets=self._offsets.astype(np.int64))
+
+    @classmethod
+    def load(cls, filename: str) -> 'Drawing':
+        """Abrir un .npz (formato actual) o un .json (formato anterior)"""
+        if filename.lower().endswith('.json'):
+            with open(filename, 'r') as f:
+                return cls.from_legacy(json.load(f))
+
+        with np.load(filename) as data:
+            version = int(data['version'])
+            if version > FORMAT_VERSION:
+                raise ValueError(f"Formato de dibujo v{version} no soportado "
+                                 f"(máximo v{FORMAT_VERSION})")
+            return cls(data['points'].astype(float), data['offsets'])
@@ -0,0 +1,833 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor del Plotter - Conexión, transformación, planificación y trabajos sin Tk
+
+`PlotterEngine` reúne todo lo que antes vivía en los métodos de la GUI:
+abrir el puerto (real o SIMULADOR), el origen y la configuración, preparar
+un dibujo (simplificar, ordenar, pasar a comandos) y enviarlo. No toca
+ningún widget: avisa de lo que pasa con eventos
+
+    callback(evento, datos)
+
+que llegan desde los hilos del motor (lector serial, trabajo). La GUI los
+pasa al hilo de Tk; `cnc_cli.py` los imprime.
+
+Todo lo que se escribe al puerto pasa por un único `AsyncPlotterTransport`
+que corre en un loop de asyncio propio (`LoopThread`): los comandos
+sueltos y los trabajos esperan el mismo candado, así una calibración o un
+Home nunca se intercalan en medio de un dibujo.
+
+    EVENT_LOG         mensaje para la consola (str)
+    EVENT_SENT        comando enviado (str)
+    EVENT_RECEIVED    línea recibida del CNC (str)
+    EVENT_CONNECTION  conectado / desconectado (bool)
+    EVENT_POSITION    posición del CNC en pasos (x, y)
+    EVENT_PROGRESS    avance del trabajo (JobProgress)
+    EVENT_JOB_DONE    fin del trabajo (JobResult)
+
+Con un `JobJournal` cada trabajo anota sus checkpoints (comandos
+confirmados y posición): `pause()`/`resume()` lo suspenden sin perderlo y
+`resume_job()` sigue uno detenido o cortado (USB, cuelgue) desde ahí.
+"""
+
+import bisect
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import serial
+
+from cnc_async import AsyncJobRunner, AsyncPlotterTransport, LoopThread
+from cnc_batch import AdaptiveBatcher, encode_batch
+from cnc_drawing import Drawing
+from cnc_gcode import GCodeParser, is_gcode_file, iter_file_strokes, iter_gcode_commands, load_strokes
+from cnc_journal import JobCheckpoint, JobJournal, JournalError, file_source, replay
+from cnc_lookahead import START_DELAY_US, LookaheadPlanner, velocity_command
+from cnc_motion import EtaEstimator, MotionModel, format_duration
+from cnc_optimizer import optimize_order
+from cnc_planner import move_command, plan
+from cnc_position import DEFAULT_LIMITS, PositionTracker
+from cnc_profiles import CalibrationProfile, ProfileMismatch, ProfileStore, device_key, verify_profile
+from cnc_simplify import DEFAULT_TOLERANCE_MM, count_segments, simplify_strokes
+from cnc_simulator import SIMULATOR_PORT, SimulatedSerial
+from cnc_svg import FILE_EXTENSION as SVG_EXTENSION, flatten_tolerance, load_svg
+from cnc_transform import ORIGIN_CORNERS, CoordinateTransform
+
+BAUD_RATE = 115200
+BOOT_WAIT_S = 2.0    # el ESP32 se reinicia al abrir el puerto
+
+EVENT_LOG = 'log'
+EVENT_SENT = 'sent'
+EVENT_RECEIVED = 'received'
+EVENT_CONNECTION = 'connection'
+EVENT_POSITION = 'position'
+EVENT_PROGRESS = 'progress'
+EVENT_JOB_DONE = 'job_done'
+
+JOB_DRAWING = 'drawing'
+JOB_GCODE = 'gcode'
+
+JOB_COMPLETED = 'completed'
+JOB_STOPPED = 'stopped'
+JOB_FAILED = 'failed'
+
+_JOB_NAMES = {JOB_DRAWING: "el dibujo", JOB_GCODE: "el G-code"}
+
+EngineListener = Callable[[str, object], None]
+
+
+class JobProgress:
+    """Avance de un trabajo: fracción (0..1), texto y segundos restantes"""
+
+    def __init__(self, fraction: float, text: str, eta_s: Optional[float] = None):
+        self.fraction = fraction
+        self.text = text
+        self.eta_s = eta_s
+
+    def __str__(self) -> str:
+        if self.eta_s is None:
+            return self.text
+        return f"{self.text} · ETA {format_duration(self.eta_s)}"
+
+
+class JobResult:
+    """Cómo terminó un trabajo"""
+
+    def __init__(self, kind: str, status: str, commands: int = 0, message: str = '',
+                 lifts_avoided: int = 0):
+        self.kind = kind
+        self.status = status
+        self.commands = commands
+        self.message = message
+        self.lifts_avoided = lifts_avoided   # U + B ahorrados uniendo trazos
+
+    @property
+    def ok(self) -> bool:
+        return self.status == JOB_COMPLETED
+
+
+def open_port(port: str, timeout: float = 1.0, simulator_time_scale: float = 1.0):
+    """Abrir un puerto serial por nombre (o el firmware simulado)"""
+    if port == SIMULATOR_PORT:
+        return SimulatedSerial(time_scale=simulator_time_scale, timeout=timeout)
+    return serial.Serial(port, BAUD_RATE, timeout=timeout)
+
+
+class PlotterEngine:
+    """Estado del plotter y trabajos de dibujo, independiente de la interfaz"""
+
+    def __init__(self, steps_per_mm: float = 51.2, canvas_width: int = 600,
+                 canvas_height: int = 600, work_area_width: float = 150,
+                 work_area_height: float = 150,
+                 simplify_tolerance: float = DEFAULT_TOLERANCE_MM, optimize: bool = True,
+                 simulator_time_scale: float = 1.0,
+                 profile_store: Optional[ProfileStore] = None, batch_moves: bool = True,
+                 lookahead: bool = True, journal: Optional[JobJournal] = None):
+        # Configuración CNC (ajustable)
+        self.steps_per_mm = steps_per_mm    # 4096 pasos por 80mm ≈ 51.2 pasos/mm
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.work_area_width = work_area_width    # mm
+        self.work_area_height = work_area_height  # mm
+        self.simplify_tolerance = simplify_tolerance  # mm (0 = solo cuantización)
+        self.optimize = optimize
+        self.simulator_time_scale = simulator_time_scale
+        self.profile_store = profile_store  # perfiles de calibración por máquina (o None)
+        self.batch_moves = batch_moves      # lotes M<n>:... si el firmware los entiende
+        self.lookahead = lookahead          # rampas V<...> entre segmentos (ídem)
+        self.journal = journal              # checkpoints para reanudar trabajos (o None)
+
+        # Origen (esquina donde queda el (0,0) del CNC tras calibrar)
+        self.origin_detected = False
+        self.origin_corner = "unknown"
+        self.max_x_steps = 0
+        self.max_y_steps = 0
+        self.span_x_steps = 0       # de límite a límite (no depende de dónde arrancó)
+        self.span_y_steps = 0
+
+        # Conexión y trabajo
+        self.serial_port = None
+        self.port_name = None
+        self.transport = None
+        self._loop = None
+        self.is_connected = False
+        self.is_drawing = False
+        self.is_paused = False
+        self.session = ''           # cambia en cada conexión (el ESP32 se reinicia)
+        self.current_pos = [0, 0]
+        self.pen_is_down = False
+        self._batch_rtt = None      # None: sin probar; 0: el firmware no tiene lotes
+        self._velocity_support = None
+        self._runner = None
+        self._journaling = False
+        self._checkpointed = 0
+        self._listeners: List[EngineListener] = []
+
+    # ------------------------------------------------------------
+    # Eventos
+    # ------------------------------------------------------------
+
+    def add_listener(self, listener: EngineListener) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: EngineListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, event: str, data=None) -> None:
+        for listener in list(self._listeners):
+            listener(event, data)
+
+    def log(self, message: str) -> None:
+        self._emit(EVENT_LOG, message)
+
+    def _set_position(self, position) -> None:
+        self.current_pos = [int(position[0]), int(position[1])]
+        self._emit(EVENT_POSITION, tuple(self.current_pos))
+
+    # ------------------------------------------------------------
+    # Conexión
+    # ------------------------------------------------------------
+
+    def connect(self, port: str, boot_wait: float = BOOT_WAIT_S) -> None:
+        """Abrir `port` (nombre o SIMULATOR_PORT); lanza la excepción del
+        puerto si no se puede abrir"""
+        serial_port = open_port(port, simulator_time_scale=self.simulator_time_scale)
+        if boot_wait:
+            time.sleep(boot_wait)  # Esperar inicialización del ESP32
+        self.attach(serial_port, port)
+
+    def attach(self, serial_port, name: str = '') -> None:
+        """Usar un puerto ya abierto (estilo pyserial)"""
+        transport = AsyncPlotterTransport(serial_port)
+        transport.on_line = lambda line: self._emit(EVENT_RECEIVED, line)
+        transport.on_write = lambda command: self._emit(EVENT_SENT, command)
+        transport.on_error = self._on_serial_error
+        self._loop = LoopThread()
+        self._loop.run(transport.start())
+        self.serial_port = serial_port
+        self.port_name = name
+        self.transport = transport
+        self._batch_rtt = None
+        self._velocity_support = None
+        self.session = uuid.uuid4().hex
+        self.is_connected = True
+        self.log(f"✓ Conectado a {name}")
+        self._emit(EVENT_CONNECTION, True)
+
+    def disconnect(self) -> None:
+        if not self.is_connected:
+            return
+        self.is_connected = False
+        self.stop()
+        try:
+            self._loop.run(self.transport.close(), timeout=5)
+        except Exception as e:
+            self.log(f"⚠ Error al cerrar el puerto: {e}")
+        self._loop.stop()
+        self._loop = None
+        self.transport = None
+        self.serial_port = None
+        self.log("✓ Desconectado")
+        self._emit(EVENT_CONNECTION, False)
+
+    def _on_serial_error(self, error: Exception) -> None:
+        """El transporte falló (p. ej. se desconectó el USB); llega desde el
+        loop, que no puede esperarse a sí mismo: cerrar desde otro hilo"""
+        self.log(f"✗ Error de lectura serial: {error}")
+        threading.Thread(target=self.disconnect, daemon=True).start()
+
+    async def _exclusive(self, command: str) -> List[str]:
+        async with self.transport.lock:
+            return await self.transport.command(command)
+
+    def send_command(self, command: str) -> bool:
+        """Encolar un comando (espera su turno si hay un trabajo en curso)"""
+        if not self.is_connected:
+            return False
+        self._loop.submit(self._exclusive(command))
+        return True
+
+    def execute(self, command: str, timeout: Optional[float] = None) -> List[str]:
+        """Enviar un comando y esperar a que el firmware lo termine;
+        devuelve las líneas que imprimió"""
+        if not self.is_connected:
+            raise RuntimeError("CNC no conectado")
+        return self._loop.run(self._exclusive(command), timeout)
+
+    def go_home(self) -> bool:
+        if self.send_command('H'):
+            self._set_position((0, 0))
+            self.pen_is_down = False   # goHome lleva Z a 0
+            return True
+        return False
+
+    def pen_up(self) -> bool:
+        if self.send_command('U'):
+            self.pen_is_down = False
+            return True
+        return False
+
+    def pen_down(self) -> bool:
+        if self.send_command('B'):
+            self.pen_is_down = True
+            return True
+        return False
+
+    # ------------------------------------------------------------
+    # Origen y coordenadas
+    # ------------------------------------------------------------
+
+    def set_origin(self, corner: str) -> None:
+        if corner not in ORIGIN_CORNERS:
+            raise ValueError(f"Esquina desconocida: {corner}")
+        self.origin_corner = corner
+        self.origin_detected = True
+
+    def save_profile(self) -> bool:
+        """Guardar origen, límites y pasos/mm de la máquina conectada"""
+        if self.profile_store is None or not self.is_connected or not self.origin_detected:
+            return False
+        key = device_key(self.port_name)
+        profile = CalibrationProfile(self.origin_corner, self.max_x_steps, self.max_y_steps,
+                                     self.steps_per_mm, span_x_steps=self.span_x_steps,
+                                     span_y_steps=self.span_y_steps)
+        try:
+            self.profile_store.save(key, profile)
+        except OSError as e:
+            self.log(f"⚠ No se pudo guardar el perfil: {e}")
+            return False
+        self.log(f"💾 Perfil de calibración guardado ({key})")
+        return True
+
+    def saved_profile(self) -> Optional[CalibrationProfile]:
+        """Perfil guardado de la máquina conectada (o None)"""
+        if self.profile_store is None or not self.is_connected:
+            return None
+        profile = self.profile_store.load(device_key(self.port_name))
+        if profile is None or profile.origin_corner not in ORIGIN_CORNERS:
+            return None
+        return profile
+
+    def restore_profile(self, rehome: Optional[Callable[[], object]] = None) -> bool:
+        """Usar el perfil guardado de la máquina conectada.
+
+        `rehome` vuelve a buscar el origen físico (p. ej. las fases C y D
+        de la calibración) y mide el recorrido: el perfil se usa solo si
+        coincide. Sin `rehome` se usa tal cual, suponiendo que el carro
+        está en el origen (bloqueante si hay que buscarlo)."""
+        profile = self.saved_profile()
+        if profile is None:
+            return False
+        max_steps = (profile.max_x_steps, profile.max_y_steps)
+        if rehome is not None:
+            try:
+                rehome()
+                verify_profile(profile, self.span_x_steps, self.span_y_steps)
+            except ProfileMismatch as e:
+                self.log(f"⚠ El perfil guardado no coincide, hay que calibrar: {e}")
+                return False
+            except Exception as e:
+                self.log(f"⚠ No se pudo verificar el perfil: {e}")
+                return False
+            max_steps = (self.max_x_steps, self.max_y_steps)
+        self.steps_per_mm = profile.steps_per_mm
+        self.max_x_steps, self.max_y_steps = max_steps
+        self.set_origin(profile.origin_corner)
+        if rehome is not None:
+            self.log(f"✓ Perfil verificado: origen {profile.origin_corner}, "
+                     f"{profile.steps_per_mm} pasos/mm (origen buscado, recorrido coincide)")
+        else:
+            self.log(f"✓ Perfil cargado sin verificar: origen {profile.origin_corner}, "
+                     f"{profile.steps_per_mm} pasos/mm (se supone el carro en el origen)")
+        return True
+
+    @property
+    def scale_factor(self) -> float:
+        """Píxeles del canvas por mm"""
+        return self.canvas_width / self.work_area_width
+
+    @property
+    def transform(self) -> CoordinateTransform:
+        """Transformación px -> mm -> pasos con la configuración actual
+
+        Sin calibración se usa top-left (solo para visualizar; la GUI no
+        deja dibujar sin origen).
+        """
+        corner = self.origin_corner if self.origin_detected else "top-left"
+        return CoordinateTransform(corner, self.scale_factor, self.steps_per_mm,
+                                   self.canvas_width, self.canvas_height)
+
+    # ------------------------------------------------------------
+    # Archivos y preparación
+    # ------------------------------------------------------------
+
+    def load_drawing(self, filename: str) -> Drawing:
+        """Cargar .npz, .json (formato anterior), SVG o G-code en px del canvas"""
+        if is_gcode_file(filename):
+            # G-code en mm del CNC -> píxeles con el origen actual
+            transform = self.transform
+            return Drawing.from_strokes(transform.mm_to_px(stroke)
+                                        for stroke in load_strokes(filename))
+        if filename.lower().endswith(SVG_EXTENSION):
+            # SVG ajustado al área de trabajo (mm con Y hacia abajo, como el canvas)
+            strokes = load_svg(filename, self.work_area_width, self.work_area_height,
+                               flatten_tolerance(self.steps_per_mm))
+            return Drawing.from_strokes(stroke * self.scale_factor for stroke in strokes)
+        return Drawing.load(filename)
+
+    def mm_strokes(self, drawing: Drawing) -> List[np.ndarray]:
+        """Trazos del dibujo en mm según el origen actual"""
+        return drawing.map_strokes(self.transform.px_to_mm)
+
+    def prepare_lines(self, drawing: Drawing) -> Tuple[List[np.ndarray], float]:
+        """Líneas listas para enviar: simplificadas y en orden óptimo
+
+        Devuelve las líneas y la distancia con lápiz arriba ahorrada (mm).
+        """
+        lines = simplify_strokes(self.mm_strokes(drawing), self.simplify_tolerance,
+                                 self.steps_per_mm)
+        if not lines or not self.optimize:
+            return lines, 0.0
+
+        endpoints = [[line[0], line[-1]] for line in lines]
+        result = optimize_order(endpoints)
+        return result.apply(lines), result.travel_saved
+
+    def build_commands(self, lines):
+        """Generar los comandos H/L/X/Y/B/U de unas líneas (en mm)
+
+        Devuelve los comandos, la posición (pasos) del CNC al terminar cada
+        uno y, por cada línea, cuántos comandos hay hasta su final.
+        """
+        transform = self.transform
+        return plan(transform.mm_to_steps(line) for line in lines)
+
+    def job_settings(self) -> dict:
+        """Lo que define cómo se prepara un dibujo (para prepararlo en otro
+        proceso con `PlotterEngine(**settings)` y saber si quedó viejo)"""
+        return {
+            'steps_per_mm': self.steps_per_mm,
+            'canvas_width': self.canvas_width,
+            'canvas_height': self.canvas_height,
+            'work_area_width': self.work_area_width,
+            'work_area_height': self.work_area_height,
+            'simplify_tolerance': self.simplify_tolerance,
+            'optimize': self.optimize,
+            'origin_corner': self.origin_corner if self.origin_detected else None,
+        }
+
+    def job_stats(self, drawing: Drawing) -> dict:
+        """Segmentos y tiempo estimado antes/después de preparar el dibujo"""
+        prepared, _ = self.prepare_lines(drawing)
+        original = self.mm_strokes(drawing)
+        model = MotionModel()
+        return {
+            'segments_before': count_segments(original),
+            'segments_after': count_segments(prepared),
+            'seconds_before': model.total_seconds(self.build_commands(original)[0]),
+            'seconds_after': model.total_seconds(self.build_commands(prepared)[0]),
+        }
+
+    # ------------------------------------------------------------
+    # Trabajos
+    # ------------------------------------------------------------
+
+    def plot_drawing(self, drawing: Drawing) -> JobResult:
+        """Dibujar en el CNC (bloquea hasta terminar o detener)"""
+        return self._run_job(JOB_DRAWING, self._plot_drawing, drawing)
+
+    def plot_commands(self, commands: List[str], lifts_avoided: int = 0) -> JobResult:
+        """Dibujar comandos ya planificados (p. ej. por la cola de trabajos)"""
+        return self._run_job(JOB_DRAWING, self._plot_commands, commands, None, None,
+                             lifts_avoided)
+
+    def plot_gcode(self, filename: str) -> JobResult:
+        """Enviar un G-code mientras se lee (bloquea hasta terminar o detener)"""
+        return self._run_job(JOB_GCODE, self._plot_gcode, filename)
+
+    def resume_job(self, checkpoint: Optional[JobCheckpoint] = None,
+                   rehome: Optional[Callable[[], object]] = None) -> JobResult:
+        """Seguir un trabajo detenido o cortado desde su último checkpoint
+        (bloquea como plot_*). Si el CNC se reinició desde entonces (otra
+        conexión), `rehome` tiene que llevarlo al origen, p. ej. calibrando."""
+        if checkpoint is None:
+            checkpoint = self.pending_job()
+        kind = checkpoint.kind if checkpoint is not None else JOB_DRAWING
+        return self._run_job(kind, self._resume_job, checkpoint, rehome)
+
+    def pending_job(self) -> Optional[JobCheckpoint]:
+        """El trabajo sin terminar del diario, o None"""
+        if self.journal is None:
+            return None
+        return self.journal.load()
+
+    def start_job(self, job: Callable, *args) -> threading.Thread:
+        """Lanzar `plot_drawing`/`plot_gcode`/`resume_job` en un hilo; el
+        final llega como EVENT_JOB_DONE"""
+        self.is_drawing = True
+        thread = threading.Thread(target=job, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def pause(self) -> None:
+        """Dejar de enviar tras los comandos que ya están en camino; el
+        trabajo sigue abierto hasta `resume()` o `stop()`"""
+        self.is_paused = True
+        runner = self._runner
+        if runner is not None:
+            self._loop.call(runner.pause)
+            self.log("⏸️ Pausado: terminando lo que ya está en camino")
+
+    def resume(self) -> None:
+        """Seguir un trabajo pausado"""
+        self.is_paused = False
+        runner = self._runner
+        if runner is not None:
+            self._loop.call(runner.resume)
+            self.log("▶️ Reanudado")
+
+    def stop(self) -> None:
+        """Terminar el trabajo en curso (queda en el diario para reanudarlo)"""
+        self.is_drawing = False
+        self.is_paused = False
+        runner = self._runner
+        if runner is not None and self._loop is not None:
+            self._loop.call(runner.abort)
+
+    def _run_job(self, kind: str, job: Callable, *args) -> JobResult:
+        self.is_drawing = True
+        self.is_paused = False
+        try:
+            if not self.is_connected:
+                raise RuntimeError("CNC no conectado")
+            result = job(*args)
+        except Exception as e:
+            self.log(f"✗ Error en {_JOB_NAMES[kind]}: {str(e)}")
+            result = JobResult(kind, JOB_FAILED, message=str(e))
+        finally:
+            self.is_drawing = False
+            self.is_paused = False
+        self._close_journal(result)
+        self._emit(EVENT_JOB_DONE, result)
+        return result
+
+    def _stream(self, commands, on_progress) -> int:
+        # Los ecos del CNC marcan el ritmo (sin sleeps estimados); pausar
+        # deja de encolar hasta reanudar y detener descarta lo que no se
+        # llegó a escribir. El
+        # tracker re-apunta los movimientos recortados por el firmware y
+        # verifica la posición con 'P' (esos no cuentan como progreso).
+        # Partir de la posición y los límites que reporta el firmware
+        self.execute('P')
+        position = self.transport.position or tuple(self.current_pos)
+        tracker = PositionTracker(position[:2], self.transport.limits or DEFAULT_LIMITS)
+        planner = None
+        if self.lookahead and self._probe_velocity():
+            planner = LookaheadPlanner()
+            commands = planner.wrap(commands)
+        stream = tracker.wrap(commands)
+        batcher = None
+        rtt = self._probe_batches() if self.batch_moves else None
+        if rtt is not None:
+            batcher = AdaptiveBatcher(self._batch_rtt or rtt)
+            batcher.observe_rtt(rtt)
+            self._batch_rtt = batcher.rtt_s
+            stream = batcher.wrap(stream)
+
+        def on_response(lines):
+            # Un lote cubre varios comandos del tracker (nunca un 'P')
+            count = 1 if batcher is None else batcher.on_response(lines)
+            job = [tracker.on_response(lines) for _ in range(count)]
+            if any(job):
+                on_progress(tracker.completed)
+
+        runner = AsyncJobRunner(self.transport)
+        self._runner = runner
+        if self.is_paused:
+            runner.pause()
+        try:
+            self._loop.run(runner.run(stream, on_response=on_response,
+                                      should_continue=lambda: self.is_drawing))
+        finally:
+            self._runner = None
+        if batcher is not None and batcher.batches:
+            self.log(f"📦 {batcher.batched_commands} comandos en {batcher.batches} lotes "
+                     f"(RTT {self._batch_rtt * 1000:.0f} ms)")
+        if planner is not None and planner.ramped_moves:
+            self.log(f"🏎️ {planner.ramped_moves} movimientos con rampa: "
+                     f"{format_duration(planner.constant_seconds)} → "
+                     f"{format_duration(planner.planned_seconds)} de movimiento XY")
+        self._reconcile(tracker)
+        return tracker.completed
+
+    def _probe_batches(self) -> Optional[float]:
+        """Tiempo de ida y vuelta de un lote vacío ('M0 OK'), o None si el
+        firmware no entiende lotes: uno viejo lo toma como comando
+        desconocido (imprime la ayuda) y el trabajo sigue con comandos
+        sueltos. Se mide antes de cada trabajo (promedio móvil en
+        `_batch_rtt`); un "no" queda hasta la próxima conexión."""
+        if self._batch_rtt == 0:
+            return None
+        started = time.monotonic()
+        lines = self.execute(encode_batch(0, []))
+        if "M0 OK" not in lines:
+            self._batch_rtt = 0
+            self.log("ℹ️ El firmware no soporta lotes: se envían comandos sueltos")
+            return None
+        return max(time.monotonic() - started, 1e-3)
+
+    def _probe_velocity(self) -> bool:
+        """¿El firmware entiende V<...>? Un V vacío no imprime nada; uno
+        viejo responde con la lista de comandos. Una vez por conexión."""
+        if self._velocity_support is None:
+            lines = self.execute(velocity_command(0, 0, START_DELAY_US, START_DELAY_US))
+            self._velocity_support = not any("COMANDOS DISPONIBLES" in line for line in lines)
+            if not self._velocity_support:
+                self.log("ℹ️ El firmware no soporta rampas (V): velocidad constante")
+        return self._velocity_support
+
+    def _reconcile(self, tracker: PositionTracker) -> None:
+        """Dejar la posición del host igual a la del firmware"""
+        if tracker.adjusted_moves:
+            self.log(f"📐 {tracker.adjusted_moves} movimientos ajustados a los límites del CNC")
+        if tracker.drift_events:
+            self.log(f"🧭 Posición re-sincronizada {tracker.drift_events} veces "
+                     f"(deriva máx. {tracker.max_drift} pasos)")
+        if tracker.final is not None:
+            self._set_position(tracker.final)
+
+    def _plot_drawing(self, drawing: Drawing) -> JobResult:
+        self.log("🎨 Iniciando dibujo...")
+
+        # Ir a home primero y luego recorrer las líneas
+        lines, travel_saved = self.prepare_lines(drawing)
+        self.log(f"✂️ Simplificado: {count_segments(drawing.strokes())} → "
+                 f"{count_segments(lines)} segmentos")
+        if travel_saved > 0:
+            self.log(f"🧭 Recorrido optimizado: {travel_saved:.1f} mm menos con lápiz arriba")
+        commands, _, stroke_ends = self.build_commands(lines)
+        lifts_avoided = sum(1 for line in lines if len(line)) - len(stroke_ends)
+        self._log_lifts(lifts_avoided)
+        return self._plot_commands(commands, lifts_avoided=lifts_avoided)
+
+    def _plot_commands(self, commands: List[str], checkpoint: Optional[JobCheckpoint] = None,
+                       rehome: Optional[Callable[[], object]] = None,
+                       lifts_avoided: int = 0) -> JobResult:
+        """Enviar los comandos de un dibujo, desde el principio o desde
+        `checkpoint`"""
+        states = [(position, pen_down) for _, position, pen_down in replay(commands)]
+        stroke_ends = [index + 1 for index, command in enumerate(commands) if command == 'U']
+        total_lines = len(stroke_ends)
+        start, prefix = 0, []
+        if checkpoint is not None:
+            start = checkpoint.completed
+            if start > len(commands) or (start and states[start - 1] != (checkpoint.position,
+                                                                         checkpoint.pen_down)):
+                raise JournalError("el diario no coincide con los comandos del dibujo")
+            prefix = self._resync(checkpoint, rehome)
+        self._begin_journal(JOB_DRAWING, checkpoint, commands=commands)
+
+        # Progreso por tiempo previsto (no por líneas) y ETA que se
+        # corrige con el ritmo real de los ecos
+        eta = EtaEstimator.for_commands(commands)
+        eta.completed = start
+        self.log(f"⏱️ Tiempo estimado: {format_duration(eta.remaining_seconds())}")
+
+        def on_progress(done):
+            # Lo que re-posiciona al reanudar no es parte del dibujo
+            completed = start + done - len(prefix)
+            if completed <= start:
+                return
+            eta.update(completed)
+            position, pen_down = states[completed - 1]
+            self._checkpoint(completed, position, pen_down)
+            self._set_position(position)
+            current_line = bisect.bisect_right(stroke_ends, completed)
+            self._emit(EVENT_PROGRESS, JobProgress(
+                eta.fraction(), f"{current_line} / {total_lines} líneas",
+                eta.remaining_seconds()))
+
+        eta.start()
+        done = self._stream(prefix + commands[start:], on_progress)
+        completed = start + max(done - len(prefix), 0)
+
+        if not self.is_drawing:
+            self.log(f"⏹️ Dibujo detenido en el comando {completed}/{len(commands)}")
+            return JobResult(JOB_DRAWING, JOB_STOPPED, completed, lifts_avoided=lifts_avoided)
+        self.log("✓ Dibujo completado!")
+        return JobResult(JOB_DRAWING, JOB_COMPLETED, completed, lifts_avoided=lifts_avoided)
+
+    def _log_lifts(self, lifts_avoided: int) -> None:
+        if lifts_avoided > 0:
+            self.log(f"✏️ {lifts_avoided} subidas de lápiz evitadas (trazos que se tocan)")
+
+    def _plot_gcode(self, filename: str, checkpoint: Optional[JobCheckpoint] = None,
+                    rehome: Optional[Callable[[], object]] = None) -> JobResult:
+        """Los trazos se compilan a comandos a medida que el parser los
+        entrega, así los archivos grandes empiezan a dibujarse enseguida.
+        Al reanudar se vuelve a leer el archivo hasta el checkpoint."""
+        self.log(f"📄 Enviando G-code: {os.path.basename(filename)}")
+        total_bytes = max(os.path.getsize(filename), 1)
+        parser = GCodeParser()
+        pending_states = deque()
+        if checkpoint is None:
+            settings = self._journal_settings()
+        else:
+            settings = checkpoint.settings
+            source = checkpoint.source or {}
+            current = file_source(filename)
+            if (source.get('size'), source.get('mtime')) != (current['size'], current['mtime']):
+                raise JournalError(f"{os.path.basename(filename)} cambió desde el corte")
+        transform = CoordinateTransform(settings['origin_corner'], settings['scale_factor'],
+                                        settings['steps_per_mm'], *settings['canvas'])
+
+        counts = {'strokes': 0, 'lifts': 0}
+
+        def counted(strokes):
+            for stroke in strokes:
+                counts['strokes'] += len(stroke) > 0
+                yield stroke
+
+        def compiled():
+            strokes = counted(iter_file_strokes(filename, parser))
+            for command, _ in iter_gcode_commands(strokes, transform):
+                counts['lifts'] += command == 'U'
+                yield command
+
+        entries = replay(compiled())
+        start, prefix = 0, []
+        if checkpoint is not None:
+            start = checkpoint.completed
+            state = None
+            for _ in range(start):
+                entry = next(entries, None)
+                if entry is None:
+                    raise JournalError("el G-code terminó antes del checkpoint")
+                state = entry[1:]
+            if start and state != (checkpoint.position, checkpoint.pen_down):
+                raise JournalError("el G-code no coincide con el diario")
+            prefix = self._resync(checkpoint, rehome)
+        self._begin_journal(JOB_GCODE, checkpoint, settings, source=file_source(filename))
+
+        def commands():
+            yield from prefix
+            for command, position, pen_down in entries:
+                pending_states.append((position, pen_down))
+                yield command
+
+        acknowledged = [start]
+
+        def on_progress(done):
+            completed = start + done - len(prefix)
+            state = None
+            while acknowledged[0] < completed and pending_states:
+                state = pending_states.popleft()
+                acknowledged[0] += 1
+            if state is not None:
+                self._checkpoint(acknowledged[0], *state)
+                self._set_position(state[0])
+            self._emit(EVENT_PROGRESS, JobProgress(
+                min(parser.bytes_read / total_bytes, 1.0),
+                f"{parser.line_number} líneas G-code"))
+
+        done = self._stream(commands(), on_progress)
+        completed = start + max(done - len(prefix), 0)
+
+        if not self.is_drawing:
+            self.log(f"⏹️ G-code detenido en el comando {completed}")
+            return JobResult(JOB_GCODE, JOB_STOPPED, completed)
+        lifts_avoided = counts['strokes'] - counts['lifts']
+        self._log_lifts(lifts_avoided)
+        self.log(f"✓ G-code completado: {parser.line_number} líneas, {completed} comandos")
+        return JobResult(JOB_GCODE, JOB_COMPLETED, completed, lifts_avoided=lifts_avoided)
+
+    # ------------------------------------------------------------
+    # Diario y reanudación
+    # ------------------------------------------------------------
+
+    def _resume_job(self, checkpoint: Optional[JobCheckpoint],
+                    rehome: Optional[Callable[[], object]]) -> JobResult:
+        if checkpoint is None:
+            raise JournalError("no hay ningún trabajo para reanudar")
+        self.log(f"🔁 Reanudando {_JOB_NAMES[checkpoint.kind]} desde el comando "
+                 f"{checkpoint.completed}")
+        if checkpoint.kind == JOB_GCODE:
+            return self._plot_gcode(checkpoint.source['path'], checkpoint, rehome)
+        return self._plot_commands(checkpoint.commands, checkpoint, rehome)
+
+    def _resync(self, checkpoint: JobCheckpoint,
+                rehome: Optional[Callable[[], object]]) -> List[str]:
+        """Dejar el CNC listo para seguir desde `checkpoint`; devuelve los
+        comandos que lo llevan ahí con el lápiz como estaba"""
+        if checkpoint.session != self.session:
+            # Al abrir el puerto el ESP32 se reinicia y cuenta desde donde
+            # quedó el carro: hay que volver al origen real
+            if rehome is None:
+                raise JournalError("el CNC se reinició desde el corte: "
+                                   "hay que buscar el origen para reanudar")
+            self.log("🏠 El CNC se reinició: buscando el origen antes de reanudar")
+            rehome()
+        self.execute('P')
+        x, y = (self.transport.position or tuple(self.current_pos))[:2]
+        target_x, target_y = checkpoint.position
+        self.log(f"🧭 CNC en ({x}, {y}); se retoma en ({target_x}, {target_y})")
+        prefix = ['U']
+        if (x, y) != (target_x, target_y):
+            prefix.append(move_command(target_x - x, target_y - y))
+        if checkpoint.pen_down:
+            prefix.append('B')
+        return prefix
+
+    def _journal_settings(self) -> dict:
+        """Lo que define la transformación de un G-code (para regenerarlo)"""
+        transform = self.transform
+        return {'origin_corner': transform.origin_corner, 'scale_factor': self.scale_factor,
+                'steps_per_mm': self.steps_per_mm,
+                'canvas': [self.canvas_width, self.canvas_height]}
+
+    def _begin_journal(self, kind: str, checkpoint: Optional[JobCheckpoint],
+                       settings: Optional[dict] = None, commands: Optional[List[str]] = None,
+                       source: Optional[dict] = None) -> None:
+        self._journaling = False
+        self._checkpointed = checkpoint.completed if checkpoint is not None else 0
+        if self.journal is None:
+            return
+        if settings is None:
+            settings = checkpoint.settings if checkpoint is not None else self._journal_settings()
+        try:
+            self.journal.begin(kind, self.session, settings, commands, source, checkpoint)
+        except OSError as e:
+            self.log(f"⚠ No se pudo crear el diario del trabajo: {e}")
+            return
+        self._journaling = True
+
+    def _checkpoint(self, completed: int, position, pen_down: bool) -> None:
+        """Anotar el avance (desde el loop, en cada eco)"""
+        if not self._journaling:
+            return
+        try:
+            self.journal.record(completed, position, pen_down)
+            self._checkpointed = completed
+            if self.is_paused or not self.is_drawing:
+                self.journal.sync()
+        except OSError as e:
+            self._journaling = False
+            self.log(f"⚠ No se pudo anotar el avance del trabajo: {e}")
+
+    def _close_journal(self, result: JobResult) -> None:
+        if not self._journaling:
+            return
+        self._journaling = False
+        try:
+            self.journal.finish(result.status, completed=result.status == JOB_COMPLETED)
+        except OSError as e:
+            self.log(f"⚠ No se pudo cerrar el diario del trabajo: {e}")
+            return
+        if result.status != JOB_COMPLETED:
+            self.log(f"💾 Avance guardado: se puede reanudar desde el comando {self._checkpointed}")
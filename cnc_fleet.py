@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Flota de Plotters - Varios ESP32 en paralelo desde un solo proceso
+
+`FleetController` busca los puertos con `serial.tools.list_ports`, abre
+cada uno y lo identifica por el banner de arranque del firmware
+(`=== CNC ESP32 S3 ===`; el ESP32 se reinicia al abrir el puerto). Si la
+placa no se reinicia (USB nativo), se le pregunta con 'P' y se reconoce
+por `=== POSICION ===`. Cada máquina identificada queda con su conexión
+(un AsyncPlotterTransport) y un worker que toma trabajos de una cola
+común: los dibujos se reparten entre las máquinas libres y corren a la vez.
+
+    python cnc_fleet.py dibujo1.svg dibujo2.gcode logo.npz
+    python cnc_fleet.py *.svg --simulators 3 --time-scale 0.01
+
+Las estadísticas por máquina (trabajos, comandos, tiempo ocupado) se
+imprimen al terminar. Se puede probar sin hardware con SimulatedSerial.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import serial.tools.list_ports
+
+from cnc_async import AsyncJobRunner, AsyncPlotterTransport
+from cnc_engine import PlotterEngine, open_port
+from cnc_serial_reader import MAX_READ, LineFramer
+from cnc_simulator import SIMULATOR_PORT, SimulatedSerial
+from cnc_transform import ORIGIN_CORNERS
+
+BANNER = "=== CNC ESP32 S3 ==="
+POSITION_HEADER = "=== POSICION ==="
+IDENTIFY_TIMEOUT_S = 4.0   # espera máxima por puerto
+PROBE_AFTER_S = 2.0        # sin banner a los 2 s: preguntar con 'P'
+
+DEVICE_IDLE = 'idle'
+DEVICE_BUSY = 'busy'
+DEVICE_OFFLINE = 'offline'
+
+
+def identify_port(port, timeout: float = IDENTIFY_TIMEOUT_S,
+                  probe_after: float = PROBE_AFTER_S) -> bool:
+    """¿Hay un CNC con nuestro firmware en este puerto? (bloqueante)"""
+    framer = LineFramer()
+    start = time.monotonic()
+    probed = False
+    while time.monotonic() - start < timeout:
+        data = port.read(1)
+        if data and port.in_waiting:
+            data += port.read(min(port.in_waiting, MAX_READ))
+        for line in framer.feed(data):
+            if BANNER in line or line == POSITION_HEADER:
+                return True
+        if not probed and time.monotonic() - start >= probe_after:
+            port.write(b'P\n')
+            probed = True
+    return False
+
+
+def candidate_ports() -> List[str]:
+    return [port.device for port in serial.tools.list_ports.comports()]
+
+
+class FleetJob:
+    """Un trabajo en la cola de la flota"""
+
+    def __init__(self, name: str, commands: List[str]):
+        self.name = name
+        self.commands = commands
+        self.device = None
+        self.completed = 0
+        self.seconds = 0.0
+        self.error = None
+        self.done = asyncio.get_running_loop().create_future()
+
+    @property
+    def ok(self) -> bool:
+        return self.done.done() and self.error is None
+
+
+class FleetDevice:
+    """Una máquina de la flota: su conexión y sus estadísticas"""
+
+    def __init__(self, name: str, transport: AsyncPlotterTransport):
+        self.name = name
+        self.transport = transport
+        self.state = DEVICE_IDLE
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.commands = 0
+        self.busy_seconds = 0.0
+        self.last_error = None
+        self.runner = None
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'jobs_completed': self.jobs_completed,
+            'jobs_failed': self.jobs_failed,
+            'commands': self.commands,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'last_error': None if self.last_error is None else str(self.last_error),
+        }
+
+
+class FleetController:
+    """Conexiones por máquina y una cola de trabajos compartida"""
+
+    def __init__(self, opener: Callable[[str], object] = open_port,
+                 identify_timeout: float = IDENTIFY_TIMEOUT_S,
+                 probe_after: float = PROBE_AFTER_S,
+                 on_event: Optional[Callable[[str, str], None]] = None,
+                 **transport_options):
+        self.opener = opener
+        self.transport_options = transport_options
+        self.identify_timeout = identify_timeout
+        self.probe_after = probe_after
+        self.on_event = on_event or (lambda device, message: None)
+        self.devices: Dict[str, FleetDevice] = {}
+        self.jobs: List[FleetJob] = []
+        self._queue = None
+        self._workers = []
+
+    # ------------------------------------------------------------
+    # Máquinas
+    # ------------------------------------------------------------
+
+    async def discover(self, ports: Optional[Iterable[str]] = None) -> List[str]:
+        """Abrir e identificar en paralelo; devuelve las máquinas nuevas"""
+        ports = candidate_ports() if ports is None else list(ports)
+        results = await asyncio.gather(*(self._probe(name) for name in ports
+                                         if name not in self.devices))
+        found = []
+        for name, port in results:
+            if port is not None:
+                await self.add_device(name, port)
+                found.append(name)
+        return found
+
+    async def _probe(self, name: str):
+        loop = asyncio.get_running_loop()
+        try:
+            port = await loop.run_in_executor(None, self.opener, name)
+        except Exception as e:
+            self.on_event(name, f"✗ No se pudo abrir: {e}")
+            return name, None
+        identified = await loop.run_in_executor(None, identify_port, port,
+                                                self.identify_timeout, self.probe_after)
+        if not identified:
+            self.on_event(name, "⚠ No responde como CNC ESP32 (ignorado)")
+            port.close()
+            return name, None
+        self.on_event(name, "✓ CNC identificado")
+        return name, port
+
+    async def add_device(self, name: str, port) -> FleetDevice:
+        """Sumar una máquina con su puerto ya abierto (e identificado)"""
+        transport = AsyncPlotterTransport(port, **self.transport_options)
+        await transport.start()
+        device = FleetDevice(name, transport)
+        self.devices[name] = device
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers.append(asyncio.ensure_future(self._worker(device)))
+        return device
+
+    # ------------------------------------------------------------
+    # Trabajos
+    # ------------------------------------------------------------
+
+    def submit(self, commands: List[str], name: str = '') -> FleetJob:
+        """Encolar un trabajo (lista de comandos ya planificada)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        job = FleetJob(name or f"trabajo {len(self.jobs) + 1}", list(commands))
+        self.jobs.append(job)
+        self._queue.put_nowait(job)
+        if self.devices and not self._online():
+            self._fail_queued()
+        return job
+
+    async def join(self) -> List[FleetJob]:
+        """Esperar a que terminen todos los trabajos encolados"""
+        if not self.jobs:
+            return []
+        await asyncio.gather(*(job.done for job in self.jobs))
+        return self.jobs
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: device.stats() for name, device in self.devices.items()}
+
+    async def _worker(self, device: FleetDevice) -> None:
+        while True:
+            job = await self._queue.get()
+            device.state = DEVICE_BUSY
+            job.device = device.name
+            self.on_event(device.name, f"🎨 {job.name}")
+            started = time.monotonic()
+            device.runner = AsyncJobRunner(device.transport)
+            try:
+                job.completed = await device.runner.run(job.commands)
+            except Exception as e:
+                device.busy_seconds += time.monotonic() - started
+                device.jobs_failed += 1
+                device.last_error = e
+                device.state = DEVICE_OFFLINE
+                self.on_event(device.name, f"✗ {job.name}: {e}")
+                if device.runner.completed == 0 and self._online():
+                    # No llegó a dibujar nada: que lo haga otra máquina
+                    job.device = None
+                    self._queue.put_nowait(job)
+                else:
+                    job.error = e
+                    job.done.set_result(job)
+                self._queue.task_done()
+                if not self._online():
+                    self._fail_queued()
+                return
+            finally:
+                device.runner = None
+            job.seconds = time.monotonic() - started
+            device.busy_seconds += job.seconds
+            device.commands += job.completed
+            device.jobs_completed += 1
+            device.state = DEVICE_IDLE
+            self.on_event(device.name, f"✓ {job.name} ({job.seconds:.1f} s)")
+            job.done.set_result(job)
+            self._queue.task_done()
+
+    def _online(self) -> bool:
+        return any(device.state != DEVICE_OFFLINE for device in self.devices.values())
+
+    def _fail_queued(self) -> None:
+        # Sin máquinas en línea nadie va a tomar lo que queda en la cola:
+        # terminarlo con error para que join() no espere para siempre
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.error = ConnectionError("Ninguna máquina de la flota en línea")
+            job.done.set_result(job)
+            self._queue.task_done()
+            self.on_event('flota', f"✗ {job.name}: sin máquinas en línea")
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for device in self.devices.values():
+            await device.transport.close()
+        self._workers = []
+
+
+def plan_file(filename: str, engine: PlotterEngine) -> List[str]:
+    """Cargar, simplificar, ordenar y planificar un archivo (sin conexión)"""
+    drawing = engine.load_drawing(filename)
+    lines, _ = engine.prepare_lines(drawing)
+    return engine.build_commands(lines)[0]
+
+
+async def run_fleet(files: List[str], ports: Optional[List[str]] = None,
+                    simulators: int = 0, time_scale: float = 1.0,
+                    origin: str = "top-left") -> FleetController:
+    engine = PlotterEngine()
+    engine.set_origin(origin)
+
+    def opener(name):
+        if name.startswith(SIMULATOR_PORT):
+            return SimulatedSerial(time_scale=time_scale, timeout=0.05)
+        return open_port(name)
+
+    fleet = FleetController(opener, on_event=lambda device, message: print(f"[{device}] {message}"))
+    names = list(ports) if ports else candidate_ports()
+    names += [f"{SIMULATOR_PORT}{i + 1}" for i in range(simulators)]
+    found = await fleet.discover(names)
+    if not found:
+        print("✗ No se encontró ningún CNC", file=sys.stderr)
+        return fleet
+    try:
+        for filename in files:
+            fleet.submit(plan_file(filename, engine), filename)
+        await fleet.join()
+    finally:
+        await fleet.close()
+    return fleet
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Dibujar en varios plotters a la vez")
+    parser.add_argument('files', nargs='+', help=".npz, .json, .svg o G-code")
+    parser.add_argument('--ports', nargs='+', help="puertos a usar (default: todos)")
+    parser.add_argument('--simulators', type=int, default=0, help="sumar N plotters simulados")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="velocidad de los simulados (0 = instantáneo)")
+    parser.add_argument('--origin', choices=ORIGIN_CORNERS, default="top-left")
+    args = parser.parse_args(argv)
+
+    fleet = asyncio.run(run_fleet(args.files, args.ports, args.simulators, args.time_scale,
+                                  args.origin))
+    print(f"\n{'Máquina':<14} {'trabajos':>8} {'fallos':>6} {'comandos':>9} {'ocupado (s)':>12}")
+    for name, stats in fleet.stats().items():
+        print(f"{name:<14} {stats['jobs_completed']:>8} {stats['jobs_failed']:>6} "
+              f"{stats['commands']:>9} {stats['busy_seconds']:>12.1f}")
+    failed = [job for job in fleet.jobs if not job.ok]
+    return 1 if failed or not fleet.devices else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
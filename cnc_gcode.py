@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importador de G-code - De archivos CAM/vectoriales a trazos y comandos CNC
+
+Soporta G0/G1 (rápido/lineal), G2/G3 (arcos con I,J o R), G90/G91
+(absoluto/incremental), G20/G21 (pulgadas/mm) y G28 (volver al origen).
+El lápiz se controla con Z (Z <= pen_z baja el lápiz) o con M3/M4 (bajar)
+y M5 (subir). Las coordenadas X/Y del G-code son mm del CNC.
+
+El análisis es incremental: `iter_strokes` entrega cada trazo en cuanto
+se levanta el lápiz, así un archivo de varios MB empieza a enviarse antes
+de terminar de leerlo. Los arcos se convierten en segmentos con un error
+de cuerda máximo de `arc_tolerance` mm.
+"""
+
+import math
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from cnc_planner import iter_commands
+
+DEFAULT_ARC_TOLERANCE_MM = 0.05
+DEFAULT_PEN_Z = 0.0
+INCH_MM = 25.4
+FILE_EXTENSIONS = ('.gcode', '.nc', '.ngc', '.gc', '.g', '.tap')
+
+_WORD = re.compile(r'([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+_COMMENT = re.compile(r'\([^)]*\)|;.*')
+
+
+def is_gcode_file(filename: str) -> bool:
+    return filename.lower().endswith(FILE_EXTENSIONS)
+
+
+def arc_points(start, end, center, clockwise: bool,
+               tolerance: float = DEFAULT_ARC_TOLERANCE_MM) -> np.ndarray:
+    """Puntos (sin el inicial) que aproximan un arco con error de cuerda
+    menor a `tolerance`. Si inicio y fin coinciden es un círculo completo."""
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    center = np.asarray(center, dtype=float)
+    radius = float(np.hypot(*(start - center)))
+    if radius == 0:
+        return end.reshape(1, 2)
+
+    a0 = math.atan2(start[1] - center[1], start[0] - center[0])
+    a1 = math.atan2(end[1] - center[1], end[0] - center[0])
+    sweep = a1 - a0
+    if clockwise and sweep >= 0:
+        sweep -= 2 * math.pi
+    elif not clockwise and sweep <= 0:
+        sweep += 2 * math.pi
+
+    # Ángulo máximo por segmento para que la flecha no supere la tolerancia
+    if tolerance < radius:
+        max_angle = 2 * math.acos(1 - tolerance / radius)
+    else:
+        max_angle = math.pi / 2
+    n = max(1, math.ceil(abs(sweep) / max_angle))
+
+    angles = a0 + sweep * np.arange(1, n + 1) / n
+    points = center + radius * np.column_stack([np.cos(angles), np.sin(angles)])
+    points[-1] = end
+    return points
+
+
+class GCodeParser:
+    """Máquina de estados de G-code que produce trazos en mm"""
+
+    def __init__(self, arc_tolerance: float = DEFAULT_ARC_TOLERANCE_MM,
+                 pen_z: float = DEFAULT_PEN_Z):
+        self.arc_tolerance = arc_tolerance
+        self.pen_z = pen_z
+        self.position = np.zeros(2)
+        self.z = None
+        self.absolute = True
+        self.units = 1.0          # mm por unidad (G21=1, G20=25.4)
+        self.motion = 0           # último G0/G1/G2/G3 (modal)
+        self.pen_down = False
+        self.line_number = 0
+        self.bytes_read = 0
+        self._stroke = None       # lista de arreglos del trazo en curso
+
+    # ------------------------------------------------------------
+    # Trazos
+    # ------------------------------------------------------------
+
+    def _start_stroke(self) -> None:
+        self._stroke = [self.position.reshape(1, 2).copy()]
+
+    def _end_stroke(self, finished: List[np.ndarray]) -> None:
+        if self._stroke is not None:
+            finished.append(np.vstack(self._stroke))
+            self._stroke = None
+
+    def _set_pen(self, down: bool, finished: List[np.ndarray]) -> None:
+        if down and not self.pen_down:
+            self._start_stroke()
+        elif not down and self.pen_down:
+            self._end_stroke(finished)
+        self.pen_down = down
+
+    # ------------------------------------------------------------
+    # Análisis
+    # ------------------------------------------------------------
+
+    def feed(self, line: str) -> List[np.ndarray]:
+        """Procesar una línea; devuelve los trazos que quedaron terminados"""
+        self.line_number += 1
+        self.bytes_read += len(line)
+        code = _COMMENT.sub('', line).upper()
+        code = code.split('*', 1)[0]  # checksum estilo RepRap
+        if not code.strip():
+            return []
+
+        words = {}
+        g_codes = []
+        m_codes = []
+        for letter, value in _WORD.findall(code):
+            number = float(value)
+            if letter == 'G':
+                g_codes.append(number)
+            elif letter == 'M':
+                m_codes.append(int(number))
+            else:
+                words[letter] = number
+
+        finished = []
+        home = False
+        for g in g_codes:
+            if g in (0, 1, 2, 3):
+                self.motion = int(g)
+            elif g == 20:
+                self.units = INCH_MM
+            elif g == 21:
+                self.units = 1.0
+            elif g == 90:
+                self.absolute = True
+            elif g == 91:
+                self.absolute = False
+            elif g == 28:
+                home = True
+
+        # El lápiz cambia antes del movimiento de la misma línea
+        for m in m_codes:
+            if m in (3, 4):
+                self._set_pen(True, finished)
+            elif m == 5:
+                self._set_pen(False, finished)
+        if 'Z' in words:
+            z = words['Z'] * self.units
+            self.z = z if self.absolute or self.z is None else self.z + z
+            self._set_pen(self.z <= self.pen_z, finished)
+
+        if home:
+            self._travel(np.zeros(2), finished)
+            return finished
+
+        if 'X' not in words and 'Y' not in words:
+            return finished
+
+        target = self.position.copy()
+        for axis, letter in enumerate('XY'):
+            if letter in words:
+                value = words[letter] * self.units
+                target[axis] = value if self.absolute else target[axis] + value
+
+        if self.motion == 0:
+            self._travel(target, finished)
+        elif self.motion == 1:
+            self._line(target.reshape(1, 2))
+        else:
+            center = self._arc_center(target, words)
+            self._line(arc_points(self.position, target, center,
+                                  self.motion == 2, self.arc_tolerance))
+        return finished
+
+    def finish(self) -> List[np.ndarray]:
+        """Cerrar el trazo en curso al final del archivo"""
+        finished = []
+        self._end_stroke(finished)
+        self.pen_down = False
+        return finished
+
+    def _travel(self, target: np.ndarray, finished: List[np.ndarray]) -> None:
+        """G0: movimiento sin dibujar (corta el trazo si el lápiz está abajo)"""
+        if self.pen_down:
+            # Un trazo que solo tiene su punto inicial no se llegó a dibujar
+            # (típico de M3 seguido de G0 en archivos de láser)
+            if len(self._stroke) > 1:
+                self._end_stroke(finished)
+            self.position = target
+            self._start_stroke()
+        else:
+            self.position = target
+
+    def _line(self, points: np.ndarray) -> None:
+        if self.pen_down:
+            self._stroke.append(points)
+        self.position = points[-1].copy()
+
+    def _arc_center(self, target: np.ndarray, words: dict) -> np.ndarray:
+        if 'R' in words:
+            radius = words['R'] * self.units
+            dx, dy = target - self.position
+            chord = math.hypot(dx, dy)
+            if chord == 0:
+                raise ValueError(f"Línea {self.line_number}: arco R sin desplazamiento")
+            h2 = 4 * radius * radius - chord * chord
+            if h2 < -1e-6 * chord * chord:
+                raise ValueError(f"Línea {self.line_number}: radio {radius} menor "
+                                 f"que media cuerda")
+            h = -math.sqrt(max(h2, 0.0)) / chord
+            if self.motion == 3:
+                h = -h
+            if radius < 0:
+                h = -h
+            return self.position + 0.5 * np.array([dx - dy * h, dy + dx * h])
+        offset = np.array([words.get('I', 0.0), words.get('J', 0.0)]) * self.units
+        return self.position + offset
+
+
+def iter_strokes(lines: Iterable[str], parser: Optional[GCodeParser] = None,
+                 **options) -> Iterator[np.ndarray]:
+    """Trazos (arreglos (k, 2) en mm) a medida que se leen las líneas"""
+    if parser is None:
+        parser = GCodeParser(**options)
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.finish()
+
+
+def iter_file_strokes(filename: str, parser: Optional[GCodeParser] = None,
+                      **options) -> Iterator[np.ndarray]:
+    """Igual que iter_strokes pero leyendo el archivo de a poco"""
+    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+        yield from iter_strokes(f, parser, **options)
+
+
+def load_strokes(filename: str, **options) -> List[np.ndarray]:
+    return list(iter_file_strokes(filename, **options))
+
+
+def iter_gcode_commands(strokes_mm: Iterable[np.ndarray], transform,
+                        home: bool = True) -> Iterator[Tuple[str, Tuple[int, int]]]:
+    """Compilar trazos en mm a comandos H/L/X/Y/B/U sin materializar la lista"""
+    steps = (transform.mm_to_steps(stroke) for stroke in strokes_mm)
+    return iter_commands(steps, home=home)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diario de Trabajos - Reanudar un dibujo tras una pausa, un corte o un cuelgue
+
+Mientras un trabajo corre, `JobJournal` anota en un archivo de solo
+agregado cuántos comandos confirmó el CNC y dónde quedó la máquina:
+
+    {"version": 1, "kind": "drawing", "session": "...", "commands": [...]}
+    1532 4210 -388 1
+    1533 4290 -391 1
+    end stopped
+
+La primera línea es la cabecera (JSON): qué trabajo es y lo necesario para
+regenerarlo (los comandos de un dibujo, o el archivo y la transformación
+de un G-code). Cada línea siguiente es un checkpoint `índice x y lápiz`.
+Las líneas se escriben al buffer en cada eco y se bajan a disco con fsync
+cada `SYNC_INTERVAL_S` o `SYNC_RECORDS` checkpoints (y al pausar o
+terminar): un corte de luz pierde a lo sumo ese tramo, que se vuelve a
+dibujar. Una última línea a medio escribir se ignora al leer.
+
+Un trabajo completo borra su diario; uno detenido o cortado lo deja para
+`PlotterEngine.resume_job()`.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from cnc_position import parse_move
+
+DEFAULT_JOURNAL_FILE = os.path.join(os.path.expanduser('~'), '.cnc_plotter_trabajo.jsonl')
+FORMAT_VERSION = 1
+SYNC_INTERVAL_S = 1.0     # fsync a lo sumo una vez por segundo...
+SYNC_RECORDS = 500        # ...o cada tantos checkpoints
+
+Point = Tuple[int, int]
+
+
+class JournalError(Exception):
+    """El trabajo anotado no se puede reanudar"""
+
+
+class JobCheckpoint:
+    """Un trabajo sin terminar y hasta dónde llegó"""
+
+    def __init__(self, header: dict, completed: int = 0, position: Point = (0, 0),
+                 pen_down: bool = False, status: Optional[str] = None):
+        self.header = header
+        self.completed = completed
+        self.position = position
+        self.pen_down = pen_down
+        self.status = status    # None: se cortó sin llegar a cerrarse
+
+    @property
+    def kind(self) -> str:
+        return self.header['kind']
+
+    @property
+    def session(self) -> str:
+        return self.header.get('session', '')
+
+    @property
+    def commands(self) -> Optional[List[str]]:
+        return self.header.get('commands')
+
+    @property
+    def source(self) -> Optional[dict]:
+        return self.header.get('source')
+
+    @property
+    def settings(self) -> dict:
+        return self.header.get('settings', {})
+
+    @property
+    def total(self) -> Optional[int]:
+        commands = self.commands
+        return None if commands is None else len(commands)
+
+    def __str__(self) -> str:
+        total = self.total
+        done = f"{self.completed}/{total}" if total is not None else str(self.completed)
+        return f"{done} comandos"
+
+
+def file_source(filename: str) -> dict:
+    """Identidad de un archivo fuente (para no reanudar uno que cambió)"""
+    stat = os.stat(filename)
+    return {'path': os.path.abspath(filename), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def replay(commands: Iterable[str], start: Point = (0, 0),
+           pen_down: bool = False) -> Iterator[Tuple[str, Point, bool]]:
+    """(comando, posición, lápiz abajo) tras cada comando, como lo sigue
+    el firmware"""
+    x, y = start
+    for command in commands:
+        code = command[:1].upper()
+        if code == 'H':
+            x, y, pen_down = 0, 0, False    # goHome deja Z en 0
+        elif code == 'U':
+            pen_down = False
+        elif code == 'B':
+            pen_down = True
+        else:
+            move = parse_move(command)
+            if move is not None:
+                x, y = x + move[0], y + move[1]
+        yield command, (x, y), pen_down
+
+
+class JobJournal:
+    """Checkpoints de un trabajo en un archivo de solo agregado (thread-safe)"""
+
+    def __init__(self, filename: str = DEFAULT_JOURNAL_FILE,
+                 sync_interval_s: float = SYNC_INTERVAL_S, sync_records: int = SYNC_RECORDS):
+        self.filename = filename
+        self.sync_interval_s = sync_interval_s
+        self.sync_records = sync_records
+        self.syncs = 0
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    def begin(self, kind: str, session: str, settings: dict,
+              commands: Optional[List[str]] = None, source: Optional[dict] = None,
+              checkpoint: Optional[JobCheckpoint] = None) -> None:
+        """Empezar el diario de un trabajo (reemplaza al anterior). Si se
+        reanuda, `checkpoint` queda como primer registro."""
+        header = {'version': FORMAT_VERSION, 'kind': kind, 'session': session,
+                  'settings': settings, 'started_at': time.time()}
+        if commands is not None:
+            header['commands'] = list(commands)
+        if source is not None:
+            header['source'] = source
+        with self._lock:
+            self._close()
+            # Cabecera atómica (temporal + os.replace): nunca un diario sin ella
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            fd, temp_name = tempfile.mkstemp(prefix='.trabajo-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(header, ensure_ascii=False) + '\n')
+                    if checkpoint is not None:
+                        f.write(self._format(checkpoint.completed, checkpoint.position,
+                                             checkpoint.pen_down))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_name, self.filename)
+            except BaseException:
+                os.unlink(temp_name)
+                raise
+            self._file = open(self.filename, 'a', encoding='utf-8')
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    @staticmethod
+    def _format(completed: int, position: Point, pen_down: bool) -> str:
+        return f"{completed} {int(position[0])} {int(position[1])} {int(pen_down)}\n"
+
+    def record(self, completed: int, position: Point, pen_down: bool) -> None:
+        """Anotar que terminaron `completed` comandos (barato: fsync por tandas)"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(self._format(completed, position, pen_down))
+            self._unsynced += 1
+            if (self._unsynced >= self.sync_records
+                    or time.monotonic() - self._last_sync >= self.sync_interval_s):
+                self._sync()
+
+    def sync(self) -> None:
+        """Bajar a disco lo anotado (al pausar)"""
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self._file is None or not self._unsynced:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.syncs += 1
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def finish(self, status: str, completed: bool = False) -> None:
+        """Cerrar el diario: un trabajo completo lo borra, uno detenido o
+        fallido lo deja (con su estado) para reanudarlo"""
+        with self._lock:
+            if self._file is None:
+                return
+            if completed:
+                self._close()
+                self._remove()
+                return
+            self._file.write(f"end {status}\n")
+            self._unsynced += 1
+            self._sync()
+            self._close()
+
+    def discard(self) -> None:
+        """Olvidar el trabajo anotado (no se va a reanudar)"""
+        with self._lock:
+            self._close()
+            self._remove()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _remove(self) -> None:
+        try:
+            os.unlink(self.filename)
+        except FileNotFoundError:
+            pass
+
+    def load(self) -> Optional[JobCheckpoint]:
+        """El trabajo sin terminar anotado, o None"""
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                lines = f.read().split('\n')
+        except OSError:
+            return None
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return None
+        if not isinstance(header, dict) or header.get('version') != FORMAT_VERSION:
+            return None
+        checkpoint = JobCheckpoint(header)
+        # La última línea sin '\n' quedó a medio escribir: no cuenta
+        for line in lines[1:-1]:
+            fields = line.split()
+            if len(fields) == 2 and fields[0] == 'end':
+                checkpoint.status = fields[1]
+                continue
+            try:
+                completed, x, y, pen = (int(field) for field in fields)
+            except ValueError:
+                continue
+            checkpoint.completed = completed
+            checkpoint.position = (x, y)
+            checkpoint.pen_down = bool(pen)
+        return checkpoint
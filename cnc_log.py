@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consola por Lotes - Log thread-safe para el widget tk.Text de la GUI
+
+Los hilos (lector serial, dibujo, calibración) solo encolan mensajes; el
+hilo de Tk los vuelca en lotes con `root.after`, una sola inserción por
+tick. El widget guarda como máximo `max_lines` líneas (búfer circular) y,
+opcionalmente, todo se copia a un archivo con rotación.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+from collections import deque
+from typing import List, Optional
+
+import tkinter as tk
+
+FLUSH_INTERVAL_MS = 50
+DEFAULT_MAX_LINES = 2000
+MAX_BATCH = 5000  # mensajes máximos por tick (el resto espera al siguiente)
+
+
+class ConsoleLog:
+    """Cola de mensajes + volcado periódico al widget de la consola"""
+
+    def __init__(self, max_lines: int = DEFAULT_MAX_LINES, log_file: Optional[str] = None,
+                 max_bytes: int = 1024 * 1024, backup_count: int = 3):
+        self.max_lines = max_lines
+        self.lines = deque(maxlen=max_lines)  # líneas visibles (búfer circular)
+        self._queue = queue.Queue()
+        self._root = None
+        self._widget = None
+        self._logger = None
+        if log_file:
+            self._logger = self._file_logger(log_file, max_bytes, backup_count)
+
+    @staticmethod
+    def _file_logger(log_file: str, max_bytes: int, backup_count: int) -> logging.Logger:
+        directory = os.path.dirname(os.path.abspath(log_file))
+        os.makedirs(directory, exist_ok=True)
+        logger = logging.getLogger(f"cnc_plotter.console.{os.path.abspath(log_file)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+        return logger
+
+    def write(self, message: str) -> None:
+        """Encolar un mensaje (se puede llamar desde cualquier hilo)"""
+        self._queue.put(message)
+        if self._logger is not None:
+            self._logger.info(message)
+
+    def attach(self, root, widget, interval_ms: int = FLUSH_INTERVAL_MS) -> None:
+        """Empezar a volcar la cola en `widget` cada `interval_ms`"""
+        self._root = root
+        self._widget = widget
+        self._interval = interval_ms
+        self._schedule()
+
+    def _schedule(self) -> None:
+        self._root.after(self._interval, self._tick)
+
+    def _tick(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._schedule()
+
+    def drain(self) -> List[str]:
+        """Sacar de la cola los mensajes pendientes (hasta MAX_BATCH)"""
+        batch = []
+        try:
+            while len(batch) < MAX_BATCH:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def flush(self) -> None:
+        """Volcar al widget los mensajes pendientes (hilo de Tk)"""
+        batch = self.drain()
+        if not batch or self._widget is None:
+            return
+        self.lines.extend(batch)
+
+        widget = self._widget
+        widget.config(state=tk.NORMAL)
+        if len(batch) >= self.max_lines:
+            # El lote solo ya llena la consola: reemplazar todo
+            widget.delete('1.0', tk.END)
+            widget.insert(tk.END, '\n'.join(self.lines) + '\n')
+        else:
+            widget.insert(tk.END, '\n'.join(batch) + '\n')
+            # 'end-1c' está en la línea vacía tras el último '\n'
+            excess = int(widget.index('end-1c').split('.')[0]) - 1 - self.max_lines
+            if excess > 0:
+                widget.delete('1.0', f'{excess + 1}.0')
+        widget.see(tk.END)
+        widget.config(state=tk.DISABLED)
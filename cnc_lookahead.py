@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador de Velocidad - Look-ahead entre segmentos para trazos fluidos
+
+moveXY del firmware da cada paso con el mismo STEP_DELAY y se detiene en
+seco al final de cada comando: una curva de cien segmentos casi alineados
+arranca y frena cien veces a la velocidad de arranque. Este módulo mira
+hacia adelante sobre los movimientos de un trazo y le dice al firmware a
+qué velocidad entrar y salir de cada uno:
+
+    V<dx>,<dy>,<entrada_us>,<salida_us>
+
+El firmware acelera desde el intervalo de entrada hacia CRUISE_DELAY y
+frena para llegar al de salida, con la misma aceleración fija de este
+lado. La velocidad del paso i de un movimiento de n pasos es
+
+    v_i = min(v_crucero, sqrt(v_e² + 2·a·i), sqrt(v_s² + 2·a·(n-1-i)))
+
+(velocidades en pasos del eje mayor por segundo). Las esquinas se limitan
+con junction deviation: la velocidad a la que el carro puede doblar un
+ángulo desviándose a lo sumo `JUNCTION_DEVIATION` pasos de la esquina
+ideal; nunca menos que la de arranque, que el motor toma sin rampa.
+
+`step_intervals()` es el modelo de referencia de ese perfil (el mismo
+cálculo que el firmware) y sirve para verificar los perfiles y medir el
+tiempo ahorrado (`compare_seconds()`).
+"""
+
+import math
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cnc_planner import STEP_DELAY_S
+from cnc_position import parse_move
+
+# Constantes del firmware (CNC_Controller.ino)
+START_DELAY_US = 2000        # STEP_DELAY: arranca y frena sin rampa
+CRUISE_DELAY_US = 1200       # CRUISE_DELAY: intervalo mínimo con rampa
+ACCEL_STEPS_S2 = 1500.0      # ACCEL_STEPS_S2
+JUNCTION_DEVIATION = 3.0     # pasos
+LOOKAHEAD_MOVES = 64         # movimientos mirados hacia adelante
+
+START_SPEED = 1e6 / START_DELAY_US
+CRUISE_SPEED = 1e6 / CRUISE_DELAY_US
+MIN_GAIN = 1.02              # sin ganancia de 2 % se envía el comando original
+
+
+def velocity_command(dx: int, dy: int, entry_us: int, exit_us: int) -> str:
+    return f"V{dx},{dy},{entry_us},{exit_us}"
+
+
+def parse_velocity(command: str) -> Optional[Tuple[int, int, int, int]]:
+    """(dx, dy, entrada_us, salida_us) de un comando V, o None"""
+    command = command.strip().upper()
+    if not command.startswith('V'):
+        return None
+    try:
+        dx, dy, entry_us, exit_us = (int(part) for part in command[1:].split(','))
+    except ValueError:
+        return None
+    return dx, dy, entry_us, exit_us
+
+
+def _speed(interval_us: int) -> float:
+    """Velocidad de un intervalo, dentro de lo que acepta el firmware"""
+    return 1e6 / min(max(interval_us, CRUISE_DELAY_US), START_DELAY_US)
+
+
+def _interval_us(speed: float) -> int:
+    """Intervalo entero para el firmware, redondeado hacia lo más lento"""
+    return min(max(math.ceil(1e6 / speed - 1e-6), CRUISE_DELAY_US), START_DELAY_US)
+
+
+def _grid(speed: float) -> float:
+    return _speed(_interval_us(speed))
+
+
+def step_intervals(steps: int, entry_speed: float, exit_speed: float,
+                   cruise_speed: float = CRUISE_SPEED,
+                   accel: float = ACCEL_STEPS_S2) -> np.ndarray:
+    """Segundos de cada paso de un movimiento (modelo de referencia)"""
+    i = np.arange(steps, dtype=float)
+    speed = np.minimum(cruise_speed,
+                       np.minimum(np.sqrt(entry_speed ** 2 + 2 * accel * i),
+                                  np.sqrt(exit_speed ** 2 + 2 * accel * (steps - 1 - i))))
+    return 1.0 / speed
+
+
+def move_seconds(steps: int, entry_us: int, exit_us: int) -> float:
+    """Duración de un movimiento V de `steps` pasos"""
+    if steps <= 0:
+        return 0.0
+    return float(step_intervals(steps, _speed(entry_us), _speed(exit_us)).sum())
+
+
+def peak_acceleration(intervals: Sequence[float]) -> float:
+    """Mayor |Δ(v²)|/2 entre pasos consecutivos (pasos/s²), para verificar
+    que un perfil respeta la aceleración"""
+    speed = 1.0 / np.asarray(intervals, dtype=float)
+    if len(speed) < 2:
+        return 0.0
+    return float(np.abs(np.diff(speed ** 2)).max() / 2)
+
+
+def junction_speed(previous: Tuple[int, int], following: Tuple[int, int],
+                   accel: float = ACCEL_STEPS_S2,
+                   deviation: float = JUNCTION_DEVIATION) -> float:
+    """Velocidad máxima al pasar de un movimiento al siguiente"""
+    norm = math.hypot(*previous) * math.hypot(*following)
+    if norm == 0:
+        return START_SPEED
+    # cos del ángulo entre el segmento anterior invertido y el siguiente:
+    # -1 = seguir derecho, 1 = dar la vuelta
+    cos_theta = -(previous[0] * following[0] + previous[1] * following[1]) / norm
+    sin_half = math.sqrt(max(0.0, (1 - cos_theta) / 2))
+    if sin_half >= 0.9999:
+        return CRUISE_SPEED
+    speed = math.sqrt(accel * deviation * sin_half / (1 - sin_half))
+    return min(max(speed, START_SPEED), CRUISE_SPEED)
+
+
+def plan_speeds(moves: Sequence[Tuple[int, int]], entry_speed: float = START_SPEED,
+                exit_speed: float = START_SPEED,
+                accel: float = ACCEL_STEPS_S2) -> List[Tuple[float, float]]:
+    """(entrada, salida) de cada movimiento de una secuencia continua.
+
+    Pasada hacia atrás: cada entrada tiene que poder frenar hasta la salida
+    en su largo. Pasada hacia adelante: cada salida tiene que alcanzarse
+    acelerando desde la entrada. `entry_speed` ya está comprometida. Las
+    velocidades se redondean a µs enteros hacia abajo en cada pasada, así
+    el perfil que ejecuta el firmware cumple la aceleración.
+    """
+    count = len(moves)
+    if count == 0:
+        return []
+    lengths = [max(abs(dx), abs(dy)) for dx, dy in moves]
+    limits = [entry_speed] + [junction_speed(moves[k - 1], moves[k], accel)
+                              for k in range(1, count)]
+    entries = [0.0] * count
+    exits = [0.0] * count
+    following = exit_speed
+    for k in range(count - 1, -1, -1):
+        exits[k] = following
+        entries[k] = _grid(min(limits[k], math.sqrt(following ** 2 + 2 * accel * lengths[k])))
+        following = entries[k]
+    entries[0] = entry_speed
+    for k in range(count):
+        if k:
+            entries[k] = min(entries[k], exits[k - 1])
+        exits[k] = _grid(min(exits[k], math.sqrt(entries[k] ** 2 + 2 * accel * lengths[k])))
+    return list(zip(entries, exits))
+
+
+def _peak_speed(steps: int, entry: float, exit: float, accel: float = ACCEL_STEPS_S2) -> float:
+    """Velocidad máxima dentro de un movimiento (donde se cruzan las rampas)"""
+    return min(CRUISE_SPEED, math.sqrt((entry ** 2 + exit ** 2) / 2 + accel * (steps - 1)))
+
+
+class LookaheadPlanner:
+    """Reescribe los movimientos de un flujo de comandos como V<...>.
+
+    Una racha de movimientos seguidos (sin U/B/P/H en medio) es un camino
+    continuo. Se planifican de a `lookahead` movimientos suponiendo que el
+    último frena; se envía la primera mitad y su velocidad de salida queda
+    comprometida para el resto. Cada comando sale con uno y solo uno de
+    reemplazo, así el progreso por comandos no cambia.
+    """
+
+    def __init__(self, lookahead: int = LOOKAHEAD_MOVES):
+        self.lookahead = max(lookahead, 2)
+        self.ramped_moves = 0
+        self.constant_seconds = 0.0   # movimientos a STEP_DELAY fijo
+        self.planned_seconds = 0.0    # los mismos con los perfiles V
+
+    @property
+    def saved_seconds(self) -> float:
+        return self.constant_seconds - self.planned_seconds
+
+    def wrap(self, commands: Iterable[str]) -> Iterator[str]:
+        pending = deque()     # (comando original, (dx, dy))
+        entry = START_SPEED
+        for command in commands:
+            move = parse_move(command)
+            if move is None or parse_velocity(command) is not None:
+                if pending:
+                    yield from self._emit(pending, entry, len(pending))
+                entry = START_SPEED
+                yield command
+                continue
+            pending.append((command, move))
+            if len(pending) >= self.lookahead:
+                entry = yield from self._emit(pending, entry, len(pending) // 2)
+        if pending:
+            yield from self._emit(pending, entry, len(pending))
+
+    def _emit(self, pending: deque, entry: float, count: int):
+        speeds = plan_speeds([move for _, move in pending], entry)
+        for k in range(count):
+            command, (dx, dy) = pending.popleft()
+            entry, exit = speeds[k]
+            steps = max(abs(dx), abs(dy))
+            entry_us, exit_us = _interval_us(entry), _interval_us(exit)
+            self.constant_seconds += steps * STEP_DELAY_S
+            if (entry_us == exit_us == START_DELAY_US
+                    and _peak_speed(steps, entry, exit) < START_SPEED * MIN_GAIN):
+                # Arranca y frena parado sin margen para acelerar: el
+                # comando común hace lo mismo y es más corto
+                self.planned_seconds += steps * STEP_DELAY_S
+                yield command
+            else:
+                self.ramped_moves += 1
+                self.planned_seconds += move_seconds(steps, entry_us, exit_us)
+                yield velocity_command(dx, dy, entry_us, exit_us)
+            entry = exit
+        return entry
+
+
+def compare_seconds(commands: Iterable[str]) -> Tuple[float, float]:
+    """Tiempo de movimiento XY modelado: (STEP_DELAY fijo, con look-ahead)"""
+    planner = LookaheadPlanner()
+    for _ in planner.wrap(commands):
+        pass
+    return planner.constant_seconds, planner.planned_seconds
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelo de Movimiento - Duración de cada comando y ETA en vivo
+
+`MotionModel` calcula de antemano cuánto tarda cada comando según las
+constantes del firmware (STEP_DELAY, pasos del lápiz, delay(200), eco por
+serial). Así el progreso se mide en tiempo y no en líneas: un trabajo con
+un trazo enorme y 99 puntos ya no marca 99 % al empezar.
+
+`EtaEstimator` ajusta el modelo con los ecos que llegan del CNC. El tiempo
+observado se explica como
+
+    transcurrido ≈ a * movimiento_previsto + c * overhead_previsto
+
+y `a`, `c` se estiman por mínimos cuadrados con olvido exponencial (los
+últimos ~minutos de máquina pesan más) y un prior que los lleva a 1 cuando
+todavía hay pocos datos. Las esperas largas (pausa, cable suelto) no se
+usan para el ajuste.
+"""
+
+import math
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from cnc_lookahead import move_seconds
+
+# Constantes del firmware (CNC_Controller.ino)
+STEP_DELAY_S = 0.002        # STEP_DELAY = 2000 us
+PEN_STEPS = 200             # PEN_UP_STEPS / PEN_DOWN_STEPS
+PEN_SETTLE_S = 0.2          # delay(200) tras mover el lápiz
+BAUD_RATE = 115200
+RESPONSE_BYTES = 32         # eco "> CMD" + reporte del movimiento (promedio)
+COMMAND_OVERHEAD_S = 0.002  # parseo del comando en el ESP32
+
+# Ajuste del ETA
+FORGET_SECONDS = 60.0       # memoria del ajuste (tiempo de máquina previsto)
+PRIOR_WEIGHT = 0.05         # peso del prior a = c = 1 (s²)
+STALL_FACTOR = 10.0         # intervalos 10x más lentos de lo previsto...
+STALL_MIN_S = 5.0           # ...y de más de 5 s se consideran una pausa
+SCALE_LIMITS = (0.2, 5.0)
+
+
+class MotionModel:
+    """Duración prevista de los comandos del firmware"""
+
+    def __init__(self, step_delay_s: float = STEP_DELAY_S, pen_steps: int = PEN_STEPS,
+                 pen_settle_s: float = PEN_SETTLE_S,
+                 command_overhead_s: float = COMMAND_OVERHEAD_S,
+                 baud_rate: Optional[int] = BAUD_RATE,
+                 response_bytes: int = RESPONSE_BYTES):
+        self.step_delay_s = step_delay_s
+        self.pen_steps = pen_steps
+        self.pen_settle_s = pen_settle_s
+        self.command_overhead_s = command_overhead_s
+        self.baud_rate = baud_rate
+        self.response_bytes = response_bytes
+
+    def _serial_seconds(self, command: str) -> float:
+        if not self.baud_rate:
+            return 0.0
+        # 10 bits por byte (8N1): el comando + '\n' y la respuesta
+        return (len(command) + 1 + self.response_bytes) * 10 / self.baud_rate
+
+    def breakdown(self, commands: Iterable[str], start: Tuple[int, int] = (0, 0),
+                  pen_down: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Separar cada comando en (movimiento, overhead) en segundos.
+
+        Sigue la posición y el estado del lápiz igual que el firmware: H
+        vuelve en X y luego en Y (no en diagonal) y baja Z a 0, y un U/B
+        repetido no mueve el motor. Los V usan el modelo de cnc_lookahead.
+        """
+        pos_x, pos_y = start
+        pos_z = -self.pen_steps if pen_down else 0
+        motion, overhead = [], []
+        for command in commands:
+            steps = 0
+            settle = 0.0
+            profiled = 0.0   # V: su perfil ya viene en segundos
+            axis, value = command[:1].upper(), command[1:]
+            try:
+                if axis == 'V':
+                    dx, dy, entry_us, exit_us = (int(part) for part in value.split(','))
+                    profiled = move_seconds(max(abs(dx), abs(dy)), entry_us, exit_us)
+                    pos_x, pos_y = pos_x + dx, pos_y + dy
+                elif axis == 'L' and ',' in value:
+                    dx, dy = (int(part) for part in value.split(','))
+                    steps = max(abs(dx), abs(dy))
+                    pos_x, pos_y = pos_x + dx, pos_y + dy
+                elif axis in ('X', 'Y', 'Z') and value:
+                    delta = int(value)
+                    steps = abs(delta)
+                    if axis == 'X':
+                        pos_x += delta
+                    elif axis == 'Y':
+                        pos_y += delta
+                    else:
+                        pos_z += delta
+                elif axis == 'H':
+                    steps = abs(pos_x) + abs(pos_y) + abs(pos_z)
+                    pos_x = pos_y = pos_z = 0
+                elif axis == 'B' and not pen_down:
+                    steps, settle = self.pen_steps, self.pen_settle_s
+                    pos_z -= self.pen_steps
+                    pen_down = True
+                elif axis == 'U' and pen_down:
+                    steps, settle = self.pen_steps, self.pen_settle_s
+                    pos_z += self.pen_steps
+                    pen_down = False
+            except ValueError:
+                steps = 0
+            motion.append(steps * self.step_delay_s + settle + profiled)
+            overhead.append(self.command_overhead_s + self._serial_seconds(command))
+        return np.asarray(motion, dtype=float), np.asarray(overhead, dtype=float)
+
+    def durations(self, commands: Iterable[str], start: Tuple[int, int] = (0, 0),
+                  pen_down: bool = False) -> np.ndarray:
+        """Segundos previstos de cada comando"""
+        motion, overhead = self.breakdown(commands, start, pen_down)
+        return motion + overhead
+
+    def total_seconds(self, commands: Iterable[str], start: Tuple[int, int] = (0, 0),
+                      pen_down: bool = False) -> float:
+        return float(self.durations(commands, start, pen_down).sum())
+
+
+class EtaEstimator:
+    """Progreso por tiempo y ETA que se autocalibra con los ecos"""
+
+    def __init__(self, motion: np.ndarray, overhead: np.ndarray,
+                 clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._motion_cum = np.concatenate([[0.0], np.cumsum(motion)])
+        self._overhead_cum = np.concatenate([[0.0], np.cumsum(overhead)])
+        self.total = len(motion)
+        self.completed = 0
+        self.motion_scale = 1.0
+        self.overhead_scale = 1.0
+        # Ecuaciones normales acumuladas (con olvido)
+        self._xx = np.zeros((2, 2))
+        self._xy = np.zeros(2)
+        self._last_time = None
+        self._last_completed = 0
+
+    @classmethod
+    def for_commands(cls, commands, model: Optional[MotionModel] = None, **options):
+        motion, overhead = (model or MotionModel()).breakdown(commands)
+        return cls(motion, overhead, **options)
+
+    def start(self, now: Optional[float] = None) -> None:
+        """Marcar el momento en que se envió el primer comando"""
+        self._last_time = self.clock() if now is None else now
+        self._last_completed = self.completed
+
+    def update(self, completed: int, now: Optional[float] = None) -> None:
+        """Registrar que ya terminaron `completed` comandos"""
+        now = self.clock() if now is None else now
+        completed = min(completed, self.total)
+        if self._last_time is None:
+            self.start(now)
+        if completed <= self._last_completed:
+            return
+
+        observed = now - self._last_time
+        dm = self._motion_cum[completed] - self._motion_cum[self._last_completed]
+        do = self._overhead_cum[completed] - self._overhead_cum[self._last_completed]
+        predicted = dm + do
+        self.completed = completed
+        self._last_completed = completed
+        self._last_time = now
+
+        if observed > STALL_MIN_S and observed > STALL_FACTOR * predicted:
+            return   # pausa o atasco: no dice nada sobre la velocidad
+        decay = math.exp(-predicted / FORGET_SECONDS)
+        x = np.array([dm, do])
+        self._xx = self._xx * decay + np.outer(x, x)
+        self._xy = self._xy * decay + x * observed
+        self._fit()
+
+    def _fit(self) -> None:
+        prior = PRIOR_WEIGHT * np.eye(2)
+        try:
+            a, c = np.linalg.solve(self._xx + prior, self._xy + PRIOR_WEIGHT)
+        except np.linalg.LinAlgError:
+            return
+        low, high = SCALE_LIMITS
+        self.motion_scale = float(np.clip(a, low, high))
+        self.overhead_scale = float(np.clip(c, low, high))
+
+    def _calibrated(self, index: int) -> float:
+        return (self.motion_scale * self._motion_cum[index]
+                + self.overhead_scale * self._overhead_cum[index])
+
+    def remaining_seconds(self) -> float:
+        return max(self._calibrated(self.total) - self._calibrated(self.completed), 0.0)
+
+    def fraction(self) -> float:
+        """Fracción del tiempo total ya realizada (0..1)"""
+        total = self._calibrated(self.total)
+        if total <= 0:
+            return 1.0 if self.completed >= self.total else 0.0
+        return min(self._calibrated(self.completed) / total, 1.0)
+
+
+def format_duration(seconds: float) -> str:
+    """1:05:03 / 4:07"""
+    seconds = int(round(max(seconds, 0)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
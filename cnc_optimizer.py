@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optimizador de Recorrido - Orden y sentido de los trazos (lápiz arriba)
+
+Los trazos se dibujan en el orden en que se hicieron y el trabajo siempre
+empieza en Home, así que en dibujos con muchos trazos pequeños la mayor
+parte del tiempo se va en viajes con el lápiz arriba. Aquí se reordenan
+(y opcionalmente se invierten) los trazos para minimizar esa distancia:
+
+1. Vecino más cercano desde Home, con una rejilla espacial sobre los
+   extremos de los trazos para no comparar contra todos.
+2. 2-opt sobre la secuencia de trazos usando listas de vecinos cercanos;
+   invertir un tramo de la secuencia invierte también cada trazo.
+"""
+
+import math
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_TIME_BUDGET = 0.8  # s en total; 2-opt usa lo que deje el vecino más cercano
+DEFAULT_NEIGHBORS = 8
+
+
+class StrokeOrder:
+    """Resultado de la optimización: orden, sentido y distancias de viaje"""
+
+    def __init__(self, order: List[int], reversed_flags: List[bool],
+                 travel_before: float, travel_after: float):
+        self.order = order
+        self.reversed = reversed_flags
+        self.travel_before = travel_before
+        self.travel_after = travel_after
+
+    @property
+    def travel_saved(self) -> float:
+        return self.travel_before - self.travel_after
+
+    def apply(self, strokes: Sequence[Sequence]) -> List[list]:
+        """Reordenar (e invertir) una lista de trazos según el resultado"""
+        result = []
+        for index, flip in zip(self.order, self.reversed):
+            stroke = strokes[index]
+            result.append(stroke[::-1] if flip else stroke)
+        return result
+
+
+def travel_distance(starts: np.ndarray, ends: np.ndarray,
+                    start: Tuple[float, float] = (0.0, 0.0)) -> float:
+    """Distancia total con lápiz arriba recorriendo los trazos en orden"""
+    if len(starts) == 0:
+        return 0.0
+    origins = np.vstack([np.asarray(start, dtype=float)[None, :], ends[:-1]])
+    return float(np.hypot(*(starts - origins).T).sum())
+
+
+def _endpoints(strokes: Sequence[Sequence]) -> np.ndarray:
+    """Extremos como arreglo (2n, 2): fila 2s = inicio, 2s+1 = fin del trazo s"""
+    points = np.empty((2 * len(strokes), 2), dtype=float)
+    for s, stroke in enumerate(strokes):
+        points[2 * s] = stroke[0][:2]
+        points[2 * s + 1] = stroke[-1][:2]
+    return points
+
+
+class _EndpointGrid:
+    """Rejilla uniforme sobre los extremos para buscar el más cercano vivo"""
+
+    MAX_RING = 3  # más allá, buscar por fuerza bruta vectorizada
+
+    def __init__(self, points: np.ndarray, cell: float):
+        self.points = points
+        self.coords = points.tolist()
+        self.cell = cell
+        self.alive = np.ones(len(points), dtype=bool)
+        self.cells = {}
+        keys = np.floor(points / cell).astype(np.int64).tolist()
+        self.keys = keys
+        for index, key in enumerate(keys):
+            self.cells.setdefault(tuple(key), []).append(index)
+
+    def remove(self, index: int) -> None:
+        self.alive[index] = False
+        key = tuple(self.keys[index])
+        bucket = self.cells[key]
+        bucket.remove(index)
+        if not bucket:
+            del self.cells[key]
+
+    def nearest(self, x: float, y: float) -> int:
+        cx, cy = math.floor(x / self.cell), math.floor(y / self.cell)
+        best, best_dist = -1, math.inf
+        for ring in range(self.MAX_RING + 1):
+            for key in _ring_cells(cx, cy, ring):
+                for index in self.cells.get(key, ()):
+                    px, py = self.coords[index]
+                    dist = math.hypot(px - x, py - y)
+                    if dist < best_dist:
+                        best, best_dist = index, dist
+            # Cualquier punto fuera del anillo está al menos a ring*cell
+            if best >= 0 and best_dist <= ring * self.cell:
+                return best
+
+        candidates = np.flatnonzero(self.alive)
+        delta = self.points[candidates] - (x, y)
+        return int(candidates[np.argmin(np.einsum('ij,ij->i', delta, delta))])
+
+
+def _ring_cells(cx: int, cy: int, ring: int):
+    if ring == 0:
+        yield (cx, cy)
+        return
+    for dx in range(-ring, ring + 1):
+        yield (cx + dx, cy - ring)
+        yield (cx + dx, cy + ring)
+    for dy in range(-ring + 1, ring):
+        yield (cx - ring, cy + dy)
+        yield (cx + ring, cy + dy)
+
+
+def _cell_size(points: np.ndarray) -> float:
+    """Celda para ~2 extremos por celda en promedio"""
+    span = points.max(axis=0) - points.min(axis=0)
+    area = max(float(span[0]) * float(span[1]), 1e-9)
+    return max(math.sqrt(2.0 * area / len(points)), 1e-6)
+
+
+def _nearest_neighbour(points: np.ndarray, start, allow_reverse: bool):
+    n = len(points) // 2
+    grid = _EndpointGrid(points, _cell_size(points))
+    if not allow_reverse:
+        for s in range(n):
+            grid.remove(2 * s + 1)  # solo se puede entrar por el inicio
+
+    order, flags = [], []
+    x, y = start
+    for _ in range(n):
+        index = grid.nearest(x, y)
+        s, flip = divmod(index, 2)
+        for endpoint in (2 * s, 2 * s + 1):
+            if grid.alive[endpoint]:
+                grid.remove(endpoint)
+        order.append(s)
+        flags.append(bool(flip))
+        x, y = grid.coords[2 * s + 1 - flip]
+    return order, flags
+
+
+def _neighbor_lists(points: np.ndarray, k: int) -> List[List[int]]:
+    """k extremos más cercanos a cada extremo (rejilla 3x3 + argpartition)"""
+    cell = _cell_size(points) * 2.0
+    keys = np.floor(points / cell).astype(np.int64)
+    buckets = {}
+    for index, key in enumerate(map(tuple, keys.tolist())):
+        buckets.setdefault(key, []).append(index)
+
+    neighbors = [None] * len(points)
+    for (cx, cy), members in buckets.items():
+        candidates = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                candidates.extend(buckets.get((cx + dx, cy + dy), ()))
+        candidates = np.asarray(candidates)
+        members = np.asarray(members)
+        delta = points[members][:, None, :] - points[candidates][None, :, :]
+        dist = np.einsum('ijk,ijk->ij', delta, delta)
+        dist[members[:, None] == candidates[None, :]] = np.inf
+        count = min(k, len(candidates) - 1)
+        if count <= 0:
+            for member in members.tolist():
+                neighbors[member] = []
+            continue
+        nearest = np.argpartition(dist, count - 1, axis=1)[:, :count]
+        for member, row in zip(members.tolist(), candidates[nearest].tolist()):
+            neighbors[member] = row
+    return neighbors
+
+
+def _two_opt(points: np.ndarray, order: List[int], flags: List[bool], start,
+             k: int, time_budget: float) -> Tuple[List[int], List[bool]]:
+    """2-opt con listas de vecinos: invertir tour[i..j] invierte cada trazo"""
+    deadline = time.perf_counter() + time_budget
+    n = len(order)
+    coords = points.tolist()
+    tour = np.asarray(order, dtype=np.int64)
+    rev = np.zeros(n, dtype=np.int64)
+    rev[tour] = np.asarray(flags, dtype=np.int64)
+    pos = np.empty(n, dtype=np.int64)
+    pos[tour] = np.arange(n)
+    neighbors = _neighbor_lists(points, k)
+    # Vecinos de Home (el "extremo" anterior al primer trazo)
+    delta = points - start
+    home_neighbors = np.argsort(np.einsum('ij,ij->i', delta, delta))[:k].tolist()
+
+    def head(s):  # extremo por el que se entra al trazo s
+        return coords[2 * s + rev[s]]
+
+    def dist(a, b):
+        return math.hypot(a[0] - b[0], a[1] - b[1])
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n):
+            if i % 256 == 0 and time.perf_counter() >= deadline:
+                break
+            if i == 0:
+                a, candidates = start, home_neighbors
+            else:
+                prev = int(tour[i - 1])
+                a_index = 2 * prev + 1 - int(rev[prev])
+                a, candidates = coords[a_index], neighbors[a_index]
+            b = head(int(tour[i]))
+            d_ab = dist(a, b)
+            for c_index in candidates:
+                s = c_index // 2
+                if c_index != 2 * s + 1 - rev[s]:
+                    continue  # el candidato debe ser la salida de su trazo
+                j = int(pos[s])
+                c = coords[c_index]
+                if j >= i:
+                    # Invertir tour[i..j]: a->b y c->next pasan a a->c y b->next
+                    nxt = head(int(tour[j + 1])) if j + 1 < n else None
+                    old = d_ab + (dist(c, nxt) if nxt is not None else 0.0)
+                    new = dist(a, c) + (dist(b, nxt) if nxt is not None else 0.0)
+                    lo, hi = i, j
+                elif j < i - 1:
+                    # Invertir tour[j+1..i-1]: c->y y a->b pasan a c->a y y->b
+                    y = head(int(tour[j + 1]))
+                    old = dist(c, y) + d_ab
+                    new = dist(c, a) + dist(y, b)
+                    lo, hi = j + 1, i - 1
+                else:
+                    continue
+                if new < old - 1e-9:
+                    segment = tour[lo:hi + 1][::-1].copy()
+                    tour[lo:hi + 1] = segment
+                    pos[segment] = np.arange(lo, hi + 1)
+                    rev[segment] ^= 1
+                    improved = True
+                    break
+
+    order = tour.tolist()
+    flags = [bool(rev[s]) for s in order]
+    return order, flags
+
+
+def optimize_order(strokes: Sequence[Sequence], start: Tuple[float, float] = (0.0, 0.0),
+                   allow_reverse: bool = True, two_opt: bool = True,
+                   time_budget: float = DEFAULT_TIME_BUDGET,
+                   neighbors: int = DEFAULT_NEIGHBORS) -> StrokeOrder:
+    """Ordenar los trazos para minimizar la distancia con lápiz arriba.
+
+    Los trazos son secuencias no vacías de puntos (x, y, ...) en cualquier
+    unidad; solo se usan las dos primeras coordenadas de sus extremos.
+    """
+    started = time.perf_counter()
+    strokes = list(strokes)
+    n = len(strokes)
+    if n == 0:
+        return StrokeOrder([], [], 0.0, 0.0)
+
+    points = _endpoints(strokes)
+    start = (float(start[0]), float(start[1]))
+    before = travel_distance(points[0::2], points[1::2], start)
+
+    order, flags = _nearest_neighbour(points, start, allow_reverse)
+    # 2-opt invierte trazos: solo aplica si se permite cambiar su sentido
+    if two_opt and allow_reverse and n > 2:
+        remaining = time_budget - (time.perf_counter() - started)
+        if remaining > 0:
+            order, flags = _two_opt(points, order, flags, start, neighbors, remaining)
+
+    after = _order_travel(points, order, flags, start)
+    if after > before:
+        # Nunca empeorar el orden original
+        return StrokeOrder(list(range(n)), [False] * n, before, before)
+    return StrokeOrder(order, flags, before, after)
+
+
+def _order_travel(points: np.ndarray, order: List[int], flags: List[bool], start) -> float:
+    order = np.asarray(order, dtype=np.int64)
+    flip = np.asarray(flags, dtype=np.int64)
+    starts = points[2 * order + flip]
+    ends = points[2 * order + 1 - flip]
+    return travel_distance(starts, ends, start)
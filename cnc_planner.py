@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador de Trayectorias - Trazos en pasos -> comandos del firmware
+
+Cada segmento se envía como UN movimiento combinado `L<dx>,<dy>` (moveXY en
+el firmware), de modo que una diagonal tarda max(|dx|,|dy|) pasos en lugar
+de la escalera X-luego-Y que tardaba |dx|+|dy|. Los movimientos de un solo
+eje siguen usando `X<n>` / `Y<n>` porque son más cortos de transmitir.
+
+El lápiz se sigue como estado: nunca se manda un U/B que no cambie nada, y
+si un trazo empieza a `merge_tolerance` pasos o menos de donde terminó el
+anterior, se dibuja de corrido (sin U + B: 0.6 s y 400 pasos de Z menos).
+"""
+
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+Point = Tuple[int, int]
+
+# Constantes del firmware (CNC_Controller.ino)
+STEP_DELAY_S = 0.002             # STEP_DELAY = 2000 us
+PEN_SECONDS = 200 * 0.002 + 0.2  # PEN_UP/DOWN_STEPS + delay(200)
+MERGE_TOLERANCE_STEPS = 2        # trazos que se tocan: seguir sin levantar el lápiz
+
+
+def move_command(dx: int, dy: int) -> str:
+    """Comando más corto para un desplazamiento relativo (en pasos)"""
+    if dy == 0:
+        return f"X{dx}"
+    if dx == 0:
+        return f"Y{dy}"
+    return f"L{dx},{dy}"
+
+
+def iter_commands(strokes: Iterable[Sequence[Point]],
+                  start: Point = (0, 0),
+                  home: bool = True,
+                  merge_tolerance: int = MERGE_TOLERANCE_STEPS) -> Iterator[Tuple[str, Point]]:
+    """Generar (comando, posición al terminarlo) para una secuencia de trazos.
+
+    Los trazos son secuencias de puntos absolutos en pasos. Se aceptan
+    iterables perezosos para poder empezar a enviar antes de tenerlos todos:
+    el U de un trazo sale cuando llega el siguiente (o al final), porque
+    recién ahí se sabe si hace falta levantar el lápiz.
+    """
+    if home:
+        yield 'H', (0, 0)   # goHome deja Z en 0: lápiz arriba
+        pos_x, pos_y = 0, 0
+    else:
+        pos_x, pos_y = start
+    pen_down = False
+
+    for stroke in strokes:
+        if len(stroke) == 0:
+            continue
+        for i, (x_steps, y_steps) in enumerate(stroke):
+            x_steps, y_steps = int(x_steps), int(y_steps)
+            delta_x = x_steps - pos_x
+            delta_y = y_steps - pos_y
+            if i == 0 and pen_down and max(abs(delta_x), abs(delta_y)) > merge_tolerance:
+                # El trazo empieza lejos: terminar el anterior
+                pen_down = False
+                yield 'U', (pos_x, pos_y)
+            if delta_x != 0 or delta_y != 0:
+                pos_x, pos_y = x_steps, y_steps
+                yield move_command(delta_x, delta_y), (pos_x, pos_y)
+
+            # Primer punto del trazo: llegar sin dibujar y bajar lápiz
+            if i == 0 and not pen_down:
+                pen_down = True
+                yield 'B', (pos_x, pos_y)
+
+    # Subir lápiz al terminar el último trazo
+    if pen_down:
+        yield 'U', (pos_x, pos_y)
+
+
+def count_pen_lifts(commands: Iterable[str]) -> int:
+    """Subidas de lápiz (U) de una lista de comandos"""
+    return sum(1 for command in commands if command == 'U')
+
+
+def plan(strokes: Iterable[Sequence[Point]], start: Point = (0, 0),
+         home: bool = True,
+         merge_tolerance: int = MERGE_TOLERANCE_STEPS) -> Tuple[List[str], List[Point], List[int]]:
+    """Planificar un dibujo completo.
+
+    Devuelve los comandos, la posición tras cada comando y, por cada trazo
+    dibujado (los que se unieron al anterior cuentan como uno), cuántos
+    comandos hay hasta su final (para mostrar el progreso).
+    """
+    commands, positions, stroke_ends = [], [], []
+    for command, position in iter_commands(strokes, start, home, merge_tolerance):
+        commands.append(command)
+        positions.append(position)
+        if command == 'U':
+            stroke_ends.append(len(commands))
+    return commands, positions, stroke_ends
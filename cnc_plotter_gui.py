@@ -12,12 +12,28 @@ from tkinter import ttk, messagebox, filedialog
 import serial
 import serial.tools.list_ports
 import threading
-import time
-import json
-from typing import List, Tuple
-import math
+import queue
+
+from cnc_calibration import PHASES, CalibrationError, run_calibration
+from cnc_drawing import FILE_EXTENSION, Drawing
+from cnc_engine import (EVENT_CONNECTION, EVENT_JOB_DONE, EVENT_LOG, EVENT_POSITION,
+                        EVENT_PROGRESS, EVENT_RECEIVED, EVENT_SENT, JOB_COMPLETED, JOB_FAILED,
+                        JOB_GCODE, PlotterEngine)
+from cnc_log import ConsoleLog
+from cnc_profiles import ProfileStore
+from cnc_render import CanvasRenderer
+from cnc_simulator import SIMULATOR_PORT
+from cnc_gcode import FILE_EXTENSIONS as GCODE_EXTENSIONS
+from cnc_journal import JobJournal
+from cnc_queue import STATUS_FAILED, STATUS_PLOTTING, STATUS_STOPPED, JobQueue
 
 class CNCPlotterGUI:
+    # Copiar toda la consola a un archivo con rotación (None = desactivado)
+    CONSOLE_LOG_FILE = None  # p. ej. 'cnc_consola.log'
+    UI_POLL_MS = 50  # cada cuánto se aplican en Tk los eventos del motor
+    PROBE_TIMEOUT_S = 10  # máximo por movimiento de prueba tras calibrar
+    STATS_DELAY_MS = 300  # trazos seguidos: solo se calculan las stats del último
+    
     def __init__(self, root):
         self.root = root
         self.root.title("🎨 CNC Plotter Controller - ESP32 S3")
@@ -25,27 +41,22 @@ class CNCPlotterGUI:
         self.root.configure(bg='#2b2b2b')
         
         # Variables
-        self.serial_port = None
-        self.is_connected = False
-        self.is_drawing = False
-        self.drawing_points = []
-        self.current_pos = [0, 0]  # Posición actual del CNC
-        self.pen_is_down = False
-        
-        # Configuración CNC (ajustable)
-        self.steps_per_mm = 51.2  # 4096 pasos por 80mm ≈ 51.2 pasos/mm
+        self.drawing = Drawing()  # Trazos en píxeles del canvas
         self.canvas_width = 600
         self.canvas_height = 600
-        self.work_area_width = 150  # mm (ajusta según tu CNC)
-        self.work_area_height = 150  # mm
-        self.scale_factor = self.canvas_width / self.work_area_width  # píxeles por mm
-        
-        # 🆕 DETECCIÓN AUTOMÁTICA DE ORIGEN
-        self.origin_detected = False
-        self.origin_corner = "unknown"  # "top-left", "top-right", "bottom-left", "bottom-right"
-        self.max_x_steps = 0  # Detectado durante calibración
-        self.max_y_steps = 0  # Detectado durante calibración
         self.calibration_in_progress = False
+        self._stats_after = None       # cálculo de stats programado (after)
+        self._stats_generation = 0     # descarta resultados de un dibujo viejo
+        
+        # Conexión, configuración CNC, origen y trabajos (sin Tk)
+        self.engine = PlotterEngine(canvas_width=self.canvas_width,
+                                    canvas_height=self.canvas_height,
+                                    profile_store=ProfileStore(),
+                                    journal=JobJournal())
+        self._ui_events = queue.Queue()
+        self.engine.add_listener(self._on_engine_event)
+        # Cola de trabajos: se prepara en segundo plano y sigue entre sesiones
+        self.job_queue = JobQueue(self.engine, on_change=self._on_queue_change)
         
         # Colores tema oscuro
         self.bg_color = '#2b2b2b'
@@ -55,8 +66,13 @@ class CNCPlotterGUI:
         self.draw_color = '#00ff00'
         self.preview_color = '#ffaa00'
         
+        # Consola: los hilos encolan, Tk vuelca en lotes
+        self.console_log = ConsoleLog(log_file=self.CONSOLE_LOG_FILE)
+        
         self.setup_ui()
         self.update_ports()
+        self._refresh_queue()
+        self.root.after(self.UI_POLL_MS, self._poll_ui_events)
         
     def setup_ui(self):
         """Configurar la interfaz de usuario"""
@@ -122,6 +138,8 @@ class CNCPlotterGUI:
         self.canvas = tk.Canvas(canvas_container, width=self.canvas_width, height=self.canvas_height,
                                bg=self.canvas_bg, cursor='pencil')
         self.canvas.pack()
+        self.renderer = CanvasRenderer(self.canvas, self.canvas_width, self.canvas_height,
+                                       self.grid_color, self.draw_color)
         
         # Dibujar grid
         self.draw_grid()
@@ -167,6 +185,11 @@ class CNCPlotterGUI:
                                    height=2, state=tk.DISABLED)
         self.btn_pause.pack(fill=tk.X, padx=10, pady=5)
         
+        self.btn_stop = tk.Button(btn_frame1, text="⏹️ DETENER", command=self.stop_drawing,
+                                  bg='#7a4a2d', fg=self.fg_color, font=('Arial', 11, 'bold'),
+                                  state=tk.DISABLED)
+        self.btn_stop.pack(fill=tk.X, padx=10, pady=5)
+        
         self.btn_clear = tk.Button(btn_frame1, text="🗑️ Limpiar Canvas", command=self.clear_canvas,
                                    bg='#7a2d2d', fg=self.fg_color, font=('Arial', 11, 'bold'))
         self.btn_clear.pack(fill=tk.X, padx=10, pady=5)
@@ -207,6 +230,34 @@ class CNCPlotterGUI:
                                  bg='#4a4a9d', fg=self.fg_color, font=('Arial', 10))
         self.btn_load.pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(5, 10))
         
+        self.btn_gcode = tk.Button(right_frame, text="📄 Enviar G-code", command=self.send_gcode_file,
+                                   bg='#4a4a9d', fg=self.fg_color, font=('Arial', 10),
+                                   state=tk.DISABLED)
+        self.btn_gcode.pack(fill=tk.X, padx=10, pady=5)
+        
+        # Cola de trabajos
+        tk.Label(right_frame, text="📋 Cola de Trabajos", bg=self.bg_color, fg=self.fg_color,
+                font=('Arial', 11, 'bold')).pack(pady=(10, 5))
+        
+        self.list_queue = tk.Listbox(right_frame, height=4, bg='#1e1e1e', fg=self.fg_color,
+                                     font=('Arial', 9), selectmode=tk.EXTENDED)
+        self.list_queue.pack(fill=tk.X, padx=10)
+        self.list_queue.bind('<Double-Button-1>', self.queue_retry)
+        
+        btn_frame_queue = tk.Frame(right_frame, bg=self.bg_color)
+        btn_frame_queue.pack(fill=tk.X, pady=5)
+        
+        for text, command in (("➕ Archivos", self.queue_add_files),
+                              ("➕ Canvas", self.queue_add_canvas),
+                              ("🗑️", self.queue_remove)):
+            tk.Button(btn_frame_queue, text=text, command=command, bg='#4a4a9d',
+                      fg=self.fg_color, font=('Arial', 9)).pack(side=tk.LEFT, fill=tk.X,
+                                                              expand=True, padx=2)
+        
+        self.btn_queue = tk.Button(right_frame, text="▶️ Iniciar Cola", command=self.toggle_queue,
+                                   bg='#2d7a2d', fg=self.fg_color, font=('Arial', 10))
+        self.btn_queue.pack(fill=tk.X, padx=10, pady=5)
+        
         # Separador
         ttk.Separator(right_frame, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=15)
         
@@ -221,6 +272,10 @@ class CNCPlotterGUI:
                                      fg=self.fg_color, font=('Arial', 9))
         self.lbl_progress.pack()
         
+        self.lbl_job_stats = tk.Label(right_frame, text="Segmentos: 0 → 0", bg=self.bg_color,
+                                      fg='#aaaaaa', font=('Arial', 8), justify=tk.LEFT)
+        self.lbl_job_stats.pack()
+        
         # Separador
         ttk.Separator(right_frame, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=15)
         
@@ -235,13 +290,26 @@ class CNCPlotterGUI:
                 font=('Arial', 9)).grid(row=0, column=0, sticky=tk.W, pady=2)
         
         self.entry_steps = tk.Entry(config_frame, width=10, font=('Arial', 9))
-        self.entry_steps.insert(0, str(self.steps_per_mm))
+        self.entry_steps.insert(0, str(self.engine.steps_per_mm))
         self.entry_steps.grid(row=0, column=1, padx=5, pady=2)
         
         self.btn_update_config = tk.Button(config_frame, text="✓", command=self.update_config,
                                           bg='#4a7a9d', fg=self.fg_color, font=('Arial', 9), width=3)
         self.btn_update_config.grid(row=0, column=2, pady=2)
         
+        tk.Label(config_frame, text="Tolerancia (mm):", bg=self.bg_color, fg=self.fg_color,
+                font=('Arial', 9)).grid(row=1, column=0, sticky=tk.W, pady=2)
+        
+        self.entry_tolerance = tk.Entry(config_frame, width=10, font=('Arial', 9))
+        self.entry_tolerance.insert(0, str(self.engine.simplify_tolerance))
+        self.entry_tolerance.grid(row=1, column=1, padx=5, pady=2)
+        
+        self.optimize_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(config_frame, text="Optimizar recorrido", variable=self.optimize_var,
+                      command=self.update_optimize, bg=self.bg_color, fg=self.fg_color,
+                      selectcolor='#4a4a4a', activebackground=self.bg_color,
+                      font=('Arial', 9)).grid(row=2, column=0, columnspan=3, sticky=tk.W, pady=2)
+        
         # ============================================
         # PANEL INFERIOR - CONSOLA
         # ============================================
@@ -263,214 +331,205 @@ class CNCPlotterGUI:
                               state=tk.DISABLED)
         self.console.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=self.console.yview)
+        self.console_log.attach(self.root, self.console)
         
     def draw_grid(self):
-        """Dibujar grid en el canvas"""
-        grid_spacing = 50  # píxeles
-        
-        # Líneas verticales
-        for x in range(0, self.canvas_width + 1, grid_spacing):
-            self.canvas.create_line(x, 0, x, self.canvas_height, fill=self.grid_color, width=1)
-        
-        # Líneas horizontales
-        for y in range(0, self.canvas_height + 1, grid_spacing):
-            self.canvas.create_line(0, y, self.canvas_width, y, fill=self.grid_color, width=1)
-        
-        # 🆕 Mostrar mensaje según estado
-        if not self.is_connected:
-            # No conectado: mensaje de conexión
-            self.canvas.create_text(self.canvas_width/2, self.canvas_height/2,
-                                   text="🔌 Conecta tu ESP32 primero\n\nSelecciona el puerto COM\ny haz clic en 'Conectar'",
-                                   fill='#888888', font=('Arial', 12))
-            return
-        
-        if not self.origin_detected:
-            # Conectado pero sin calibrar: mensaje de calibración
-            self.canvas.create_text(self.canvas_width/2, self.canvas_height/2,
-                                   text="⚙️ Calibra el CNC\n\n🔍 Usa 'AUTO-DETECTAR ORIGEN'\nen el menú Calibrar",
-                                   fill='#ffaa00', font=('Arial', 12, 'bold'))
-            return
-        
-        # Determinar posición del origen según esquina detectada
-        if self.origin_corner == "top-left":
-            origin_x, origin_y = 5, 5
-            x_arrow_dx, y_arrow_dy = 30, 30
-        elif self.origin_corner == "top-right":
-            origin_x, origin_y = self.canvas_width - 5, 5
-            x_arrow_dx, y_arrow_dy = -30, 30
-        elif self.origin_corner == "bottom-left":
-            origin_x, origin_y = 5, self.canvas_height - 5
-            x_arrow_dx, y_arrow_dy = 30, -30
-        else:  # bottom-right
-            origin_x, origin_y = self.canvas_width - 5, self.canvas_height - 5
-            x_arrow_dx, y_arrow_dy = -30, -30
-        
-        # Dibujar origen
-        self.canvas.create_oval(origin_x - 4, origin_y - 4, origin_x + 4, origin_y + 4,
-                               fill='#ff0000', outline='#ff0000', width=2)
-        
-        label_offset_x = -35 if origin_x > self.canvas_width/2 else 35
-        self.canvas.create_text(origin_x + label_offset_x, origin_y,
-                               text="(0,0) CNC", fill='#ff0000', font=('Arial', 10, 'bold'))
-        
-        # Flechas de ejes
-        self.canvas.create_line(origin_x, origin_y, origin_x + x_arrow_dx, origin_y,
-                               fill='#00ff00', width=2, arrow=tk.LAST)
-        self.canvas.create_text(origin_x + x_arrow_dx + 15*(-1 if x_arrow_dx<0 else 1), origin_y,
-                               text="X+", fill='#00ff00', font=('Arial', 9, 'bold'))
-        
-        self.canvas.create_line(origin_x, origin_y, origin_x, origin_y + y_arrow_dy,
-                               fill='#0000ff', width=2, arrow=tk.LAST)
-        self.canvas.create_text(origin_x, origin_y + y_arrow_dy + 15*(-1 if y_arrow_dy<0 else 1),
-                               text="Y+", fill='#0000ff', font=('Arial', 9, 'bold'))
-
+        """Grid e indicadores del canvas (capas en caché, no borra los trazos)"""
+        self.renderer.draw_grid()
+        engine = self.engine
+        self.renderer.set_overlay(engine.is_connected, engine.origin_detected, engine.origin_corner)
     
     def update_ports(self):
         """Actualizar lista de puertos seriales disponibles"""
         ports = [port.device for port in serial.tools.list_ports.comports()]
-        self.port_combo['values'] = ports
+        # 🧪 El simulador siempre está disponible (pruebas sin hardware)
+        self.port_combo['values'] = ports + [SIMULATOR_PORT]
+        self.port_combo.current(0)
         if ports:
-            self.port_combo.current(0)
             self.log("✓ Puertos detectados: " + ", ".join(ports))
         else:
-            self.log("⚠ No se detectaron puertos COM")
+            self.log("⚠ No se detectaron puertos COM (disponible: 🧪 SIMULADOR)")
     
     def toggle_connection(self):
         """Conectar/Desconectar del CNC"""
-        if not self.is_connected:
+        if not self.engine.is_connected:
             try:
                 port = self.port_var.get()
                 if not port:
                     messagebox.showerror("Error", "Selecciona un puerto COM")
                     return
-                
-                self.serial_port = serial.Serial(port, 115200, timeout=1)
-                time.sleep(2)  # Esperar inicialización del ESP32
-                
-                self.is_connected = True
-                self.btn_connect.config(text="🔌 Desconectar", bg='#7a2d2d')
-                self.lbl_status.config(text="✅ Conectado", fg='#66ff66')
-                self.btn_draw.config(state=tk.NORMAL)
-                self.log(f"✓ Conectado a {port}")
-                
-                # 🆕 Actualizar canvas para mostrar mensaje de calibración
-                self.canvas.delete('all')
-                self.draw_grid()
-                
-                # Iniciar hilo de lectura
-                threading.Thread(target=self.read_serial, daemon=True).start()
-                
+                self.engine.connect(port)
             except Exception as e:
                 messagebox.showerror("Error de Conexión", f"No se pudo conectar:\n{str(e)}")
                 self.log(f"✗ Error: {str(e)}")
         else:
-            if self.serial_port:
-                self.serial_port.close()
-            self.is_connected = False
+            self.engine.disconnect()
+    
+    def _on_connection(self, connected):
+        """Reflejar en la interfaz que se conectó o se perdió la conexión"""
+        if connected:
+            self.btn_connect.config(text="🔌 Desconectar", bg='#7a2d2d')
+            self.lbl_status.config(text="✅ Conectado", fg='#66ff66')
+            self.btn_draw.config(state=tk.NORMAL)
+            self.btn_gcode.config(state=tk.NORMAL)
+            # Si esta máquina ya se calibró antes, no hace falta repetirlo todo
+            threading.Thread(target=self._restore_profile_thread, daemon=True).start()
+        else:
             self.btn_connect.config(text="🔌 Conectar", bg='#2d7a2d')
             self.lbl_status.config(text="⭕ Desconectado", fg='#ff6666')
             self.btn_draw.config(state=tk.DISABLED)
-            self.log("✓ Desconectado")
-            
-            # 🆕 Actualizar canvas para mostrar mensaje de conexión
-            self.canvas.delete('all')
-            self.draw_grid()
+            self.btn_gcode.config(state=tk.DISABLED)
+        
+        # 🆕 Actualizar canvas para mostrar el mensaje de conexión/calibración
+        self.draw_grid()
+    
+    def _restore_profile_thread(self):
+        """Ofrecer el perfil guardado y el trabajo sin terminar de la máquina"""
+        profile = self.engine.saved_profile()
+        # Un trabajo que se cortó (USB, cuelgue) se puede seguir desde su checkpoint
+        checkpoint = self.engine.pending_job()
+        if profile is not None:
+            self._post(self._offer_profile, profile, checkpoint)
+        elif checkpoint is not None:
+            self._post(self._offer_resume, checkpoint)
+    
+    def _offer_profile(self, profile, checkpoint):
+        """Preguntar cómo usar el perfil: el ESP32 se reinició al conectar y
+        no sabe dónde quedó el carro"""
+        if self.calibration_in_progress or not self.engine.is_connected:
+            return
+        answer = messagebox.askyesnocancel(
+            "Perfil de calibración",
+            f"Esta máquina ya se calibró (origen {profile.origin_corner}, "
+            f"{profile.steps_per_mm} pasos/mm).\n\n"
+            "Sí: buscar el origen (calibración de X e Y) y usar el perfil si "
+            "el recorrido coincide.\n"
+            "No: usarlo ya, con el carro en el origen.\n"
+            "Cancelar: no usarlo.")
+        if answer is None:
+            if checkpoint is not None:
+                self._offer_resume(checkpoint)
+            return
+        rehome = (lambda: run_calibration(self.engine, PHASES[:2])) if answer else None
+        self.calibration_in_progress = answer
+        threading.Thread(target=self._apply_profile_thread, args=(rehome, checkpoint),
+                         daemon=True).start()
+    
+    def _apply_profile_thread(self, rehome, checkpoint):
+        try:
+            restored = self.engine.restore_profile(rehome)
+        finally:
+            self.calibration_in_progress = False
+        if restored:
+            self._post(self._on_profile_restored)
+        if checkpoint is not None:
+            self._post(self._offer_resume, checkpoint)
+    
+    def _on_profile_restored(self):
+        self.entry_steps.delete(0, tk.END)
+        self.entry_steps.insert(0, str(self.engine.steps_per_mm))
+        self.update_job_stats()
+        self.draw_grid()
+    
+    def _offer_resume(self, checkpoint):
+        """Preguntar si se reanuda el trabajo que quedó sin terminar"""
+        if self.engine.is_drawing or not self.engine.is_connected:
+            return
+        name = "G-code" if checkpoint.kind == JOB_GCODE else "dibujo"
+        if not messagebox.askyesno(
+                "Trabajo sin terminar",
+                f"Hay un {name} sin terminar ({checkpoint}).\n\n"
+                "Antes de seguir se buscará el origen (calibración de X e Y) "
+                "y se retomará desde donde quedó.\n\n¿Reanudar?"):
+            return
+        self._start_job(self.engine.resume_job, checkpoint,
+                        lambda: run_calibration(self.engine, PHASES[:2]))
     
     def send_command(self, command):
         """Enviar comando al CNC"""
-        if self.serial_port and self.is_connected:
-            try:
-                self.serial_port.write((command + '\n').encode())
-                self.log(f"→ Enviado: {command}")
-                return True
-            except Exception as e:
-                self.log(f"✗ Error al enviar: {str(e)}")
-                return False
-        return False
+        return self.engine.send_command(command)
     
-    def read_serial(self):
-        """Leer respuestas del CNC (hilo secundario)"""
-        while self.is_connected:
-            try:
-                if self.serial_port.in_waiting:
-                    line = self.serial_port.readline().decode('utf-8', errors='ignore').strip()
-                    if line:
-                        self.log(f"← {line}")
-            except:
-                pass
-            time.sleep(0.1)
+    def _on_engine_event(self, event, data):
+        """Eventos del motor (llegan desde sus hilos)
+        
+        La consola ya es thread-safe; todo lo que toca widgets se encola y
+        se aplica en el hilo de Tk con `_poll_ui_events`.
+        """
+        if event == EVENT_LOG:
+            self.log(data)
+        elif event == EVENT_SENT:
+            self.log(f"→ Enviado: {data}")
+        elif event == EVENT_RECEIVED:
+            self.log(f"← {data}")
+        elif event == EVENT_CONNECTION:
+            self._post(self._on_connection, data)
+        elif event == EVENT_POSITION:
+            self._post(self.update_cnc_position)
+        elif event == EVENT_PROGRESS:
+            self._post(self._show_progress, data)
+        elif event == EVENT_JOB_DONE:
+            self._post(self._finish_job, data)
+    
+    def _post(self, callback, *args):
+        """Ejecutar `callback(*args)` en el hilo de Tk (desde cualquier hilo)"""
+        self._ui_events.put((callback, args))
+    
+    def _poll_ui_events(self):
+        """Aplicar los eventos encolados; del progreso y la posición basta
+        el último de cada tick"""
+        pending = []
+        try:
+            while True:
+                pending.append(self._ui_events.get_nowait())
+        except queue.Empty:
+            pass
+        coalesced = (self._show_progress, self.update_cnc_position)
+        last = {callback: i for i, (callback, _) in enumerate(pending) if callback in coalesced}
+        try:
+            for i, (callback, args) in enumerate(pending):
+                if callback in coalesced and last[callback] != i:
+                    continue
+                callback(*args)
+        finally:
+            self.root.after(self.UI_POLL_MS, self._poll_ui_events)
     
     def log(self, message):
-        """Agregar mensaje a la consola"""
-        self.console.config(state=tk.NORMAL)
-        self.console.insert(tk.END, message + '\n')
-        self.console.see(tk.END)
-        self.console.config(state=tk.DISABLED)
+        """Agregar mensaje a la consola (seguro desde cualquier hilo)"""
+        self.console_log.write(message)
     
     def start_draw(self, event):
         """Iniciar trazo con el mouse"""
-        self.drawing_points.append([])  # Nueva línea
-        x_mm, y_mm = self.pixel_to_mm(event.x, event.y)
-        self.drawing_points[-1].append((event.x, event.y, x_mm, y_mm))
+        self.drawing.begin_stroke(event.x, event.y)  # Nueva línea
+        self.renderer.begin_stroke(event.x, event.y)
     
     def draw(self, event):
         """Dibujar mientras se arrastra el mouse"""
-        if len(self.drawing_points) > 0:
-            last_point = self.drawing_points[-1][-1]
-            x_mm, y_mm = self.pixel_to_mm(event.x, event.y)
-            
-            # Dibujar línea en el canvas
-            self.canvas.create_line(last_point[0], last_point[1], event.x, event.y,
-                                   fill=self.draw_color, width=2, capstyle=tk.ROUND)
-            
-            self.drawing_points[-1].append((event.x, event.y, x_mm, y_mm))
+        if self.drawing.last_point is not None:
+            # Extender la polilínea del trazo (un solo ítem del canvas)
+            self.renderer.extend_stroke(event.x, event.y)
+            self.drawing.add_point(event.x, event.y)
     
     def end_draw(self, event):
         """Terminar trazo"""
-        pass
+        self.drawing.end_stroke()
+        self.renderer.end_stroke()
+        self.update_job_stats()
     
-    def pixel_to_mm(self, px, py):
-        """Convertir coordenadas de píxeles a milímetros
+    @property
+    def transform(self):
+        """Transformación px -> mm -> pasos con la configuración actual
         
         🆕 CONVERSIÓN DINÁMICA según origen detectado automáticamente
         """
-        if not self.origin_detected:
-            # Sin calibración: usar origen top-left por defecto para visualización
-            # (no mostrar advertencia aquí, solo al intentar dibujar)
-            x_mm = px / self.scale_factor
-            y_mm = py / self.scale_factor
-            return x_mm, y_mm
-        
-        # Convertir según la esquina de origen detectada
-        if self.origin_corner == "top-left":
-            # Origen: Superior Izquierda
-            # X+ derecha, Y+ abajo
-            x_mm = px / self.scale_factor
-            y_mm = py / self.scale_factor
-            
-        elif self.origin_corner == "top-right":
-            # Origen: Superior Derecha
-            # X+ izquierda, Y+ abajo
-            x_mm = (self.canvas_width - px) / self.scale_factor
-            y_mm = py / self.scale_factor
-            
-        elif self.origin_corner == "bottom-left":
-            # Origen: Inferior Izquierda
-            # X+ derecha, Y+ arriba
-            x_mm = px / self.scale_factor
-            y_mm = (self.canvas_height - py) / self.scale_factor
-            
-        else:  # bottom-right
-            # Origen: Inferior Derecha
-            # X+ izquierda, Y+ arriba
-            x_mm = (self.canvas_width - px) / self.scale_factor
-            y_mm = (self.canvas_height - py) / self.scale_factor
-        
-        return x_mm, y_mm
+        return self.engine.transform
+    
+    def pixel_to_mm(self, px, py):
+        """Convertir coordenadas de píxeles a milímetros"""
+        return self.transform.point_to_mm(px, py)
     
-    def mm_to_steps(self, mm):
-        """Convertir milímetros a pasos de motor"""
-        return int(mm * self.steps_per_mm)
+    def pixels_to_mm(self, points):
+        """Versión vectorizada de pixel_to_mm para un arreglo (N, 2) de píxeles"""
+        return self.transform.px_to_mm(points)
     
     def update_mouse_position(self, event):
         """Actualizar posición del mouse en tiempo real"""
@@ -479,43 +538,75 @@ class CNCPlotterGUI:
     
     def clear_canvas(self):
         """Limpiar el canvas"""
-        self.canvas.delete('all')
-        self.draw_grid()
-        self.drawing_points = []
+        self.renderer.clear_strokes()
+        self.drawing = Drawing()
+        self.update_job_stats()
         self.log("✓ Canvas limpiado")
     
     def go_home(self):
         """Enviar comando Home al CNC"""
-        if self.send_command('H'):
-            self.current_pos = [0, 0]
-            self.update_cnc_position()
+        self.engine.go_home()
     
     def pen_up(self):
         """Subir el lápiz"""
-        if self.send_command('U'):
-            self.pen_is_down = False
+        self.engine.pen_up()
     
     def pen_down(self):
         """Bajar el lápiz"""
-        if self.send_command('B'):
-            self.pen_is_down = True
+        self.engine.pen_down()
+    
+    def update_optimize(self):
+        """Activar/desactivar el orden óptimo de los trazos"""
+        self.engine.optimize = self.optimize_var.get()
+        self.update_job_stats()
+    
+    def update_job_stats(self):
+        """Recalcular segmentos y tiempo estimado (diferido: varios trazos
+        rápidos disparan un solo cálculo)"""
+        if self._stats_after is not None:
+            self.root.after_cancel(self._stats_after)
+        self._stats_after = self.root.after(self.STATS_DELAY_MS, self._start_job_stats)
+    
+    def _start_job_stats(self):
+        """Preparar el dibujo en otro hilo: RDP, orden y planificación no
+        congelan el canvas"""
+        self._stats_after = None
+        self._stats_generation += 1
+        generation = self._stats_generation
+        drawing = Drawing(self.drawing.points.copy(), self.drawing.offsets.copy())
+        threading.Thread(target=self._job_stats_thread, args=(generation, drawing),
+                         daemon=True).start()
+    
+    def _job_stats_thread(self, generation, drawing):
+        try:
+            stats = self.engine.job_stats(drawing)
+        except Exception as e:
+            self.log(f"⚠ No se pudo estimar el trabajo: {e}")
+            return
+        self._post(self._show_job_stats, generation, stats)
+    
+    def _show_job_stats(self, generation, stats):
+        """Mostrar segmentos y tiempo estimado antes/después de preparar el dibujo"""
+        if generation != self._stats_generation:
+            return    # el dibujo cambió mientras se calculaba
+        self.lbl_job_stats.config(
+            text=f"Segmentos: {stats['segments_before']} → {stats['segments_after']}\n"
+                 f"Tiempo est.: {stats['seconds_before'] / 60:.1f} → "
+                 f"{stats['seconds_after'] / 60:.1f} min")
     
     def update_cnc_position(self):
         """Actualizar display de posición CNC"""
-        self.lbl_cnc_pos.config(text=f"CNC: ({self.current_pos[0]}, {self.current_pos[1]}) pasos")
+        x, y = self.engine.current_pos
+        self.lbl_cnc_pos.config(text=f"CNC: ({x}, {y}) pasos")
     
-    def send_drawing(self):
-        """Enviar el dibujo al CNC"""
-        if not self.drawing_points:
-            messagebox.showwarning("Sin Dibujo", "No hay nada para dibujar")
-            return
-        
-        if not self.is_connected:
+    def _ready_to_draw(self):
+        """Verificar conexión y calibración antes de enviar un trabajo"""
+        if not self.engine.is_connected:
             messagebox.showerror("Error", "Conecta al CNC primero")
-            return
+            return False
         
         # ✅ Verificar calibración antes de dibujar
-        if not self.origin_detected:
+        if not self.engine.origin_detected:
             messagebox.showerror("Sin Calibración", 
                                "⚠️ Debes calibrar el CNC primero!\n\n"
                                "1. Haz clic en '⚙️ Calibrar'\n"
@@ -523,165 +614,196 @@ class CNCPlotterGUI:
                                "3. Espera a que termine la calibración\n"
                                "4. Selecciona la esquina correcta\n\n"
                                "Esto asegura que tu dibujo salga correctamente orientado.")
-            return
-        
-        self.is_drawing = True
+            return False
+        return True
+    
+    def _start_job(self, job, *args):
+        """Lanzar un trabajo del motor en su hilo (la UI sigue respondiendo)"""
         self.btn_draw.config(state=tk.DISABLED)
-        self.btn_pause.config(state=tk.NORMAL)
-        
-        # Ejecutar en hilo separado para no bloquear la UI
-        threading.Thread(target=self.draw_on_cnc, daemon=True).start()
+        self.btn_gcode.config(state=tk.DISABLED)
+        self.btn_pause.config(state=tk.NORMAL, text="⏸️ PAUSAR")
+        self.btn_stop.config(state=tk.NORMAL)
+        self.engine.start_job(job, *args)
     
-    def draw_on_cnc(self):
-        """Proceso de dibujo en el CNC (hilo separado)"""
-        try:
-            self.log("🎨 Iniciando dibujo...")
-            
-            # Ir a home primero
-            self.send_command('H')
-            time.sleep(2)
-            
-            total_lines = len(self.drawing_points)
-            current_line = 0
-            
-            for line in self.drawing_points:
-                if not self.is_drawing:
-                    self.log("⏸️ Dibujo pausado")
-                    break
-                
-                current_line += 1
-                self.progress['value'] = (current_line / total_lines) * 100
-                self.lbl_progress.config(text=f"{current_line} / {total_lines} líneas")
-                
-                # Primer punto de la línea - ir sin dibujar
-                first_point = line[0]
-                x_steps = self.mm_to_steps(first_point[2])
-                y_steps = self.mm_to_steps(first_point[3])
-                
-                # Mover a posición inicial de la línea
-                delta_x = x_steps - self.current_pos[0]
-                delta_y = y_steps - self.current_pos[1]
-                
-                if delta_x != 0:
-                    self.send_command(f"X{delta_x}")
-                    time.sleep(abs(delta_x) * 0.002)  # 2ms por paso
-                
-                if delta_y != 0:
-                    self.send_command(f"Y{delta_y}")
-                    time.sleep(abs(delta_y) * 0.002)
-                
-                self.current_pos = [x_steps, y_steps]
-                
-                # Bajar lápiz
-                self.send_command('B')
-                time.sleep(0.3)
-                
-                # Dibujar resto de puntos
-                for point in line[1:]:
-                    if not self.is_drawing:
-                        break
-                    
-                    x_steps = self.mm_to_steps(point[2])
-                    y_steps = self.mm_to_steps(point[3])
-                    
-                    delta_x = x_steps - self.current_pos[0]
-                    delta_y = y_steps - self.current_pos[1]
-                    
-                    if delta_x != 0:
-                        self.send_command(f"X{delta_x}")
-                        time.sleep(abs(delta_x) * 0.002)
-                    
-                    if delta_y != 0:
-                        self.send_command(f"Y{delta_y}")
-                        time.sleep(abs(delta_y) * 0.002)
-                    
-                    self.current_pos = [x_steps, y_steps]
-                    self.update_cnc_position()
-                
-                # Subir lápiz al terminar línea
-                self.send_command('U')
-                time.sleep(0.3)
-            
-            self.log("✓ Dibujo completado!")
-            messagebox.showinfo("Completado", "¡Dibujo finalizado!")
-            
-        except Exception as e:
-            self.log(f"✗ Error durante el dibujo: {str(e)}")
-            messagebox.showerror("Error", f"Error durante el dibujo:\n{str(e)}")
+    def send_drawing(self):
+        """Enviar el dibujo al CNC"""
+        if not self.drawing:
+            messagebox.showwarning("Sin Dibujo", "No hay nada para dibujar")
+            return
         
-        finally:
-            self.is_drawing = False
-            self.btn_draw.config(state=tk.NORMAL)
-            self.btn_pause.config(state=tk.DISABLED)
-            self.progress['value'] = 0
+        if self._ready_to_draw():
+            self._start_job(self.engine.plot_drawing, self.drawing)
+    
+    def send_gcode_file(self):
+        """Enviar un archivo G-code directamente (sin cargarlo completo)"""
+        if not self._ready_to_draw():
+            return
+        filename = filedialog.askopenfilename(
+            filetypes=[("G-code", " ".join("*" + ext for ext in GCODE_EXTENSIONS)),
+                       ("All files", "*.*")]
+        )
+        if filename:
+            self._start_job(self.engine.plot_gcode, filename)
+    
+    def _show_progress(self, progress):
+        self.progress['value'] = progress.fraction * 100
+        self.lbl_progress.config(text=str(progress))
+    
+    def _finish_job(self, result):
+        """Fin de un trabajo del motor (hilo de Tk)"""
+        self.btn_draw.config(state=tk.NORMAL if self.engine.is_connected else tk.DISABLED)
+        self.btn_gcode.config(state=tk.NORMAL if self.engine.is_connected else tk.DISABLED)
+        self.btn_pause.config(state=tk.DISABLED, text="⏸️ PAUSAR")
+        self.btn_stop.config(state=tk.DISABLED)
+        self.progress['value'] = 0
+        
+        gcode = result.kind == JOB_GCODE
+        if result.status == JOB_COMPLETED and not self.job_queue.running:
+            messagebox.showinfo("Completado", "¡G-code finalizado!" if gcode else "¡Dibujo finalizado!")
+        elif result.status == JOB_FAILED:
+            prefix = "Error en el G-code" if gcode else "Error durante el dibujo"
+            messagebox.showerror("Error", f"{prefix}:\n{result.message}")
+    
+    def queue_add_files(self):
+        """Encolar varios archivos (se preparan mientras el CNC dibuja)"""
+        gcode_patterns = " ".join("*" + ext for ext in GCODE_EXTENSIONS)
+        filenames = filedialog.askopenfilenames(
+            filetypes=[("Dibujos", "*.npz *.json *.svg " + gcode_patterns), ("All files", "*.*")]
+        )
+        for filename in filenames:
+            self.job_queue.add_file(filename)
+    
+    def queue_add_canvas(self):
+        """Encolar una copia del dibujo del canvas"""
+        if not self.drawing:
+            messagebox.showwarning("Sin Dibujo", "No hay nada para encolar")
+            return
+        self.job_queue.add_drawing(self.drawing)
+    
+    def queue_remove(self):
+        jobs = self.job_queue.jobs
+        for index in self.list_queue.curselection():
+            if index < len(jobs):
+                self.job_queue.remove(jobs[index].id)
+    
+    def queue_retry(self, event=None):
+        """Doble clic en un trabajo detenido o fallido: volver a encolarlo"""
+        jobs = self.job_queue.jobs
+        for index in self.list_queue.curselection():
+            if index < len(jobs) and jobs[index].status in (STATUS_STOPPED, STATUS_FAILED):
+                self.job_queue.retry(jobs[index].id)
+    
+    def toggle_queue(self):
+        """Iniciar/frenar la cola (frenar deja terminar el trabajo en curso)"""
+        if self.job_queue.running:
+            self.job_queue.stop()
+        elif self._ready_to_draw():
+            self.job_queue.start()
+        self._refresh_queue()
+    
+    def _on_queue_change(self, job):
+        """La cola cambió (llega desde sus hilos)"""
+        self._post(self._refresh_queue, job)
+    
+    def _refresh_queue(self, job=None):
+        self.list_queue.delete(0, tk.END)
+        for queued in self.job_queue.jobs:
+            self.list_queue.insert(tk.END, str(queued))
+        if self.job_queue.running:
+            self.btn_queue.config(text="⏸️ Frenar Cola", bg='#9d7a2d')
+        else:
+            self.btn_queue.config(text="▶️ Iniciar Cola", bg='#2d7a2d')
+        if job is not None and job.status == STATUS_PLOTTING:
+            # La cola arrancó un trabajo: mismos controles que uno manual
+            self.btn_draw.config(state=tk.DISABLED)
+            self.btn_gcode.config(state=tk.DISABLED)
+            self.btn_pause.config(state=tk.NORMAL, text="⏸️ PAUSAR")
+            self.btn_stop.config(state=tk.NORMAL)
     
     def pause_drawing(self):
-        """Pausar/Reanudar el dibujo"""
-        self.is_drawing = not self.is_drawing
-        if self.is_drawing:
+        """Pausar/Reanudar el dibujo (el trabajo sigue abierto mientras tanto)"""
+        if self.engine.is_paused:
+            self.engine.resume()
             self.btn_pause.config(text="⏸️ PAUSAR")
         else:
+            self.engine.pause()
             self.btn_pause.config(text="▶️ REANUDAR")
     
+    def stop_drawing(self):
+        """Terminar el trabajo; su avance queda guardado para reanudarlo"""
+        self.engine.stop()
+    
     def save_drawing(self):
-        """Guardar dibujo a archivo JSON"""
-        if not self.drawing_points:
+        """Guardar dibujo en formato binario (.npz)"""
+        if not self.drawing:
             messagebox.showwarning("Sin Dibujo", "No hay nada para guardar")
             return
         
         filename = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            defaultextension=FILE_EXTENSION,
+            filetypes=[("Dibujo CNC", "*.npz"), ("All files", "*.*")]
         )
         
         if filename:
             try:
-                with open(filename, 'w') as f:
-                    json.dump(self.drawing_points, f)
+                self.drawing.save(filename)
                 self.log(f"✓ Dibujo guardado en: {filename}")
                 messagebox.showinfo("Guardado", "Dibujo guardado exitosamente")
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo guardar:\n{str(e)}")
     
     def load_drawing(self):
-        """Cargar dibujo desde archivo JSON"""
+        """Cargar dibujo (.npz, .json del formato anterior, SVG o G-code)"""
+        gcode_patterns = " ".join("*" + ext for ext in GCODE_EXTENSIONS)
         filename = filedialog.askopenfilename(
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("Dibujos", "*.npz *.json *.svg " + gcode_patterns), ("Dibujo CNC", "*.npz"),
+                       ("JSON files", "*.json"), ("SVG", "*.svg"), ("G-code", gcode_patterns),
+                       ("All files", "*.*")]
         )
         
         if filename:
             try:
-                with open(filename, 'r') as f:
-                    self.drawing_points = json.load(f)
+                drawing = self.engine.load_drawing(filename)
                 
                 # Redibujar en canvas
                 self.clear_canvas()
-                for line in self.drawing_points:
-                    for i in range(len(line) - 1):
-                        x1, y1 = line[i][0], line[i][1]
-                        x2, y2 = line[i+1][0], line[i+1][1]
-                        self.canvas.create_line(x1, y1, x2, y2, fill=self.draw_color, width=2)
+                self.drawing = drawing
+                self.render_drawing()
+                self.update_job_stats()
                 
                 self.log(f"✓ Dibujo cargado desde: {filename}")
                 messagebox.showinfo("Cargado", "Dibujo cargado exitosamente")
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo cargar:\n{str(e)}")
     
+    def render_drawing(self):
+        """Dibujar cada trazo como una sola polilínea (un ítem por trazo)"""
+        self.renderer.render_strokes(self.drawing.strokes())
+    
     def update_config(self):
-        """Actualizar configuración de pasos/mm"""
+        """Actualizar configuración de pasos/mm y tolerancia de simplificación"""
         try:
             new_steps = float(self.entry_steps.get())
-            self.steps_per_mm = new_steps
-            self.log(f"✓ Configuración actualizada: {new_steps} pasos/mm")
-            messagebox.showinfo("Actualizado", f"Pasos/mm actualizado a: {new_steps}")
+            new_tolerance = float(self.entry_tolerance.get())
+            if new_steps <= 0 or new_tolerance < 0:
+                raise ValueError
+            self.engine.steps_per_mm = new_steps
+            self.engine.simplify_tolerance = new_tolerance
+            self.engine.save_profile()
+            self.update_job_stats()
+            self.log(f"✓ Configuración actualizada: {new_steps} pasos/mm, tolerancia {new_tolerance} mm")
+            messagebox.showinfo("Actualizado", f"Pasos/mm: {new_steps}\nTolerancia: {new_tolerance} mm")
         except ValueError:
-            messagebox.showerror("Error", "Valor inválido para pasos/mm")
+            messagebox.showerror("Error", "Valor inválido para pasos/mm o tolerancia")
     
     def auto_detect_origin(self):
         """🆕 DETECTAR AUTOMÁTICAMENTE el origen y los límites del CNC"""
-        if not self.is_connected:
+        if not self.engine.is_connected:
             messagebox.showerror("Error", "Conecta al CNC primero")
             return
+        if self.engine.is_drawing:
+            messagebox.showwarning("Dibujo en curso", "Espera a que termine el dibujo")
+            return
         
         response = messagebox.askyesno(
             "Auto-Detección de Origen",
@@ -706,66 +828,55 @@ class CNCPlotterGUI:
         threading.Thread(target=self._auto_detect_thread, daemon=True).start()
     
     def _auto_detect_thread(self):
-        """Hilo de auto-detección"""
+        """Hilo de auto-detección: cada fase espera el mensaje de fin del firmware"""
+        total = len(PHASES) + 1
         try:
-            # Paso 1: Calibrar X
-            self.log("\n[1/4] Calibrando eje X...")
-            self.send_command('C')
-            time.sleep(15)  # Esperar calibración X
-            
-            # Paso 2: Calibrar Y
-            self.log("\n[2/4] Calibrando eje Y...")
-            self.send_command('D')
-            time.sleep(15)  # Esperar calibración Y
-            
-            # Paso 3: Test 4 direcciones para detectar origen
-            self.log("\n[3/4] Ejecutando test de 4 direcciones...")
-            self.send_command('A')
-            time.sleep(10)
+            run_calibration(self.engine, on_phase=lambda index, phase:
+                            self.log(f"\n[{index + 1}/{total}] {phase.title}..."))
+            if self.engine.max_x_steps and self.engine.max_y_steps:
+                steps_per_mm = self.engine.steps_per_mm
+                self.log(f"📏 Recorrido medido: {self.engine.max_x_steps} x "
+                         f"{self.engine.max_y_steps} pasos "
+                         f"({self.engine.max_x_steps / steps_per_mm:.0f} x "
+                         f"{self.engine.max_y_steps / steps_per_mm:.0f} mm)")
             
             # Paso 4: Analizar y detectar origen
-            self.log("\n[4/4] Analizando sistema de coordenadas...")
+            self.log(f"\n[{total}/{total}] Analizando sistema de coordenadas...")
             self._analyze_coordinate_system()
             
             self.log("=" * 50)
             self.log("✅ AUTO-DETECCIÓN COMPLETADA")
             self.log("=" * 50)
             
+        except CalibrationError as e:
+            self.log(f"❌ Calibración interrumpida: {e}")
+            self._post(lambda msg=str(e): messagebox.showerror(
+                "Calibración", f"La calibración falló:\n\n{msg}"))
         except Exception as e:
             self.log(f"❌ Error en auto-detección: {str(e)}")
         finally:
             self.calibration_in_progress = False
     
     def _analyze_coordinate_system(self):
-        """Analizar las respuestas de calibración y detectar el origen"""
-        # Pedir información de posición
-        self.send_command('P')
-        time.sleep(1)
-        
-        # Por ahora, asumimos que después de calibración:
-        # - El CNC está en (0,0) físico
-        # - Los comandos positivos mueven en dirección creciente
+        """Probar la dirección de los ejes y preguntar dónde quedó el origen"""
+        # Cada execute() vuelve cuando el firmware terminó el movimiento
+        self.engine.execute('P', timeout=self.PROBE_TIMEOUT_S)
         
-        # Hacer un pequeño test: mover X+10 y ver si aumenta o disminuye
         self.log("\n🔬 Probando dirección del eje X...")
-        self.send_command('X10')
-        time.sleep(2)
-        self.send_command('X-10')  # Volver
-        time.sleep(2)
+        self.engine.execute('X10', timeout=self.PROBE_TIMEOUT_S)
+        self.engine.execute('X-10', timeout=self.PROBE_TIMEOUT_S)  # Volver
         
         self.log("🔬 Probando dirección del eje Y...")
-        self.send_command('Y10')
-        time.sleep(2)
-        self.send_command('Y-10')  # Volver
-        time.sleep(2)
+        self.engine.execute('Y10', timeout=self.PROBE_TIMEOUT_S)
+        self.engine.execute('Y-10', timeout=self.PROBE_TIMEOUT_S)  # Volver
         
         # Detectar la esquina del origen basándonos en las respuestas
         # Asumimos que después de calibración bidireccional con IMU:
         # - El origen está donde los motores encuentran el primer límite
         # - Típicamente: esquina inferior derecha o superior derecha
         
-        # Preguntar al usuario
-        self.root.after(100, self._ask_user_origin_position)
+        # Preguntar al usuario (en el hilo de Tk)
+        self._post(self._ask_user_origin_position)
     
     def _ask_user_origin_position(self):
         """Preguntar al usuario dónde terminó el CNC después de calibración"""
@@ -812,15 +923,14 @@ class CNCPlotterGUI:
     
     def _set_origin(self, corner, dialog):
         """Establecer el origen detectado"""
-        self.origin_corner = corner
-        self.origin_detected = True
+        self.engine.set_origin(corner)
+        self.engine.save_profile()
         dialog.destroy()
         
         self.log(f"\n✅ Origen detectado: {corner}")
         self.log("🔄 Actualizando sistema de coordenadas...")
         
         # Redibujar grid con origen correcto
-        self.canvas.delete('all')
         self.draw_grid()
         
         messagebox.showinfo("✅ Origen Detectado", 
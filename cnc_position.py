@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Seguimiento de Posición - Lo que el host cree vs. lo que reporta el firmware
+
+Los comandos de dibujo son relativos (L<dx>,<dy>, X<n>, Y<n>) y moveXY del
+firmware recorta en 0..MAX_*_STEPS: un movimiento recortado deja al host
+creyendo una posición que el CNC no tiene y todos los deltas siguientes
+salen corridos. `PositionTracker` evita eso en dos niveles:
+
+  * Predicción: emula al firmware y arma cada movimiento hacia el destino
+    planificado (recortado a los límites) desde la posición *real*
+    prevista, así un recorte no arrastra error al resto del trabajo.
+  * Verificación: intercala 'P' cada `checkpoint_every` comandos (al subir
+    el lápiz) y al final; si el reporte no coincide con lo previsto
+    registra la deriva y re-sincroniza en el siguiente movimiento con el
+    lápiz arriba (nunca dibuja la corrección).
+
+Los límites se aprenden del propio reporte ("X: n / MAX").
+"""
+
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from cnc_planner import STEP_DELAY_S, move_command
+
+Point = Tuple[int, int]
+
+DEFAULT_LIMITS = (8192, 8192)   # MAX_X_STEPS / MAX_Y_STEPS del firmware
+START_DELAY_US = round(STEP_DELAY_S * 1e6)   # un movimiento sin rampa arranca y frena aquí
+CHECKPOINT_EVERY = 200          # comandos del trabajo entre verificaciones con 'P'
+
+_JOB = 'job'
+_CHECKPOINT = 'checkpoint'
+
+
+def parse_position_report(lines: List[str]) -> Optional[Tuple[tuple, tuple]]:
+    """Líneas 'X: n / max', 'Y: ...', 'Z: ...' del reporte de 'P';
+    devuelve ((x, y, z), (max_x, max_y, max_z)) o None"""
+    values = {}
+    for line in lines:
+        axis, _, rest = line.partition(':')
+        if axis in ('X', 'Y', 'Z') and rest:
+            value, _, maximum = rest.partition('/')
+            try:
+                values[axis] = (int(value), int(maximum) if maximum.strip() else 0)
+            except ValueError:
+                pass
+    if len(values) < 3:
+        return None
+    axes = [values[axis] for axis in ('X', 'Y', 'Z')]
+    return tuple(v for v, _ in axes), tuple(m for _, m in axes)
+
+
+def parse_move(command: str) -> Optional[Point]:
+    """(dx, dy) de un movimiento relativo del planificador (L, X<n>, Y<n>
+    o V con perfil de velocidad), o None"""
+    command = command.strip().upper()
+    try:
+        if command.startswith('L'):
+            dx, dy = command[1:].split(',')
+            return int(dx), int(dy)
+        if command.startswith('X') and len(command) > 1:
+            return int(command[1:]), 0
+        if command.startswith('Y') and len(command) > 1:
+            return 0, int(command[1:])
+        if command.startswith('V'):
+            dx, dy, _, _ = command[1:].split(',')   # V<dx>,<dy>,<entrada>,<salida>
+            return int(dx), int(dy)
+    except ValueError:
+        return None
+    return None
+
+
+def _enter_from_rest(command: str) -> str:
+    """El mismo V arrancando desde parado (sigue a un movimiento sin rampa)"""
+    dx, dy, _, exit_us = command[1:].split(',')
+    return f"V{dx},{dy},{START_DELAY_US},{exit_us}"
+
+
+class PositionTracker:
+    """Reescribe un flujo de comandos con la posición real prevista"""
+
+    def __init__(self, start: Point = (0, 0), limits: Point = DEFAULT_LIMITS,
+                 checkpoint_every: int = CHECKPOINT_EVERY):
+        self.planned = tuple(start)     # donde el trabajo cree estar
+        self.predicted = tuple(start)   # contador del firmware (emulado)
+        self.limits = tuple(limits[:2])
+        self.checkpoint_every = checkpoint_every
+        self.pen_down = False
+        self.completed = 0              # comandos del trabajo terminados
+        self.adjusted_moves = 0         # recortados o re-sincronizados
+        self.checkpoints = 0
+        self.drift_events = 0
+        self.max_drift = 0
+        self.reported = None            # última posición (x, y) del firmware
+        self.final = None               # posición al terminar todo el flujo
+        self._exhausted = False
+        self._in_flight = deque()       # (tipo, posición prevista, generación, omitidos)
+        self._generation = 0
+        self._pending_drift = None
+        self._since_checkpoint = 0
+        self._replanned = False         # el último movimiento perdió su perfil V
+
+    def _clamp(self, point: Point) -> Point:
+        return (min(max(point[0], 0), self.limits[0]),
+                min(max(point[1], 0), self.limits[1]))
+
+    def wrap(self, commands: Iterable[str]) -> Iterator[str]:
+        """Comandos a enviar: los del trabajo (con los movimientos
+        re-apuntados) más las verificaciones 'P'"""
+        for command in commands:
+            if self._pending_drift is not None and not self.pen_down:
+                # Re-sincronizar: el siguiente movimiento parte de la posición real
+                dx, dy = self._pending_drift
+                self.predicted = (self.predicted[0] - dx, self.predicted[1] - dy)
+                self._pending_drift = None
+                self._generation += 1
+
+            move = parse_move(command)
+            upper = command.strip().upper()
+            if move is not None:
+                self.planned = (self.planned[0] + move[0], self.planned[1] + move[1])
+                target = self._clamp(self.planned)
+                delta = (target[0] - self.predicted[0], target[1] - self.predicted[1])
+                if delta != move:
+                    self.adjusted_moves += 1
+                self.predicted = target
+                if delta == (0, 0):
+                    self._skip()          # nada que mover (fuera del área)
+                    continue
+                if delta != move:
+                    # El perfil V se planificó para el movimiento original:
+                    # el re-apuntado va sin rampa y el siguiente arranca de 0
+                    command = move_command(*delta)
+                    self._replanned = True
+                else:
+                    if self._replanned and upper.startswith('V'):
+                        upper = _enter_from_rest(upper)
+                    command = upper
+                    self._replanned = False
+            elif upper == 'H':
+                self.planned = self.predicted = (0, 0)
+            elif upper == 'B':
+                self.pen_down = True
+            elif upper == 'U':
+                self.pen_down = False
+
+            self._in_flight.append((_JOB, None, self._generation, 0))
+            yield command
+            self._since_checkpoint += 1
+            if upper == 'U' and self._since_checkpoint >= self.checkpoint_every:
+                yield self._checkpoint()
+        self._exhausted = True
+        yield self._checkpoint()
+
+    def _checkpoint(self) -> str:
+        self._since_checkpoint = 0
+        self._in_flight.append((_CHECKPOINT, self.predicted, self._generation, 0))
+        return 'P'
+
+    def _skip(self) -> None:
+        # Un comando que no se envía termina cuando el CNC confirma lo
+        # enviado antes que él: el progreso (y el diario) nunca se adelanta
+        if self._in_flight:
+            kind, expected, generation, skipped = self._in_flight[-1]
+            self._in_flight[-1] = (kind, expected, generation, skipped + 1)
+        else:
+            self.completed += 1
+
+    def on_response(self, lines: List[str]) -> bool:
+        """Respuesta del siguiente comando enviado (en orden); True si
+        terminó algún comando del trabajo"""
+        kind, expected, generation, skipped = self._in_flight.popleft()
+        self.completed += skipped
+        if kind == _JOB:
+            self.completed += 1
+            return True
+        self._verify(lines, expected, generation)
+        return skipped > 0
+
+    def _verify(self, lines: List[str], expected: Point, generation: int) -> None:
+        report = parse_position_report(lines)
+        if report is None:
+            return
+        (x, y, _), limits = report
+        self.checkpoints += 1
+        self.reported = (x, y)
+        if self._exhausted and not self._in_flight:
+            self.final = (x, y)
+        if limits[0] and limits[1]:
+            self.limits = limits[:2]
+        if generation != self._generation or self._pending_drift is not None:
+            return   # ya hay una corrección en camino
+        drift = (expected[0] - x, expected[1] - y)
+        if drift != (0, 0):
+            self.drift_events += 1
+            self.max_drift = max(self.max_drift, abs(drift[0]), abs(drift[1]))
+            self._pending_drift = drift
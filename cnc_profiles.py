@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfiles de Calibración - Calibrar una vez por máquina
+
+El origen detectado, los límites medidos (MAX_X/MAX_Y) y los pasos/mm se
+guardan por máquina en un JSON. La máquina se reconoce por el número de
+serie USB del puerto (VID:PID:serie); si el adaptador no tiene serie se
+usa el nombre del puerto.
+
+Al abrir el puerto el ESP32 se reinicia y cuenta desde 0 donde esté el
+carro: el reporte de 'P' no dice nada sobre el origen físico. Para
+verificar un perfil hay que volver a buscar el origen (calibración de X e
+Y contra los límites) y comparar el recorrido de límite a límite con el
+guardado; así se confirma el origen y se detecta un perfil de otra
+máquina. Sin esa búsqueda el perfil se puede usar igual, suponiendo que
+el carro quedó en el origen.
+
+El archivo se escribe de forma atómica (temporal + os.replace): un corte
+a mitad de escritura deja el perfil anterior, nunca un JSON a medias.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import serial.tools.list_ports
+
+DEFAULT_PROFILES_FILE = os.path.join(os.path.expanduser('~'), '.cnc_plotter_perfiles.json')
+FORMAT_VERSION = 1
+VERIFY_TOLERANCE = 0.05   # diferencia admitida entre recorrido medido y guardado
+
+
+class ProfileMismatch(Exception):
+    """El CNC no coincide con el perfil guardado"""
+
+
+class CalibrationProfile:
+    """Lo que aprende la auto-detección de una máquina"""
+
+    def __init__(self, origin_corner: str, max_x_steps: int = 0, max_y_steps: int = 0,
+                 steps_per_mm: float = 51.2, saved_at: Optional[float] = None,
+                 span_x_steps: int = 0, span_y_steps: int = 0):
+        self.origin_corner = origin_corner
+        self.max_x_steps = int(max_x_steps)
+        self.max_y_steps = int(max_y_steps)
+        self.span_x_steps = int(span_x_steps)   # de límite a límite (para verificar)
+        self.span_y_steps = int(span_y_steps)
+        self.steps_per_mm = float(steps_per_mm)
+        self.saved_at = time.time() if saved_at is None else saved_at
+
+    def to_dict(self) -> dict:
+        return {
+            'origin_corner': self.origin_corner,
+            'max_x_steps': self.max_x_steps,
+            'max_y_steps': self.max_y_steps,
+            'steps_per_mm': self.steps_per_mm,
+            'span_x_steps': self.span_x_steps,
+            'span_y_steps': self.span_y_steps,
+            'saved_at': self.saved_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CalibrationProfile':
+        return cls(data['origin_corner'], data.get('max_x_steps', 0),
+                   data.get('max_y_steps', 0), data.get('steps_per_mm', 51.2),
+                   data.get('saved_at'), data.get('span_x_steps', 0),
+                   data.get('span_y_steps', 0))
+
+
+def device_key(port_name: str, ports: Optional[Iterable] = None) -> str:
+    """Identidad estable de la máquina conectada en `port_name`"""
+    if ports is None:
+        ports = serial.tools.list_ports.comports()
+    for port in ports:
+        if port.device == port_name and port.serial_number:
+            return f"{port.vid or 0:04X}:{port.pid or 0:04X}:{port.serial_number}"
+    return port_name
+
+
+class ProfileStore:
+    """Perfiles por máquina en un archivo JSON (thread-safe)"""
+
+    def __init__(self, filename: str = DEFAULT_PROFILES_FILE):
+        self.filename = filename
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != FORMAT_VERSION:
+            return {}
+        return data.get('devices', {})
+
+    def load(self, key: str) -> Optional[CalibrationProfile]:
+        with self._lock:
+            data = self._read().get(key)
+        if data is None:
+            return None
+        try:
+            return CalibrationProfile.from_dict(data)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def save(self, key: str, profile: CalibrationProfile) -> None:
+        with self._lock:
+            devices = self._read()
+            devices[key] = profile.to_dict()
+            self._write({'version': FORMAT_VERSION, 'devices': devices})
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            devices = self._read()
+            if devices.pop(key, None) is not None:
+                self._write({'version': FORMAT_VERSION, 'devices': devices})
+
+    def _write(self, data: dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, temp_name = tempfile.mkstemp(prefix='.perfiles-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, self.filename)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+
+def verify_profile(profile: CalibrationProfile, span_x_steps: int, span_y_steps: int,
+                   tolerance: float = VERIFY_TOLERANCE) -> None:
+    """Comparar el recorrido de límite a límite recién medido (al buscar el
+    origen) con el guardado en el perfil. Lanza ProfileMismatch."""
+    for axis, measured, saved in (('X', span_x_steps, profile.span_x_steps),
+                                  ('Y', span_y_steps, profile.span_y_steps)):
+        if not measured:
+            raise ProfileMismatch(f"no se midió el recorrido de {axis}")
+        if not saved:
+            raise ProfileMismatch(f"el perfil no tiene el recorrido de {axis}")
+        if abs(measured - saved) > tolerance * saved:
+            raise ProfileMismatch(f"recorrido {axis} de {measured} pasos, "
+                                  f"el perfil guardó {saved}")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cola de Trabajos - Muchos dibujos seguidos sin tiempos muertos
+
+`JobQueue` acepta archivos (.npz, .json, .svg, G-code) y dibujos del
+canvas, y los manda al CNC uno tras otro:
+
+- Apenas se encola un dibujo, un pool de procesos lo prepara (cargar,
+  transformar, simplificar, ordenar, planificar) mientras el CNC dibuja
+  el anterior: al terminar uno, el siguiente ya tiene sus comandos y
+  arranca enseguida. Preparar en otros procesos no le quita GIL al hilo
+  que atiende los ecos del trabajo en curso.
+- El G-code no se prepara: se envía mientras se lee, como `plot_gcode`.
+- La cola se guarda en un JSON (escritura atómica, como los perfiles);
+  los dibujos del canvas se copian a una carpeta al lado. Al reabrir la
+  aplicación la cola sigue ahí y se vuelve a preparar.
+
+Si cambia la configuración (origen, pasos/mm, tolerancia...) lo preparado
+queda viejo y se vuelve a preparar antes de dibujarlo. Un trabajo
+detenido o fallido frena la cola (el diario de trabajos permite
+reanudarlo); los demás esperan a `start()`.
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from cnc_drawing import Drawing
+from cnc_engine import JOB_COMPLETED, JOB_STOPPED, PlotterEngine
+from cnc_gcode import is_gcode_file
+from cnc_motion import MotionModel, format_duration
+from cnc_simplify import count_segments
+
+DEFAULT_QUEUE_FILE = os.path.join(os.path.expanduser('~'), '.cnc_plotter_cola.json')
+FORMAT_VERSION = 1
+PREPARE_WORKERS = 2
+BUSY_POLL_S = 0.2     # espera mientras otro trabajo (manual) usa el CNC
+
+STATUS_PENDING = 'pending'
+STATUS_PLOTTING = 'plotting'
+STATUS_STOPPED = 'stopped'
+STATUS_FAILED = 'failed'
+STATUS_DONE = 'done'
+
+_STATUS_ICONS = {STATUS_PENDING: '⏳', STATUS_PLOTTING: '🎨', STATUS_STOPPED: '⏹️',
+                 STATUS_FAILED: '✗', STATUS_DONE: '✓'}
+
+
+class PreparedJob:
+    """Comandos listos para `PlotterEngine.plot_commands` (viaja entre procesos)"""
+
+    def __init__(self, commands: List[str], segments: int, lifts_avoided: int,
+                 seconds: float, settings: dict):
+        self.commands = commands
+        self.segments = segments
+        self.lifts_avoided = lifts_avoided
+        self.seconds = seconds
+        self.settings = settings
+
+
+def prepare_file(filename: str, settings: dict) -> PreparedJob:
+    """Cargar, simplificar, ordenar y planificar un archivo (sin conexión;
+    corre en el pool)"""
+    options = dict(settings)
+    origin = options.pop('origin_corner')
+    engine = PlotterEngine(**options)
+    if origin is not None:
+        engine.set_origin(origin)
+    lines, _ = engine.prepare_lines(engine.load_drawing(filename))
+    commands, _, stroke_ends = engine.build_commands(lines)
+    lifts_avoided = sum(1 for line in lines if len(line)) - len(stroke_ends)
+    return PreparedJob(commands, count_segments(lines), lifts_avoided,
+                       MotionModel().total_seconds(commands), settings)
+
+
+class QueuedJob:
+    """Un archivo en la cola"""
+
+    def __init__(self, filename: str, name: str = '', job_id: Optional[str] = None,
+                 status: str = STATUS_PENDING, owned: bool = False):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.filename = filename
+        self.name = name or os.path.basename(filename)
+        self.status = status
+        self.owned = owned          # copia del canvas: se borra al terminar
+        self.message = ''
+        self.prepared: Optional[Future] = None
+        self.settings: Optional[dict] = None   # con qué se preparó
+
+    @property
+    def is_gcode(self) -> bool:
+        return is_gcode_file(self.filename)
+
+    def to_dict(self) -> dict:
+        return {'id': self.id, 'filename': self.filename, 'name': self.name,
+                'status': self.status, 'owned': self.owned}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QueuedJob':
+        return cls(data['filename'], data.get('name', ''), data['id'],
+                   data.get('status', STATUS_PENDING), data.get('owned', False))
+
+    def __str__(self) -> str:
+        text = f"{_STATUS_ICONS.get(self.status, '?')} {self.name}"
+        if self.status == STATUS_PENDING and not self.is_gcode:
+            prepared = self.prepared
+            if prepared is None or not prepared.done():
+                text += " (preparando...)"
+            elif prepared.exception() is None:
+                text += f" ({format_duration(prepared.result().seconds)})"
+        return text
+
+
+def _default_executor() -> Executor:
+    # spawn: el proceso de la GUI tiene hilos (Tk, serial, asyncio)
+    return ProcessPoolExecutor(PREPARE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+
+class JobQueue:
+    """Cola persistente que prepara en segundo plano y dibuja en orden"""
+
+    def __init__(self, engine: PlotterEngine, filename: str = DEFAULT_QUEUE_FILE,
+                 executor: Optional[Executor] = None,
+                 on_change: Optional[Callable[[QueuedJob], None]] = None):
+        self.engine = engine
+        self.filename = filename
+        self.drawings_dir = os.path.splitext(filename)[0] + '_dibujos'
+        self.on_change = on_change or (lambda job: None)
+        self.running = False
+        self.idle_seconds: List[float] = []   # entre el fin de un trabajo y el siguiente
+        self._executor = executor
+        self._jobs: List[QueuedJob] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_finished = None
+        for job in self._read():
+            if job.status == STATUS_PLOTTING:
+                job.status = STATUS_STOPPED   # se cortó la aplicación dibujándolo
+            self._jobs.append(job)
+            self._prepare(job)
+        self._thread = threading.Thread(target=self._dispatch, daemon=True, name='cnc-cola')
+        self._thread.start()
+
+    # ------------------------------------------------------------
+    # Contenido
+    # ------------------------------------------------------------
+
+    @property
+    def jobs(self) -> List[QueuedJob]:
+        with self._cond:
+            return list(self._jobs)
+
+    def add_file(self, filename: str, name: str = '') -> QueuedJob:
+        """Encolar un archivo (empieza a prepararse enseguida)"""
+        return self._add(QueuedJob(os.path.abspath(filename), name))
+
+    def add_drawing(self, drawing: Drawing, name: str = '') -> QueuedJob:
+        """Encolar una copia del dibujo del canvas"""
+        os.makedirs(self.drawings_dir, exist_ok=True)
+        job = QueuedJob('', name, owned=True)
+        job.filename = os.path.join(self.drawings_dir, job.id + '.npz')
+        job.name = name or f"dibujo {job.id[:6]}"
+        drawing.save(job.filename)
+        return self._add(job)
+
+    def _add(self, job: QueuedJob) -> QueuedJob:
+        with self._cond:
+            self._jobs.append(job)
+            self._save()
+            self._prepare(job)
+            self._cond.notify_all()
+        self.engine.log(f"📋 En cola: {job.name}")
+        self.on_change(job)
+        return job
+
+    def remove(self, job_id: str) -> bool:
+        """Quitar un trabajo que no se está dibujando"""
+        with self._cond:
+            job = self._find(job_id)
+            if job is None or job.status == STATUS_PLOTTING:
+                return False
+            self._jobs.remove(job)
+            self._save()
+        if job.prepared is not None:
+            job.prepared.cancel()
+        self._discard_file(job)
+        self.on_change(job)
+        return True
+
+    def retry(self, job_id: str) -> bool:
+        """Volver a poner en espera un trabajo detenido o fallido"""
+        with self._cond:
+            job = self._find(job_id)
+            if job is None or job.status not in (STATUS_STOPPED, STATUS_FAILED):
+                return False
+            job.status = STATUS_PENDING
+            job.message = ''
+            self._prepare(job)
+            self._save()
+            self._cond.notify_all()
+        self.on_change(job)
+        return True
+
+    def _find(self, job_id: str) -> Optional[QueuedJob]:
+        return next((job for job in self._jobs if job.id == job_id), None)
+
+    # ------------------------------------------------------------
+    # Marcha
+    # ------------------------------------------------------------
+
+    def start(self) -> None:
+        """Dibujar los trabajos en espera, uno tras otro"""
+        with self._cond:
+            self.running = True
+            self._last_finished = None
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        """No empezar más trabajos (el que se está dibujando sigue)"""
+        with self._cond:
+            self.running = False
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Esperar a que la cola no tenga nada más para dibujar"""
+        def idle():
+            plotting = any(job.status == STATUS_PLOTTING for job in self._jobs)
+            return not plotting and (not self.running or self._next() is None)
+
+        with self._cond:
+            return self._cond.wait_for(idle, timeout)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self.running = False
+            self._cond.notify_all()
+        self._thread.join(1.0)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _next(self) -> Optional[QueuedJob]:
+        return next((job for job in self._jobs if job.status == STATUS_PENDING), None)
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self.running and self._next())
+                if self._closed:
+                    return
+                if self.engine.is_drawing:
+                    # Un trabajo manual usa el CNC: esperar a que termine
+                    self._cond.wait(BUSY_POLL_S)
+                    continue
+                job = self._next()
+                job.status = STATUS_PLOTTING
+                self._save()
+                if self._last_finished is not None:
+                    self.idle_seconds.append(time.monotonic() - self._last_finished)
+            self.on_change(job)
+            status, message, halt = self._plot(job)
+            with self._cond:
+                self._last_finished = time.monotonic()
+                job.status, job.message = status, message
+                if status == STATUS_DONE:
+                    self._jobs.remove(job)
+                if halt:
+                    self.running = False
+                self._save()
+                self._cond.notify_all()
+            if status == STATUS_DONE:
+                self._discard_file(job)
+            self.on_change(job)
+
+    def _plot(self, job: QueuedJob):
+        self.engine.log(f"📋 Trabajo de la cola: {job.name}")
+        if job.is_gcode:
+            result = self.engine.plot_gcode(job.filename)
+        else:
+            try:
+                prepared = self._prepared(job)
+            except Exception as e:
+                # Un archivo roto no frena la cola: queda marcado y se sigue
+                self.engine.log(f"✗ No se pudo preparar {job.name}: {e}")
+                return STATUS_FAILED, str(e), False
+            result = self.engine.plot_commands(prepared.commands, prepared.lifts_avoided)
+        if result.status == JOB_COMPLETED:
+            return STATUS_DONE, '', False
+        if result.status == JOB_STOPPED:
+            return STATUS_STOPPED, result.message, True
+        return STATUS_FAILED, result.message, True
+
+    def _prepared(self, job: QueuedJob) -> PreparedJob:
+        """Lo preparado en el pool; si la configuración cambió desde
+        entonces, se vuelve a preparar (y se encargan los que siguen)"""
+        settings = self.engine.job_settings()
+        if job.settings == settings:
+            return job.prepared.result()
+        self.engine.log("♻️ Cambió la configuración: preparando de nuevo la cola")
+        with self._cond:
+            for other in self._jobs:
+                if other.status == STATUS_PENDING and other.settings != settings:
+                    self._prepare(other)
+        return prepare_file(job.filename, settings)
+
+    # ------------------------------------------------------------
+    # Preparación y archivo
+    # ------------------------------------------------------------
+
+    def _prepare(self, job: QueuedJob) -> None:
+        if job.is_gcode or job.status != STATUS_PENDING:
+            return
+        if self._executor is None:
+            self._executor = _default_executor()
+        if job.prepared is not None:
+            job.prepared.cancel()
+        job.settings = self.engine.job_settings()
+        job.prepared = self._executor.submit(prepare_file, job.filename, job.settings)
+        job.prepared.add_done_callback(lambda _: self.on_change(job))
+
+    def _discard_file(self, job: QueuedJob) -> None:
+        if job.owned:
+            try:
+                os.unlink(job.filename)
+            except OSError:
+                pass
+
+    def _read(self) -> List[QueuedJob]:
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if not isinstance(data, dict) or data.get('version') != FORMAT_VERSION:
+            return []
+        jobs = []
+        for item in data.get('jobs', []):
+            try:
+                jobs.append(QueuedJob.from_dict(item))
+            except (KeyError, TypeError):
+                continue
+        return jobs
+
+    def _save(self) -> None:
+        data = {'version': FORMAT_VERSION, 'jobs': [job.to_dict() for job in self._jobs]}
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        try:
+            fd, temp_name = tempfile.mkstemp(prefix='.cola-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_name, self.filename)
+            except BaseException:
+                os.unlink(temp_name)
+                raise
+        except OSError as e:
+            self.engine.log(f"⚠ No se pudo guardar la cola: {e}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Renderizado del Canvas - Polilíneas por trazo y capas con tags
+
+Cada trazo es UN ítem de Tk (una polilínea con todos sus puntos, reducida
+a la resolución de la pantalla) en lugar de un ítem por segmento. El grid
+y los indicadores (mensaje de estado, origen y ejes) viven en capas con
+tag propio que solo se regeneran cuando cambia lo que muestran, así
+conectar o calibrar no obliga a redibujar todo el canvas.
+
+Capas (de abajo hacia arriba): 'grid', 'overlay', 'strokes', 'active'.
+"""
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+import tkinter as tk
+
+GRID_TAG = 'grid'
+OVERLAY_TAG = 'overlay'
+STROKES_TAG = 'strokes'
+ACTIVE_TAG = 'active'
+
+DEFAULT_GRID_SPACING = 50   # píxeles
+LOD_PIXELS = 1.0            # distancia mínima entre puntos dibujados
+ACTIVE_CHUNK = 256          # puntos por ítem mientras se dibuja con el mouse
+
+
+def decimate(points: np.ndarray, pixel: float = LOD_PIXELS) -> np.ndarray:
+    """Reducir un trazo a la resolución de pantalla: se descartan los puntos
+    que caen en la misma celda de `pixel` que el anterior (se conservan
+    siempre el primero y el último)"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) <= 2:
+        return points
+    cells = np.floor(points / pixel).astype(np.int64)
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+    keep[-1] = True
+    return points[keep]
+
+
+def _flat_coords(points: np.ndarray) -> List[float]:
+    """Coordenadas para create_line (al menos 2 puntos)"""
+    if len(points) == 1:
+        points = np.repeat(points, 2, axis=0)
+    return points.ravel().tolist()
+
+
+class CanvasRenderer:
+    """Dibuja grid, indicadores y trazos en un tk.Canvas"""
+
+    def __init__(self, canvas, width: int, height: int, grid_color: str = '#3a3a3a',
+                 draw_color: str = '#00ff00', grid_spacing: int = DEFAULT_GRID_SPACING,
+                 lod_pixels: float = LOD_PIXELS):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.grid_color = grid_color
+        self.draw_color = draw_color
+        self.grid_spacing = grid_spacing
+        self.lod_pixels = lod_pixels
+        self._overlay_key = None
+        self._active_items = []
+        self._active_coords = []
+
+    # ------------------------------------------------------------
+    # Capas fijas
+    # ------------------------------------------------------------
+
+    def draw_grid(self) -> None:
+        """Crear el grid una sola vez (queda en su capa)"""
+        if self.canvas.find_withtag(GRID_TAG):
+            return
+        for x in range(0, self.width + 1, self.grid_spacing):
+            self.canvas.create_line(x, 0, x, self.height, fill=self.grid_color, width=1,
+                                    tags=GRID_TAG)
+        for y in range(0, self.height + 1, self.grid_spacing):
+            self.canvas.create_line(0, y, self.width, y, fill=self.grid_color, width=1,
+                                    tags=GRID_TAG)
+        self.canvas.tag_lower(GRID_TAG)
+
+    def set_overlay(self, connected: bool, origin_detected: bool,
+                    origin_corner: Optional[str]) -> bool:
+        """Mostrar el mensaje de estado o el origen; no hace nada si ya
+        muestra lo mismo. Devuelve True si se regeneró la capa."""
+        if not connected:
+            key = ('disconnected',)
+        elif not origin_detected:
+            key = ('uncalibrated',)
+        else:
+            key = ('origin', origin_corner)
+        if key == self._overlay_key:
+            return False
+        self._overlay_key = key
+
+        self.canvas.delete(OVERLAY_TAG)
+        if key[0] == 'disconnected':
+            # No conectado: mensaje de conexión
+            self.canvas.create_text(self.width/2, self.height/2,
+                                    text="🔌 Conecta tu ESP32 primero\n\nSelecciona el puerto COM\ny haz clic en 'Conectar'",
+                                    fill='#888888', font=('Arial', 12), tags=OVERLAY_TAG)
+        elif key[0] == 'uncalibrated':
+            # Conectado pero sin calibrar: mensaje de calibración
+            self.canvas.create_text(self.width/2, self.height/2,
+                                    text="⚙️ Calibra el CNC\n\n🔍 Usa 'AUTO-DETECTAR ORIGEN'\nen el menú Calibrar",
+                                    fill='#ffaa00', font=('Arial', 12, 'bold'), tags=OVERLAY_TAG)
+        else:
+            self._draw_origin(origin_corner)
+
+        # Debajo de los trazos, encima del grid
+        self.canvas.tag_lower(OVERLAY_TAG)
+        self.canvas.tag_lower(GRID_TAG)
+        return True
+
+    def _draw_origin(self, origin_corner: str) -> None:
+        # Determinar posición del origen según esquina detectada
+        if origin_corner == "top-left":
+            origin_x, origin_y = 5, 5
+            x_arrow_dx, y_arrow_dy = 30, 30
+        elif origin_corner == "top-right":
+            origin_x, origin_y = self.width - 5, 5
+            x_arrow_dx, y_arrow_dy = -30, 30
+        elif origin_corner == "bottom-left":
+            origin_x, origin_y = 5, self.height - 5
+            x_arrow_dx, y_arrow_dy = 30, -30
+        else:  # bottom-right
+            origin_x, origin_y = self.width - 5, self.height - 5
+            x_arrow_dx, y_arrow_dy = -30, -30
+
+        canvas = self.canvas
+        # Dibujar origen
+        canvas.create_oval(origin_x - 4, origin_y - 4, origin_x + 4, origin_y + 4,
+                           fill='#ff0000', outline='#ff0000', width=2, tags=OVERLAY_TAG)
+
+        label_offset_x = -35 if origin_x > self.width/2 else 35
+        canvas.create_text(origin_x + label_offset_x, origin_y, text="(0,0) CNC",
+                           fill='#ff0000', font=('Arial', 10, 'bold'), tags=OVERLAY_TAG)
+
+        # Flechas de ejes
+        canvas.create_line(origin_x, origin_y, origin_x + x_arrow_dx, origin_y,
+                           fill='#00ff00', width=2, arrow=tk.LAST, tags=OVERLAY_TAG)
+        canvas.create_text(origin_x + x_arrow_dx + 15*(-1 if x_arrow_dx<0 else 1), origin_y,
+                           text="X+", fill='#00ff00', font=('Arial', 9, 'bold'), tags=OVERLAY_TAG)
+
+        canvas.create_line(origin_x, origin_y, origin_x, origin_y + y_arrow_dy,
+                           fill='#0000ff', width=2, arrow=tk.LAST, tags=OVERLAY_TAG)
+        canvas.create_text(origin_x, origin_y + y_arrow_dy + 15*(-1 if y_arrow_dy<0 else 1),
+                           text="Y+", fill='#0000ff', font=('Arial', 9, 'bold'), tags=OVERLAY_TAG)
+
+    # ------------------------------------------------------------
+    # Trazos
+    # ------------------------------------------------------------
+
+    def render_strokes(self, strokes: Iterable[np.ndarray]) -> int:
+        """Reemplazar la capa de trazos; devuelve cuántos ítems creó"""
+        self.clear_strokes()
+        count = 0
+        for stroke in strokes:
+            if len(stroke) == 0:
+                continue
+            self.canvas.create_line(*_flat_coords(decimate(stroke, self.lod_pixels)),
+                                    fill=self.draw_color, width=2, capstyle=tk.ROUND,
+                                    joinstyle=tk.ROUND, tags=STROKES_TAG)
+            count += 1
+        return count
+
+    def clear_strokes(self) -> None:
+        self.canvas.delete(STROKES_TAG)
+        self.canvas.delete(ACTIVE_TAG)
+        self._active_items = []
+        self._active_coords = []
+
+    def begin_stroke(self, x: float, y: float) -> None:
+        """Trazo a mano alzada: un ítem que se extiende con `coords`"""
+        self.end_stroke()
+        self._active_coords = [x, y]
+        self._new_active_item()
+
+    def extend_stroke(self, x: float, y: float) -> None:
+        coords = self._active_coords
+        if not coords:
+            return
+        if abs(x - coords[-2]) < self.lod_pixels and abs(y - coords[-1]) < self.lod_pixels:
+            return
+        coords.extend((x, y))
+        self.canvas.coords(self._active_items[-1], *coords)
+        if len(coords) >= 2 * ACTIVE_CHUNK:
+            # Congelar el tramo y seguir en un ítem nuevo: cada evento del
+            # mouse cuesta lo mismo aunque el trazo sea muy largo
+            self._active_coords = coords[-2:]
+            self._new_active_item()
+
+    def end_stroke(self) -> None:
+        """Pasar el trazo activo a la capa de trazos"""
+        for item in self._active_items:
+            self.canvas.dtag(item, ACTIVE_TAG)
+            self.canvas.addtag_withtag(STROKES_TAG, item)
+        self._active_items = []
+        self._active_coords = []
+
+    def _new_active_item(self) -> None:
+        x, y = self._active_coords[-2:]
+        item = self.canvas.create_line(x, y, x, y, fill=self.draw_color, width=2,
+                                       capstyle=tk.ROUND, joinstyle=tk.ROUND, tags=ACTIVE_TAG)
+        self._active_items.append(item)
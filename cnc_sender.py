@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sender por Streaming - Envío de comandos al CNC guiado por confirmaciones
+
+En lugar de dormir un tiempo estimado después de cada movimiento, se mantiene
+una ventana acotada de comandos pendientes en el buffer del ESP32 y se avanza
+con las líneas que `processCommand` ya imprime:
+
+    > X120              <- eco: el firmware empezó a ejecutar X120,
+    Moviendo X: 120 pasos   por lo tanto todos los comandos anteriores
+    X +120                  ya terminaron.
+
+Como el firmware procesa los comandos en orden, el eco del comando N confirma
+que el comando N-1 terminó. Para el último comando se usa 'P' como barrera:
+su eco solo llega cuando el movimiento previo finalizó.
+"""
+
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+from cnc_batch import batch_echo
+
+# El buffer RX del ESP32 (Arduino core) es de 256 bytes: nunca llenarlo
+DEFAULT_WINDOW = 8
+DEFAULT_MAX_BYTES = 200
+DEFAULT_ACK_TIMEOUT = 60.0  # s sin ningún eco antes de declarar el enlace muerto
+
+BARRIER_COMMAND = 'P'
+
+
+def parse_echo(line: str) -> Optional[str]:
+    """Extraer el comando de una línea de eco ('> X120' -> 'X120')"""
+    line = line.strip()
+    if not line.startswith('>'):
+        return None
+    command = line[1:].strip()
+    return command or None
+
+
+class StreamingSender:
+    """Envía comandos manteniendo una ventana acotada de comandos sin confirmar.
+
+    `write(command)` escribe un comando (sin '\\n') y devuelve True si se envió.
+    `read_line(timeout)` devuelve la siguiente línea recibida o None si vence
+    el timeout. Ambos se inyectan para poder probarlo sin hardware.
+    """
+
+    def __init__(self, write: Callable[[str], bool],
+                 read_line: Callable[[float], Optional[str]],
+                 window: int = DEFAULT_WINDOW,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 ack_timeout: float = DEFAULT_ACK_TIMEOUT):
+        if window < 1:
+            raise ValueError("La ventana debe ser de al menos 1 comando")
+        self._write = write
+        self._read_line = read_line
+        self.window = window
+        self.max_bytes = max_bytes
+        self.ack_timeout = ack_timeout
+
+        self._pending = deque()  # comandos enviados cuyo eco aún no llega
+        self._pending_bytes = 0
+        self.sent = 0        # comandos de usuario enviados
+        self.started = 0     # comandos de usuario con eco recibido
+        self.completed = 0   # comandos de usuario terminados
+        self._on_progress = None
+
+    @property
+    def in_flight(self) -> int:
+        """Comandos enviados que el firmware todavía no ha empezado"""
+        return len(self._pending)
+
+    def send(self, command: str) -> None:
+        """Enviar un comando, esperando si la ventana está llena"""
+        self._enqueue(command.strip().upper(), is_barrier=False)
+        self.sent += 1
+
+    def stream(self, commands: Iterable[str],
+               should_continue: Optional[Callable[[], bool]] = None,
+               on_progress: Optional[Callable[[int], None]] = None) -> int:
+        """Enviar una secuencia de comandos y esperar a que terminen todos.
+
+        Si `should_continue()` devuelve False se deja de enviar (los comandos
+        ya en el buffer del firmware terminan igual). Devuelve el número de
+        comandos completados.
+        """
+        self._on_progress = on_progress
+        try:
+            for command in commands:
+                if should_continue is not None and not should_continue():
+                    break
+                self.send(command)
+            self.flush()
+        finally:
+            self._on_progress = None
+        return self.completed
+
+    def flush(self) -> None:
+        """Esperar a que el firmware termine todo lo enviado (barrera con 'P')"""
+        if not self._pending and self.completed == self.sent:
+            return
+        self._enqueue(BARRIER_COMMAND, is_barrier=True)
+        while self._pending:
+            self._wait_for_echo()
+
+    def _enqueue(self, command: str, is_barrier: bool) -> None:
+        """Escribir un comando cuando haya espacio en la ventana"""
+        size = len(command) + 1
+        while self._pending and (len(self._pending) >= self.window or
+                                 self._pending_bytes + size > self.max_bytes):
+            self._wait_for_echo()
+
+        if not self._write(command):
+            raise IOError(f"No se pudo enviar el comando: {command}")
+        self._pending.append((command, size, is_barrier))
+        self._pending_bytes += size
+
+    def _wait_for_echo(self) -> None:
+        """Leer líneas hasta recibir el eco del comando más antiguo pendiente"""
+        deadline = time.monotonic() + self.ack_timeout
+        expected = self._pending[0][0]
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Sin respuesta del CNC en {self.ack_timeout:.0f} s (esperando '{expected}')")
+            line = self._read_line(min(remaining, 0.5))
+            if line is None:
+                continue
+            if batch_echo(parse_echo(line) or '') == batch_echo(expected):
+                self._acknowledge()
+                return
+
+    def _acknowledge(self) -> None:
+        """El comando más antiguo empezó: todos los anteriores terminaron"""
+        _, size, is_barrier = self._pending.popleft()
+        self._pending_bytes -= size
+        self.completed = self.started
+        if not is_barrier:
+            self.started += 1
+        if self._on_progress is not None:
+            self._on_progress(self.completed)
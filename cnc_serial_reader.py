@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lector Serial - Hilo dedicado con lecturas en bloque y suscriptores
+
+Reemplaza el sondeo cada 100 ms: el hilo se bloquea en `read()` con timeout
+(despierta en cuanto llega un byte), lee todo lo disponible de una vez y lo
+corta en líneas con `LineFramer`. Cada línea se reparte a las suscripciones
+cuyo filtro la acepta; cada suscripción tiene su propia cola thread-safe.
+"""
+
+import queue
+import threading
+from typing import Callable, List, Optional
+
+READ_TIMEOUT = 0.05   # s que el hilo puede quedar bloqueado en read()
+MAX_READ = 4096       # bytes máximos por lectura
+
+
+class LineFramer:
+    """Acumula bytes y devuelve líneas completas (terminadas en \\n o \\r)"""
+
+    def __init__(self, encoding: str = 'utf-8'):
+        self.encoding = encoding
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[str]:
+        # El firmware usa println (\r\n); aceptar cualquiera de los dos
+        self._buffer.extend(data.replace(b'\r', b'\n'))
+        *complete, rest = self._buffer.split(b'\n')
+        self._buffer = bytearray(rest)
+        return [raw.decode(self.encoding, errors='ignore').strip()
+                for raw in complete if raw.strip()]
+
+
+class Subscription:
+    """Cola de líneas filtradas; obtener con `get(timeout)`"""
+
+    def __init__(self, reader: 'SerialReader', line_filter: Optional[Callable[[str], bool]]):
+        self._reader = reader
+        self.filter = line_filter
+        self.queue = queue.Queue()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Siguiente línea o None si vence el timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self._reader.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SerialReader:
+    """Hilo lector de un puerto serial estilo pyserial.
+
+    `on_error(exc)` se llama (desde el hilo lector) si la lectura falla;
+    en ese caso el hilo termina en lugar de tragarse el error.
+    """
+
+    def __init__(self, port, on_error: Optional[Callable[[Exception], None]] = None):
+        self.port = port
+        self.on_error = on_error
+        self.framer = LineFramer()
+        self.lines_read = 0
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+
+    def subscribe(self, line_filter: Optional[Callable[[str], bool]] = None) -> Subscription:
+        """Nueva suscripción; `line_filter(line)` decide qué líneas recibe"""
+        subscription = Subscription(self, line_filter)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def start(self) -> None:
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._running.clear()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        if hasattr(self.port, 'timeout'):
+            self.port.timeout = READ_TIMEOUT
+        while self._running.is_set():
+            try:
+                # Bloquea hasta que llegue al menos un byte (o venza el timeout)
+                # y luego se lleva de una vez todo lo que haya en el buffer
+                data = self.port.read(1)
+                if not data:
+                    continue
+                waiting = self.port.in_waiting
+                if waiting:
+                    data += self.port.read(min(waiting, MAX_READ))
+            except Exception as e:
+                self._running.clear()
+                if self.on_error is not None:
+                    self.on_error(e)
+                return
+            for line in self.framer.feed(data):
+                self.dispatch(line)
+
+    def dispatch(self, line: str) -> None:
+        """Entregar una línea a todas las suscripciones que la aceptan"""
+        self.lines_read += 1
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.filter is None or subscription.filter(line):
+                subscription.queue.put(line)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simplificación de Trazos - Ramer–Douglas–Peucker vectorizado con NumPy
+
+El canvas agrega un punto por cada evento de movimiento del mouse: un trazo
+de 2 segundos son cientos de segmentos de 1-3 px, y cada uno cuesta un viaje
+por el puerto serial y una parada del motor. Aquí se eliminan los puntos que
+no cambian la forma más allá de una tolerancia en mm.
+
+La simplificación se hace en el espacio de pasos del motor: una tolerancia
+menor a medio paso no tiene sentido físico, y dos puntos que caen en el
+mismo paso son un movimiento nulo.
+"""
+
+from typing import List, Sequence
+
+import numpy as np
+
+DEFAULT_TOLERANCE_MM = 0.2
+
+
+def rdp_mask(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Máscara de los puntos que conserva Ramer–Douglas–Peucker.
+
+    Iterativo (sin recursión) y con la distancia de cada tramo calculada
+    de una sola vez con NumPy.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3:
+        return keep
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        start = points[first]
+        chord = points[last] - start
+        rel = points[first + 1:last] - start
+        length = np.hypot(chord[0], chord[1])
+        if length == 0:
+            # Trazo cerrado: distancia al punto inicial
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(chord[0] * rel[:, 1] - chord[1] * rel[:, 0]) / length
+
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            index = first + 1 + k
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return keep
+
+
+def simplify_stroke(points_mm: np.ndarray, tolerance_mm: float,
+                    steps_per_mm: float) -> np.ndarray:
+    """Índices de los puntos a conservar de un trazo (coordenadas en mm)"""
+    points_mm = np.asarray(points_mm, dtype=float).reshape(-1, 2)
+    if len(points_mm) == 0:
+        return np.zeros(0, dtype=int)
+
+    points_steps = points_mm * steps_per_mm
+    # Nada por debajo de medio paso: el motor no lo puede reproducir
+    tolerance_steps = max(tolerance_mm * steps_per_mm, 0.5)
+    keep = rdp_mask(points_steps, tolerance_steps)
+
+    # Cuantización: descartar puntos que caen en el mismo paso que el anterior
+    indices = np.flatnonzero(keep)
+    quantized = np.rint(points_steps[indices]).astype(np.int64)
+    moved = np.ones(len(indices), dtype=bool)
+    moved[1:] = np.any(quantized[1:] != quantized[:-1], axis=1)
+    return indices[moved]
+
+
+def simplify_strokes(strokes_mm: Sequence[np.ndarray], tolerance_mm: float,
+                     steps_per_mm: float) -> List[np.ndarray]:
+    """Simplificar una lista de trazos (arreglos (k, 2) en mm)"""
+    simplified = []
+    for stroke in strokes_mm:
+        if len(stroke) == 0:
+            continue
+        stroke = np.asarray(stroke, dtype=float)
+        simplified.append(stroke[simplify_stroke(stroke, tolerance_mm, steps_per_mm)])
+    return simplified
+
+
+def count_segments(lines: Sequence[Sequence]) -> int:
+    """Número de segmentos (movimientos con lápiz abajo) de un dibujo"""
+    return sum(max(len(line) - 1, 0) for line in lines)
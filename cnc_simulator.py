@@ -0,0 +1,787 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulador del Firmware - CNC_Controller.ino sin hardware
+
+`SimulatedCNC` reproduce processCommand(): los mismos comandos (X<n>, Y<n>,
+Z<n>, L<dx>,<dy>, H, P, U, B, C, D, A, I, S, R, X, Y, Z), el mismo eco
+"> CMD" y los mismos textos de reporte. El tiempo es simulado: cada paso
+cuesta STEP_DELAY, el lápiz PEN_*_STEPS pasos + 200 ms, y el loop() del
+firmware espera 10 ms cuando no hay datos. moveXY recorta a 0..MAX_*_STEPS
+igual que el firmware; moveX/moveY no recortan (tampoco en el firmware).
+
+El carro tiene un recorrido físico (`travel`) y un IMU simulado: al
+empujar contra el tope el carro se detiene y las lecturas dejan de
+cambiar, así la calibración C/D encuentra los límites como en la máquina.
+
+`SimulatedSerial` lo expone como un puerto estilo pyserial (read, write,
+in_waiting, timeout...) con un búfer de recepción de 256 bytes como el
+del ESP32. `time_scale` escala el tiempo simulado a tiempo real
+(1 = real, 0 = instantáneo). `serve_pty` lo publica en un pseudo-terminal
+para usarlo desde cualquier programa:
+
+    python cnc_simulator.py --time-scale 0.1
+"""
+
+import argparse
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from cnc_batch import BatchError, decode_batch
+from cnc_lookahead import move_seconds, parse_velocity
+
+SIMULATOR_PORT = 'SIMULADOR'
+
+# Mismos valores que CNC_Controller.ino
+STEP_DELAY_US = 2000
+MAX_X_STEPS = 8192
+MAX_Y_STEPS = 8192
+MAX_Z_STEPS = 512
+PEN_UP_STEPS = 200
+PEN_DOWN_STEPS = 200
+IMU_THRESHOLD = 500
+STABLE_COUNT = 15
+IMU_CHECK_INTERVAL = 30
+MIN_STEPS_BEFORE_CHECK = 300
+CALIBRATION_MAX_STEPS = 10000
+
+STEP_DELAY_S = STEP_DELAY_US / 1e6
+LOOP_DELAY_S = 0.010
+RX_BUFFER_SIZE = 256
+DEFAULT_TRAVEL = (7600, 7200)   # recorrido físico simulado (pasos)
+
+_CALIBRATION = {
+    'X': dict(title="║  CALIBRACION COMPLETA EJE X CON IMU       ║",
+              low="IZQUIERDO", high="DERECHO", low_dir="la IZQUIERDA", high_dir="la DERECHA",
+              low_label="📏 Límite IZQUIERDO:  ", high_label="📏 Límite DERECHO:    ",
+              origin="límite izquierdo"),
+    'Y': dict(title="║  CALIBRACION COMPLETA EJE Y CON IMU       ║",
+              low="INFERIOR", high="SUPERIOR", low_dir="ABAJO", high_dir="ARRIBA",
+              low_label="📏 Límite INFERIOR:   ", high_label="📏 Límite SUPERIOR:   ",
+              origin="límite inferior"),
+}
+
+
+def arduino_to_int(text: str) -> int:
+    """String.toInt() de Arduino: signo y dígitos iniciales, si no 0"""
+    text = text.lstrip()
+    digits = ''
+    for i, char in enumerate(text):
+        if char.isdigit() or (i == 0 and char in '+-'):
+            digits += char
+        else:
+            break
+    try:
+        return int(digits)
+    except ValueError:
+        return 0
+
+
+class SimulatedCNC:
+    """Estado y salida del firmware con reloj simulado (segundos)"""
+
+    def __init__(self, max_x: int = MAX_X_STEPS, max_y: int = MAX_Y_STEPS,
+                 travel: Tuple[int, int] = DEFAULT_TRAVEL, imu: bool = True, seed: int = 0):
+        self.max_x = max_x
+        self.max_y = max_y
+        self.imu = imu
+        self.clock = 0.0
+        self.x = self.y = self.z = 0
+        self.pen_down = False
+        self.commands = 0
+        self.quiet = False      # dentro de un lote (M) no se imprimen los movimientos
+        # Carro físico: arranca en un punto cualquiera del recorrido
+        self.travel = np.array(travel, dtype=np.int64)
+        self.physical = self.travel // 2
+        self._rng = np.random.default_rng(seed)
+        self._accel = np.array([120, -80, 16384], dtype=np.int64)
+        self._moved_since_read = True
+        self._output = []   # (tiempo, texto)
+
+    # ------------------------------------------------------------
+    # Salida y tiempo
+    # ------------------------------------------------------------
+
+    def _print(self, text: str) -> None:
+        self._output.append((self.clock, text))
+
+    def _println(self, text: str = '') -> None:
+        self._print(text + '\r\n')
+
+    def _chatter(self, text: str) -> None:
+        """Reporte de movimiento: se omite dentro de un lote"""
+        if not self.quiet:
+            self._println(text)
+
+    def _delay(self, seconds: float) -> None:
+        self.clock += seconds
+
+    def take_output(self) -> List[Tuple[float, str]]:
+        """Sacar la salida pendiente como [(tiempo simulado, texto)]"""
+        output, self._output = self._output, []
+        return output
+
+    def idle(self) -> None:
+        """Una vuelta de loop() sin datos (delay(10))"""
+        self._delay(LOOP_DELAY_S)
+
+    # ------------------------------------------------------------
+    # Movimiento
+    # ------------------------------------------------------------
+
+    def _push(self, axis: int, steps: int) -> None:
+        """Mover el carro físico; contra el tope se detiene"""
+        before = self.physical[axis]
+        self.physical[axis] = min(max(before + steps, 0), self.travel[axis])
+        if self.physical[axis] != before:
+            self._moved_since_read = True
+
+    def _move_axis(self, name: str, steps: int) -> None:
+        """moveX / moveY (sin recorte)"""
+        if steps == 0:
+            return
+        self._chatter(f"{name} {'+' if steps > 0 else '-'}{abs(steps)}")
+        self._delay(abs(steps) * STEP_DELAY_S)
+        axis = 0 if name == 'X' else 1
+        self._push(axis, steps)
+        if axis == 0:
+            self.x += steps
+        else:
+            self.y += steps
+
+    def _move_z(self, steps: int) -> None:
+        if steps == 0:
+            return
+        self._chatter(f"Z {'⬆️' if steps > 0 else '⬇️'} {abs(steps)}")
+        self._delay(abs(steps) * STEP_DELAY_S)
+        self.z += steps
+
+    @staticmethod
+    def _clamped(current: int, steps: int, maximum: int) -> int:
+        """Posición final de un eje en moveXY (avanza solo dentro de 0..MAX)"""
+        if steps > 0:
+            return current if current >= maximum else min(current + steps, maximum)
+        if steps < 0:
+            return current if current <= 0 else max(current + steps, 0)
+        return current
+
+    def _move_xy(self, dx: int, dy: int, profile: Optional[Tuple[int, int]] = None) -> None:
+        """moveXY, o moveXYProfiled si viene (entrada_us, salida_us)"""
+        self._chatter(f"Movimiento XY: ({dx}, {dy})")
+        x = self._clamped(self.x, dx, self.max_x)
+        y = self._clamped(self.y, dy, self.max_y)
+        self._push(0, x - self.x)
+        self._push(1, y - self.y)
+        self.x, self.y = x, y
+        steps = max(abs(dx), abs(dy))
+        if profile is None:
+            self._delay(steps * STEP_DELAY_S)
+        else:
+            self._delay(move_seconds(steps, *profile))
+
+    def _pen_up(self) -> None:
+        if self.pen_down:
+            self._chatter("✏️ ⬆️ LÁPIZ ARRIBA (Pen Up)")
+            self._move_z(PEN_UP_STEPS)
+            self.pen_down = False
+            self._delay(0.2)
+        else:
+            self._chatter("ℹ️ Lápiz ya está arriba")
+
+    def _pen_down(self) -> None:
+        if not self.pen_down:
+            self._chatter("✏️ ⬇️ LÁPIZ ABAJO (Pen Down)")
+            self._move_z(-PEN_DOWN_STEPS)
+            self.pen_down = True
+            self._delay(0.2)
+        else:
+            self._chatter("ℹ️ Lápiz ya está abajo")
+
+    # ------------------------------------------------------------
+    # Arranque y comandos
+    # ------------------------------------------------------------
+
+    def boot(self) -> None:
+        """Salida de setup()"""
+        self._delay(1.5)
+        self._println("\n=== CNC ESP32 S3 ===\n")
+        for motor in "XYZ":
+            self._print(f"Motor {motor}...")
+            self._println(" OK")
+            self._delay(0.3)
+        self._print("IMU MPU6050...")
+        self._delay(0.2)
+        if self.imu:
+            self._println(" OK")
+            self._println("  ✓ IMU conectado correctamente")
+        else:
+            self._println(" FALLO")
+            self._println("  ⚠ IMU no detectado - calibración manual")
+        self._delay(0.3)
+        self._println("\n=== LISTO ===")
+        self._println("\n📋 COMANDOS DISPONIBLES:")
+        self._println("💡 Escribe un comando y presiona Enter")
+        self._println()
+
+    def execute(self, command: str) -> None:
+        """processCommand(String)"""
+        command = command.strip().upper()
+        if not command:
+            return
+        self.commands += 1
+        self._print("\n> ")
+        cmd = command[0]
+        colon = command.find(':')
+        if cmd == 'M' and colon > 0:
+            # Lote: eco corto, sin repetir toda la línea
+            self._println(command[:colon])
+            self._batch(command, command[1:colon])
+            return
+        self._println(command)
+
+        if len(command) > 1 and cmd in 'XYZ':
+            value = arduino_to_int(command[1:])
+            self._println(f"Moviendo {cmd}: {value} pasos")
+            if cmd == 'Z':
+                self._move_z(value)
+            else:
+                self._move_axis(cmd, value)
+            return
+
+        if len(command) > 1 and cmd == 'L':
+            comma = command.find(',')
+            if comma < 0:
+                self._println("⚠ Formato: L<dx>,<dy> (ej: L100,-50)")
+                return
+            self._move_xy(arduino_to_int(command[1:comma]), arduino_to_int(command[comma + 1:]))
+            return
+
+        if len(command) > 1 and cmd == 'V':
+            velocity = parse_velocity(command)
+            if velocity is None:
+                self._println("⚠ Formato: V<dx>,<dy>,<entrada_us>,<salida_us> (ej: V100,-50,2000,1200)")
+                return
+            self._move_xy(velocity[0], velocity[1], velocity[2:])
+            return
+
+        handlers = {
+            'X': lambda: self._test_axis('X'),
+            'Y': lambda: self._test_axis('Y'),
+            'Z': self._test_z,
+            'S': self._draw_square,
+            'H': self._go_home,
+            'P': self._print_position,
+            'C': lambda: self._calibrate('X'),
+            'D': lambda: self._calibrate('Y'),
+            'A': self._test_area,
+            'I': self._print_imu,
+            'U': self._pen_up,
+            'B': self._pen_down,
+            'R': lambda: self._println("🔌 Motor Z liberado"),
+        }
+        handler = handlers.get(cmd)
+        if handler is None:
+            self._println("\n╔════════════════════════════════════╗")
+            self._println("║     COMANDOS DISPONIBLES          ║")
+            self._println("╚════════════════════════════════════╝")
+            self._println("  L<dx>,<dy> = Línea XY coordinada (ej: L100,-50)")
+            self._println("  V<dx>,<dy>,<e>,<s> = Línea XY con rampa (µs/paso al entrar y salir)")
+            self._println("  M<n>:L10,5;B;X20;U*CK = Lote de movimientos (checksum XOR)")
+            self._println()
+        else:
+            handler()
+
+    def _batch(self, command: str, sequence: str) -> None:
+        """processBatch(): M<seq>:<cmd>;<cmd>...*<XOR>"""
+        try:
+            _, moves = decode_batch(command)
+        except BatchError:
+            self._println(f"⚠ M{sequence} CHK")
+            return
+        # Se valida el lote entero antes de mover nada (como batchMove)
+        for move in moves:
+            if not self._batch_move(move, run=False):
+                self._println(f"⚠ M{sequence} ? {move}")
+                return
+        self.quiet = True
+        try:
+            for move in moves:
+                self._batch_move(move, run=True)
+        finally:
+            self.quiet = False
+        self._println(f"M{sequence} OK")
+
+    def _batch_move(self, move: str, run: bool) -> bool:
+        """batchMove(): un sub-comando del lote; False si está mal formado"""
+        name = move[0]
+        if name == 'L' and ',' in move:
+            if run:
+                dx, _, dy = move[1:].partition(',')
+                self._move_xy(arduino_to_int(dx), arduino_to_int(dy))
+        elif name == 'V' and parse_velocity(move) is not None:
+            if run:
+                velocity = parse_velocity(move)
+                self._move_xy(velocity[0], velocity[1], velocity[2:])
+        elif name in 'XY' and len(move) > 1:
+            if run:
+                self._move_axis(name, arduino_to_int(move[1:]))
+        elif move == 'B':
+            if run:
+                self._pen_down()
+        elif move == 'U':
+            if run:
+                self._pen_up()
+        else:
+            return False
+        return True
+
+    def _go_home(self) -> None:
+        self._println("\n=== HOME ===")
+        if self.x != 0:
+            self._move_axis('X', -self.x)
+        if self.y != 0:
+            self._move_axis('Y', -self.y)
+        if self.z != 0:
+            self._move_z(-self.z)
+        self.pen_down = False
+        self._println("HOME OK\n")
+
+    def _print_position(self) -> None:
+        self._println("\n=== POSICION ===")
+        self._println(f"X: {self.x} / {self.max_x}")
+        self._println(f"Y: {self.y} / {self.max_y}")
+        self._println(f"Z: {self.z} / {MAX_Z_STEPS}")
+        self._println()
+
+    def _test_axis(self, name: str) -> None:
+        arrows = ("→→→", "←←←") if name == 'X' else ("↑↑↑", "↓↓↓")
+        current = lambda: self.x if name == 'X' else self.y
+        self._println(f"\n=== TEST {name} - RECORRIDO COMPLETO ===")
+        self._println("Posicion inicial: ")
+        self._println(f"{name}={current()}")
+        self._println(f"{arrows[0]} Avanzando AL MÁXIMO (4000 pasos = ~17cm)...")
+        self._move_axis(name, 4000)
+        self._delay(2.0)
+        self._println(f"{arrows[1]} Retrocediendo AL INICIO (4000 pasos)...")
+        self._move_axis(name, -4000)
+        self._delay(2.0)
+        self._println(f"✓ Test {name} completado - ¿Llegó al final?")
+        self._println(f"Posicion final {name}={current()}")
+        self._println()
+
+    def _test_z(self) -> None:
+        self._println("\n=== TEST Z (50 pasos) ===")
+        self._println("Posicion inicial: ")
+        self._println(f"Z={self.z}")
+        self._println("↓ Bajando 50...")
+        self._move_z(50)
+        self._delay(1.0)
+        self._println("↑ Subiendo 50...")
+        self._move_z(-50)
+        self._delay(1.0)
+        self._println("✓ Test Z completado")
+        self._println(f"Posicion final Z={self.z}")
+        self._println()
+
+    def _draw_square(self) -> None:
+        self._println("\n═══════════════════════════════════════")
+        self._println("   🔲 DIBUJANDO CUADRADO GRANDE 🔲")
+        self._println("   (3500 pasos por lado = ~15cm)")
+        self._println("═══════════════════════════════════════\n")
+        self._pen_down()
+        self._delay(0.5)
+        for label, name, steps in (("→→→ Lado 1 (derecha)", 'X', 3500),
+                                   ("↑↑↑ Lado 2 (arriba)", 'Y', 3500),
+                                   ("←←← Lado 3 (izquierda)", 'X', -3500),
+                                   ("↓↓↓ Lado 4 (abajo)", 'Y', -3500)):
+            self._println(label)
+            self._move_axis(name, steps)
+            self._delay(0.5)
+        self._pen_up()
+        self._println("\n✅ ¡Cuadrado completado!\n")
+
+    # ------------------------------------------------------------
+    # IMU y calibración
+    # ------------------------------------------------------------
+
+    def _read_accel(self) -> np.ndarray:
+        """getMotion6(): con el carro en movimiento la aceleración cambia
+        más que IMU_THRESHOLD entre lecturas; detenido, solo ruido"""
+        if self._moved_since_read:
+            jump = self._rng.integers(IMU_THRESHOLD + 100, 3 * IMU_THRESHOLD, size=2)
+            sign = np.where(self._accel[:2] > 0, -1, 1)
+            self._accel[:2] += sign * jump
+        else:
+            self._accel[:2] += self._rng.integers(-IMU_THRESHOLD // 5, IMU_THRESHOLD // 5, size=2)
+        self._accel[:2] = np.clip(self._accel[:2], -32768, 32767)
+        self._moved_since_read = False
+        return self._accel.copy()
+
+    def _print_imu(self) -> None:
+        ax, ay, az = self._read_accel()
+        gx, gy, gz = self._rng.integers(-200, 200, size=3)
+        self._println("\n=== DATOS IMU ===")
+        self._println(f"Acelerómetro: X={ax} Y={ay} Z={az}")
+        self._println(f"Giroscopio:   X={gx} Y={gy} Z={gz}")
+        self._println()
+
+    def _search_limit(self, axis: int, direction: int, label: str) -> int:
+        """Avanzar hasta que el IMU deje de ver movimiento (fases 1 y 2)"""
+        count = 0
+        for _ in range(MIN_STEPS_BEFORE_CHECK):
+            self._push(axis, direction)
+            count += 1
+        self._delay(MIN_STEPS_BEFORE_CHECK * STEP_DELAY_S)
+        previous = self._read_accel()
+        stable = 0
+        while count < CALIBRATION_MAX_STEPS:
+            self._push(axis, direction)
+            count += 1
+            self._delay(STEP_DELAY_S)
+            if count % IMU_CHECK_INTERVAL != 0:
+                continue
+            reading = self._read_accel()
+            diff = np.abs(reading[:2] - previous[:2])
+            if np.all(diff < IMU_THRESHOLD):
+                stable += 1
+                self._print("●")
+            else:
+                stable = 0
+                self._print(".")
+            if stable >= STABLE_COUNT:
+                self._println(f"\n✓ ¡LÍMITE {label} ENCONTRADO!")
+                break
+            previous = reading
+            if count % 400 == 0:
+                self._print(f"\n[{count}")
+                self._println(f" pasos] ΔAx={diff[0]} ΔAy={diff[1]}")
+        return count
+
+    def _calibrate(self, name: str) -> None:
+        text = _CALIBRATION[name]
+        axis = 0 if name == 'X' else 1
+        self._println("\n╔════════════════════════════════════════════╗")
+        self._println(text['title'])
+        self._println("╚════════════════════════════════════════════╝\n")
+        self._println("🔍 Buscando ORIGEN y LÍMITES en ambas direcciones...\n")
+        if not self.imu:
+            self._println("⚠ ERROR: IMU no disponible")
+            self._println("Verifica conexión del MPU6050")
+            return
+        self._delay(0.5)
+
+        self._println(f"═══ FASE 1: Buscando límite {text['low']} ═══")
+        self._println(f"Moviendo hacia {text['low_dir']}...\n")
+        low = self._search_limit(axis, -1, text['low'])
+        self._println(f"\n📍 Límite {text['low']}: {low} pasos\n")
+        self._delay(0.5)
+
+        self._println(f"═══ FASE 2: Buscando límite {text['high']} ═══")
+        self._println(f"Moviendo hacia {text['high_dir']}...\n")
+        high = self._search_limit(axis, 1, text['high'])
+        self._println(f"\n📍 Límite {text['high']}: {high} pasos\n")
+        self._delay(0.5)
+
+        total = low + high
+        self._println("╔════════════════════════════════════════════╗")
+        self._println("║           RESULTADOS CALIBRACIÓN           ║")
+        self._println("╚════════════════════════════════════════════╝\n")
+        self._println(f"{text['low_label']}{low} pasos")
+        self._println(f"{text['high_label']}{high} pasos")
+        self._println(f"📏 RANGO TOTAL:       {total} pasos\n")
+        self._println("💡 Actualiza en el código:")
+        self._println(f"   #define MAX_{name}_STEPS {total}")
+        self._println()
+
+        self._println(f"═══ Regresando al ORIGEN ({text['origin']}) ═══\n")
+        self._println("Moviendo hacia ORIGEN...")
+        self._print("." * ((high - 1) // 500 + 1))
+        self._push(axis, -high)
+        self._delay(high * STEP_DELAY_S)
+        if axis == 0:
+            self.x = 0
+        else:
+            self.y = 0
+        self._println(f"\n\n✅ ¡Calibración {name} COMPLETADA!")
+        self._println(f"📍 Posición actual: {name} = 0 (ORIGEN)\n")
+
+    def _test_area(self) -> None:
+        self._println("\n╔════════════════════════════════════════════╗")
+        self._println("║     TEST ÁREA COMPLETA - 4 DIRECCIONES    ║")
+        self._println("╚════════════════════════════════════════════╝\n")
+        self._println("🔍 Probando movimiento en TODAS las direcciones")
+        self._println("   desde la posición actual...\n")
+        start_x, start_y = self.x, self.y
+        self._println(f"📍 Posición inicial: X={start_x} Y={start_y}")
+        self._println()
+
+        tests = (
+            ("═══ TEST 1/4: DERECHA (X+) ═══", 'X', lambda: self.max_x - self.x, 1,
+             "→→→ Moviendo {} pasos a la DERECHA...", "←←← Regresando...", "✓ Test DERECHA OK\n"),
+            ("═══ TEST 2/4: IZQUIERDA (X-) ═══", 'X', lambda: self.x, -1,
+             "←←← Moviendo {} pasos a la IZQUIERDA...", "→→→ Regresando...", "✓ Test IZQUIERDA OK\n"),
+            ("═══ TEST 3/4: ARRIBA (Y+) ═══", 'Y', lambda: self.max_y - self.y, 1,
+             "↑↑↑ Moviendo {} pasos hacia ARRIBA...", "↓↓↓ Regresando...", "✓ Test ARRIBA OK\n"),
+            ("═══ TEST 4/4: ABAJO (Y-) ═══", 'Y', lambda: self.y, -1,
+             "↓↓↓ Moviendo {} pasos hacia ABAJO...", "↑↑↑ Regresando...", "✓ Test ABAJO OK\n"),
+        )
+        for title, name, available, sign, going, back, done in tests:
+            self._println(title)
+            steps = min(available(), 500)
+            self._println(going.format(steps))
+            self._move_axis(name, sign * steps)
+            self._delay(1.0)
+            self._println(back)
+            self._move_axis(name, -sign * steps)
+            self._delay(1.0)
+            self._println(done)
+
+        self._println("╔════════════════════════════════════════════╗")
+        self._println("║          RESULTADOS TEST ÁREA             ║")
+        self._println("╚════════════════════════════════════════════╝\n")
+        self._println(f"📍 Posición inicial: X={start_x} Y={start_y}")
+        self._println(f"📍 Posición final:   X={self.x} Y={self.y}")
+        if self.x == start_x and self.y == start_y:
+            self._println("\n✅ ¡PERFECTO! Regresó a la posición inicial")
+        else:
+            self._println("\n⚠️ ATENCIÓN: No regresó a la posición inicial")
+            self._println(f"   Error X: {self.x - start_x}")
+            self._println(f"   Error Y: {self.y - start_y}")
+        self._println("\n✅ Test completo de 4 direcciones COMPLETADO\n")
+
+
+class SimulatedSerial:
+    """Puerto estilo pyserial conectado a un SimulatedCNC.
+
+    Un hilo hace de loop() del firmware: toma líneas del búfer de recepción
+    (256 bytes; lo que no entra se pierde, como en el ESP32) y libera la
+    salida de cada comando a medida que pasa su tiempo simulado.
+    """
+
+    def __init__(self, cnc: Optional[SimulatedCNC] = None, time_scale: float = 1.0,
+                 timeout: Optional[float] = None, boot: bool = True,
+                 rx_buffer_size: int = RX_BUFFER_SIZE):
+        self.cnc = cnc if cnc is not None else SimulatedCNC()
+        self.time_scale = time_scale
+        self.timeout = timeout
+        self.port = SIMULATOR_PORT
+        self.rx_buffer_size = rx_buffer_size
+        self.dropped_bytes = 0
+        self.is_open = True
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._cond = threading.Condition()
+        self._command = ''
+        self._thread = threading.Thread(target=self._firmware_loop, args=(boot,), daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------
+    # API estilo pyserial
+    # ------------------------------------------------------------
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise IOError("Puerto simulado cerrado")
+        with self._cond:
+            space = self.rx_buffer_size - len(self._rx)
+            accepted = data[:max(space, 0)]
+            self.dropped_bytes += len(data) - len(accepted)
+            self._rx.extend(accepted)
+            self._cond.notify_all()
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._cond:
+            while len(self._tx) < size and self.is_open:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            data = bytes(self._tx[:size])
+            del self._tx[:size]
+            return data
+
+    def readline(self) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._cond:
+            while b'\n' not in self._tx and self.is_open:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            end = self._tx.find(b'\n') + 1 or len(self._tx)
+            data = bytes(self._tx[:end])
+            del self._tx[:end]
+            return data
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            return len(self._tx)
+
+    def reset_input_buffer(self) -> None:
+        with self._cond:
+            self._tx.clear()
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------
+    # loop() del firmware
+    # ------------------------------------------------------------
+
+    def _firmware_loop(self, boot: bool) -> None:
+        self._sim_origin = self.cnc.clock
+        self._real_origin = time.monotonic()
+        if boot:
+            self.cnc.boot()
+            self._emit()
+        busy = True
+        while self.is_open:
+            with self._cond:
+                data = bytes(self._rx)
+                self._rx.clear()
+            if not data:
+                # Serial.available() == 0: delay(10) antes de volver a mirar
+                # (solo se cuenta una vez; esperar al host no es tiempo del CNC)
+                if busy:
+                    self.cnc.idle()
+                    busy = False
+                self._wait_for_input()
+                continue
+            busy = True
+            for char in data.decode('utf-8', errors='ignore'):
+                if char in '\r\n':
+                    if self._command:
+                        self.cnc.execute(self._command)
+                        self._command = ''
+                        self._emit()
+                else:
+                    self._command += char
+
+    def _real_time(self, sim_time: float) -> float:
+        return self._real_origin + (sim_time - self._sim_origin) * self.time_scale
+
+    def _sleep_until(self, sim_time: float) -> None:
+        delay = self._real_time(sim_time) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _wait_for_input(self) -> None:
+        with self._cond:
+            if self._rx or not self.is_open:
+                return
+            self._cond.wait(0.05)
+            if not self._rx:
+                # Sin tráfico el reloj simulado sigue al real
+                self._resync()
+
+    def _resync(self) -> None:
+        if self.time_scale > 0:
+            elapsed = (time.monotonic() - self._real_time(self.cnc.clock)) / self.time_scale
+            if elapsed > 0:
+                self.cnc.clock += elapsed
+
+    def _emit(self) -> None:
+        """Entregar la salida del comando en su tiempo simulado"""
+        for sim_time, text in self.cnc.take_output():
+            if self.time_scale > 0:
+                self._sleep_until(sim_time)
+            with self._cond:
+                self._tx.extend(text.encode('utf-8'))
+                self._cond.notify_all()
+        if self.time_scale > 0:
+            self._sleep_until(self.cnc.clock)
+
+
+# ------------------------------------------------------------
+# Pseudo-terminal
+# ------------------------------------------------------------
+
+class PtyBridge:
+    """Publica un SimulatedSerial en un pseudo-terminal (/dev/pts/N)"""
+
+    def __init__(self, serial_port: SimulatedSerial):
+        import tty
+        self.serial = serial_port
+        self.serial.timeout = 0.05
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.name = os.ttyname(self._slave)
+        self._running = True
+        self._threads = [threading.Thread(target=self._host_to_device, daemon=True),
+                         threading.Thread(target=self._device_to_host, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def _host_to_device(self) -> None:
+        while self._running:
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                break
+            if data:
+                self.serial.write(data)
+
+    def _device_to_host(self) -> None:
+        while self._running and self.serial.is_open:
+            data = self.serial.read(1)
+            if data:
+                data += self.serial.read(self.serial.in_waiting)
+                os.write(self._master, data)
+
+    def close(self) -> None:
+        self._running = False
+        self.serial.close()
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def serve_pty(time_scale: float = 1.0, **options) -> PtyBridge:
+    return PtyBridge(SimulatedSerial(SimulatedCNC(**options), time_scale=time_scale))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulador del firmware CNC en un pty")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="tiempo real por segundo simulado (0 = instantáneo)")
+    parser.add_argument('--no-imu', action='store_true', help="simular IMU desconectado")
+    args = parser.parse_args()
+
+    bridge = serve_pty(args.time_scale, imu=not args.no_imu)
+    print(f"🧪 Simulador CNC en {bridge.name} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bridge.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importador SVG - Trayectorias vectoriales a trazos del plotter
+
+Soporta <path> (M/L/H/V/C/S/Q/T/A/Z, absolutos y relativos), <line>,
+<polyline>, <polygon>, <rect>, <circle> y <ellipse>, con los atributos
+`transform` de cada elemento y de sus grupos <g>.
+
+Las curvas se aplanan de forma adaptativa: cada Bézier o arco recibe los
+segmentos justos para que el error de cuerda no supere la tolerancia (por
+defecto medio paso del motor), y todas las curvas del documento se evalúan
+juntas con NumPy. El resultado se escala para entrar en el área de trabajo
+y se devuelve en mm con origen arriba a la izquierda e Y hacia abajo (la
+misma orientación que el canvas).
+"""
+
+import math
+import re
+import xml.etree.ElementTree as ET
+from typing import List, Optional
+
+import numpy as np
+
+FILE_EXTENSION = '.svg'
+MAX_SEGMENTS = 4096   # segmentos máximos por curva
+DEFAULT_MARGIN_MM = 0.0
+
+_SKIPPED_TAGS = {'defs', 'clipPath', 'mask', 'symbol', 'marker', 'pattern',
+                 'title', 'desc', 'metadata', 'style', 'script', 'text'}
+_NUMBER = re.compile(r'\s*,?\s*([-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)')
+_FLAG = re.compile(r'\s*,?\s*([01])')
+_COMMAND = re.compile(r'\s*([MmZzLlHhVvCcSsQqTtAa])')
+_TRANSFORM = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+_LENGTH = re.compile(r'\s*([-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)')
+
+# Tipos de entrada de la geometría
+_START, _LINE, _QUAD, _CUBIC, _ARC = range(5)
+
+
+def flatten_tolerance(steps_per_mm: float) -> float:
+    """Tolerancia de aplanado en mm: medio paso del motor"""
+    return 0.5 / steps_per_mm
+
+
+# ------------------------------------------------------------
+# Transformaciones (matrices 3x3)
+# ------------------------------------------------------------
+
+def parse_transform(text: Optional[str]) -> np.ndarray:
+    """Atributo `transform` de SVG -> matriz afín 3x3"""
+    matrix = np.eye(3)
+    if not text:
+        return matrix
+    for name, args in _TRANSFORM.findall(text):
+        values = [float(v) for v in re.split(r'[\s,]+', args.strip()) if v]
+        step = np.eye(3)
+        if name == 'matrix' and len(values) == 6:
+            a, b, c, d, e, f = values
+            step[:2] = [[a, c, e], [b, d, f]]
+        elif name == 'translate':
+            step[0, 2] = values[0]
+            step[1, 2] = values[1] if len(values) > 1 else 0.0
+        elif name == 'scale':
+            step[0, 0] = values[0]
+            step[1, 1] = values[1] if len(values) > 1 else values[0]
+        elif name == 'rotate':
+            angle = math.radians(values[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step[:2, :2] = [[cos, -sin], [sin, cos]]
+            if len(values) == 3:
+                cx, cy = values[1], values[2]
+                step = _translation(cx, cy) @ step @ _translation(-cx, -cy)
+        elif name == 'skewX':
+            step[0, 1] = math.tan(math.radians(values[0]))
+        elif name == 'skewY':
+            step[1, 0] = math.tan(math.radians(values[0]))
+        matrix = matrix @ step
+    return matrix
+
+
+def _translation(x: float, y: float) -> np.ndarray:
+    matrix = np.eye(3)
+    matrix[:2, 2] = (x, y)
+    return matrix
+
+
+# ------------------------------------------------------------
+# Geometría del documento
+# ------------------------------------------------------------
+
+class _Geometry:
+    """Entradas en orden de dibujo: puntos iniciales, rectas y curvas.
+
+    Cada entrada aporta n puntos a la salida (1 para inicio/recta, n para
+    una curva) y usa la matriz de su elemento. Así todas las curvas del
+    mismo tipo se pueden evaluar de una sola vez.
+    """
+
+    def __init__(self):
+        self.kinds = []
+        self.matrix_ids = []
+        self.matrices = []
+        self.data = {kind: [] for kind in (_START, _LINE, _QUAD, _CUBIC, _ARC)}
+        self.ids = {kind: [] for kind in self.data}
+        self._matrix_id = -1
+
+    def set_matrix(self, matrix: np.ndarray) -> None:
+        self.matrices.append(matrix)
+        self._matrix_id = len(self.matrices) - 1
+
+    def add(self, kind: int, values) -> None:
+        self.ids[kind].append(len(self.kinds))
+        self.data[kind].append(values)
+        self.kinds.append(kind)
+        self.matrix_ids.append(self._matrix_id)
+
+    def move_to(self, point) -> None:
+        self.add(_START, point)
+
+    def line_to(self, point) -> None:
+        self.add(_LINE, point)
+
+    def quad_to(self, p0, p1, p2) -> None:
+        self.add(_QUAD, (*p0, *p1, *p2))
+
+    def cubic_to(self, p0, p1, p2, p3) -> None:
+        self.add(_CUBIC, (*p0, *p1, *p2, *p3))
+
+    def arc(self, cx, cy, rx, ry, phi, theta, sweep) -> None:
+        self.add(_ARC, (cx, cy, rx, ry, phi, theta, sweep))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    # ------------------------------------------------------------
+
+    def control_points(self) -> np.ndarray:
+        """Puntos de control ya transformados (envolvente de la geometría)"""
+        chunks = []
+        for kind in (_START, _LINE, _QUAD, _CUBIC):
+            if self.data[kind]:
+                pts = np.asarray(self.data[kind], dtype=float).reshape(len(self.data[kind]), -1, 2)
+                mids = np.asarray(self.matrix_ids, dtype=np.int64)[self.ids[kind]]
+                chunks.append(self._apply(pts.reshape(-1, 2), np.repeat(mids, pts.shape[1])))
+        if self.data[_ARC]:
+            arcs = np.asarray(self.data[_ARC], dtype=float)
+            radius = np.maximum(arcs[:, 2], arcs[:, 3])
+            corners = np.array([(-1, -1), (-1, 1), (1, -1), (1, 1)], dtype=float)
+            pts = arcs[:, None, :2] + radius[:, None, None] * corners
+            mids = np.asarray(self.matrix_ids, dtype=np.int64)[self.ids[_ARC]]
+            chunks.append(self._apply(pts.reshape(-1, 2), np.repeat(mids, 4)))
+        return np.vstack(chunks) if chunks else np.zeros((0, 2))
+
+    def _apply(self, points: np.ndarray, matrix_ids: np.ndarray) -> np.ndarray:
+        matrices = np.asarray(self.matrices)[matrix_ids]
+        return (np.einsum('nij,nj->ni', matrices[:, :2, :2], points) + matrices[:, :2, 2])
+
+    def flatten(self, tolerance: float) -> List[np.ndarray]:
+        """Aplanar todo a polilíneas con error de cuerda <= tolerance
+        (en unidades del documento ya transformadas)"""
+        total = len(self.kinds)
+        if total == 0:
+            return []
+        matrices = np.asarray(self.matrices)
+        matrix_ids = np.asarray(self.matrix_ids, dtype=np.int64)
+        # Escala máxima de cada matriz: la tolerancia local se achica en proporción
+        gains = np.linalg.norm(matrices[:, :2, :2], ord=2, axis=(1, 2))
+        gains = np.maximum(gains, 1e-12)
+
+        counts = np.ones(total, dtype=np.int64)
+        curves = {}
+        for kind in (_QUAD, _CUBIC, _ARC):
+            if not self.data[kind]:
+                continue
+            ids = np.asarray(self.ids[kind], dtype=np.int64)
+            values = np.asarray(self.data[kind], dtype=float)
+            local_tol = tolerance / gains[matrix_ids[ids]]
+            n = _segment_counts(kind, values, local_tol)
+            counts[ids] = n
+            curves[kind] = (ids, values, n)
+
+        starts = np.zeros(total + 1, dtype=np.int64)
+        np.cumsum(counts, out=starts[1:])
+        out = np.empty((int(starts[-1]), 2))
+
+        for kind in (_START, _LINE):
+            if self.data[kind]:
+                out[starts[self.ids[kind]]] = np.asarray(self.data[kind], dtype=float)
+
+        for kind, (ids, values, n) in curves.items():
+            segment = np.repeat(np.arange(len(ids)), n)
+            first = np.repeat(np.cumsum(n) - n, n)
+            k = np.arange(len(segment)) - first + 1
+            t = k / n[segment]
+            out[starts[ids][segment] + k - 1] = _evaluate(kind, values[segment], t)
+
+        out = self._apply(out, np.repeat(matrix_ids, counts))
+        stroke_starts = starts[self.ids[_START]]
+        strokes = np.split(out, stroke_starts[1:])
+        return [stroke for stroke in strokes if len(stroke) > 1]
+
+
+def _segment_counts(kind: int, values: np.ndarray, tolerance: np.ndarray) -> np.ndarray:
+    """Segmentos por curva para que la flecha no supere `tolerance`"""
+    if kind == _ARC:
+        radius = np.maximum(values[:, 2], values[:, 3])
+        ratio = np.clip(1 - tolerance / np.maximum(radius, 1e-12), -1, 1)
+        max_angle = np.where(tolerance < radius, 2 * np.arccos(ratio), math.pi / 2)
+        n = np.ceil(np.abs(values[:, 6]) / np.maximum(max_angle, 1e-9))
+    else:
+        p = values.reshape(len(values), -1, 2)
+        # Cota de la segunda derivada: error <= |B''|max / (8 n^2)
+        second = p[:, :-2] - 2 * p[:, 1:-1] + p[:, 2:]
+        bound = np.linalg.norm(second, axis=2).max(axis=1)
+        degree = p.shape[1] - 1
+        factor = degree * (degree - 1) / 8.0
+        n = np.ceil(np.sqrt(factor * bound / tolerance))
+    return np.clip(n, 1, MAX_SEGMENTS).astype(np.int64)
+
+
+def _evaluate(kind: int, values: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Evaluar curvas (una fila de `values` por punto) en los parámetros t"""
+    t = t[:, None]
+    s = 1 - t
+    if kind == _QUAD:
+        p0, p1, p2 = values[:, 0:2], values[:, 2:4], values[:, 4:6]
+        return s * s * p0 + 2 * s * t * p1 + t * t * p2
+    if kind == _CUBIC:
+        p0, p1, p2, p3 = values[:, 0:2], values[:, 2:4], values[:, 4:6], values[:, 6:8]
+        return s * s * s * p0 + 3 * s * s * t * p1 + 3 * s * t * t * p2 + t * t * t * p3
+    cx, cy, rx, ry, phi, theta, sweep = values.T
+    angle = theta + sweep * t[:, 0]
+    cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+    x = rx * np.cos(angle)
+    y = ry * np.sin(angle)
+    return np.column_stack([cx + cos_phi * x - sin_phi * y, cy + sin_phi * x + cos_phi * y])
+
+
+# ------------------------------------------------------------
+# Trayectorias <path>
+# ------------------------------------------------------------
+
+class _PathScanner:
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def _match(self, pattern):
+        match = pattern.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            return match.group(1)
+        return None
+
+    def command(self) -> Optional[str]:
+        return self._match(_COMMAND)
+
+    def has_number(self) -> bool:
+        return _NUMBER.match(self.text, self.pos) is not None
+
+    def number(self) -> float:
+        value = self._match(_NUMBER)
+        if value is None:
+            raise ValueError(f"Número esperado en la posición {self.pos} del path")
+        return float(value)
+
+    def flag(self) -> bool:
+        value = self._match(_FLAG)
+        if value is None:
+            raise ValueError(f"Bandera de arco esperada en la posición {self.pos}")
+        return value == '1'
+
+    def point(self, relative_to=None):
+        x, y = self.number(), self.number()
+        if relative_to is not None:
+            return (relative_to[0] + x, relative_to[1] + y)
+        return (x, y)
+
+
+def _svg_arc(geometry: _Geometry, p0, p1, rx, ry, rotation, large, sweep) -> None:
+    """Arco elíptico de SVG (forma de extremos) -> forma de centro"""
+    if p0 == p1:
+        return
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        geometry.line_to(p1)
+        return
+    phi = math.radians(rotation)
+    cos, sin = math.cos(phi), math.sin(phi)
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1, y1 = cos * dx + sin * dy, -sin * dx + cos * dy
+
+    scale = x1 * x1 / (rx * rx) + y1 * y1 / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    num = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+    den = rx * rx * y1 * y1 + ry * ry * x1 * x1
+    coef = math.sqrt(max(num, 0.0) / den) if den else 0.0
+    if large == sweep:
+        coef = -coef
+    cxp, cyp = coef * rx * y1 / ry, -coef * ry * x1 / rx
+    cx = cos * cxp - sin * cyp + (p0[0] + p1[0]) / 2
+    cy = sin * cxp + cos * cyp + (p0[1] + p1[1]) / 2
+
+    theta = math.atan2((y1 - cyp) / ry, (x1 - cxp) / rx)
+    theta_end = math.atan2((-y1 - cyp) / ry, (-x1 - cxp) / rx)
+    delta = theta_end - theta
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+    geometry.arc(cx, cy, rx, ry, phi, theta, delta)
+
+
+def parse_path(d: str, geometry: _Geometry) -> None:
+    """Agregar a `geometry` los subtrazos del atributo `d` de un <path>"""
+    scanner = _PathScanner(d)
+    current = (0.0, 0.0)
+    start = current
+    last_control = None   # para S/T
+    command = None
+    while True:
+        new_command = scanner.command()
+        if new_command is None:
+            if command is None or not scanner.has_number() or command in 'Zz':
+                break
+            # Comando implícito: tras M sigue L
+            new_command = {'M': 'L', 'm': 'l'}.get(command, command)
+        command = new_command
+        relative = command.islower()
+        base = current if relative else None
+        op = command.upper()
+        control = None
+
+        if op == 'M':
+            current = scanner.point(base)
+            start = current
+            geometry.move_to(current)
+        elif op == 'Z':
+            if current != start:
+                geometry.line_to(start)
+            current = start
+        elif op == 'L':
+            current = scanner.point(base)
+            geometry.line_to(current)
+        elif op == 'H':
+            x = scanner.number()
+            current = (current[0] + x if relative else x, current[1])
+            geometry.line_to(current)
+        elif op == 'V':
+            y = scanner.number()
+            current = (current[0], current[1] + y if relative else y)
+            geometry.line_to(current)
+        elif op == 'C':
+            c1, c2, end = scanner.point(base), scanner.point(base), scanner.point(base)
+            geometry.cubic_to(current, c1, c2, end)
+            control, current = c2, end
+        elif op == 'S':
+            c1 = _reflect(last_control, current, 'C')
+            c2, end = scanner.point(base), scanner.point(base)
+            geometry.cubic_to(current, c1, c2, end)
+            control, current = c2, end
+        elif op == 'Q':
+            c1, end = scanner.point(base), scanner.point(base)
+            geometry.quad_to(current, c1, end)
+            control, current = c1, end
+        elif op == 'T':
+            c1 = _reflect(last_control, current, 'Q')
+            end = scanner.point(base)
+            geometry.quad_to(current, c1, end)
+            control, current = c1, end
+        elif op == 'A':
+            rx, ry, rotation = scanner.number(), scanner.number(), scanner.number()
+            large, sweep = scanner.flag(), scanner.flag()
+            end = scanner.point(base)
+            _svg_arc(geometry, current, end, rx, ry, rotation, large, sweep)
+            current = end
+        last_control = (op, control) if control is not None else None
+
+
+def _reflect(last_control, current, kind):
+    """Punto de control reflejado para S/T (o el punto actual)"""
+    if last_control is None or last_control[0] not in (kind, 'S' if kind == 'C' else 'T'):
+        return current
+    cx, cy = last_control[1]
+    return (2 * current[0] - cx, 2 * current[1] - cy)
+
+
+# ------------------------------------------------------------
+# Elementos y documento
+# ------------------------------------------------------------
+
+def _length(value: Optional[str], default: float = 0.0) -> float:
+    if value is None:
+        return default
+    match = _LENGTH.match(value)
+    return float(match.group(1)) if match else default
+
+
+def _points_attribute(text: Optional[str]) -> List[tuple]:
+    values = [float(v) for v in re.findall(r'[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?', text or '')]
+    return list(zip(values[0::2], values[1::2]))
+
+
+def _add_element(tag: str, element, geometry: _Geometry) -> None:
+    get = element.get
+    if tag == 'path':
+        parse_path(get('d', ''), geometry)
+    elif tag == 'line':
+        geometry.move_to((_length(get('x1')), _length(get('y1'))))
+        geometry.line_to((_length(get('x2')), _length(get('y2'))))
+    elif tag in ('polyline', 'polygon'):
+        points = _points_attribute(get('points'))
+        if not points:
+            return
+        geometry.move_to(points[0])
+        for point in points[1:]:
+            geometry.line_to(point)
+        if tag == 'polygon' and len(points) > 2:
+            geometry.line_to(points[0])
+    elif tag == 'rect':
+        x, y = _length(get('x')), _length(get('y'))
+        w, h = _length(get('width')), _length(get('height'))
+        if w <= 0 or h <= 0:
+            return
+        geometry.move_to((x, y))
+        for point in ((x + w, y), (x + w, y + h), (x, y + h), (x, y)):
+            geometry.line_to(point)
+    elif tag in ('circle', 'ellipse'):
+        cx, cy = _length(get('cx')), _length(get('cy'))
+        if tag == 'circle':
+            rx = ry = _length(get('r'))
+        else:
+            rx, ry = _length(get('rx')), _length(get('ry'))
+        if rx <= 0 or ry <= 0:
+            return
+        geometry.move_to((cx + rx, cy))
+        geometry.arc(cx, cy, rx, ry, 0.0, 0.0, 2 * math.pi)
+
+
+def _walk(element, matrix: np.ndarray, geometry: _Geometry) -> None:
+    tag = element.tag.rsplit('}', 1)[-1]
+    if tag in _SKIPPED_TAGS or element.get('display') == 'none':
+        return
+    matrix = matrix @ parse_transform(element.get('transform'))
+    if tag in ('path', 'line', 'polyline', 'polygon', 'rect', 'circle', 'ellipse'):
+        geometry.set_matrix(matrix)
+        _add_element(tag, element, geometry)
+    for child in element:
+        _walk(child, matrix, geometry)
+
+
+def parse_svg(source) -> _Geometry:
+    """Leer un SVG (ruta de archivo o texto) y devolver su geometría"""
+    if isinstance(source, str) and source.lstrip().startswith('<'):
+        root = ET.fromstring(source)
+    else:
+        root = ET.parse(source).getroot()
+    geometry = _Geometry()
+    _walk(root, np.eye(3), geometry)
+    return geometry
+
+
+def load_svg(source, work_width: float, work_height: float,
+             tolerance_mm: float, margin_mm: float = DEFAULT_MARGIN_MM) -> List[np.ndarray]:
+    """SVG -> trazos en mm ajustados (sin deformar) al área de trabajo.
+
+    Devuelve arreglos (k, 2) con origen arriba a la izquierda e Y hacia
+    abajo, centrados en el área de trabajo.
+    """
+    geometry = parse_svg(source)
+    if not len(geometry):
+        return []
+
+    hull = geometry.control_points()
+    available = np.array([work_width, work_height], dtype=float) - 2 * margin_mm
+    if np.any(available <= 0):
+        raise ValueError("El margen no deja área de trabajo")
+
+    def fit_scale(points):
+        size = np.maximum(points.max(axis=0) - points.min(axis=0), 1e-12)
+        return float(np.min(available / size))
+
+    # La envolvente de control es más grande que el dibujo real, así que
+    # subestima la escala: si la real resulta mayor se aplana de nuevo
+    scale = fit_scale(hull)
+    strokes = geometry.flatten(tolerance_mm / scale)
+    if not strokes:
+        return []
+    points = np.vstack(strokes)
+    true_scale = fit_scale(points)
+    if true_scale > scale * 1.05:
+        strokes = geometry.flatten(tolerance_mm / true_scale)
+        points = np.vstack(strokes)
+    scale = fit_scale(points)
+
+    lower = points.min(axis=0)
+    size = (points.max(axis=0) - lower) * scale
+    offset = margin_mm + (available - size) / 2
+    return [(stroke - lower) * scale + offset for stroke in strokes]
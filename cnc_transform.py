@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transformación de Coordenadas - Canvas (px) -> CNC (mm) -> pasos
+
+Una sola transformación afín (esquina de origen, escala, pasos/mm y
+correcciones opcionales de escuadra y holgura) que convierte arreglos
+completos de puntos con NumPy, en lugar de ramificar por esquina en cada
+punto. La usan el canvas, el sender y test_coordenadas.py.
+"""
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+ORIGIN_CORNERS = ("top-left", "top-right", "bottom-left", "bottom-right")
+
+
+class CoordinateTransform:
+    """Conversión vectorizada px <-> mm -> pasos para una esquina de origen.
+
+    skew_deg   : ángulo (grados) que el eje Y se desvía de la escuadra; se
+                 compensa desplazando X en -y*tan(skew)
+    backlash_* : holgura mecánica en pasos; se agrega al invertir el sentido
+                 de un eje
+    """
+
+    def __init__(self, origin_corner: str = "top-left", scale_factor: float = 4.0,
+                 steps_per_mm: float = 51.2, canvas_width: float = 600,
+                 canvas_height: float = 600, skew_deg: float = 0.0,
+                 backlash_x: int = 0, backlash_y: int = 0):
+        if origin_corner not in ORIGIN_CORNERS:
+            raise ValueError(f"Esquina de origen inválida: {origin_corner}")
+        self.origin_corner = origin_corner
+        self.scale_factor = scale_factor
+        self.steps_per_mm = steps_per_mm
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.skew_deg = skew_deg
+        self.backlash = np.array([backlash_x, backlash_y], dtype=np.int64)
+
+        # px -> mm:  mm = px @ A.T + b
+        flip_x = origin_corner.endswith("right")
+        flip_y = origin_corner.startswith("bottom")
+        sx = -1.0 if flip_x else 1.0
+        sy = -1.0 if flip_y else 1.0
+        self._linear = np.diag([sx, sy]) / scale_factor
+        self._offset = np.array([canvas_width if flip_x else 0.0,
+                                 canvas_height if flip_y else 0.0]) / scale_factor
+        # mm -> mm de máquina (corrección de escuadra)
+        self._skew = np.array([[1.0, -math.tan(math.radians(skew_deg))], [0.0, 1.0]])
+
+    # ------------------------------------------------------------
+    # px <-> mm
+    # ------------------------------------------------------------
+
+    def px_to_mm(self, points) -> np.ndarray:
+        """Arreglo (N, 2) de píxeles del canvas -> mm respecto al origen CNC"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return points @ self._linear.T + self._offset
+
+    def mm_to_px(self, points) -> np.ndarray:
+        """Inversa de px_to_mm (para colocar en el canvas trazos importados)"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return (points - self._offset) @ np.linalg.inv(self._linear).T
+
+    def point_to_mm(self, px: float, py: float) -> Tuple[float, float]:
+        x_mm, y_mm = self.px_to_mm([(px, py)])[0]
+        return float(x_mm), float(y_mm)
+
+    # ------------------------------------------------------------
+    # mm -> pasos
+    # ------------------------------------------------------------
+
+    def mm_to_steps(self, points_mm) -> np.ndarray:
+        """Trazo (N, 2) en mm -> posiciones absolutas enteras en pasos.
+
+        Redondeo con difusión de error: se redondea la posición absoluta, no
+        cada delta por separado, así que el residuo de cada movimiento se
+        arrastra al siguiente y el error nunca supera medio paso ni se
+        acumula a lo largo del trazo (int() truncaba y sesgaba hacia el 0).
+        """
+        points_mm = np.asarray(points_mm, dtype=float).reshape(-1, 2)
+        steps = points_mm @ self._skew.T * self.steps_per_mm
+        quantized = np.rint(steps).astype(np.int64)
+        if self.backlash.any():
+            quantized = quantized + self._backlash_offsets(quantized)
+        return quantized
+
+    def px_to_steps(self, points) -> np.ndarray:
+        return self.mm_to_steps(self.px_to_mm(points))
+
+    def _backlash_offsets(self, quantized: np.ndarray) -> np.ndarray:
+        """Compensación de holgura: mientras un eje avanza en sentido negativo
+        se le resta `backlash` (la holgura se recoge al invertir)"""
+        deltas = np.diff(quantized, axis=0, prepend=quantized[:1])
+        direction = np.sign(deltas)
+        offsets = np.zeros_like(quantized)
+        for axis in range(2):
+            d = direction[:, axis]
+            # Propagar el último sentido no nulo hacia adelante
+            index = np.where(d != 0, np.arange(len(d)), 0)
+            np.maximum.accumulate(index, out=index)
+            last = d[index]
+            offsets[:, axis] = np.where(last < 0, -self.backlash[axis], 0)
+        return offsets
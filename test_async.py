@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Transporte asyncio - futuros por comando, barrera, pausa y aborto
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from cnc_async import AsyncJobRunner, AsyncPlotterTransport
+from cnc_planner import plan
+from cnc_simulator import SimulatedSerial
+
+
+def _transport(**options):
+    return AsyncPlotterTransport(SimulatedSerial(time_scale=0, timeout=0.05, boot=False),
+                                 **options)
+
+
+def _job(repeat=50):
+    commands, _, _ = plan([[(100, 100), (3000, 2000)], [(50, 400), (60, 500)]] * repeat)
+    return commands
+
+
+def test_command_resolves_with_its_response_lines():
+    async def scenario():
+        async with _transport() as transport:
+            written = []
+            transport.on_write = written.append
+            assert await transport.command('X100') == ['Moviendo X: 100 pasos', 'X +100']
+            assert written == ['X100', 'P']          # barrera automática
+            assert transport.position == (100, 0, 0)
+            lines = await transport.command('p')
+            assert lines[0] == '=== POSICION ===' and written[-1] == 'p'
+
+    asyncio.run(scenario())
+
+
+def test_job_runner_streams_without_extra_barriers():
+    async def scenario():
+        async with _transport() as transport:
+            written = []
+            transport.on_write = written.append
+            progress = []
+            commands = _job()
+            completed = await AsyncJobRunner(transport).run(commands, progress.append)
+            assert completed == len(commands)
+            assert progress == list(range(1, len(commands) + 1))
+            assert written.count('P') == 1
+            assert (transport.port.cnc.x, transport.port.cnc.y) == (60, 500)
+            assert transport.port.dropped_bytes == 0
+
+    asyncio.run(scenario())
+
+
+def test_pause_is_bounded_and_resume_finishes():
+    async def scenario():
+        async with _transport() as transport:
+            runner = AsyncJobRunner(transport)
+            commands = _job()
+
+            def on_progress(done):
+                if done == 10:
+                    runner.pause()
+
+            task = asyncio.ensure_future(runner.run(commands, on_progress))
+            await asyncio.sleep(0.3)
+            paused_at = runner.completed
+            assert 10 <= paused_at <= 10 + runner.lookahead
+            await asyncio.sleep(0.2)
+            assert runner.completed == paused_at and not task.done()
+
+            runner.resume()
+            assert await task == len(commands)
+
+    asyncio.run(scenario())
+
+
+def test_abort_discards_unsent_commands_and_keeps_transport_usable():
+    async def scenario():
+        async with _transport() as transport:
+            runner = AsyncJobRunner(transport)
+            commands = _job()
+
+            def on_progress(done):
+                if done == 5:
+                    runner.abort()
+
+            completed = await runner.run(commands, on_progress)
+            assert 5 <= completed < len(commands)
+            assert transport.pending == 0
+            assert (await transport.command('P'))[0] == '=== POSICION ==='
+
+    asyncio.run(scenario())
+
+
+def test_exclusive_command_waits_for_the_running_job():
+    async def scenario():
+        async with _transport() as transport:
+            written = []
+            transport.on_write = written.append
+            commands = _job(5)
+            job = asyncio.ensure_future(AsyncJobRunner(transport).run(commands))
+            await asyncio.sleep(0)
+
+            async with transport.lock:
+                await transport.command('H')
+            assert await job == len(commands)
+            # El Home no quedó intercalado entre los movimientos del dibujo
+            assert [c for c in written if c != 'P'] == commands + ['H']
+
+    asyncio.run(scenario())
+
+
+class SilentPort:
+    """Puerto que acepta todo y nunca responde"""
+
+    timeout = 0.05
+
+    def write(self, data):
+        return len(data)
+
+    def read(self, size=1):
+        time.sleep(self.timeout)
+        return b''
+
+    in_waiting = 0
+
+    def close(self):
+        pass
+
+
+def test_no_response_times_out():
+    async def scenario():
+        async with AsyncPlotterTransport(SilentPort(), ack_timeout=0.3) as transport:
+            with pytest.raises(TimeoutError):
+                await transport.command('X10')
+            with pytest.raises(TimeoutError):
+                await transport.command('X10')   # el transporte quedó inutilizable
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Protocolo por Lotes - codificación, armado adaptativo, firmware simulado y motor
+"""
+
+import numpy as np
+import pytest
+
+from cnc_batch import (AdaptiveBatcher, BatchError, batch_echo, checksum, decode_batch,
+                       encode_batch, is_batch)
+from cnc_drawing import Drawing
+from cnc_engine import EVENT_LOG, EVENT_SENT, PlotterEngine
+from cnc_simulator import SimulatedCNC, SimulatedSerial
+
+
+class OldFirmwareCNC(SimulatedCNC):
+    """Firmware anterior a los lotes: 'M...' es un comando desconocido"""
+
+    def execute(self, command):
+        if is_batch(command):
+            self._print("\n> ")
+            self._println(command.strip().upper())
+            self._println("  L<dx>,<dy> = Línea XY coordinada (ej: L100,-50)")
+            return
+        super().execute(command)
+
+
+def test_encode_decode_roundtrip_and_checksum():
+    line = encode_batch(17, ['l12,-3', 'U', 'X250', 'B'])
+    assert line.startswith('M17:L12,-3;U;X250;B*')
+    assert int(line[-2:], 16) == checksum(line[:-3])
+    assert decode_batch(line) == (17, ['L12,-3', 'U', 'X250', 'B'])
+    assert decode_batch(encode_batch(0, [])) == (0, [])
+    assert batch_echo(line) == 'M17' and batch_echo('l5,5') == 'L5,5'
+    with pytest.raises(BatchError):
+        decode_batch(line.replace('X250', 'X251'))
+    with pytest.raises(BatchError):
+        decode_batch('M3:L1,1')
+
+
+def test_batcher_groups_by_rtt_and_size():
+    moves = [f"L{(i % 7 + 1) * 10},-{i % 5 + 1}" for i in range(100)]
+    batcher = AdaptiveBatcher(rtt_s=1.0, max_bytes=60)
+    lines = list(batcher.wrap(['H'] + moves + ['P']))
+    assert lines[0] == 'H' and lines[-1] == 'P'
+    assert all(len(line) <= 60 for line in lines)
+    assert sum(len(decode_batch(line)[1]) for line in lines if is_batch(line)) == 100
+    assert batcher.batches == len(lines) - 2 and batcher.batched_commands == 100
+
+    # Con un RTT corto los lotes duran menos (más líneas)
+    short = AdaptiveBatcher(rtt_s=0.01, max_bytes=60)
+    assert len(list(short.wrap(moves))) > len(lines) - 2
+
+    # Las respuestas se consumen en orden; un lote sin "OK" es un error
+    assert batcher.on_response(['> H']) == 1
+    first = decode_batch(lines[1])
+    assert batcher.on_response([f'M{first[0]} OK']) == len(first[1])
+    with pytest.raises(BatchError, match='CHK'):
+        batcher.on_response(['⚠ M2 CHK'])
+
+
+def test_simulator_runs_batches_quietly_and_rejects_bad_batches():
+    cnc = SimulatedCNC(max_x=2000, max_y=2000)
+    cnc.execute(encode_batch(5, ['L100,50', 'B', 'X20', 'U', 'Y-10']))
+    output = ''.join(text for _, text in cnc.take_output()).splitlines()
+    assert (cnc.x, cnc.y) == (120, 40) and not cnc.pen_down
+    assert output[-1] == 'M5 OK' and not any(line.startswith('Movimiento') for line in output)
+
+    bad = encode_batch(6, ['X300'])
+    cnc.execute(bad[:-2] + ('00' if bad[-2:] != '00' else '01'))
+    assert ''.join(text for _, text in cnc.take_output()).splitlines()[-1] == '⚠ M6 CHK'
+    assert (cnc.x, cnc.y) == (120, 40)
+
+    # Un comando mal formado al final: no se ejecuta ni lo anterior
+    cnc.execute(encode_batch(7, ['X30', 'B', 'V1,2']))
+    assert ''.join(text for _, text in cnc.take_output()).splitlines()[-1] == '⚠ M7 ? V1,2'
+    assert (cnc.x, cnc.y) == (120, 40) and not cnc.pen_down
+
+
+def _plot(cnc):
+    engine = PlotterEngine(simulator_time_scale=0, optimize=False, simplify_tolerance=0)
+    sent, logs = [], []
+    engine.add_listener(lambda event, data: (sent if event == EVENT_SENT else
+                                             logs if event == EVENT_LOG else []).append(data))
+    engine.set_origin('top-left')
+    engine.attach(SimulatedSerial(cnc, time_scale=0, timeout=0.05, boot=False))
+    # Trazos densos: muchos segmentos de pocos pasos
+    t = np.linspace(0, 6 * np.pi, 900)
+    spiral = [np.column_stack([300 + 10 * t * np.cos(t), 300 + 10 * t * np.sin(t)])]
+    try:
+        result = engine.plot_drawing(Drawing.from_strokes(spiral))
+    finally:
+        engine.disconnect()
+    assert result.ok
+    last = engine.transform.px_to_steps(np.array([spiral[-1][-1]]))[0]
+    assert (cnc.x, cnc.y) == (int(last[0]), int(last[1]))
+    assert tuple(engine.current_pos) == (cnc.x, cnc.y)
+    return result, sent, logs
+
+
+def test_engine_sends_batches_and_falls_back_on_old_firmware():
+    batched, sent, logs = _plot(SimulatedCNC(max_x=8192, max_y=8192))
+    assert any(line.startswith('📦') for line in logs)
+    single, old_sent, old_logs = _plot(OldFirmwareCNC(max_x=8192, max_y=8192))
+    assert any("no soporta lotes" in line for line in old_logs)
+    assert sum(is_batch(line) for line in old_sent) == 1   # solo la prueba
+    assert batched.commands == single.commands
+    assert len(sent) * 2 < len(old_sent)
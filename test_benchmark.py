@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Benchmark - corpus reproducible, métricas y comparación JSON
+"""
+
+import json
+
+import numpy as np
+
+from cnc_benchmark import CORPUS, compare, main, pen_up_distance, run_benchmark
+
+
+def test_corpus_is_reproducible():
+    for name, generate in CORPUS.items():
+        a = list(generate(np.random.default_rng(3)).strokes())
+        b = list(generate(np.random.default_rng(3)).strokes())
+        assert len(a) == len(b) > 0, name
+        assert all(np.array_equal(x, y) for x, y in zip(a, b)), name
+
+
+def test_pen_up_distance_counts_only_travel():
+    commands = ['U', 'L100,0', 'B', 'L0,100', 'U', 'L-100,0']
+    positions = [(0, 0), (100, 0), (100, 0), (100, 100), (100, 100), (0, 100)]
+    assert pen_up_distance(commands, positions, steps_per_mm=10) == 20.0
+
+
+def test_run_reports_all_metrics_and_sends_everything():
+    document = run_benchmark(['long_diagonals'])
+    result = document['results']['long_diagonals']
+    assert result['completed'] == result['commands']
+    assert result['bytes_sent'] == result['bytes'] + len('P\n')   # + barrera final
+    assert result['dropped_bytes'] == 0
+    assert result['mechanical_s'] > 0 and result['pen_up_mm'] > 0
+    json.dumps(document)
+
+
+def test_compare_flags_regressions(tmp_path):
+    old = {'results': {'a': {'commands': 100, 'wall_s': 1.0}}}
+    new = {'results': {'a': {'commands': 150, 'wall_s': 0.5}}}
+    lines = compare(old, new)
+    assert any(line.startswith('⚠') and 'commands' in line for line in lines)
+    assert any(line.startswith('✓') and 'wall_s' in line for line in lines)
+
+    (tmp_path / 'old.json').write_text(json.dumps(old))
+    (tmp_path / 'new.json').write_text(json.dumps(new))
+    assert main(['compare', str(tmp_path / 'old.json'), str(tmp_path / 'new.json')]) == 1
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de la Calibración por eventos - fases, límites medidos y tiempos máximos
+"""
+
+import pytest
+
+from cnc_calibration import (PHASES, STATE_DONE, STATE_FAILED, CalibrationError,
+                             CalibrationMonitor, CalibrationPhase, run_calibration)
+from cnc_engine import PlotterEngine
+from cnc_simulator import SimulatedCNC, SimulatedSerial
+
+
+def _engine(cnc, time_scale=0):
+    engine = PlotterEngine()
+    engine.attach(SimulatedSerial(cnc, time_scale=time_scale, timeout=0.05, boot=False))
+    return engine
+
+
+def test_monitor_parses_limits_and_completion():
+    monitor = CalibrationMonitor()
+    monitor.begin(PHASES[0])
+    for line in ("═══ FASE 1: Buscando límite IZQUIERDO ═══", "📍 Límite IZQUIERDO: 3120 pasos",
+                 "═══ FASE 2: Buscando límite DERECHO ═══", "📍 Límite DERECHO: 7410 pasos",
+                 "   #define MAX_X_STEPS 10530", "═══ Regresando al ORIGEN (límite izquierdo) ═══"):
+        monitor.feed(line)
+    assert monitor.limits == {'IZQUIERDO': 3120, 'DERECHO': 7410}
+    assert monitor.results == {'MAX_X_STEPS': 10530, 'SPAN_X_STEPS': 7410}
+    assert not monitor.wait(0)
+    monitor.feed("✅ ¡Calibración X COMPLETADA!")
+    assert monitor.wait(0) and monitor.state == STATE_DONE
+
+
+def test_full_calibration_measures_the_travel():
+    cnc = SimulatedCNC(travel=(6000, 5000))
+    engine = _engine(cnc)
+    try:
+        monitor = run_calibration(engine)
+    finally:
+        engine.disconnect()
+    limits = monitor.limits
+    assert engine.max_x_steps == limits['IZQUIERDO'] + limits['DERECHO']
+    assert engine.max_y_steps == limits['INFERIOR'] + limits['SUPERIOR']
+    # De tope a tope: el recorrido más lo que avanza mientras confirma el límite
+    assert 6000 <= limits['DERECHO'] < 6000 + 1000
+    assert 5000 <= limits['SUPERIOR'] < 5000 + 1000
+    assert not monitor.warnings
+    assert (cnc.x, cnc.y) == (0, 0)
+
+
+def test_firmware_error_stops_the_sequence():
+    engine = _engine(SimulatedCNC(imu=False))
+    phases = []
+    try:
+        with pytest.raises(CalibrationError, match="IMU no disponible"):
+            run_calibration(engine, on_phase=lambda index, phase: phases.append(phase.command))
+    finally:
+        engine.disconnect()
+    assert phases == ['C']
+
+
+def test_phase_timeout_reports_where_it_stopped():
+    engine = _engine(SimulatedCNC(), time_scale=1.0)
+    slow = CalibrationPhase('C', "Calibrando eje X", "Calibración X COMPLETADA", 0.8)
+    try:
+        with pytest.raises(CalibrationError, match="no terminó en 1 s") as error:
+            run_calibration(engine, phases=[slow])
+    finally:
+        engine.disconnect()
+    assert "límite" in str(error.value) or "inicio" in str(error.value)
+    assert engine.max_x_steps == 0
+
+
+def test_monitor_ignores_lines_between_phases():
+    monitor = CalibrationMonitor()
+    monitor.feed("⚠ ERROR: IMU no disponible")
+    monitor.begin(PHASES[2])
+    monitor.feed("⚠ ERROR: IMU no disponible")
+    assert monitor.state == STATE_FAILED and monitor.error == "IMU no disponible"
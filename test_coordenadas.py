@@ -4,6 +4,10 @@
 Test de Coordenadas - Verificar que la inversion del eje Y funciona correctamente
 """
 
+import numpy as np
+
+from cnc_transform import CoordinateTransform
+
 def test_coordinate_conversion():
     """Prueba la conversion de coordenadas canvas -> CNC"""
     
@@ -15,17 +19,10 @@ def test_coordinate_conversion():
     scale_factor = canvas_width / work_area_width  # 4.0
     steps_per_mm = 51.2
     
-    def pixel_to_mm(px, py):
-        """Convertir pixeles a mm con origen en SUPERIOR DERECHA"""
-        # X invertido: izquierda canvas = derecha CNC (origen)
-        x_mm = (canvas_width - px) / scale_factor
-        # Y directo: arriba canvas = arriba CNC
-        y_mm = py / scale_factor
-        return x_mm, y_mm
-    
-    def mm_to_steps(mm):
-        """Convertir mm a pasos"""
-        return int(mm * steps_per_mm)
+    # Origen en SUPERIOR DERECHA: X invertido, Y directo
+    transform = CoordinateTransform("top-right", scale_factor, steps_per_mm,
+                                    canvas_width, canvas_height)
+    pixel_to_mm = transform.point_to_mm
     
     print("=" * 70)
     print("  TEST DE CONVERSION DE COORDENADAS")
@@ -54,11 +51,11 @@ def test_coordinate_conversion():
         "Posicion", "Canvas (px)", "CNC (mm)", "CNC (pasos)"))
     print("-" * 70)
     
-    for description, px, py in test_points:
-        x_mm, y_mm = pixel_to_mm(px, py)
-        x_steps = mm_to_steps(x_mm)
-        y_steps = mm_to_steps(y_mm)
-        
+    canvas_points = np.array([(px, py) for _, px, py in test_points], dtype=float)
+    all_mm = transform.px_to_mm(canvas_points)
+    all_steps = transform.mm_to_steps(all_mm)
+    
+    for (description, px, py), (x_mm, y_mm), (x_steps, y_steps) in zip(test_points, all_mm, all_steps):
         print("{:<40} | ({:>3}, {:>3})    | ({:>6.1f}, {:>6.1f}) | ({:>5}, {:>5})".format(
             description, px, py, x_mm, y_mm, x_steps, y_steps))
     
@@ -113,6 +110,7 @@ def test_coordinate_conversion():
     print(f"   CNC: ({x_mm:.1f}, {y_mm:.1f}) mm")
     print(f"   Esperado: (0, 0) mm - ORIGEN CNC")
     print(f"   Resultado: {'OK' if x_mm == 0 and y_mm == 0 else 'ERROR'}")
+    assert x_mm == 0 and y_mm == 0
     print()
     
     # Test 2: Izquierda del canvas = derecha del CNC
@@ -123,6 +121,7 @@ def test_coordinate_conversion():
     print(f"   CNC: ({x_mm:.1f}, {y_mm:.1f}) mm")
     print(f"   Esperado: X cercano a {work_area_width}mm (lejos del origen)")
     print(f"   Resultado: {'OK' if x_mm > 100 else 'ERROR'}")
+    assert x_mm > 100
     print()
     
     # Test 3: Centro debe estar en el centro
@@ -133,6 +132,14 @@ def test_coordinate_conversion():
     print(f"   CNC: ({x_mm:.1f}, {y_mm:.1f}) mm")
     print(f"   Esperado: Cerca de ({work_area_width/2}, {work_area_height/2}) mm")
     print(f"   Resultado: {'OK' if 70 < x_mm < 80 and 70 < y_mm < 80 else 'ERROR'}")
+    assert 70 < x_mm < 80 and 70 < y_mm < 80
+    print()
+    
+    # Test 4: ida y vuelta px -> mm -> px
+    back = transform.mm_to_px(all_mm)
+    print(f"4. Ida y vuelta canvas -> CNC -> canvas")
+    print(f"   Error maximo: {np.abs(back - canvas_points).max():.2e} px")
+    assert np.allclose(back, canvas_points)
     print()
     
     print("=" * 70)
@@ -142,5 +149,34 @@ def test_coordinate_conversion():
     print("Si todos los tests dicen 'OK', la conversion funciona correctamente!")
     print()
 
+
+def test_sin_deriva_de_redondeo():
+    """Muchos movimientos pequeños no deben acumular error (int() truncaba)"""
+    transform = CoordinateTransform("top-left", 4.0, 51.2)
+    # 0.3 px = 0.075 mm = 3.84 pasos por punto
+    stroke_px = np.column_stack([np.arange(1000) * 0.3, np.zeros(1000)])
+    steps = transform.px_to_steps(stroke_px)
+    exact = transform.px_to_mm(stroke_px) * 51.2
+    assert np.abs(steps - exact).max() <= 0.5
+    assert steps[-1, 0] == round(999 * 0.3 / 4.0 * 51.2)
+
+
+def test_todas_las_esquinas():
+    """Cada esquina del canvas es el origen (0, 0) de su configuracion"""
+    corners = {"top-left": (0, 0), "top-right": (600, 0),
+               "bottom-left": (0, 600), "bottom-right": (600, 600)}
+    for corner, origin_px in corners.items():
+        transform = CoordinateTransform(corner)
+        assert np.allclose(transform.px_to_mm([origin_px]), 0)
+        assert np.allclose(transform.px_to_mm([(300, 300)]), 75)
+
+
+def test_holgura():
+    """La holgura se suma al invertir el sentido de un eje"""
+    transform = CoordinateTransform("top-left", 4.0, 10.0, backlash_x=3)
+    steps = transform.mm_to_steps([(0, 0), (10, 0), (5, 0), (5, 1), (8, 0)])
+    assert steps[:, 0].tolist() == [0, 100, 47, 47, 80]
+
+
 if __name__ == "__main__":
     test_coordinate_conversion()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Dibujo Compacto - buffers planos, formato .npz y JSON anterior
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from cnc_drawing import FORMAT_VERSION, Drawing
+
+
+def test_capture_builds_flat_buffers():
+    drawing = Drawing()
+    drawing.begin_stroke(10, 10)
+    drawing.add_point(20, 10)
+    drawing.add_point(30, 15)
+    drawing.begin_stroke(100, 100)  # cierra el trazo anterior
+    drawing.add_point(110, 120)
+    drawing.end_stroke()
+
+    assert len(drawing) == 2
+    assert drawing.num_points == 5
+    assert drawing.offsets.tolist() == [0, 3, 5]
+    assert drawing.stroke(1).tolist() == [[100, 100], [110, 120]]
+    assert drawing.last_point == (110, 120)
+
+
+def test_map_strokes_converts_all_points_at_once():
+    drawing = Drawing.from_strokes([[(0, 0), (4, 8)], [(40, 4)]])
+    calls = []
+
+    def to_mm(points):
+        calls.append(len(points))
+        return points / 4.0
+
+    strokes = drawing.map_strokes(to_mm)
+
+    assert calls == [3]
+    assert strokes[0].tolist() == [[0, 0], [1, 2]]
+    assert strokes[1].tolist() == [[10, 1]]
+
+
+def test_npz_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    drawing = Drawing.from_strokes([rng.uniform(0, 600, (n, 2)) for n in (5, 1, 300)])
+    filename = tmp_path / "dibujo.npz"
+
+    drawing.save(str(filename))
+    loaded = Drawing.load(str(filename))
+
+    assert loaded.offsets.tolist() == drawing.offsets.tolist()
+    assert np.allclose(loaded.points, drawing.points, atol=1e-3)
+
+
+def test_npz_is_smaller_than_legacy_json(tmp_path):
+    rng = np.random.default_rng(1)
+    drawing = Drawing.from_strokes([rng.uniform(0, 600, (500, 2)) for _ in range(20)])
+    legacy = [[(x, y, x / 4, y / 4) for x, y in stroke] for stroke in drawing.strokes()]
+    (tmp_path / "dibujo.json").write_text(json.dumps(legacy))
+
+    drawing.save(str(tmp_path / "dibujo.npz"))
+
+    assert (tmp_path / "dibujo.npz").stat().st_size < (tmp_path / "dibujo.json").stat().st_size / 3
+
+
+def test_legacy_json_import_drops_stale_mm(tmp_path):
+    legacy = [[[100, 50, 999.0, 999.0], [120, 60, 999.0, 999.0]], [[5, 5, 1.0, 1.0]]]
+    filename = tmp_path / "viejo.json"
+    filename.write_text(json.dumps(legacy))
+
+    drawing = Drawing.load(str(filename))
+
+    assert len(drawing) == 2
+    assert drawing.stroke(0).tolist() == [[100, 50], [120, 60]]
+
+
+def test_newer_format_version_is_rejected(tmp_path):
+    filename = tmp_path / "futuro.npz"
+    np.savez(filename, version=np.int32(FORMAT_VERSION + 1),
+             points=np.zeros((0, 2), np.float32), offsets=np.zeros(1, np.int64))
+
+    with pytest.raises(ValueError):
+        Drawing.load(str(filename))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Motor y el CLI - trabajos completos sin Tk contra el simulador
+"""
+
+import numpy as np
+import pytest
+
+from cnc_cli import main
+from cnc_drawing import Drawing
+from cnc_engine import (EVENT_CONNECTION, EVENT_JOB_DONE, EVENT_PROGRESS, JOB_COMPLETED,
+                        JOB_FAILED, PlotterEngine)
+from cnc_simulator import SIMULATOR_PORT
+
+
+@pytest.fixture
+def engine():
+    engine = PlotterEngine(simulator_time_scale=0)
+    events = []
+    engine.add_listener(lambda event, data: events.append((event, data)))
+    engine.events = events
+    engine.set_origin("top-left")
+    engine.connect(SIMULATOR_PORT, boot_wait=0)
+    yield engine
+    engine.disconnect()
+
+
+def _of(engine, kind):
+    return [data for event, data in engine.events if event == kind]
+
+
+def test_plot_drawing_reaches_the_last_point(engine):
+    drawing = Drawing.from_strokes([np.array([(60, 60), (300, 120), (300, 400)], dtype=float),
+                                    np.array([(500, 500), (520, 540)], dtype=float)])
+    result = engine.plot_drawing(drawing)
+    assert result.ok and result.commands > 0
+
+    cnc = engine.serial_port.cnc
+    assert (cnc.x, cnc.y) == tuple(engine.current_pos)
+    assert not cnc.pen_down
+
+    progress = _of(engine, EVENT_PROGRESS)
+    fractions = [p.fraction for p in progress]
+    assert fractions == sorted(fractions) and fractions[-1] == pytest.approx(1.0)
+    assert _of(engine, EVENT_JOB_DONE) == [result]
+    assert _of(engine, EVENT_CONNECTION) == [True]
+
+
+def test_plot_gcode_streams_file(engine, tmp_path):
+    gcode = tmp_path / "cuadrado.gcode"
+    gcode.write_text("G21 G90\nG0 X10 Y10\nM3\nG1 X40\nG1 Y40\nG1 X10\nG1 Y10\nM5\n")
+    result = engine.plot_gcode(str(gcode))
+    assert result.status == JOB_COMPLETED
+
+    steps = engine.transform.mm_to_steps(np.array([[10.0, 10.0]]))[0]
+    cnc = engine.serial_port.cnc
+    assert (cnc.x, cnc.y) == tuple(steps)
+
+
+def test_touching_strokes_save_pen_lifts(engine):
+    # Un cuadrado dibujado como cuatro trazos que se tocan
+    corners = [(100, 100), (300, 100), (300, 300), (100, 300), (100, 100)]
+    drawing = Drawing.from_strokes(np.array([a, b], dtype=float)
+                                   for a, b in zip(corners, corners[1:]))
+    result = engine.plot_drawing(drawing)
+    assert result.ok and result.lifts_avoided == 3
+    cnc = engine.serial_port.cnc
+    assert cnc.z == 0 and not cnc.pen_down
+
+
+def test_job_without_connection_fails_cleanly():
+    engine = PlotterEngine()
+    result = engine.plot_drawing(Drawing.from_strokes([np.zeros((2, 2))]))
+    assert result.status == JOB_FAILED and not engine.is_drawing
+
+
+def test_load_drawing_gcode_round_trip(tmp_path):
+    engine = PlotterEngine()
+    engine.set_origin("bottom-right")
+    gcode = tmp_path / "linea.nc"
+    gcode.write_text("G0 X5 Y7\nG1 Z-1\nG1 X25 Y30\nG0 Z5\n")
+    drawing = engine.load_drawing(str(gcode))
+    assert np.allclose(engine.mm_strokes(drawing)[0], [(5, 7), (25, 30)])
+
+
+def test_cli_plot_and_stats(tmp_path, capsys):
+    svg = tmp_path / "circulo.svg"
+    svg.write_text('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
+                   '<circle cx="50" cy="50" r="40"/></svg>')
+    assert main(['stats', str(svg)]) == 0
+    assert "Segmentos:" in capsys.readouterr().out
+
+    journal = str(tmp_path / "trabajo.jsonl")
+    assert main(['plot', str(svg), '--port', SIMULATOR_PORT, '--time-scale', '0',
+                 '--journal', journal]) == 0
+    assert "✓ Dibujo completado!" in capsys.readouterr().err
+    # Completo: no queda nada para reanudar
+    assert main(['resume', '--port', SIMULATOR_PORT, '--journal', journal]) == 1
+    assert "No hay ningún trabajo" in capsys.readouterr().err
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de la Flota - identificación por banner, reparto de trabajos y fallos
+"""
+
+import asyncio
+import time
+
+from cnc_fleet import DEVICE_OFFLINE, FleetController, identify_port
+from cnc_planner import plan
+from cnc_simulator import SimulatedSerial
+
+
+class OtherDevicePort:
+    """Otro aparato serial: habla, pero no es nuestro firmware"""
+
+    timeout = 0.02
+    in_waiting = 0
+
+    def __init__(self):
+        self.written = []
+        self._pending = b"GPS READY\r\n$GPGGA,,,,\r\n"
+        self.closed = False
+
+    def write(self, data):
+        self.written.append(data)
+        return len(data)
+
+    def read(self, size=1):
+        if self._pending:
+            data, self._pending = self._pending[:size], self._pending[size:]
+            return data
+        time.sleep(self.timeout)
+        return b''
+
+    def close(self):
+        self.closed = True
+
+
+class SilentPort(OtherDevicePort):
+    """Acepta todo y nunca responde"""
+
+    def __init__(self):
+        super().__init__()
+        self._pending = b''
+
+
+def _simulator(**options):
+    options.setdefault('time_scale', 0)
+    return SimulatedSerial(timeout=0.05, **options)
+
+
+def _job(offset):
+    commands, _, _ = plan([[(100 + offset, 100), (900, 700)], [(50, 400), (60, 500 + offset)]])
+    return commands
+
+
+def test_identify_by_banner_or_position_probe():
+    assert identify_port(_simulator(), timeout=1.0)
+    quiet = _simulator(boot=False)                 # no se reinició al abrir
+    assert identify_port(quiet, timeout=1.0, probe_after=0.05)
+    other = OtherDevicePort()
+    assert not identify_port(other, timeout=0.3, probe_after=0.1)
+    assert other.written == [b'P\n']
+
+
+def test_discover_keeps_only_plotters():
+    ports = {'COM3': _simulator(), 'COM4': OtherDevicePort(), 'COM5': _simulator(boot=False)}
+
+    def opener(name):
+        if name == 'COM9':
+            raise OSError("acceso denegado")
+        return ports[name]
+
+    async def scenario():
+        fleet = FleetController(opener, identify_timeout=0.5, probe_after=0.1)
+        found = await fleet.discover(['COM3', 'COM4', 'COM5', 'COM9'])
+        await fleet.close()
+        return found
+
+    assert sorted(asyncio.run(scenario())) == ['COM3', 'COM5']
+    assert ports['COM4'].closed
+
+
+def test_jobs_are_spread_over_idle_machines():
+    ports = {name: _simulator(time_scale=0.002) for name in ('A', 'B', 'C')}
+    jobs = [_job(i * 10) for i in range(6)]
+
+    async def scenario():
+        fleet = FleetController(ports.__getitem__)
+        await fleet.discover(ports)
+        submitted = [fleet.submit(commands) for commands in jobs]
+        await fleet.join()
+        await fleet.close()
+        return fleet, submitted
+
+    fleet, submitted = asyncio.run(scenario())
+    assert all(job.ok and job.completed == len(job.commands) for job in submitted)
+    stats = fleet.stats()
+    assert all(s['jobs_completed'] >= 1 for s in stats.values())
+    assert sum(s['jobs_completed'] for s in stats.values()) == len(jobs)
+    assert sum(s['commands'] for s in stats.values()) == sum(map(len, jobs))
+    for port in ports.values():
+        assert not port.cnc.pen_down and port.dropped_bytes == 0
+
+
+def test_job_moves_to_another_machine_when_one_stops_answering():
+    healthy = _simulator()
+
+    async def scenario():
+        fleet = FleetController(ack_timeout=0.3)
+        await fleet.add_device('MUDO', SilentPort())
+        await fleet.add_device('OK', healthy)
+        submitted = [fleet.submit(_job(0)), fleet.submit(_job(20))]
+        await fleet.join()
+        await fleet.close()
+        return fleet, submitted
+
+    fleet, submitted = asyncio.run(scenario())
+    assert all(job.ok and job.device == 'OK' for job in submitted)
+    stats = fleet.stats()
+    assert stats['MUDO']['state'] == DEVICE_OFFLINE and stats['MUDO']['jobs_failed'] == 1
+    assert stats['OK']['jobs_completed'] == 2
+
+
+def test_queued_jobs_fail_when_no_machine_is_left():
+    async def scenario():
+        fleet = FleetController(ack_timeout=0.3)
+        await fleet.add_device('MUDO', SilentPort())
+        submitted = [fleet.submit(_job(0)), fleet.submit(_job(20))]
+        await asyncio.wait_for(fleet.join(), timeout=10)
+        late = fleet.submit(_job(40))      # ya no queda nadie: falla enseguida
+        await fleet.close()
+        return submitted + [late]
+
+    jobs = asyncio.run(scenario())
+    assert all(job.done.done() and not job.ok for job in jobs)
+    assert isinstance(jobs[1].error, ConnectionError) and jobs[1].device is None
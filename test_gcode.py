@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Importador G-code - trazos, arcos, unidades y compilación a comandos
+"""
+
+import numpy as np
+import pytest
+
+from cnc_gcode import GCodeParser, arc_points, iter_gcode_commands, iter_strokes
+from cnc_transform import CoordinateTransform
+
+
+def test_pen_by_z_and_relative_moves():
+    program = """
+    G21 G90 (mm, absoluto)
+    G0 X10 Y10
+    G1 Z-1 F500
+    G1 X20 ; lado
+    G91
+    G1 Y5
+    G90
+    G0 Z5
+    G0 X0 Y0
+    """
+    strokes = list(iter_strokes(program.splitlines()))
+    assert len(strokes) == 1
+    assert np.allclose(strokes[0], [(10, 10), (20, 10), (20, 15)])
+
+
+def test_pen_by_m3_m5_and_inches():
+    program = ["G20", "G0 X1 Y0", "M3", "G1 X2", "M5", "M3", "G0 X3", "G1 Y1", "M5"]
+    strokes = list(iter_strokes(program))
+    assert len(strokes) == 2
+    assert np.allclose(strokes[0], [(25.4, 0), (50.8, 0)])
+    # M3 seguido de G0: el punto de bajada no se dibuja
+    assert np.allclose(strokes[1], [(76.2, 0), (76.2, 25.4)])
+
+
+def test_arc_respects_chord_tolerance():
+    tolerance = 0.01
+    points = arc_points((10, 0), (0, 10), (0, 0), clockwise=False, tolerance=tolerance)
+    assert np.allclose(points[-1], (0, 10))
+    assert np.allclose(np.hypot(points[:, 0], points[:, 1]), 10)
+
+    # Flecha de cada cuerda: r - distancia del centro al punto medio
+    full = np.vstack([(10, 0), points])
+    mid = (full[1:] + full[:-1]) / 2
+    assert (10 - np.hypot(mid[:, 0], mid[:, 1])).max() <= tolerance
+
+
+def test_arc_ij_and_r_give_same_result():
+    ij = list(iter_strokes(["G0 X0 Y0", "M3", "G2 X10 Y0 I5 J0", "M5"]))[0]
+    r = list(iter_strokes(["G0 X0 Y0", "M3", "G2 X10 Y0 R5", "M5"]))[0]
+    assert np.allclose(ij, r)
+    # Horario desde (0,0) a (10,0) con centro (5,0) pasa por arriba (Y+)
+    assert ij[:, 1].max() == pytest.approx(5, abs=0.05)
+
+
+def test_full_circle():
+    stroke = list(iter_strokes(["G0 X10 Y0", "M3", "G3 X10 Y0 I-10 J0", "M5"]))[0]
+    assert np.allclose(stroke[0], stroke[-1])
+    assert stroke[:, 1].min() < -9.9 and stroke[:, 1].max() > 9.9
+
+
+def test_streaming_yields_strokes_before_end_of_input():
+    def lines():
+        yield "G0 X0 Y0"
+        yield "M3"
+        yield "G1 X10"
+        yield "M5"
+        raise AssertionError("no debería leer más allá del primer trazo")
+
+    parser = GCodeParser()
+    first = next(iter_strokes(lines(), parser))
+    assert np.allclose(first, [(0, 0), (10, 0)])
+    assert parser.line_number == 4
+
+
+def test_compiles_to_plotter_commands():
+    transform = CoordinateTransform("top-left", steps_per_mm=10.0)
+    strokes = iter_strokes(["G0 X1 Y1", "G1 Z-1", "G1 X2 Y3", "G1 Z1"])
+    commands = [command for command, _ in iter_gcode_commands(strokes, transform)]
+    assert commands == ['H', 'L10,10', 'B', 'L10,20', 'U']
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Diario de Trabajos - checkpoints, pausa real y reanudar tras un corte
+"""
+
+import threading
+
+import numpy as np
+
+from cnc_calibration import PHASES, run_calibration
+from cnc_drawing import Drawing
+from cnc_engine import (EVENT_LOG, EVENT_PROGRESS, JOB_COMPLETED, JOB_FAILED, JOB_STOPPED,
+                        PlotterEngine)
+from cnc_journal import JobJournal, replay
+from cnc_simulator import SimulatedCNC, SimulatedSerial
+
+
+def test_journal_round_trip_and_torn_tail(tmp_path):
+    journal = JobJournal(str(tmp_path / 'trabajo.jsonl'), sync_interval_s=60, sync_records=3)
+    journal.begin('drawing', 'abc', {'origin_corner': 'top-left'}, commands=['H', 'X10', 'B'])
+    for completed in range(1, 8):
+        journal.record(completed, (completed * 10, -completed), completed % 2 == 1)
+    assert journal.syncs == 2     # fsync por tandas, no por registro
+    journal.sync()
+    checkpoint = journal.load()
+    assert (checkpoint.kind, checkpoint.session, checkpoint.commands) == ('drawing', 'abc',
+                                                                         ['H', 'X10', 'B'])
+    assert (checkpoint.completed, checkpoint.position, checkpoint.pen_down) == (7, (70, -7), True)
+    assert checkpoint.status is None
+
+    # Un corte a mitad de una línea: vale el último checkpoint completo
+    with open(journal.filename, 'a') as f:
+        f.write("8 80 -")
+    assert journal.load().completed == 7
+
+    journal.begin('drawing', 'abc', {}, commands=['H'])
+    journal.record(1, (0, 0), False)
+    journal.finish(JOB_STOPPED)
+    assert journal.load().status == JOB_STOPPED
+    journal.begin('drawing', 'abc', {}, commands=['H'])
+    journal.finish(JOB_COMPLETED, completed=True)
+    assert journal.load() is None and list(tmp_path.iterdir()) == []
+
+
+def test_replay_follows_position_and_pen():
+    states = [state[1:] for state in replay(['H', 'L10,5', 'B', 'V5,0,2000,1500', 'U', 'Y-3'])]
+    assert states == [((0, 0), False), ((10, 5), False), ((10, 5), True), ((15, 5), True),
+                      ((15, 5), False), ((15, 2), False)]
+
+
+def _engine(cnc, journal, events):
+    engine = PlotterEngine(simulator_time_scale=0, optimize=False, journal=journal)
+    engine.add_listener(lambda event, data: events.append((event, data)))
+    engine.set_origin('top-left')
+    engine.attach(SimulatedSerial(cnc, time_scale=0, timeout=0.05, boot=False))
+    return engine
+
+
+def _drawing():
+    t = np.linspace(0, 4 * np.pi, 200)
+    return Drawing.from_strokes([np.column_stack([300 + 20 * t * np.cos(t),
+                                                  300 + 20 * t * np.sin(t)]),
+                                 np.array([(50, 50), (550, 60), (540, 550)], dtype=float)])
+
+
+def _stop_after(engine, events, count, action):
+    def listener(event, data):
+        if event == EVENT_PROGRESS:
+            listener.seen += 1
+            if listener.seen == count:
+                action()
+    listener.seen = 0
+    engine.add_listener(listener)
+    return listener
+
+
+def _last_point(engine, drawing):
+    last = engine.transform.px_to_steps(list(drawing.strokes())[-1][-1:])[0]
+    return int(last[0]), int(last[1])
+
+
+def test_pause_waits_and_resume_continues(tmp_path):
+    cnc, events = SimulatedCNC(max_x=8192, max_y=8192), []
+    engine = _engine(cnc, JobJournal(str(tmp_path / 'trabajo.jsonl')), events)
+    paused = []
+
+    def pause():
+        engine.pause()
+        paused.append(engine.is_paused)
+        threading.Timer(0.2, engine.resume).start()
+
+    _stop_after(engine, events, 10, pause)
+    drawing = _drawing()
+    try:
+        result = engine.plot_drawing(drawing)
+    finally:
+        engine.disconnect()
+    assert result.status == JOB_COMPLETED and paused == [True]
+    logs = [data for event, data in events if event == EVENT_LOG]
+    assert any(line.startswith('⏸️') for line in logs) and any(line.startswith('▶️') for line in logs)
+    assert (cnc.x, cnc.y) == _last_point(engine, drawing)
+    assert engine.pending_job() is None     # completo: sin diario
+
+
+def test_stopped_job_resumes_from_the_checkpoint(tmp_path):
+    cnc, events = SimulatedCNC(max_x=8192, max_y=8192), []
+    engine = _engine(cnc, JobJournal(str(tmp_path / 'trabajo.jsonl')), events)
+    _stop_after(engine, events, 40, engine.stop)
+    drawing = _drawing()
+    try:
+        stopped = engine.plot_drawing(drawing)
+        checkpoint = engine.pending_job()
+        assert stopped.status == JOB_STOPPED and checkpoint.status == JOB_STOPPED
+        assert checkpoint.completed == stopped.commands > 40
+        assert checkpoint.position == (cnc.x, cnc.y)
+
+        sent_before = cnc.commands
+        resumed = engine.resume_job()
+    finally:
+        engine.disconnect()
+    assert resumed.status == JOB_COMPLETED and resumed.commands == checkpoint.total
+    # Solo lo que faltaba (+ P, U y las pruebas de lotes/rampas)
+    assert cnc.commands - sent_before < checkpoint.total - checkpoint.completed + 10
+    assert (cnc.x, cnc.y) == _last_point(engine, drawing)
+    assert engine.pending_job() is None
+
+
+def test_resume_after_reconnect_rehomes_first(tmp_path):
+    journal = JobJournal(str(tmp_path / 'trabajo.jsonl'))
+    cnc, events = SimulatedCNC(max_x=8192, max_y=8192, travel=(9000, 9000)), []
+    engine = _engine(cnc, journal, events)
+    run_calibration(engine, PHASES[:2])
+    _stop_after(engine, events, 30, engine.stop)
+    drawing = _drawing()
+    engine.plot_drawing(drawing)
+    engine.disconnect()
+
+    # Corte de USB: al reconectar el ESP32 arranca de nuevo contando desde 0
+    # donde quedó el carro
+    cnc.x = cnc.y = cnc.z = 0
+    cnc.pen_down = False
+    engine = _engine(cnc, journal, [])
+    try:
+        refused = engine.resume_job()
+        assert refused.status == JOB_FAILED and "origen" in refused.message
+        assert journal.load() is not None
+        result = engine.resume_job(rehome=lambda: run_calibration(engine, PHASES[:2]))
+    finally:
+        engine.disconnect()
+    assert result.status == JOB_COMPLETED
+    assert (cnc.x, cnc.y) == _last_point(engine, drawing)
+    assert tuple(cnc.physical) == (cnc.x, cnc.y)   # mismo origen que al empezar
+
+
+def test_gcode_resumes_by_rereading_the_file(tmp_path):
+    gcode = tmp_path / 'zigzag.nc'
+    gcode.write_text("G0 X5 Y5\nG1 Z-1\n" + "".join(f"G1 X{5 + 3 * (i % 2)} Y{5 + i}\n"
+                                                    for i in range(60)) + "G0 Z5\n")
+    cnc, events = SimulatedCNC(max_x=8192, max_y=8192), []
+    engine = _engine(cnc, JobJournal(str(tmp_path / 'trabajo.jsonl')), events)
+    _stop_after(engine, events, 25, engine.stop)
+    try:
+        stopped = engine.plot_gcode(str(gcode))
+        assert stopped.status == JOB_STOPPED
+        resumed = engine.resume_job()
+    finally:
+        engine.disconnect()
+    assert resumed.status == JOB_COMPLETED and resumed.commands > stopped.commands
+    last = engine.transform.mm_to_steps(np.array([(8, 64)]))[0]
+    assert (cnc.x, cnc.y) == (int(last[0]), int(last[1]))
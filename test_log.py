@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de la Consola por Lotes - cola, búfer circular y archivo con rotación
+"""
+
+import threading
+
+from cnc_log import ConsoleLog
+
+
+class FakeText:
+    """Sustituto mínimo de tk.Text (solo lo que usa ConsoleLog)"""
+
+    def __init__(self):
+        self.text = ''
+        self.inserts = 0
+
+    def config(self, **kwargs):
+        pass
+
+    def insert(self, index, text):
+        self.text += text
+        self.inserts += 1
+
+    def index(self, index):
+        return f"{self.text.count(chr(10)) + 1}.0"
+
+    def delete(self, first, last):
+        lines = self.text.split('\n')
+        if last == 'end':
+            self.text = ''
+        else:
+            self.text = '\n'.join(lines[int(last.split('.')[0]) - 1:])
+
+    def see(self, index):
+        pass
+
+
+class FakeRoot:
+    def after(self, ms, callback):
+        pass
+
+
+def test_messages_are_flushed_in_one_insert():
+    console = ConsoleLog()
+    widget = FakeText()
+    console.attach(FakeRoot(), widget)
+    for i in range(100):
+        console.write(f"← línea {i}")
+
+    console.flush()
+
+    assert widget.inserts == 1
+    assert widget.text.splitlines()[-1] == "← línea 99"
+
+
+def test_visible_lines_are_capped():
+    console = ConsoleLog(max_lines=50)
+    widget = FakeText()
+    console.attach(FakeRoot(), widget)
+    for batch in range(5):
+        for i in range(30):
+            console.write(f"{batch}-{i}")
+        console.flush()
+
+    visible = widget.text.splitlines()
+    assert len(visible) == 50
+    assert visible[-1] == "4-29"
+    assert list(console.lines) == visible
+
+
+def test_write_is_thread_safe():
+    console = ConsoleLog(max_lines=10000)
+    threads = [threading.Thread(target=lambda: [console.write("x") for _ in range(1000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(console.drain()) == 4000
+
+
+def test_mirror_to_rotating_file(tmp_path):
+    log_file = tmp_path / "logs" / "consola.log"
+    console = ConsoleLog(log_file=str(log_file), max_bytes=2000, backup_count=2)
+    for i in range(200):
+        console.write(f"mensaje {i}")
+
+    assert log_file.exists()
+    assert (tmp_path / "logs" / "consola.log.1").exists()
+    assert "mensaje 199" in log_file.read_text(encoding='utf-8')
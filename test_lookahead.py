@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Planificador de Velocidad - perfiles, esquinas, look-ahead y tiempo ahorrado
+"""
+
+import numpy as np
+
+from cnc_drawing import Drawing
+from cnc_engine import EVENT_LOG, PlotterEngine
+from cnc_lookahead import (ACCEL_STEPS_S2, CRUISE_SPEED, START_DELAY_US, START_SPEED,
+                           LookaheadPlanner, compare_seconds, junction_speed, parse_velocity,
+                           peak_acceleration, step_intervals)
+from cnc_position import PositionTracker
+from cnc_simulator import SimulatedCNC, SimulatedSerial
+
+
+def _circle_commands(radius=2000, points=200):
+    t = np.linspace(0, 2 * np.pi, points)
+    path = np.round(np.column_stack([radius * np.cos(t), radius * np.sin(t)])).astype(int)
+    return ['B'] + [f"L{dx},{dy}" for dx, dy in np.diff(path, axis=0)] + ['U']
+
+
+def _stroke_intervals(commands):
+    """Intervalos de todos los pasos seguidos, como los daría el firmware"""
+    intervals = []
+    for command in commands:
+        velocity = parse_velocity(command)
+        if velocity is not None:
+            dx, dy, entry_us, exit_us = velocity
+            intervals.extend(step_intervals(max(abs(dx), abs(dy)), 1e6 / entry_us, 1e6 / exit_us))
+    return np.array(intervals)
+
+
+def test_reference_profile_ramps_within_the_acceleration():
+    intervals = step_intervals(2000, START_SPEED, START_SPEED)
+    assert intervals[0] == intervals[-1] == 1 / START_SPEED
+    assert np.isclose(intervals.min(), 1 / CRUISE_SPEED)
+    assert peak_acceleration(intervals) <= ACCEL_STEPS_S2 * 1.001
+    # Un movimiento corto no llega a crucero: sube y baja
+    short = step_intervals(40, START_SPEED, START_SPEED)
+    assert short.min() > 1 / CRUISE_SPEED and short.sum() < 40 / START_SPEED
+
+
+def test_junction_speed_depends_on_the_angle():
+    assert junction_speed((100, 0), (100, 0)) == CRUISE_SPEED
+    assert junction_speed((100, 0), (0, 100)) == START_SPEED      # esquina a 90°
+    assert junction_speed((100, 0), (-100, 0)) == START_SPEED     # vuelta atrás
+    assert START_SPEED < junction_speed((100, 0), (100, 30)) < CRUISE_SPEED
+
+
+def test_curves_flow_through_and_corners_stop():
+    commands = _circle_commands()
+    planner = LookaheadPlanner()
+    sent = list(planner.wrap(commands))
+    assert len(sent) == len(commands) and sent[0] == 'B' and sent[-1] == 'U'
+    profiles = [parse_velocity(command) for command in sent[1:-1]]
+    assert profiles[0][2] == START_DELAY_US and profiles[-1][3] == START_DELAY_US
+    assert all(a[3] == b[2] for a, b in zip(profiles, profiles[1:]))   # sin saltos
+    assert min(profile[2] for profile in profiles) < START_DELAY_US * 0.7
+    assert peak_acceleration(_stroke_intervals(sent)) <= ACCEL_STEPS_S2 * 1.01
+    assert planner.saved_seconds > 0.3 * planner.constant_seconds
+
+    square = list(LookaheadPlanner().wrap(['L2000,0', 'L0,2000', 'L-2000,0']))
+    assert all(parse_velocity(c)[2:] == (START_DELAY_US, START_DELAY_US) for c in square)
+    constant, planned = compare_seconds(['L2000,0', 'L0,2000', 'L-2000,0'])
+    assert constant == 12.0 and planned < constant
+    # Sin espacio para acelerar se manda el comando original
+    assert list(LookaheadPlanner().wrap(['L3,0', 'L0,3'])) == ['L3,0', 'L0,3']
+
+
+def test_short_window_commits_only_feasible_speeds():
+    commands = [f"L50,{i % 2}" for i in range(100)]
+    sent = list(LookaheadPlanner(lookahead=8).wrap(commands))
+    profiles = [parse_velocity(command) for command in sent]
+    assert all(a[3] == b[2] for a, b in zip(profiles, profiles[1:]))
+    assert profiles[-1][3] == START_DELAY_US
+    assert peak_acceleration(_stroke_intervals(sent)) <= ACCEL_STEPS_S2 * 1.01
+
+
+def test_tracker_drops_the_profile_of_clipped_moves():
+    tracker = PositionTracker(limits=(1000, 1000))
+    sent = list(tracker.wrap(['V-300,100,2000,1500', 'V500,0,1500,1500',
+                              'V100,0,1500,2000']))
+    # Los recortados van sin rampa; el siguiente V arranca desde parado
+    assert sent == ['Y100', 'X200', 'V100,0,2000,2000', 'P']
+
+
+def _plot(lookahead):
+    cnc = SimulatedCNC(max_x=8192, max_y=8192)
+    engine = PlotterEngine(simulator_time_scale=0, optimize=False, lookahead=lookahead)
+    logs = []
+    engine.add_listener(lambda event, data: logs.append(data) if event == EVENT_LOG else None)
+    engine.set_origin('top-left')
+    engine.attach(SimulatedSerial(cnc, time_scale=0, timeout=0.05, boot=False))
+    t = np.linspace(0, 2 * np.pi, 300)
+    circle = np.column_stack([300 + 150 * np.cos(t), 300 + 150 * np.sin(t)])
+    try:
+        result = engine.plot_drawing(Drawing.from_strokes([circle]))
+    finally:
+        engine.disconnect()
+    assert result.ok
+    last = engine.transform.px_to_steps(circle[-1:])[0]
+    assert (cnc.x, cnc.y) == (int(last[0]), int(last[1]))
+    return cnc.clock, logs
+
+
+def test_engine_drawing_is_faster_with_lookahead():
+    constant, _ = _plot(False)
+    planned, logs = _plot(True)
+    assert planned < 0.85 * constant
+    assert any(line.startswith('🏎️') for line in logs)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Modelo de Movimiento - duración por comando y ETA autocalibrado
+"""
+
+import numpy as np
+import pytest
+
+from cnc_motion import EtaEstimator, MotionModel, format_duration
+from cnc_planner import plan
+from cnc_simulator import SimulatedCNC
+
+
+def test_model_matches_simulated_firmware():
+    commands, _, _ = plan([[(100, 100), (900, 350), (900, 900)], [(50, 400), (60, 410)]])
+    commands += ['B', 'B', 'H', 'P']   # lápiz repetido y home con el lápiz abajo
+    cnc = SimulatedCNC()
+    expected = []
+    for command in commands:
+        before = cnc.clock
+        cnc.execute(command)
+        expected.append(cnc.clock - before)
+
+    model = MotionModel(command_overhead_s=0, baud_rate=0)
+    assert np.allclose(model.durations(commands), expected)
+
+
+def test_serial_overhead_depends_on_command_length():
+    model = MotionModel(step_delay_s=0, pen_settle_s=0, command_overhead_s=0)
+    short, long = model.durations(['X1', 'L-1000,1000'])
+    assert long > short > 0
+
+
+def test_progress_is_measured_in_time_not_lines():
+    # Un trazo enorme seguido de 99 puntos
+    motion = np.array([100.0] + [0.01] * 99)
+    eta = EtaEstimator(motion, np.zeros(100))
+    eta.start(now=0.0)
+    eta.update(1, now=100.0)
+    assert eta.fraction() > 0.99
+    assert eta.remaining_seconds() == pytest.approx(0.99, rel=0.05)
+
+    eta = EtaEstimator(motion[::-1].copy(), np.zeros(100))
+    eta.start(now=0.0)
+    eta.update(99, now=0.99)
+    assert eta.fraction() < 0.02
+
+
+def test_eta_calibrates_to_the_observed_pace():
+    rng = np.random.default_rng(0)
+    motion = rng.uniform(0, 0.5, 400)
+    overhead = np.full(400, 0.01)
+    actual = 1.3 * motion + 3.0 * overhead   # la máquina real es más lenta
+
+    eta = EtaEstimator(motion, overhead)
+    eta.start(now=0.0)
+    now = 0.0
+    for i in range(200):
+        now += actual[i]
+        eta.update(i + 1, now=now)
+
+    assert eta.motion_scale == pytest.approx(1.3, rel=0.05)
+    assert eta.remaining_seconds() == pytest.approx(actual[200:].sum(), rel=0.03)
+
+
+def test_pause_is_not_used_for_calibration():
+    eta = EtaEstimator(np.full(10, 1.0), np.zeros(10))
+    eta.start(now=0.0)
+    eta.update(1, now=1.0)
+    eta.update(2, now=600.0)   # diez minutos en pausa
+    assert eta.motion_scale == pytest.approx(1.0, rel=0.05)
+    assert eta.remaining_seconds() == pytest.approx(8.0, rel=0.05)
+
+
+def test_format_duration():
+    assert format_duration(247) == "4:07"
+    assert format_duration(3903) == "1:05:03"
+    assert format_duration(-3) == "0:00"
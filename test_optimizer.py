@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Optimizador de Recorrido - orden e inversión de trazos
+"""
+
+import time
+
+import numpy as np
+
+from cnc_optimizer import optimize_order, travel_distance
+
+
+def _travel(strokes, start=(0.0, 0.0)):
+    starts = np.array([s[0] for s in strokes], dtype=float)
+    ends = np.array([s[-1] for s in strokes], dtype=float)
+    return travel_distance(starts, ends, start)
+
+
+def test_reverses_stroke_that_ends_closer():
+    # El segundo trazo termina junto al primero: conviene recorrerlo al revés
+    strokes = [[(0, 0), (10, 0)], [(100, 0), (11, 0)]]
+    result = optimize_order(strokes)
+
+    assert result.order == [0, 1]
+    assert result.reversed == [False, True]
+    assert result.apply(strokes)[1] == [(11, 0), (100, 0)]
+    assert result.travel_after < result.travel_before
+
+
+def test_result_is_a_permutation_and_never_worse():
+    rng = np.random.default_rng(3)
+    strokes = [[tuple(p), tuple(p + rng.normal(0, 5, 2))] for p in rng.uniform(0, 500, (300, 2))]
+
+    result = optimize_order(strokes)
+
+    assert sorted(result.order) == list(range(300))
+    assert abs(_travel(result.apply(strokes)) - result.travel_after) < 1e-6
+    assert result.travel_after <= result.travel_before
+    assert result.travel_saved == result.travel_before - result.travel_after
+
+
+def test_without_reversal_keeps_stroke_direction():
+    strokes = [[(0, 0), (10, 0)], [(100, 0), (11, 0)], [(50, 50), (60, 60)]]
+    result = optimize_order(strokes, allow_reverse=False)
+
+    assert not any(result.reversed)
+    assert sorted(result.order) == [0, 1, 2]
+
+
+def test_two_opt_improves_on_nearest_neighbour():
+    rng = np.random.default_rng(7)
+    strokes = [[tuple(p), tuple(p + 1)] for p in rng.uniform(0, 1000, (2000, 2))]
+
+    greedy = optimize_order(strokes, two_opt=False)
+    improved = optimize_order(strokes)
+
+    assert improved.travel_after < greedy.travel_after
+
+
+def test_ten_thousand_strokes_under_a_second():
+    rng = np.random.default_rng(11)
+    points = rng.uniform(0, 7000, (10000, 2))
+    strokes = [[tuple(p), tuple(p + d)] for p, d in zip(points, rng.normal(0, 50, (10000, 2)))]
+
+    started = time.perf_counter()
+    result = optimize_order(strokes)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    assert result.travel_after < result.travel_before / 10
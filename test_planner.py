@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Planificador - movimientos XY combinados en lugar de escaleras X/Y
+"""
+
+import pytest
+
+from cnc_motion import STEP_DELAY_S, MotionModel
+from cnc_planner import count_pen_lifts, move_command, plan
+
+
+def test_move_command_picks_shortest_form():
+    assert move_command(100, 0) == "X100"
+    assert move_command(0, -50) == "Y-50"
+    assert move_command(30, -40) == "L30,-40"
+
+
+def test_plan_emits_combined_moves_and_pen_changes():
+    strokes = [[(100, 100), (200, 150), (200, 300)], [(50, 50)]]
+    commands, positions, stroke_ends = plan(strokes)
+
+    assert commands == ['H', 'L100,100', 'B', 'L100,50', 'Y150', 'U',
+                        'L-150,-250', 'B', 'U']
+    assert positions[-1] == (50, 50)
+    assert stroke_ends == [6, 9]
+    assert len(positions) == len(commands)
+
+
+def test_plan_without_home_starts_from_given_position():
+    commands, _, _ = plan([[(10, 10)]], start=(10, 0), home=False)
+    assert commands == ['Y10', 'B', 'U']
+
+
+def test_diagonal_stroke_halves_step_time():
+    # Diagonal larga: la escalera X/Y tardaba |dx|+|dy| pasos
+    stroke = [(i * 10, i * 10) for i in range(101)]
+    commands, _, _ = plan([stroke], start=(0, 0), home=False)
+
+    moves = [c for c in commands if c not in ('B', 'U')]
+    combined = MotionModel(command_overhead_s=0, baud_rate=None).total_seconds(moves)
+    staircase = sum(abs(b[0] - a[0]) + abs(b[1] - a[1]) for a, b in zip(stroke, stroke[1:]))
+    assert combined * 2 == pytest.approx(staircase * STEP_DELAY_S)
+
+
+def test_touching_strokes_are_drawn_without_lifting_the_pen():
+    strokes = [[(0, 0), (100, 0)], [(101, 1), (101, 100)], [(101, 100)], [(300, 300), (310, 300)]]
+    commands, positions, stroke_ends = plan(strokes, home=False)
+    # 2° trazo a 1 paso del final del 1°; el punto suelto cae justo encima
+    assert commands == ['B', 'X100', 'L1,1', 'Y99', 'U', 'L199,200', 'B', 'X10', 'U']
+    assert count_pen_lifts(commands) == 2 and stroke_ends == [5, 9]
+    assert len(positions) == len(commands)
+
+    # Con tolerancia 0 solo se unen los que coinciden exactamente
+    commands, _, _ = plan(strokes, home=False, merge_tolerance=0)
+    assert count_pen_lifts(commands) == 3
+    assert commands.count('B') == commands.count('U')
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Seguimiento de Posición - recortes del firmware, deriva y re-sincronización
+"""
+
+import numpy as np
+
+from cnc_drawing import Drawing
+from cnc_engine import EVENT_LOG, PlotterEngine
+from cnc_position import PositionTracker, parse_move, parse_position_report
+from cnc_simulator import SimulatedCNC, SimulatedSerial
+
+
+def _report(x, y, z=0):
+    return ['=== POSICION ===', f'X: {x} / 1000', f'Y: {y} / 1000', f'Z: {z} / 512']
+
+
+def test_parse_reports_and_moves():
+    assert parse_position_report(_report(140, -3)) == ((140, -3, 0), (1000, 1000, 512))
+    assert parse_position_report(['=== POSICION ===', 'X: 1 / 2']) is None
+    assert parse_move('L10,-5') == (10, -5)
+    assert parse_move('x-7') == (-7, 0) and parse_move('Y3') == (0, 3)
+    assert parse_move('X') is None and parse_move('U') is None
+
+
+def test_clipped_moves_are_reaimed_at_the_planned_point():
+    tracker = PositionTracker(limits=(1000, 1000))
+    sent = list(tracker.wrap(['H', 'X-300', 'B', 'L500,200', 'U', 'X900', 'X-500']))
+    # X-300 queda en el borde (no se envía); el resto apunta al plan recortado
+    assert sent == ['H', 'B', 'L200,200', 'U', 'X800', 'X-400', 'P']
+    assert tracker.predicted == (600, 200) and tracker.planned == (600, 200)
+    assert tracker.adjusted_moves == 4
+
+
+def test_skipped_moves_count_only_after_the_previous_echo():
+    tracker = PositionTracker(limits=(1000, 1000))
+    stream = tracker.wrap(['X-300', 'B', 'X-50', 'Y-10', 'X400', 'U'])
+    assert next(stream) == 'B'             # X-300 se omite con nada en vuelo
+    assert tracker.completed == 1
+    assert next(stream) == 'X50'           # X-50 e Y-10 tampoco se envían...
+    assert tracker.completed == 1          # ...pero esperan al eco de 'B'
+    assert tracker.on_response([]) and tracker.completed == 4
+    assert tracker.on_response([]) and tracker.completed == 5
+
+
+def test_drift_from_report_is_corrected_with_pen_up():
+    tracker = PositionTracker(checkpoint_every=1)
+    stream = tracker.wrap(['X100', 'B', 'X50', 'U', 'X10', 'B', 'Y5', 'U'])
+    assert [next(stream) for _ in range(5)] == ['X100', 'B', 'X50', 'U', 'P']
+    for _ in range(4):
+        assert tracker.on_response([])
+    assert not tracker.on_response(_report(140, 0))    # el CNC quedó 10 pasos atrás
+    assert tracker.drift_events == 1 and tracker.max_drift == 10
+    assert next(stream) == 'X20'                       # re-sincroniza en el viaje
+    assert list(stream) == ['B', 'Y5', 'U', 'P', 'P']
+    assert tracker.predicted == (160, 5)
+
+
+def test_stale_checkpoints_do_not_correct_twice():
+    tracker = PositionTracker(checkpoint_every=1)
+    stream = tracker.wrap(['X100', 'U', 'X10', 'U', 'X10', 'U'])
+    assert [next(stream) for _ in range(6)] == ['X100', 'U', 'P', 'X10', 'U', 'P']
+    tracker.on_response([]), tracker.on_response([])
+    tracker.on_response(_report(90, 0))
+    tracker.on_response([]), tracker.on_response([])
+    tracker.on_response(_report(100, 0))               # sigue atrasado: misma deriva
+    assert tracker.drift_events == 1
+    assert next(stream) == 'X20'
+
+
+def test_engine_job_ends_where_the_firmware_says():
+    cnc = SimulatedCNC(max_x=2000, max_y=2000)
+    engine = PlotterEngine(simulator_time_scale=0, optimize=False)
+    logs = []
+    engine.add_listener(lambda event, data: logs.append(data) if event == EVENT_LOG else None)
+    engine.set_origin('top-left')
+    engine.attach(SimulatedSerial(cnc, time_scale=0, timeout=0.05, boot=False))
+    try:
+        # Trazos que salen del recorrido del firmware y vuelven a entrar
+        drawing = Drawing.from_strokes([np.array([(20, 20), (300, 20), (300, 60)], dtype=float),
+                                        np.array([(40, 100), (60, 120)], dtype=float)])
+        result = engine.plot_drawing(drawing)
+    finally:
+        engine.disconnect()
+    assert result.ok
+    assert tuple(engine.current_pos) == (cnc.x, cnc.y)
+    last = engine.transform.px_to_steps(np.array([(60.0, 120.0)]))[0]
+    assert (cnc.x, cnc.y) == (int(last[0]), int(last[1]))
+    assert any("ajustados a los límites" in line for line in logs)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de los Perfiles de Calibración - guardado atómico, identidad y verificación
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from cnc_calibration import PHASES, run_calibration
+from cnc_engine import EVENT_LOG, PlotterEngine
+from cnc_profiles import CalibrationProfile, ProfileStore, device_key
+from cnc_simulator import SIMULATOR_PORT, SimulatedCNC, SimulatedSerial
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / 'perfiles.json'))
+
+
+def _engine(store, cnc=None):
+    engine = PlotterEngine(profile_store=store)
+    engine.logs = []
+    engine.add_listener(lambda event, data: engine.logs.append(data) if event == EVENT_LOG
+                        else None)
+    engine.attach(SimulatedSerial(cnc, time_scale=0, timeout=0.05, boot=False), SIMULATOR_PORT)
+    return engine
+
+
+def test_store_round_trip_keeps_other_machines(store, tmp_path):
+    store.save('A', CalibrationProfile('bottom-right', 9900, 8800, 40.0))
+    store.save('B', CalibrationProfile('top-left'))
+    store.save('A', CalibrationProfile('top-right', 9000, 8000, 40.0))
+    profile = store.load('A')
+    assert (profile.origin_corner, profile.max_x_steps, profile.steps_per_mm) == ('top-right', 9000, 40.0)
+    assert store.load('B').origin_corner == 'top-left'
+    assert store.load('C') is None
+    assert os.listdir(tmp_path) == ['perfiles.json']   # sin temporales
+    store.delete('B')
+    assert store.load('B') is None
+
+
+def test_corrupt_or_foreign_file_is_ignored(store):
+    with open(store.filename, 'w') as f:
+        f.write('{"devices": {"A": ')
+    assert store.load('A') is None
+    with open(store.filename, 'w') as f:
+        json.dump({'version': 99, 'devices': {'A': {'origin_corner': 'top-left'}}}, f)
+    assert store.load('A') is None
+    store.save('A', CalibrationProfile('top-left'))
+    assert store.load('A').origin_corner == 'top-left'
+
+
+def test_device_key_prefers_usb_serial_number():
+    ports = [SimpleNamespace(device='COM3', vid=0x303A, pid=0x1001, serial_number='F4:12:FA'),
+             SimpleNamespace(device='COM4', vid=0x10C4, pid=0xEA60, serial_number=None)]
+    assert device_key('COM3', ports) == '303A:1001:F4:12:FA'
+    assert device_key('COM4', ports) == 'COM4'
+    assert device_key(SIMULATOR_PORT, ports) == SIMULATOR_PORT
+
+
+def test_reconnect_restores_profile_after_finding_the_origin(store):
+    cnc = SimulatedCNC(max_x=8192, max_y=8192, travel=(9000, 8500))
+    engine = _engine(store, cnc)
+    assert not engine.restore_profile()              # todavía no hay perfil
+    run_calibration(engine, PHASES[:2])
+    engine.steps_per_mm = 40.0
+    engine.set_origin('bottom-right')
+    assert engine.save_profile()
+    span = (engine.span_x_steps, engine.span_y_steps)
+    engine.disconnect()
+
+    # Al reconectar el ESP32 cuenta desde 0 donde quedó el carro
+    cnc.x = cnc.y = 0
+    engine = _engine(store, cnc)
+    try:
+        assert engine.restore_profile(rehome=lambda: run_calibration(engine, PHASES[:2]))
+        assert engine.origin_detected and engine.origin_corner == 'bottom-right'
+        assert (engine.span_x_steps, engine.span_y_steps) == span
+        assert engine.steps_per_mm == 40.0
+        assert tuple(cnc.physical) == (cnc.x, cnc.y)   # contador y carro de acuerdo
+        assert any("Perfil verificado" in line for line in engine.logs)
+    finally:
+        engine.disconnect()
+
+
+def test_profile_of_another_machine_is_rejected(store):
+    store.save(SIMULATOR_PORT, CalibrationProfile('top-left', 3000, 3000,
+                                                     span_x_steps=3000, span_y_steps=3000))
+    engine = _engine(store, SimulatedCNC(max_x=8192, max_y=8192, travel=(9000, 9000)))
+    try:
+        assert not engine.restore_profile(rehome=lambda: run_calibration(engine, PHASES[:2]))
+        assert not engine.origin_detected
+        assert any("no coincide" in line for line in engine.logs)
+    finally:
+        engine.disconnect()
+
+
+def test_profile_without_rehome_is_not_called_verified(store):
+    store.save(SIMULATOR_PORT, CalibrationProfile('top-right', 9000, 8000, 40.0))
+    engine = _engine(store)
+    try:
+        assert engine.restore_profile()
+        assert engine.origin_corner == 'top-right' and engine.max_x_steps == 9000
+        assert any("sin verificar" in line for line in engine.logs)
+        assert not any("verificado" in line for line in engine.logs)
+    finally:
+        engine.disconnect()
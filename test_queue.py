@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de la Cola de Trabajos - preparación en segundo plano, orden, persistencia y fallos
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from cnc_drawing import Drawing
+from cnc_engine import EVENT_LOG, EVENT_PROGRESS, PlotterEngine
+from cnc_queue import (STATUS_FAILED, STATUS_PENDING, STATUS_STOPPED, JobQueue, prepare_file)
+from cnc_simulator import SimulatedCNC, SimulatedSerial
+
+SVG = ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
+       '<circle cx="50" cy="50" r="40"/></svg>')
+
+
+@pytest.fixture
+def engine():
+    engine = PlotterEngine(simulator_time_scale=0)
+    engine.logs = []
+    engine.add_listener(lambda event, data: engine.logs.append(data) if event == EVENT_LOG
+                        else None)
+    engine.set_origin('top-left')
+    engine.cnc = SimulatedCNC(max_x=8192, max_y=8192)
+    engine.attach(SimulatedSerial(engine.cnc, time_scale=0, timeout=0.05, boot=False))
+    yield engine
+    engine.disconnect()
+
+
+def _queue(engine, tmp_path):
+    return JobQueue(engine, str(tmp_path / 'cola.json'), executor=ThreadPoolExecutor(2))
+
+
+def _files(tmp_path):
+    svg = tmp_path / 'circulo.svg'
+    svg.write_text(SVG)
+    gcode = tmp_path / 'linea.nc'
+    gcode.write_text("G0 X5 Y7\nG1 Z-1\nG1 X25 Y30\nG0 Z5\n")
+    npz = tmp_path / 'trazos.npz'
+    Drawing.from_strokes([np.array([(60, 60), (300, 120), (300, 400)], dtype=float)]).save(str(npz))
+    return str(svg), str(gcode), str(npz)
+
+
+def test_queue_plots_everything_back_to_back(engine, tmp_path):
+    queue = _queue(engine, tmp_path)
+    try:
+        svg, gcode, npz = _files(tmp_path)
+        for filename in (svg, gcode, npz):
+            queue.add_file(filename)
+        canvas = queue.add_drawing(Drawing.from_strokes([np.array([(500, 500), (520, 540)],
+                                                                  dtype=float)]))
+        assert os.path.exists(canvas.filename)
+        queue.start()
+        assert queue.wait_idle(timeout=30)
+    finally:
+        queue.close()
+    assert queue.jobs == [] and not os.path.exists(canvas.filename)
+    started = [line for line in engine.logs if line.startswith("📋 Trabajo de la cola")]
+    assert [line.split(': ')[1] for line in started] == ['circulo.svg', 'linea.nc',
+                                                         'trazos.npz', canvas.name]
+    assert len(queue.idle_seconds) == 3 and max(queue.idle_seconds) < 0.5
+    with open(queue.filename) as f:
+        assert json.load(f)['jobs'] == []
+    last = engine.transform.px_to_steps(np.array([(520, 540)]))[0]
+    assert (engine.cnc.x, engine.cnc.y) == (int(last[0]), int(last[1]))
+
+
+def test_queue_survives_a_restart_and_reprepares_stale_jobs(engine, tmp_path):
+    svg, _, npz = _files(tmp_path)
+    first = _queue(engine, tmp_path)
+    first.add_file(svg)
+    first.add_file(npz)
+    first.close()
+
+    queue = _queue(engine, tmp_path)
+    try:
+        assert [job.name for job in queue.jobs] == ['circulo.svg', 'trazos.npz']
+        assert all(job.status == STATUS_PENDING for job in queue.jobs)
+        queue.jobs[0].prepared.result(timeout=10)
+        engine.set_origin('bottom-right')       # lo preparado quedó viejo
+        queue.start()
+        assert queue.wait_idle(timeout=30)
+    finally:
+        queue.close()
+    assert queue.jobs == []
+    assert any(line.startswith("♻️") for line in engine.logs)
+
+
+def test_broken_file_is_skipped_and_stop_halts_the_queue(engine, tmp_path):
+    svg, gcode, npz = _files(tmp_path)
+    broken = tmp_path / 'roto.svg'
+    broken.write_text('<svg')
+    queue = _queue(engine, tmp_path)
+    progress = []
+
+    def stop_once(event, data):
+        if event == EVENT_PROGRESS:
+            progress.append(data)
+            if len(progress) == 5:
+                engine.stop()
+
+    try:
+        bad = queue.add_file(str(broken))
+        queue.add_file(svg)
+        waiting = queue.add_file(npz)
+        engine.add_listener(stop_once)
+        queue.start()
+        assert queue.wait_idle(timeout=30)
+    finally:
+        queue.close()
+    statuses = [(job.name, job.status) for job in queue.jobs]
+    assert statuses == [('roto.svg', STATUS_FAILED), ('circulo.svg', STATUS_STOPPED),
+                        ('trazos.npz', STATUS_PENDING)]
+    assert bad.message and waiting.status == STATUS_PENDING and not queue.running
+
+
+def test_process_pool_prepares_the_same_commands(tmp_path):
+    svg, _, _ = _files(tmp_path)
+    engine = PlotterEngine()
+    engine.set_origin('top-left')
+    queue = JobQueue(engine, str(tmp_path / 'cola.json'))
+    try:
+        job = queue.add_file(svg)
+        prepared = job.prepared.result(timeout=120)
+    finally:
+        queue.close()
+    assert prepared.commands == prepare_file(svg, engine.job_settings()).commands
+    assert prepared.commands[0] == 'H' and prepared.seconds > 0
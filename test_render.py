@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Renderizado - un ítem por trazo, nivel de detalle y capas en caché
+"""
+
+import numpy as np
+
+from cnc_render import ACTIVE_CHUNK, CanvasRenderer, decimate
+
+
+class FakeCanvas:
+    """Sustituto mínimo de tk.Canvas (ítems con coords y tags)"""
+
+    def __init__(self):
+        self.items = {}
+        self.next_id = 1
+        self.created = 0
+
+    def _create(self, coords, tags):
+        item = self.next_id
+        self.next_id += 1
+        self.created += 1
+        tags = (tags,) if isinstance(tags, str) else tuple(tags or ())
+        self.items[item] = {'coords': list(coords), 'tags': set(tags)}
+        return item
+
+    def create_line(self, *coords, tags=None, **options):
+        return self._create(coords, tags)
+
+    def create_text(self, *coords, tags=None, **options):
+        return self._create(coords, tags)
+
+    def create_oval(self, *coords, tags=None, **options):
+        return self._create(coords, tags)
+
+    def find_withtag(self, tag):
+        return tuple(item for item, data in self.items.items() if tag in data['tags'])
+
+    def delete(self, tag):
+        for item in self.find_withtag(tag):
+            del self.items[item]
+
+    def tag_lower(self, tag):
+        pass
+
+    def coords(self, item, *coords):
+        self.items[item]['coords'] = list(coords)
+
+    def dtag(self, item, tag):
+        self.items[item]['tags'].discard(tag)
+
+    def addtag_withtag(self, tag, item):
+        self.items[item]['tags'].add(tag)
+
+
+def _renderer():
+    canvas = FakeCanvas()
+    return canvas, CanvasRenderer(canvas, 600, 600)
+
+
+def test_decimate_keeps_endpoints_and_drops_subpixel_points():
+    points = np.column_stack([np.linspace(0, 10, 1001), np.zeros(1001)])
+    reduced = decimate(points, 1.0)
+    assert np.allclose(reduced[0], (0, 0)) and np.allclose(reduced[-1], (10, 0))
+    assert len(reduced) <= 12
+
+
+def test_one_item_per_stroke():
+    canvas, renderer = _renderer()
+    strokes = [np.random.default_rng(i).uniform(0, 600, (5000, 2)) for i in range(10)]
+    assert renderer.render_strokes(strokes) == 10
+    assert len(canvas.find_withtag('strokes')) == 10
+
+    renderer.clear_strokes()
+    assert canvas.find_withtag('strokes') == ()
+
+
+def test_overlay_is_cached_and_strokes_survive_state_changes():
+    canvas, renderer = _renderer()
+    renderer.draw_grid()
+    grid_items = canvas.find_withtag('grid')
+    renderer.render_strokes([np.array([(0, 0), (100, 100)], dtype=float)])
+
+    assert renderer.set_overlay(False, False, None)
+    assert not renderer.set_overlay(False, False, None)
+    assert renderer.set_overlay(True, True, "top-right")
+
+    renderer.draw_grid()
+    assert canvas.find_withtag('grid') == grid_items
+    assert len(canvas.find_withtag('strokes')) == 1
+
+
+def test_freehand_stroke_extends_a_single_item():
+    canvas, renderer = _renderer()
+    renderer.begin_stroke(0, 0)
+    for x in range(1, 100):
+        renderer.extend_stroke(x, x)
+    renderer.end_stroke()
+
+    items = canvas.find_withtag('strokes')
+    assert len(items) == 1
+    assert len(canvas.items[items[0]]['coords']) == 200
+    assert canvas.find_withtag('active') == ()
+
+
+def test_long_freehand_stroke_is_chunked():
+    canvas, renderer = _renderer()
+    renderer.begin_stroke(0, 0)
+    for x in range(1, 3 * ACTIVE_CHUNK):
+        renderer.extend_stroke(x % 600, x // 600)
+    renderer.end_stroke()
+    assert 1 < len(canvas.find_withtag('strokes')) <= 4
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Sender por Streaming - sin hardware, contra un puerto serial falso
+"""
+
+from collections import deque
+
+import pytest
+
+from cnc_sender import StreamingSender, parse_echo
+
+
+class FakeSerial:
+    """Puerto serial falso que responde como `processCommand` del firmware.
+
+    Los comandos escritos quedan en un buffer de entrada; cada lectura
+    ejecuta el siguiente comando cuando ya no quedan líneas por leer.
+    """
+
+    def __init__(self, silent=False):
+        self.silent = silent
+        self.rx_buffer = deque()     # comandos aún no procesados por el firmware
+        self.output = deque()        # líneas que el firmware ya imprimió
+        self.executed = []
+        self.max_buffered = 0
+
+    def write(self, command):
+        self.rx_buffer.append(command)
+        self.max_buffered = max(self.max_buffered, len(self.rx_buffer))
+        return True
+
+    def readline(self, timeout):
+        if not self.output and self.rx_buffer and not self.silent:
+            self._execute(self.rx_buffer.popleft())
+        return self.output.popleft() if self.output else None
+
+    def _execute(self, command):
+        self.executed.append(command)
+        self.output.append("")
+        self.output.append(f"> {command}")
+        axis, value = command[0], command[1:]
+        if axis in "XY" and value:
+            self.output.append(f"Moviendo {axis}: {value} pasos")
+            self.output.append(f"{axis} {'+' if int(value) > 0 else '-'}{abs(int(value))}")
+        elif command == 'P':
+            self.output.extend(["=== POSICION ===", "X: 0 / 8192", "Y: 0 / 8192"])
+
+
+def test_parse_echo():
+    assert parse_echo("> X120") == "X120"
+    assert parse_echo(">  B ") == "B"
+    assert parse_echo("Moviendo X: 120 pasos") is None
+    assert parse_echo(">") is None
+
+
+def test_stream_completes_all_commands_in_order():
+    port = FakeSerial()
+    sender = StreamingSender(port.write, port.readline, window=3)
+    commands = ['H', 'X100', 'Y-50', 'B', 'X10', 'U']
+
+    completed = sender.stream(commands)
+
+    assert completed == len(commands)
+    assert port.executed == commands + ['P']  # 'P' es la barrera final
+
+
+def test_window_bounds_outstanding_commands():
+    port = FakeSerial()
+    sender = StreamingSender(port.write, port.readline, window=2)
+    sender.stream([f"X{i}" for i in range(1, 50)])
+
+    assert port.max_buffered <= 2
+
+
+def test_byte_budget_bounds_outstanding_commands():
+    port = FakeSerial()
+    sender = StreamingSender(port.write, port.readline, window=100, max_bytes=12)
+    sender.stream(["X-1000"] * 10)
+
+    assert port.max_buffered <= 2
+
+
+def test_progress_reports_completed_commands():
+    port = FakeSerial()
+    sender = StreamingSender(port.write, port.readline, window=4)
+    progress = []
+    sender.stream(['X1', 'X2', 'X3'], on_progress=progress.append)
+
+    assert progress == sorted(progress)
+    assert progress[-1] == 3
+
+
+def test_should_continue_stops_sending():
+    port = FakeSerial()
+    sent = []
+
+    def write(command):
+        if command != 'P':
+            sent.append(command)
+        return port.write(command)
+
+    def keep_going():
+        return len(sent) < 2
+
+    sender = StreamingSender(write, port.readline, window=1)
+    completed = sender.stream(['X1', 'X2', 'X3', 'X4'], should_continue=keep_going)
+
+    assert completed == 2
+    assert 'X3' not in port.executed
+
+
+def test_silent_port_times_out():
+    port = FakeSerial(silent=True)
+    sender = StreamingSender(port.write, port.readline, window=1, ack_timeout=0.05)
+
+    with pytest.raises(TimeoutError):
+        sender.stream(['X1', 'X2'])
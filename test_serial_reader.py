@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Lector Serial - framing, suscripciones con filtro y errores
+"""
+
+import threading
+import time
+
+from cnc_serial_reader import LineFramer, SerialReader
+
+
+class FakePort:
+    """Puerto estilo pyserial: read() bloquea hasta timeout si no hay datos"""
+
+    def __init__(self):
+        self.timeout = 1.0
+        self._data = bytearray()
+        self._cond = threading.Condition()
+        self.fail = None
+
+    def feed(self, data):
+        with self._cond:
+            self._data.extend(data)
+            self._cond.notify_all()
+
+    @property
+    def in_waiting(self):
+        return len(self._data)
+
+    def read(self, size=1):
+        with self._cond:
+            if self.fail is not None:
+                raise self.fail
+            if not self._data:
+                self._cond.wait(self.timeout)
+            chunk = bytes(self._data[:size])
+            del self._data[:size]
+            return chunk
+
+
+def test_framer_handles_crlf_and_partial_lines():
+    framer = LineFramer()
+    assert framer.feed(b"\r\n> X1") == []
+    assert framer.feed(b"0\r\nMoviendo X: 10 pasos\r\nX +") == ["> X10", "Moviendo X: 10 pasos"]
+    assert framer.feed(b"10\n") == ["X +10"]
+
+
+def test_framer_keeps_utf8_split_across_reads():
+    data = "✏️ ⬆️ LÁPIZ ARRIBA\r\n".encode('utf-8')
+    framer = LineFramer()
+    assert framer.feed(data[:5]) == []
+    assert framer.feed(data[5:]) == ["✏️ ⬆️ LÁPIZ ARRIBA"]
+
+
+def test_subscriptions_receive_filtered_lines():
+    port = FakePort()
+    reader = SerialReader(port)
+    everything = reader.subscribe()
+    echoes = reader.subscribe(lambda line: line.startswith('>'))
+    reader.start()
+    try:
+        port.feed(b"\r\n> X10\r\nMoviendo X: 10 pasos\r\n\r\n> B\r\n")
+        assert echoes.get(timeout=1) == "> X10"
+        assert echoes.get(timeout=1) == "> B"
+        assert [everything.get(timeout=1) for _ in range(3)] == [
+            "> X10", "Moviendo X: 10 pasos", "> B"]
+        echoes.close()
+        port.feed(b"> U\n")
+        assert everything.get(timeout=1) == "> U"
+        assert echoes.get(timeout=0.1) is None
+    finally:
+        reader.stop()
+
+
+def test_bulk_output_is_not_throttled():
+    port = FakePort()
+    reader = SerialReader(port)
+    lines = reader.subscribe()
+    reader.start()
+    try:
+        started = time.monotonic()
+        port.feed(b"".join(b"IMU %d\r\n" % i for i in range(5000)))
+        received = [lines.get(timeout=1) for _ in range(5000)]
+        assert received[-1] == "IMU 4999"
+        assert time.monotonic() - started < 2.0
+    finally:
+        reader.stop()
+
+
+def test_read_errors_are_reported():
+    port = FakePort()
+    errors = []
+    reader = SerialReader(port, on_error=errors.append)
+    port.fail = OSError("USB desconectado")
+    reader.start()
+    deadline = time.monotonic() + 1
+    while (not errors or reader.is_running) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert isinstance(errors[0], OSError)
+    assert not reader.is_running
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de Simplificación - Ramer–Douglas–Peucker con cuantización a pasos
+"""
+
+import numpy as np
+
+from cnc_motion import MotionModel
+from cnc_planner import plan
+from cnc_simplify import count_segments, rdp_mask, simplify_stroke, simplify_strokes
+
+STEPS_PER_MM = 51.2
+
+
+def test_noisy_straight_line_collapses_to_endpoints():
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 100, 500)
+    points = np.column_stack([x, 20 + rng.normal(0, 0.01, len(x))])
+
+    indices = simplify_stroke(points, 0.1, STEPS_PER_MM)
+
+    assert list(indices) == [0, len(points) - 1]
+
+
+def test_corner_is_preserved():
+    points = np.array([(0, 0), (5, 0), (10, 0), (10, 5), (10, 10)], dtype=float)
+    assert list(np.flatnonzero(rdp_mask(points, 0.1))) == [0, 2, 4]
+
+
+def test_closed_stroke_keeps_its_shape():
+    t = np.linspace(0, 2 * np.pi, 200)
+    circle = np.column_stack([50 + 20 * np.cos(t), 50 + 20 * np.sin(t)])
+
+    indices = simplify_stroke(circle, 0.05, STEPS_PER_MM)
+
+    assert 8 < len(indices) < 200
+    assert indices[0] == 0 and indices[-1] == len(circle) - 1
+
+
+def test_points_in_same_step_are_dropped():
+    # Separados menos de medio paso: el motor no se movería
+    points = np.array([(0, 0), (0.001, 0.002), (0.002, 0.0)])
+    indices = simplify_stroke(points, 0.0, STEPS_PER_MM)
+    assert list(indices) == [0]
+
+
+def test_simplify_strokes_reduces_segments_and_time():
+    xs = np.linspace(10, 100, 300)
+    stroke = np.column_stack([xs, 10 + 0.5 * xs])
+
+    simplified = simplify_strokes([stroke], 0.2, STEPS_PER_MM)
+
+    assert count_segments([stroke]) == 299
+    assert count_segments(simplified) == 1
+    assert (simplified[0][0] == stroke[0]).all() and (simplified[0][-1] == stroke[-1]).all()
+
+    def seconds(strokes):
+        steps = [np.rint(s * STEPS_PER_MM).astype(int) for s in strokes]
+        return MotionModel().total_seconds(plan(steps)[0])
+
+    assert seconds(simplified) < seconds([stroke])
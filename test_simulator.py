@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Simulador - mismo protocolo que el firmware, tiempos y calibración
+"""
+
+import time
+
+import pytest
+
+from cnc_planner import plan
+from cnc_sender import StreamingSender, parse_echo
+from cnc_serial_reader import LineFramer, SerialReader
+from cnc_simulator import (MAX_X_STEPS, STEP_DELAY_S, SimulatedCNC, SimulatedSerial,
+                           arduino_to_int)
+
+
+def _run(cnc, command):
+    cnc.execute(command)
+    return LineFramer().feed(''.join(text for _, text in cnc.take_output()).encode())
+
+
+def test_echo_and_position_report():
+    cnc = SimulatedCNC()
+    lines = _run(cnc, 'x100')
+    assert lines[:2] == ['> X100', 'Moviendo X: 100 pasos']
+    assert parse_echo(lines[0]) == 'X100'
+
+    assert _run(cnc, 'P') == ['> P', '=== POSICION ===', f'X: 100 / {MAX_X_STEPS}',
+                              f'Y: 0 / {MAX_X_STEPS}', 'Z: 0 / 512']
+
+
+def test_step_timing_and_line_clamping():
+    cnc = SimulatedCNC()
+    _run(cnc, 'L300,-100')
+    # Y ya está en 0: solo avanza X; el tiempo es max(|dx|, |dy|) pasos
+    assert (cnc.x, cnc.y) == (300, 0)
+    assert cnc.clock == pytest.approx(300 * STEP_DELAY_S)
+
+    _run(cnc, f'L{MAX_X_STEPS},0')
+    assert cnc.x == MAX_X_STEPS
+    assert _run(cnc, 'L5') == ['> L5', '⚠ Formato: L<dx>,<dy> (ej: L100,-50)']
+
+
+def test_pen_commands():
+    cnc = SimulatedCNC()
+    assert _run(cnc, 'B')[1] == '✏️ ⬇️ LÁPIZ ABAJO (Pen Down)'
+    assert cnc.pen_down and cnc.clock == pytest.approx(200 * STEP_DELAY_S + 0.2)
+    assert _run(cnc, 'B')[1] == 'ℹ️ Lápiz ya está abajo'
+    # Home sube el lápiz (Z a 0): el siguiente B tiene que volver a bajarlo
+    _run(cnc, 'H')
+    assert cnc.z == 0 and not cnc.pen_down
+    assert _run(cnc, 'B')[1] == '✏️ ⬇️ LÁPIZ ABAJO (Pen Down)'
+
+
+def test_calibration_reports_range():
+    cnc = SimulatedCNC(travel=(3000, 3000))
+    lines = _run(cnc, 'C')
+    assert '✓ ¡LÍMITE IZQUIERDO ENCONTRADO!' in lines
+    assert '✅ ¡Calibración X COMPLETADA!' in lines
+    define = [line for line in lines if line.startswith('#define MAX_X_STEPS')]
+    assert len(define) == 1 and int(define[0].split()[-1]) > 3000
+    assert cnc.x == 0 and cnc.physical[0] == 0
+
+    no_imu = SimulatedCNC(imu=False)
+    assert '⚠ ERROR: IMU no disponible' in _run(no_imu, 'D')
+
+
+def test_arduino_to_int():
+    assert arduino_to_int('-50') == -50
+    assert arduino_to_int('12abc') == 12
+    assert arduino_to_int('abc') == 0
+
+
+def test_serial_port_end_to_end_with_streaming_sender():
+    port = SimulatedSerial(time_scale=0, timeout=0.05, boot=False)
+    reader = SerialReader(port)
+    echoes = reader.subscribe(lambda line: parse_echo(line) is not None)
+    reader.start()
+    try:
+        commands, _, _ = plan([[(100, 100), (300, 200)], [(50, 400)]])
+        sender = StreamingSender(lambda cmd: port.write((cmd + '\n').encode()) > 0, echoes.get)
+        assert sender.stream(commands) == len(commands)
+        assert (port.cnc.x, port.cnc.y) == (50, 400)
+        assert port.dropped_bytes == 0
+    finally:
+        reader.stop()
+        port.close()
+
+
+def test_rx_buffer_overflow_drops_bytes():
+    port = SimulatedSerial(time_scale=1.0, timeout=0.05, boot=False, rx_buffer_size=16)
+    try:
+        port.write(b'X1000\n')           # ocupa al firmware 2 s simulados
+        time.sleep(0.05)
+        port.write(b'Y1\n' * 10)         # 30 bytes en un búfer de 16
+        assert port.dropped_bytes == 14
+    finally:
+        port.close()
+
+
+def test_time_scale_paces_output():
+    port = SimulatedSerial(time_scale=0.05, timeout=2.0, boot=False)
+    try:
+        start = time.monotonic()
+        port.write(b'X500\nP\n')         # 1 s simulado -> ~50 ms reales
+        while b'=== POSICION ===' not in port.readline():
+            pass
+        elapsed = time.monotonic() - start
+        assert 0.04 <= elapsed < 1.0
+    finally:
+        port.close()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test del Importador SVG - aplanado adaptativo, transformaciones y ajuste al área
+"""
+
+import time
+
+import numpy as np
+
+from cnc_svg import load_svg, parse_svg, parse_transform
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg">{}</svg>'
+
+
+def _flatten(body, tolerance=0.01):
+    return parse_svg(SVG.format(body)).flatten(tolerance)
+
+
+def test_transform_composition():
+    matrix = parse_transform("translate(10, 20) scale(2)")
+    assert np.allclose(matrix @ [1, 1, 1], [12, 22, 1])
+    rotated = parse_transform("rotate(90 5 5)")
+    assert np.allclose(rotated @ [10, 5, 1], [5, 10, 1])
+
+
+def test_relative_commands_and_implicit_lineto():
+    strokes = _flatten('<path d="m10 10 20 0 0 20 h-20 z M 0 0 V 5"/>')
+    assert len(strokes) == 2
+    assert np.allclose(strokes[0], [(10, 10), (30, 10), (30, 30), (10, 30), (10, 10)])
+    assert np.allclose(strokes[1], [(0, 0), (0, 5)])
+
+
+def test_cubic_flattening_within_tolerance():
+    tolerance = 0.01
+    stroke = _flatten('<path d="M0 0 C 0 100 100 100 100 0"/>', tolerance)[0]
+    t = np.linspace(0, 1, 2001)[:, None]
+    p0, p1, p2, p3 = np.array([(0, 0), (0, 100), (100, 100), (100, 0)], dtype=float)
+    exact = (1 - t) ** 3 * p0 + 3 * (1 - t) ** 2 * t * p1 + 3 * (1 - t) * t ** 2 * p2 + t ** 3 * p3
+
+    # Distancia de cada punto exacto a la polilínea
+    a, b = stroke[:-1], stroke[1:]
+    ab = b - a
+    rel = exact[:, None, :] - a[None]
+    u = np.clip((rel * ab).sum(-1) / (ab * ab).sum(-1), 0, 1)
+    distance = np.linalg.norm(rel - u[..., None] * ab, axis=-1).min(axis=1)
+    assert distance.max() <= tolerance
+    # Adaptativo: con 4 veces más tolerancia alcanza la mitad de segmentos
+    coarse = _flatten('<path d="M0 0 C 0 100 100 100 100 0"/>', 4 * tolerance)[0]
+    assert len(coarse) - 1 <= (len(stroke) - 1) / 2 + 1
+
+
+def test_circle_and_scaled_group():
+    strokes = _flatten('<g transform="scale(3)"><circle cx="10" cy="10" r="5"/></g>', 0.01)
+    radius = np.hypot(strokes[0][:, 0] - 30, strokes[0][:, 1] - 30)
+    assert np.allclose(radius, 15)
+    assert np.allclose(strokes[0][0], strokes[0][-1])
+
+
+def test_svg_arc_endpoints():
+    stroke = _flatten('<path d="M0 0 A 10 10 0 0 1 20 0"/>')[0]
+    assert np.allclose(stroke[-1], (20, 0))
+    # Sweep=1 en coordenadas SVG (Y abajo) pasa por Y negativa
+    assert stroke[:, 1].min() < -9.9
+
+
+def test_fit_into_work_area():
+    strokes = load_svg(SVG.format('<rect x="100" y="100" width="400" height="200"/>'),
+                       150, 150, tolerance_mm=0.01)
+    points = np.vstack(strokes)
+    assert np.allclose(points.min(axis=0), (0, 37.5))
+    assert np.allclose(points.max(axis=0), (150, 112.5))
+
+
+def test_large_logo_imports_fast():
+    rng = np.random.default_rng(1)
+    paths = "".join('<path d="M{:.2f} {:.2f} C{:.2f} {:.2f} {:.2f} {:.2f} {:.2f} {:.2f} '
+                    'Q{:.2f} {:.2f} {:.2f} {:.2f}"/>'.format(*row)
+                    for row in rng.uniform(0, 1000, (2000, 12)))
+    start = time.perf_counter()
+    strokes = load_svg(SVG.format(paths), 150, 150, tolerance_mm=0.5 / 51.2)
+    assert time.perf_counter() - start < 1.0
+    assert len(strokes) == 2000